@@ -63,11 +63,331 @@ def convert_to_string_dict(obj):
         return str(obj)  
     else:
         return str(obj)
-    
+
+
+def artifact_to_dict(artifact) -> dict:
+    """Convert a wandb Artifact to the artifact dict returned by list_runs."""
+    return {
+        "name": artifact.name,
+        "id": artifact.id,
+        "type": artifact.type,
+        "version": artifact.version,
+        "url": artifact.url,
+        "description": artifact.description,
+        "createdAt": artifact.created_at,
+        "aliases": artifact.aliases,
+        "tags": artifact.tags
+    }
+
+
+# Fields of the artifacts listed by the bulk queries
+ARTIFACT_FIELDS_FRAGMENT = """
+fragment BulkArtifactFields on Artifact {
+    id
+    versionIndex
+    description
+    createdAt
+    artifactType { name }
+    artifactSequence { name project { entityName name } }
+    aliases { alias }
+}
+"""
+
+# Runs with their summaries, configs and, optionally, the artifacts they logged,
+# fetched page by page with a single query instead of one API call per run
+BULK_RUNS_QUERY = """
+query BulkRuns(
+    $project: String!, $entity: String!, $cursor: String, $perPage: Int!,
+    $order: String, $filters: JSONString, $withArtifacts: Boolean!, $artifactsPerRun: Int
+) {
+    project(name: $project, entityName: $entity) {
+        runs(filters: $filters, after: $cursor, first: $perPage, order: $order) {
+            edges {
+                node {
+                    name
+                    displayName
+                    state
+                    config
+                    summaryMetrics
+                    outputArtifacts(first: $artifactsPerRun) @include(if: $withArtifacts) {
+                        edges { node { ...BulkArtifactFields } }
+                        pageInfo { endCursor hasNextPage }
+                    }
+                }
+            }
+            pageInfo {
+                endCursor
+                hasNextPage
+            }
+        }
+    }
+}
+""" + ARTIFACT_FIELDS_FRAGMENT
+
+# Number of runs queried together by _query_runs_batch
+RUNS_PER_BATCH = 50
+
+# File holding the metadata of a run, see wandb's Run.metadata
+RUN_METADATA_FILE = "wandb-metadata.json"
+
+
+def _parse_project_path(api, project_path: str) -> tuple[str, str]:
+    """Split "entity/project" into its parts, using the default entity for "project"."""
+    parts = project_path.strip("/").split("/")
+    if len(parts) == 1:
+        return api.default_entity, parts[0]
+    return parts[0], parts[1]
+
+
+def _run_config(config_json: str) -> dict:
+    """Decode a run's config like wandb's Run.config, without the private keys."""
+    config = {}
+    for key, value in json.loads(config_json or "{}").items():
+        if key.startswith("_"):
+            continue
+        config[key] = value["value"] if isinstance(value, dict) and "value" in value else value
+    return config
+
+
+def _artifact_node_to_dict(node: dict, app_url: str) -> dict:
+    """Convert an artifact of BULK_RUNS_QUERY to the artifact dict returned by list_runs."""
+    sequence = node.get("artifactSequence") or {}
+    project = sequence.get("project") or {}
+    artifact_type = (node.get("artifactType") or {}).get("name")
+    version = f"v{node.get('versionIndex')}"
+    return {
+        "name": f"{sequence.get('name')}:{version}",
+        "id": node.get("id"),
+        "type": artifact_type,
+        "version": version,
+        "url": f"{app_url}/{project.get('entityName')}/{project.get('name')}"
+               f"/artifacts/{artifact_type}/{sequence.get('name')}/{version}",
+        "description": node.get("description"),
+        "createdAt": node.get("createdAt"),
+        "aliases": [alias["alias"] for alias in node.get("aliases") or []],
+        # Only recent servers support artifact tags, so they are not fetched
+        "tags": None
+    }
+
+
+def _query_runs_batch(api, entity: str, project: str, run_selections: dict[str, str],
+                      fragments: str = "") -> dict[str, dict]:
+    """
+    Query fields of several runs with one request, by aliasing a `run` field per run.
+
+    Args:
+        api (wandb.Api): The API whose client sends the request.
+        entity (str): The entity of the runs.
+        project (str): The project of the runs.
+        run_selections (dict[str, str]): The selection set queried for each run id.
+        fragments (str, optional): Definitions of the fragments used by the selections. Defaults to "".
+
+    Returns:
+        dict[str, dict]: The run nodes by run id, None for runs that were not found.
+    """
+    from wandb_gql import gql  # This must be imported after wandb
+
+    aliases = {f"run{i}": run_id for i, run_id in enumerate(run_selections)}
+    # JSON string literals are valid GraphQL string literals
+    fields = "\n".join(f"{alias}: run(name: {json.dumps(run_id)}) {{ {run_selections[run_id]} }}"
+                       for alias, run_id in aliases.items())
+    query = gql(
+        "query RunsBatch($project: String!, $entity: String!) {\n"
+        f"project(name: $project, entityName: $entity) {{\n{fields}\n}}\n}}\n{fragments}"
+    )
+    response = api.client.execute(query, variable_values={"entity": entity, "project": project})
+    project_node = response.get("project") or {}
+    return {run_id: project_node.get(alias) for alias, run_id in aliases.items()}
+
+
+def _fetch_remaining_artifacts(api, entity: str, project: str, cursors: dict[str, str],
+                               per_page: int, app_url: str) -> dict[str, list[dict]]:
+    """
+    List the artifacts of runs after a cursor, for RUNS_PER_BATCH runs per request.
+
+    Args:
+        api (wandb.Api): The API whose client sends the requests.
+        entity (str): The entity of the runs.
+        project (str): The project of the runs.
+        cursors (dict[str, str]): The cursor after the artifacts already listed, by run id.
+        per_page (int): Number of artifacts fetched per run and request.
+        app_url (str): The base URL of the W&B app.
+
+    Returns:
+        dict[str, list[dict]]: The remaining artifacts by run id.
+    """
+    artifacts = {run_id: [] for run_id in cursors}
+    while cursors:
+        next_cursors = {}
+        run_ids = list(cursors)
+        for start in range(0, len(run_ids), RUNS_PER_BATCH):
+            selections = {
+                run_id: f"outputArtifacts(after: {json.dumps(cursors[run_id])}, first: {int(per_page)}) {{ "
+                        "edges { node { ...BulkArtifactFields } } pageInfo { endCursor hasNextPage } }"
+                for run_id in run_ids[start:start + RUNS_PER_BATCH]
+            }
+            nodes = _query_runs_batch(api, entity, project, selections, fragments=ARTIFACT_FIELDS_FRAGMENT)
+            for run_id, node in nodes.items():
+                output_artifacts = (node or {}).get("outputArtifacts") or {}
+                artifacts[run_id].extend(_artifact_node_to_dict(edge["node"], app_url)
+                                         for edge in output_artifacts.get("edges") or [])
+                page_info = output_artifacts.get("pageInfo") or {}
+                if page_info.get("hasNextPage") and page_info.get("endCursor"):
+                    next_cursors[run_id] = page_info["endCursor"]
+        cursors = next_cursors
+    return artifacts
+
+
+def fetch_runs_metadata(project_path: str, runs: list[dict], max_workers: int = 8) -> list[dict]:
+    """
+    Fill in the metadata of runs listed in bulk mode, which is stored in a file of every run.
+
+    The file URLs are queried for RUNS_PER_BATCH runs per request, and the files are
+    downloaded concurrently.
+
+    Args:
+        project_path (str): The path of the project of the runs, "entity/project".
+        runs (list[dict]): Runs returned by list_runs, updated in place.
+        max_workers (int, optional): Number of files downloaded at once. Defaults to 8.
+
+    Returns:
+        runs (list[dict]): The same runs, with their metadata, or None if it can't be downloaded.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    api = wandb.Api()
+    entity, project = _parse_project_path(api, project_path)
+    selection = (f"files(names: [{json.dumps(RUN_METADATA_FILE)}], first: 1) "
+                 "{ edges { node { url(upload: false) } } }")
+    urls = {}
+    run_ids = [run["id"] for run in runs]
+    for start in range(0, len(run_ids), RUNS_PER_BATCH):
+        batch = run_ids[start:start + RUNS_PER_BATCH]
+        nodes = _query_runs_batch(api, entity, project, {run_id: selection for run_id in batch})
+        for run_id, node in nodes.items():
+            edges = ((node or {}).get("files") or {}).get("edges") or []
+            urls[run_id] = edges[0]["node"].get("url") if edges else None
+
+    session = api.client._client.transport.session
+
+    def download(url):
+        if not url:
+            return None
+        try:
+            response = session.get(url, timeout=5)
+            response.raise_for_status()
+            return json.loads(response.content)
+        except Exception as e:
+            print(f"Warning: Could not download run metadata from {url}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        metadata = dict(zip(urls, executor.map(download, urls.values())))
+    for run in runs:
+        run["metadata"] = metadata.get(run["id"])
+    return runs
+
+
+def list_runs_bulk(
+        project_path: str,
+        filters: dict[str, Any] = None,
+        include_artifacts: bool = False,
+        per_page: int = 100,
+        artifacts_per_run: int = 50,
+    ) -> list[dict]:
+    """
+    List the runs of a W&B project with one paginated GraphQL query, instead of
+    separate API calls for every run's artifacts and metadata.
+
+    Args:
+        project_path (str): The path of the target project, "entity/project".
+        filters (dict[str, Any], optional): The filters query for runs, as in list_runs. Defaults to None.
+        include_artifacts (bool, optional): Also fetch the artifacts logged by each run, within the
+        same pages. Defaults to False.
+        per_page (int, optional): Number of runs fetched by each request. Defaults to 100.
+        artifacts_per_run (int, optional): Number of artifacts fetched with each run. The remaining
+        artifacts of runs with more are listed afterwards, for RUNS_PER_BATCH runs per request.
+        Defaults to 50.
+
+    Returns:
+        runs_list (list[dict]): The runs, with the same keys as list_runs. The metadata is None,
+        since it is stored in a file of every run (see fetch_runs_metadata), and the artifacts are
+        empty unless included.
+    """
+    from wandb_gql import gql  # This must be imported after wandb
+
+    api = wandb.Api()
+    entity, project = _parse_project_path(api, project_path)
+    app_url = api.client.app_url
+    query = gql(BULK_RUNS_QUERY)
+    variables = {
+        "entity": entity,
+        "project": project,
+        "perPage": per_page,
+        "order": "+created_at",
+        "filters": json.dumps(filters or {}),
+        "withArtifacts": include_artifacts,
+        "artifactsPerRun": artifacts_per_run,
+    }
+
+    runs_list = []
+    # Cursors after the artifacts fetched so far, for runs with more than artifacts_per_run
+    artifact_cursors = {}
+    cursor = None
+    while True:
+        response = api.client.execute(query, variable_values={**variables, "cursor": cursor})
+        runs = ((response.get("project") or {}).get("runs")) or {}
+        for edge in runs.get("edges") or []:
+            node = edge["node"]
+            run_id = node["name"]
+            artifacts = []
+            if include_artifacts:
+                output_artifacts = node.get("outputArtifacts") or {}
+                artifacts = [_artifact_node_to_dict(artifact_edge["node"], app_url)
+                             for artifact_edge in output_artifacts.get("edges") or []]
+                artifact_page_info = output_artifacts.get("pageInfo") or {}
+                if artifact_page_info.get("hasNextPage") and artifact_page_info.get("endCursor"):
+                    artifact_cursors[run_id] = artifact_page_info["endCursor"]
+
+            try:
+                summary_dict_str = convert_to_string_dict(json.loads(node.get("summaryMetrics") or "{}"))
+            except Exception as e:
+                print(f"Warning: Could not convert summary for run {node.get('displayName')}: {e}")
+                summary_dict_str = {}
+
+            runs_list.append({
+                "entity": entity,
+                "id": run_id,
+                "metadata": None,
+                "name": node.get("displayName"),
+                "path": [entity, project, run_id],
+                "state": node.get("state"),
+                "url": f"{app_url}/{entity}/{project}/runs/{run_id}",
+                "summary": summary_dict_str,
+                "config": _run_config(node.get("config")),
+                "artifacts": artifacts
+            })
+
+        page_info = runs.get("pageInfo") or {}
+        cursor = page_info.get("endCursor")
+        if not page_info.get("hasNextPage") or not cursor:
+            break
+
+    if artifact_cursors:
+        remaining = _fetch_remaining_artifacts(api, entity, project, artifact_cursors,
+                                               artifacts_per_run, app_url)
+        for run in runs_list:
+            run["artifacts"].extend(remaining.get(run["id"], []))
+
+    return runs_list
+
+
 @mcp.tool()
 async def list_runs(
         project_path:str, 
         filters:dict[str, Any]=None,
+        bulk: bool = False,
+        include_artifacts: bool = False,
     ) -> list[dict]:
     """
     Get the list of runs in a W&B project. Runs includes the id, name, path, url, and other metadata.
@@ -89,6 +409,11 @@ async def list_runs(
             - {"tags": {"$in": ["tag1", "tag2"]}} → runs containing tag1 OR tag2
             - {"tags": {"$nin": ["tag1"]}} → runs NOT containing tag1
         Defaults to None.
+        bulk (bool, optional): Fetch the runs, their summaries and configs with a single paginated query
+        instead of separate calls for every run's artifacts and metadata, which is much faster for large
+        projects. The metadata is then None, see fetch_runs_metadata. Defaults to False.
+        include_artifacts (bool, optional): In bulk mode, also fetch the artifacts logged by each run, within
+        the same pages. Without bulk mode, artifacts are always listed. Defaults to False.
 
     Returns:
         runs_list (list[dict]): The list of runs in the project. Every run include keys:
@@ -100,7 +425,12 @@ async def list_runs(
         - state (str): The state of the run.
         - url (str): The URL of the run.
         - summary (dict): The summary of the run, which is a dictionary containing key-value pairs of metrics.
+        - config (dict): The config of the run.
+        - artifacts (list[dict]): The artifacts logged by the run.
     """
+    if bulk:
+        return list_runs_bulk(project_path, filters, include_artifacts=include_artifacts)
+
     api = wandb.Api()
     runs_list = []
 
@@ -109,17 +439,7 @@ async def list_runs(
     for run in runs:
         artifacts = []
         for artifact in run.logged_artifacts():
-            artifacts.append({
-                "name": artifact.name,
-                "id": artifact.id,
-                "type": artifact.type,
-                "version": artifact.version,
-                "url": artifact.url,
-                "description": artifact.description,
-                "createdAt": artifact.created_at,
-                "aliases": artifact.aliases,
-                "tags": artifact.tags
-            })
+            artifacts.append(artifact_to_dict(artifact))
             
         # try to convert summary to dict with string keys and string values
         try:
@@ -213,7 +533,8 @@ async def filter_runs_by_single_param_difference(project_path:str, param_name: s
                    differing only in the specified parameter. The runs are sorted by the parameter 
                    values in ascending order. Each run dictionary contains the same keys as 
                    returned by list_runs(): entity, id, metadata, name, path, state, url, 
-                   summary, config, and artifacts.
+                   summary, config, and artifacts. The runs are listed in bulk mode, and the
+                   metadata is only downloaded for the runs returned.
 
     Example:
         # Find all runs that differ only in learning rate
@@ -229,7 +550,8 @@ async def filter_runs_by_single_param_difference(project_path:str, param_name: s
             filters={"state": "finished"}
         )
     """
-    runs=await list_runs(project_path, filters)
+    # The bulk query fetches the configs and artifacts without separate calls per run
+    runs=await list_runs(project_path, filters, bulk=True, include_artifacts=True)
 
     if not runs:
         return []
@@ -267,7 +589,8 @@ async def filter_runs_by_single_param_difference(project_path:str, param_name: s
 
     filtered_runs = [runs[i] for i in sorted_indices]
 
-    return filtered_runs
+    # The metadata is stored in a file of every run, so only download it for the runs returned
+    return fetch_runs_metadata(project_path, filtered_runs)
 
 if __name__ == "__main__":
     mcp.run()
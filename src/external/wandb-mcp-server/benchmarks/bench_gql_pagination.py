@@ -0,0 +1,146 @@
+"""
+Benchmark cursor pagination in query_paginated_wandb_gql against a local fake GraphQL server.
+
+The fake server answers `project.runs` connection queries with pages of runs
+carrying JSON config and summary blobs, after a configurable latency. The
+same query is paginated with and without prefetching the next page in a
+background thread while the current page is merged.
+
+Usage:
+    WANDB_API_KEY=... python benchmarks/bench_gql_pagination.py [--num-runs 5000] [--page-size 100]
+
+Importing `wandb_mcp_server` needs WANDB_API_KEY to be set, though no requests
+leave the machine: `wandb.Api` is pointed at the fake server with WANDB_BASE_URL.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+QUERY = """
+query ProjectRuns($entity: String!, $project: String!, $limit: Int) {
+  project(name: $project, entityName: $entity) {
+    runs(first: $limit) {
+      edges { node { id name state config summaryMetrics } }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+
+def make_runs(num_runs: int, payload_keys: int) -> List[Dict[str, Any]]:
+    """Build run nodes with JSON-encoded config and summary metrics."""
+    return [
+        {
+            "id": f"run-{i}",
+            "name": f"run-{i}",
+            "state": "finished",
+            "config": json.dumps({f"param_{k}": k * i for k in range(payload_keys)}),
+            "summaryMetrics": json.dumps(
+                {f"metric_{k}": k / (i + 1) for k in range(payload_keys)}
+            ),
+        }
+        for i in range(num_runs)
+    ]
+
+
+def start_fake_server(
+    runs: List[Dict[str, Any]], latency: float, latency_per_kb: float = 0.0
+) -> ThreadingHTTPServer:
+    """Serve `project.runs` pages over HTTP, with cursors as run offsets.
+
+    Each response is delayed by `latency` plus `latency_per_kb` per KiB of
+    payload. The server counts the requests it answered in `requests`.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            variables = body.get("variables") or {}
+            start = int(variables.get("after") or 0)
+            end = min(start + int(variables.get("limit") or 50), len(runs))
+            payload = json.dumps(
+                {
+                    "data": {
+                        "project": {
+                            "runs": {
+                                "edges": [{"node": run} for run in runs[start:end]],
+                                "pageInfo": {
+                                    "hasNextPage": end < len(runs),
+                                    "endCursor": str(end),
+                                },
+                            }
+                        }
+                    }
+                }
+            ).encode()
+            time.sleep(latency + latency_per_kb * len(payload) / 1024)
+            server.requests += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-runs", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--payload-keys", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = make_runs(args.num_runs, args.payload_keys)
+    server = start_fake_server(runs, args.latency)
+    os.environ["WANDB_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # Imported after WANDB_BASE_URL is set
+    from wandb_mcp_server.mcp_tools.query_wandb_gql import query_paginated_wandb_gql
+
+    pages = -(-args.num_runs // args.page_size)
+    print(
+        f"{args.num_runs} runs, {pages} pages of {args.page_size}, "
+        f"{args.latency * 1000:.0f} ms server latency\n"
+    )
+    timings = {}
+    for prefetch in (False, True):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = query_paginated_wandb_gql(
+                QUERY,
+                {"entity": "entity", "project": "project"},
+                max_items=args.num_runs,
+                items_per_page=args.page_size,
+                prefetch=prefetch,
+            )
+            best = min(best, time.perf_counter() - start)
+        edges = result["project"]["runs"]["edges"]
+        assert len(edges) == args.num_runs, len(edges)
+        timings[prefetch] = best
+
+    print(f"{'sequential':>12}: {timings[False]:7.3f} s")
+    print(
+        f"{'prefetch':>12}: {timings[True]:7.3f} s  "
+        f"{timings[False] / timings[True]:5.2f}x"
+    )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark the per-page cost of building Weave query request bodies.
+
+For each supported filter shape, times rebuilding the request body with
+`QueryBuilder.prepare_query_params` for every page (the previous behaviour),
+compiling a `QueryPlan` from scratch, and building a page from a compiled plan
+with `QueryPlan.request`, both for offset and keyset (cursor) pagination.
+
+Usage:
+    WANDB_API_KEY=... python benchmarks/bench_query_plan.py [--pages 2000]
+
+Importing `wandb_mcp_server` needs WANDB_API_KEY to be set, though no requests are made.
+"""
+
+import argparse
+import time
+from typing import Any, Callable, Dict
+
+from wandb_mcp_server.weave_api.query_builder import QueryBuilder
+
+CURSOR = {
+    "started_at": "2025-01-01T00:00:00.123456Z",
+    "id": "0195abc",
+    "direction": "desc",
+}
+
+FILTER_SHAPES: Dict[str, Dict[str, Any]] = {
+    "none": {},
+    "direct": {"trace_roots_only": True, "op_names": ["a", "b"], "trace_id": "t"},
+    "op_name_contains": {"op_name_contains": "Evaluation.evaluate"},
+    "status": {"status": "error"},
+    "time_range": {
+        "time_range": {"start": "2025-01-01T00:00:00Z", "end": "2025-02-01T00:00:00Z"}
+    },
+    "latency": {"latency": {"$lt": 5000}},
+    "attributes": {
+        "attributes": {"metadata.model": "gpt-4o", "usage.tokens": {"$gte": 100}}
+    },
+    "combined": {
+        "trace_roots_only": True,
+        "op_name_contains": "chat",
+        "display_name": "agent.*",
+        "status": "success",
+        "has_exception": False,
+        "time_range": {"start": "2025-01-01T00:00:00Z"},
+        "latency": {"$gt": 100},
+        "attributes": {"metadata.env": "prod"},
+    },
+}
+
+
+def params_for(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Query parameters as the trace service sends them for one page."""
+    return {
+        "entity_name": "entity",
+        "project_name": "project",
+        "filters": filters,
+        "sort_by": "started_at",
+        "sort_direction": "desc",
+        "include_costs": True,
+        "include_feedback": True,
+        "columns": ["id", "op_name", "started_at", "status", "inputs", "output"],
+    }
+
+
+def per_page_us(build_page: Callable[[int], Any], pages: int) -> float:
+    """Average microseconds to build one page."""
+    start = time.perf_counter()
+    for page in range(pages):
+        build_page(page)
+    return (time.perf_counter() - start) / pages * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", type=int, default=2000)
+    args = parser.parse_args()
+
+    header = (
+        f"{'filters':>17} {'rebuild':>9} {'compile':>9} {'plan page':>10} "
+        f"{'speedup':>8} {'rebuild+cursor':>15} {'plan+cursor':>12}"
+    )
+    print(f"Microseconds per page over {args.pages} pages\n")
+    print(header)
+    for name, filters in FILTER_SHAPES.items():
+        params = params_for(filters)
+        cursor_params = {**params, "filters": {**filters, "cursor": CURSOR}}
+
+        rebuild = per_page_us(
+            lambda page: QueryBuilder.prepare_query_params(
+                {**params, "offset": page * 100, "limit": 100}
+            ),
+            args.pages,
+        )
+
+        def compile_uncached(page: int) -> None:
+            QueryBuilder.clear_plan_cache()
+            QueryBuilder.compile_plan(params)
+
+        compile_cost = per_page_us(compile_uncached, args.pages)
+
+        plan = QueryBuilder.compile_plan(params)
+        plan_page = per_page_us(
+            lambda page: plan.request(offset=page * 100, limit=100), args.pages
+        )
+        rebuild_cursor = per_page_us(
+            lambda page: QueryBuilder.prepare_query_params(
+                {**cursor_params, "limit": 100}
+            ),
+            args.pages,
+        )
+        plan_cursor = per_page_us(
+            lambda page: plan.request(limit=100, cursor=CURSOR), args.pages
+        )
+        print(
+            f"{name:>17} {rebuild:9.1f} {compile_cost:9.1f} {plan_page:10.2f} "
+            f"{rebuild / plan_page:7.0f}x {rebuild_cursor:15.1f} {plan_cursor:12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
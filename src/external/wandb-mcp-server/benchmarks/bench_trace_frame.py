@@ -0,0 +1,130 @@
+"""
+Benchmark latency and cost analytics with TraceFrame against per-dict processing.
+
+Computes per-op trace counts, latency percentiles and cost totals, status
+counts and the op distribution over synthetic projected calls, once with the
+`TraceProcessor` helpers walking each trace dictionary and once with a
+columnar `TraceFrame` (build time reported separately).
+
+Usage:
+    WANDB_API_KEY=... python benchmarks/bench_trace_frame.py [--num-traces 1000000]
+
+Importing `wandb_mcp_server` needs WANDB_API_KEY to be set, though no requests are made.
+Requires pyarrow (`pip install wandb_mcp_server[analytics]`).
+"""
+
+import argparse
+import random
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from wandb_mcp_server.weave_api.frame import TraceFrame
+from wandb_mcp_server.weave_api.processors import MetadataAccumulator, TraceProcessor
+
+OPS = ["chat", "retrieve", "rerank", "tool_call", "Evaluation.evaluate", "score"]
+MODELS = ["gpt-4o", "gpt-4o-mini", "claude-3-5-sonnet"]
+
+
+def synthetic_traces(num_traces: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Generate calls projected to the columns a TraceFrame needs."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    traces = []
+    for i in range(num_traces):
+        started_at = start + timedelta(milliseconds=i)
+        latency_ms = int(rng.lognormvariate(5, 1))
+        weave_summary: Dict[str, Any] = {
+            "status": "error" if rng.random() < 0.05 else "success",
+            "latency_ms": latency_ms,
+        }
+        if rng.random() < 0.5:
+            model = rng.choice(MODELS)
+            weave_summary["costs"] = {
+                model: {
+                    "prompt_tokens": rng.randint(10, 2000),
+                    "completion_tokens": rng.randint(10, 500),
+                    "prompt_tokens_total_cost": rng.random() / 100,
+                    "completion_tokens_total_cost": rng.random() / 50,
+                }
+            }
+        traces.append(
+            {
+                "id": f"0195{i:012x}",
+                "trace_id": f"trace{i // 10}",
+                "parent_id": None if i % 10 == 0 else f"0195{i - 1:012x}",
+                "op_name": f"weave:///entity/project/op/{rng.choice(OPS)}:abc",
+                "started_at": started_at.isoformat(),
+                "ended_at": (started_at + timedelta(milliseconds=latency_ms)).isoformat(),
+                "summary": {"weave": weave_summary},
+            }
+        )
+    return traces
+
+
+def per_dict_analysis(traces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate with the per-trace TraceProcessor helpers."""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    costs: Dict[str, float] = defaultdict(float)
+    for trace in traces:
+        match = MetadataAccumulator.OP_NAME_PATTERN.search(trace["op_name"])
+        op = match.group(1) if match else ""
+        latencies[op].append(TraceProcessor.get_latency_ms(trace))
+        trace_costs = {"costs": trace["summary"]["weave"].get("costs", {})}
+        costs[op] += TraceProcessor.get_cost(trace_costs, "prompt_cost")
+        costs[op] += TraceProcessor.get_cost(trace_costs, "completion_cost")
+        TraceProcessor.extract_status(trace)
+    accumulator = MetadataAccumulator(token_counting="none").update(traces)
+    return {
+        "percentiles": {
+            op: statistics.quantiles(values, n=100)[49::40]
+            for op, values in latencies.items()
+        },
+        "costs": dict(costs),
+        "status": accumulator.status_counts,
+        "ops": accumulator.op_distribution(),
+    }
+
+
+def frame_analysis(frame: TraceFrame) -> Dict[str, Any]:
+    """Aggregate with vectorized TraceFrame operations."""
+    return {
+        "percentiles": frame.percentiles("latency_ms", q=[0.5, 0.9], by="op"),
+        "costs": frame.cost_rollup(by="op"),
+        "status": frame.status_counts(),
+        "ops": frame.op_distribution(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-traces", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    traces = synthetic_traces(args.num_traces)
+    print(f"{len(traces)} traces\n")
+
+    start = time.perf_counter()
+    per_dict_analysis(traces)
+    per_dict_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frame = TraceFrame.from_traces(traces)
+    build_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frame_analysis(frame)
+    frame_elapsed = time.perf_counter() - start
+
+    print(f"{'per-dict analysis':>22}: {per_dict_elapsed:7.2f} s")
+    print(f"{'TraceFrame build':>22}: {build_elapsed:7.2f} s")
+    print(
+        f"{'TraceFrame analysis':>22}: {frame_elapsed:7.2f} s  "
+        f"{per_dict_elapsed / frame_elapsed:6.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from typing import Any
 
-import wandb
+from wandb_mcp_server.mcp_tools.tools_utils import get_wandb_api
 
 
 LIST_ENTITY_PROJECTS_TOOL_DESCRIPTION = """
@@ -69,8 +69,8 @@ def list_entity_projects(entity: str | None = None) -> dict[str, list[dict[str,
             - updated_at: Last update timestamp
             - tags: List of project tags
     """
-    # Initialize wandb API
-    api = wandb.Api()
+    # Reuse the shared wandb API client, and the viewer it already looked up
+    api = get_wandb_api()
 
     # Merge entity and teams into a single list
     if entity is None:
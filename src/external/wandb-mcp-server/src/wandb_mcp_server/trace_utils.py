@@ -5,8 +5,8 @@ import re
 from datetime import datetime
 from typing import Any, Dict, List
 
-import tiktoken
 from wandb_mcp_server.utils import get_rich_logger
+from wandb_mcp_server.weave_api.processors import TraceProcessor
 
 
 class DateTimeEncoder(json.JSONEncoder):
@@ -17,89 +17,22 @@ class DateTimeEncoder(json.JSONEncoder):
 
 
 def truncate_value(value: Any, max_length: int = 200) -> Any:
-    """Recursively truncate string values in nested structures."""
-    logger = get_rich_logger(__name__)
-
-    # Handle None values
-    if value is None:
-        return None
-
-    # If max_length is 0, truncate completely by returning empty values based on type
-    if max_length == 0:
-        if isinstance(value, str):
-            return ""
-        elif isinstance(value, dict):
-            return {}
-        elif isinstance(value, list):
-            return []
-        elif isinstance(value, (int, float)):
-            return 0
-        else:
-            return ""
-
-    # Regular truncation for non-zero max_length
-    if isinstance(value, str):
-        if len(value) > max_length:
-            logger.debug(f"Truncating string of length {len(value)} to {max_length}")
-        return value[:max_length] + "..." if len(value) > max_length else value
-    elif isinstance(value, dict):
-        try:
-            # Handle special case for inputs/outputs that might have complex object references
-            if "__type__" in value or "_type" in value:
-                logger.info(
-                    f"Found potential complex object: {value.get('__type__') or value.get('_type')}"
-                )
-                # For very small max_length, return empty dict to ensure proper truncation tests pass
-                if max_length < 50:
-                    return {}
-                # Otherwise, convert to a simplified representation
-                return {"type": value.get("__type__") or value.get("_type")}
-
-            result = {k: truncate_value(v, max_length) for k, v in value.items()}
-            return result
-        except Exception as e:
-            logger.warning(f"Error truncating dict: {e}, returning empty dict")
-            return {}
-    elif isinstance(value, list):
-        try:
-            result = [truncate_value(v, max_length) for v in value]
-            return result
-        except Exception as e:
-            logger.warning(f"Error truncating list: {e}, returning empty list")
-            return []
-    # For datetime objects and other non-JSON serializable types, convert to string
-    elif not isinstance(value, (int, float, bool)):
-        try:
-            return (
-                str(value)[:max_length] + "..."
-                if len(str(value)) > max_length
-                else str(value)
-            )
-        except Exception as e:
-            logger.warning(f"Error converting value to string: {e}, returning None")
-            return None
-    return value
+    """Truncate string values in nested structures."""
+    return TraceProcessor.truncate_value(value, max_length)
 
 
 def count_tokens(text: str) -> int:
-    """Count tokens in a string using tiktoken."""
-    try:
-        encoding = tiktoken.get_encoding("cl100k_base")  # Using OpenAI's encoding
-        return len(encoding.encode(text))
-    except Exception:
-        # Fallback to approximate token count if tiktoken fails
-        return len(text.split())
+    """Count tokens in a string using the cached tiktoken encoder."""
+    return TraceProcessor.count_tokens(text)
 
 
 def calculate_token_counts(traces: List[Dict]) -> Dict[str, int]:
     """Calculate token counts for traces."""
-    total_tokens = 0
-    input_tokens = 0
-    output_tokens = 0
-
-    for trace in traces:
-        input_tokens += count_tokens(str(trace.get("inputs", "")))
-        output_tokens += count_tokens(str(trace.get("output", "")))
+    texts = [str(trace.get("inputs", "")) for trace in traces]
+    texts += [str(trace.get("output", "")) for trace in traces]
+    counts = TraceProcessor.count_tokens_batch(texts)
+    input_tokens = sum(counts[: len(traces)])
+    output_tokens = sum(counts[len(traces) :])
 
     total_tokens = input_tokens + output_tokens
 
@@ -0,0 +1,75 @@
+"""
+JSON decoders for Weave API responses.
+
+This module provides pluggable decoders for the JSONL lines streamed by the Weave API.
+orjson or msgspec are used when installed, falling back to the standard library.
+All decoders take raw bytes and raise `json.JSONDecodeError` on invalid input.
+"""
+
+import json
+from typing import Any, Callable, Dict, Optional, Union
+
+JsonDecoder = Callable[[Union[bytes, str]], Any]
+
+# Decoders in order of preference for 'auto', fastest first
+DECODER_PREFERENCE = ("msgspec", "orjson", "json")
+
+
+def _json_loads(data: Union[bytes, str]) -> Any:
+    # json.loads is slower on bytes, since it first detects the encoding
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return json.loads(data)
+
+
+DECODERS: Dict[str, JsonDecoder] = {"json": _json_loads}
+
+try:
+    import orjson
+
+    # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+    DECODERS["orjson"] = orjson.loads
+except ImportError:
+    pass
+
+try:
+    import msgspec
+
+    _msgspec_decoder = msgspec.json.Decoder()
+
+    def _msgspec_loads(data: Union[bytes, str]) -> Any:
+        try:
+            return _msgspec_decoder.decode(data)
+        except msgspec.DecodeError as e:
+            if isinstance(data, bytes):
+                data = data.decode("utf-8", errors="replace")
+            raise json.JSONDecodeError(str(e), data, 0) from e
+
+    DECODERS["msgspec"] = _msgspec_loads
+except ImportError:
+    pass
+
+
+def get_decoder(name: Optional[str] = None) -> JsonDecoder:
+    """Get a JSON decoder by name.
+
+    Args:
+        name: 'orjson', 'msgspec', 'json', or None/'auto' for the fastest available.
+
+    Returns:
+        Callable decoding a JSON document from bytes or str.
+
+    Raises:
+        ValueError: If the decoder is unknown or its package is not installed.
+    """
+    if name in (None, "auto"):
+        name = next(n for n in DECODER_PREFERENCE if n in DECODERS)
+
+    if name not in DECODERS:
+        if name in DECODER_PREFERENCE:
+            raise ValueError(f"JSON decoder '{name}' requires the '{name}' package")
+        raise ValueError(
+            f"Unknown JSON decoder '{name}'. Choose from: {', '.join(DECODER_PREFERENCE)}"
+        )
+
+    return DECODERS[name]
@@ -0,0 +1,372 @@
+"""
+Columnar trace tables for analytics over Weave query results.
+
+`TraceFrame` flattens streamed traces into a pyarrow Table with one column per
+field (ids, op name, timestamps, latency, status and costs), built a batch at
+a time. Group-bys, percentiles and cost rollups then run as vectorized Arrow
+compute kernels instead of walking the trace dictionaries one by one.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from wandb_mcp_server.utils import get_rich_logger
+
+logger = get_rich_logger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+# Prefix of the per-model total cost columns, e.g. 'cost.gpt-4o'
+MODEL_COST_PREFIX = "cost."
+
+# Same base op name as MetadataAccumulator.OP_NAME_PATTERN, as a named group
+OP_NAME_PATTERN = r"/op/(?P<op>[^:]+)"
+
+# Columns needed from the server to build a frame
+FRAME_SOURCE_COLUMNS = [
+    "id",
+    "trace_id",
+    "parent_id",
+    "op_name",
+    "started_at",
+    "ended_at",
+    "summary",
+]
+
+COST_COLUMNS = [
+    "prompt_tokens",
+    "completion_tokens",
+    "prompt_cost",
+    "completion_cost",
+    "total_cost",
+]
+
+
+def _require_pyarrow() -> None:
+    if not HAVE_PYARROW:
+        raise ImportError(
+            "TraceFrame requires the 'pyarrow' package, "
+            "install it with `pip install wandb_mcp_server[analytics]`"
+        )
+
+
+def _as_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _BatchBuilder:
+    """Collects flattened trace fields into column lists for one record batch."""
+
+    def __init__(self):
+        self.columns: Dict[str, List[Any]] = {
+            name: []
+            for name in (
+                "id",
+                "trace_id",
+                "parent_id",
+                "op_name",
+                "started_at",
+                "ended_at",
+                "latency_ms",
+                "status",
+                *COST_COLUMNS,
+            )
+        }
+        self.model_costs: Dict[str, List[Optional[float]]] = {}
+        self.num_rows = 0
+
+    def add(self, trace: Any) -> None:
+        fields = trace if isinstance(trace, Mapping) else getattr(trace, "__dict__", {})
+        columns = self.columns
+        for name in ("id", "trace_id", "parent_id", "op_name"):
+            columns[name].append(fields.get(name))
+        for name in ("started_at", "ended_at"):
+            value = fields.get(name)
+            columns[name].append(
+                value if value is None or isinstance(value, str) else str(value)
+            )
+
+        summary = fields.get("summary")
+        weave_summary = (summary.get("weave") if isinstance(summary, dict) else None) or {}
+
+        latency = fields.get("latency_ms")
+        if latency is None:
+            latency = weave_summary.get("latency_ms")
+        columns["latency_ms"].append(_as_float(latency))
+
+        status = fields.get("status")
+        columns["status"].append(status if status else weave_summary.get("status"))
+
+        costs = fields.get("costs")
+        if not isinstance(costs, dict) or not costs:
+            costs = weave_summary.get("costs")
+        totals = {name: None for name in COST_COLUMNS}
+        if isinstance(costs, dict):
+            for model, cost_info in costs.items():
+                if not isinstance(cost_info, dict):
+                    continue
+                prompt_cost = _as_float(cost_info.get("prompt_tokens_total_cost"))
+                completion_cost = _as_float(
+                    cost_info.get("completion_tokens_total_cost")
+                )
+                total_cost = _as_float(cost_info.get("total_cost"))
+                if total_cost is None and (prompt_cost or completion_cost):
+                    total_cost = (prompt_cost or 0.0) + (completion_cost or 0.0)
+                for name, value in (
+                    ("prompt_tokens", _as_float(cost_info.get("prompt_tokens"))),
+                    ("completion_tokens", _as_float(cost_info.get("completion_tokens"))),
+                    ("prompt_cost", prompt_cost),
+                    ("completion_cost", completion_cost),
+                    ("total_cost", total_cost),
+                ):
+                    if value is not None:
+                        totals[name] = (totals[name] or 0.0) + value
+                if total_cost is not None:
+                    model_column = self.model_costs.get(model)
+                    if model_column is None:
+                        model_column = self.model_costs[model] = [None] * self.num_rows
+                    model_column.append(total_cost)
+        for name, value in totals.items():
+            columns[name].append(value)
+
+        self.num_rows += 1
+        for model_column in self.model_costs.values():
+            if len(model_column) < self.num_rows:
+                model_column.append(None)
+
+    def to_table(self) -> "pa.Table":
+        arrays = {
+            "id": pa.array(self.columns["id"], pa.string()),
+            "trace_id": pa.array(self.columns["trace_id"], pa.string()),
+            "parent_id": pa.array(self.columns["parent_id"], pa.string()),
+            "op_name": pa.array(self.columns["op_name"], pa.string()),
+        }
+        arrays["op"] = pc.struct_field(
+            pc.extract_regex(arrays["op_name"], OP_NAME_PATTERN), [0]
+        )
+        for name in ("started_at", "ended_at"):
+            arrays[name] = pa.array(self.columns[name], pa.string()).cast(
+                pa.timestamp("us", tz="UTC")
+            )
+
+        latency = pa.array(self.columns["latency_ms"], pa.float64())
+        # Fall back to the wall time between start and end when no latency was logged
+        elapsed_ms = pc.divide(
+            pc.cast(
+                pc.microseconds_between(arrays["started_at"], arrays["ended_at"]),
+                pa.float64(),
+            ),
+            1000.0,
+        )
+        arrays["latency_ms"] = pc.coalesce(latency, elapsed_ms)
+        arrays["status"] = pa.array(self.columns["status"], pa.string())
+        for name in COST_COLUMNS:
+            arrays[name] = pa.array(self.columns[name], pa.float64())
+        for model, values in sorted(self.model_costs.items()):
+            arrays[MODEL_COST_PREFIX + model] = pa.array(values, pa.float64())
+        return pa.table(arrays)
+
+
+class TraceFrame:
+    """Columnar table of trace fields with vectorized aggregations.
+
+    Columns are `id`, `trace_id`, `parent_id`, `op_name`, `op` (the base op
+    name), `started_at`, `ended_at`, `latency_ms`, `status`, the token and
+    cost totals across models (`prompt_tokens`, `completion_tokens`,
+    `prompt_cost`, `completion_cost`, `total_cost`) and one `cost.<model>`
+    total cost column per model seen.
+    """
+
+    def __init__(self, table: "pa.Table"):
+        """Initialize the TraceFrame.
+
+        Args:
+            table: Table with the TraceFrame columns, e.g. from `from_traces`.
+        """
+        _require_pyarrow()
+        self.table = table
+
+    @classmethod
+    def from_traces(
+        cls, traces: Iterable[Any], batch_size: int = 65536
+    ) -> "TraceFrame":
+        """Build a frame from an iterable of traces, consuming it lazily.
+
+        Only `batch_size` traces' worth of Python values is held at once;
+        each batch is converted to Arrow arrays before the next one is read.
+
+        Args:
+            traces: Iterable of trace dictionaries, TraceViews or WeaveTraces.
+            batch_size: Number of traces flattened per record batch.
+
+        Returns:
+            TraceFrame over all the traces.
+        """
+        _require_pyarrow()
+        tables = []
+        builder = _BatchBuilder()
+        for trace in traces:
+            builder.add(trace)
+            if builder.num_rows >= batch_size:
+                tables.append(builder.to_table())
+                builder = _BatchBuilder()
+        if builder.num_rows or not tables:
+            tables.append(builder.to_table())
+
+        # Batches may have seen different models, missing cost columns are null
+        table = pa.concat_tables(tables, promote_options="default")
+        logger.debug(f"Built TraceFrame with {table.num_rows} rows")
+        return cls(table)
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    @property
+    def model_cost_columns(self) -> List[str]:
+        """Names of the per-model total cost columns."""
+        return [
+            name
+            for name in self.table.column_names
+            if name.startswith(MODEL_COST_PREFIX)
+        ]
+
+    def filter(self, mask: Union["pa.Array", "pc.Expression"]) -> "TraceFrame":
+        """Return a frame with the rows matching a boolean mask or expression."""
+        return TraceFrame(self.table.filter(mask))
+
+    def to_pandas(self) -> Any:
+        """Convert the frame to a pandas DataFrame (requires pandas)."""
+        return self.table.to_pandas()
+
+    def status_counts(self) -> Dict[str, int]:
+        """Count traces by status, as `MetadataAccumulator` does."""
+        status = pc.utf8_lower(self.table.column("status"))
+        counts = {"success": 0, "error": 0, "other": 0}
+        for entry in pc.value_counts(status).to_pylist():
+            key = entry["values"] if entry["values"] in ("success", "error") else "other"
+            counts[key] += entry["counts"]
+        return counts
+
+    def op_distribution(self) -> Dict[str, int]:
+        """Count traces by base op name, sorted by count in descending order."""
+        ops = self.table.column("op").drop_null()
+        ops = ops.filter(pc.not_equal(ops, ""))
+        counts = {
+            entry["values"]: entry["counts"]
+            for entry in pc.value_counts(ops).to_pylist()
+        }
+        return dict(sorted(counts.items(), key=lambda x: x[1], reverse=True))
+
+    def percentiles(
+        self,
+        column: str = "latency_ms",
+        q: Sequence[float] = (0.5, 0.9, 0.99),
+        by: Optional[Union[str, List[str]]] = None,
+    ) -> Union[Dict[float, Optional[float]], List[Dict[str, Any]]]:
+        """Compute percentiles of a numeric column, overall or per group.
+
+        Overall percentiles are exact. Per-group percentiles use Arrow's
+        t-digest aggregation, which is approximate but single-pass.
+
+        Args:
+            column: Numeric column, e.g. 'latency_ms' or 'total_cost'.
+            q: Quantiles to compute, between 0 and 1.
+            by: Column(s) to group by, e.g. 'op'.
+
+        Returns:
+            `{quantile: value}` overall, or one row per group with a `p<N>` key
+            per quantile (e.g. `p50`, `p99`) when `by` is given.
+        """
+        values = self.table.column(column)
+        q = list(q)
+        if by is None:
+            if values.null_count == len(values):
+                return {quantile: None for quantile in q}
+            result = pc.quantile(values, q=q, skip_nulls=True).to_pylist()
+            return dict(zip(q, result))
+
+        keys = [by] if isinstance(by, str) else list(by)
+        grouped = self.table.group_by(keys).aggregate(
+            [(column, "tdigest", pc.TDigestOptions(q=q))]
+        )
+        rows = []
+        for row in grouped.to_pylist():
+            digest = row.pop(f"{column}_tdigest") or [None] * len(q)
+            for quantile, value in zip(q, digest):
+                row[f"p{quantile * 100:g}"] = value
+            rows.append(row)
+        return rows
+
+    def group_by(
+        self,
+        by: Union[str, List[str]] = "op",
+        aggregations: Optional[List[tuple]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Aggregate the frame per group.
+
+        Args:
+            by: Column(s) to group by, e.g. 'op', 'trace_id' or 'status'.
+            aggregations: Arrow `(column, function)` pairs, e.g.
+                `[("latency_ms", "mean"), ("total_cost", "sum")]`. Defaults to the
+                trace count, mean and max latency, and total cost.
+
+        Returns:
+            One dictionary per group, sorted by trace count in descending order.
+        """
+        keys = [by] if isinstance(by, str) else list(by)
+        if aggregations is None:
+            aggregations = [
+                ("id", "count"),
+                ("latency_ms", "mean"),
+                ("latency_ms", "max"),
+                ("total_cost", "sum"),
+            ]
+        grouped = self.table.group_by(keys).aggregate(aggregations)
+        sort_key = next(
+            (
+                f"{column}_{function}"
+                for column, function, *_ in aggregations
+                if function == "count"
+            ),
+            None,
+        )
+        if sort_key:
+            grouped = grouped.sort_by([(sort_key, "descending")])
+        return grouped.to_pylist()
+
+    def cost_rollup(
+        self, by: Optional[Union[str, List[str]]] = None
+    ) -> Union[Dict[str, float], List[Dict[str, Any]]]:
+        """Sum token counts and costs, overall or per group.
+
+        Args:
+            by: Column(s) to group by, e.g. 'op' or 'trace_id'.
+
+        Returns:
+            Totals of every cost column, including per-model costs, overall or
+            as one row per group sorted by total cost in descending order.
+        """
+        columns = COST_COLUMNS + self.model_cost_columns
+        if by is None:
+            return {
+                column: pc.sum(self.table.column(column)).as_py() or 0.0
+                for column in columns
+            }
+
+        keys = [by] if isinstance(by, str) else list(by)
+        grouped = self.table.group_by(keys).aggregate(
+            [(column, "sum") for column in columns]
+        )
+        grouped = grouped.rename_columns(
+            [name.removesuffix("_sum") for name in grouped.column_names]
+        )
+        return grouped.sort_by([("total_cost", "descending")]).to_pylist()
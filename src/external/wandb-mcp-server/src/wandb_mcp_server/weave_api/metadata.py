@@ -0,0 +1,143 @@
+"""
+Metadata engine for Weave traces.
+
+This module builds trace metadata without downloading trace payloads.
+It combines the `/calls/query_stats` endpoint with a stream of projected calls.
+"""
+
+from typing import Any, Dict, Optional
+
+from wandb_mcp_server.utils import get_rich_logger
+from wandb_mcp_server.weave_api.client import WeaveApiClient
+from wandb_mcp_server.weave_api.models import TraceMetadata
+from wandb_mcp_server.weave_api.processors import MetadataAccumulator
+from wandb_mcp_server.weave_api.query_builder import QueryBuilder
+
+logger = get_rich_logger(__name__)
+
+
+class TraceMetadataEngine:
+    """Builds TraceMetadata from call stats and a projected call stream."""
+
+    # Only the columns needed for time range, status and op distribution
+    METADATA_COLUMNS = [
+        "id",
+        "op_name",
+        "started_at",
+        "ended_at",
+        "summary.weave.status",
+    ]
+
+    def __init__(self, client: WeaveApiClient):
+        """Initialize the TraceMetadataEngine.
+
+        Args:
+            client: Client used to query the Weave API.
+        """
+        self.client = client
+
+    def _query_stats(self, request_body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Query the count and total storage size for a calls query.
+
+        Args:
+            request_body: Prepared `/calls/stream_query` request body.
+
+        Returns:
+            Stats response, or None if the stats endpoint could not be used.
+        """
+        stats_request = {
+            key: request_body[key]
+            for key in ("project_id", "filter", "query", "limit")
+            if key in request_body
+        }
+        stats_request["include_total_storage_size"] = True
+
+        try:
+            return self.client.query_stats(stats_request)
+        except Exception as e:
+            logger.warning(
+                f"Could not query call stats, falling back to per-call storage sizes: {e}"
+            )
+            return None
+
+    def query_metadata(
+        self,
+        entity_name: str,
+        project_name: str,
+        filters: Optional[Dict[str, Any]] = None,
+        sort_by: str = "started_at",
+        sort_direction: str = "desc",
+        target_limit: Optional[int] = None,
+        token_counting: str = "estimate",
+    ) -> TraceMetadata:
+        """Compute metadata for the traces matching a query.
+
+        Only `METADATA_COLUMNS` are streamed from the server, without costs,
+        feedback, inputs or outputs. Token counts are estimated from the
+        stored size of the calls: the total from `/calls/query_stats` is used
+        when it covers exactly the matched calls, otherwise each call's
+        `storage_size_bytes` is requested alongside the projected columns.
+
+        Args:
+            entity_name: Weights & Biases entity name.
+            project_name: Weights & Biases project name.
+            filters: Dictionary of filter conditions.
+            sort_by: Server-side field to sort by, relevant when target_limit applies.
+            sort_direction: Sort direction ('asc' or 'desc').
+            target_limit: Maximum number of traces to include in the metadata.
+            token_counting: Either 'estimate' or 'none'.
+
+        Returns:
+            TraceMetadata for the matching traces.
+
+        Raises:
+            ValueError: If exact token counting is requested, which needs trace payloads.
+        """
+        if token_counting not in ("estimate", "none"):
+            raise ValueError(
+                f"TraceMetadataEngine does not support token_counting '{token_counting}'"
+            )
+
+        request_body = QueryBuilder.prepare_query_params(
+            {
+                "entity_name": entity_name,
+                "project_name": project_name,
+                "filters": filters or {},
+                "sort_by": sort_by,
+                "sort_direction": sort_direction,
+                "limit": target_limit,
+                "include_costs": False,
+                "include_feedback": False,
+                "columns": list(self.METADATA_COLUMNS),
+            }
+        )
+        request_body.pop("_synthetic_fields", None)
+
+        stats = self._query_stats(request_body)
+        count = stats.get("count") if stats is not None else None
+        if count == 0:
+            return MetadataAccumulator(token_counting="none").to_metadata()
+
+        accumulator = MetadataAccumulator(token_counting=token_counting)
+
+        # With a limit the stats total only matches the streamed calls if no more
+        # calls matched than the limit
+        use_stats_size = (
+            token_counting == "estimate"
+            and stats is not None
+            and stats.get("total_storage_size_bytes") is not None
+            and (target_limit is None or (count is not None and count <= target_limit))
+        )
+        if use_stats_size:
+            accumulator.add_storage_size(stats["total_storage_size_bytes"])
+        elif token_counting == "estimate":
+            request_body["include_storage_size"] = True
+
+        accumulator.update(self.client.query_traces(request_body))
+
+        if count is not None and count != accumulator.total_traces:
+            logger.debug(
+                f"Call stats reported {count} traces, streamed {accumulator.total_traces}"
+            )
+
+        return accumulator.to_metadata()
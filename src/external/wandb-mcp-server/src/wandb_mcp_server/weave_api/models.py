@@ -4,11 +4,13 @@ Data models for the Weave API.
 This module defines the data structures used across the Weave API client.
 """
 
+from collections.abc import Mapping
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional, Union
-from pydantic import BaseModel, Field
+from typing import Any, Dict, Iterator, List, Optional, Union
+from pydantic import BaseModel, Field, GetCoreSchemaHandler, TypeAdapter
+from pydantic_core import core_schema
 
 
 class SortDirection(str, Enum):
@@ -115,6 +117,18 @@ class TraceMetadata(BaseModel):
     op_distribution: Dict[str, int] = Field(default_factory=dict)
 
 
+class ExportResult(BaseModel):
+    """Summary of a trace export written to a local file."""
+
+    path: str
+    format: str
+    rows_written: int = 0
+    bytes_written: int = 0
+    # Empty if every column returned by the server was written
+    columns: List[str] = Field(default_factory=list)
+    metadata: TraceMetadata = Field(default_factory=TraceMetadata)
+
+
 class WeaveTrace(BaseModel):
     """Representation of a Weave trace."""
 
@@ -145,11 +159,89 @@ class WeaveTrace(BaseModel):
         arbitrary_types_allowed = True
 
 
+class TraceView(Mapping):
+    """Lazy, read-only view of a raw trace dictionary.
+
+    Attribute access mirrors `WeaveTrace`, but each field is validated and
+    parsed (e.g. `started_at` into a datetime) only when it is first read.
+    Item access and serialization return the raw decoded values, so a trace
+    is passed through to the response without being converted or re-validated.
+    """
+
+    __slots__ = ("_data", "_parsed")
+
+    # TypeAdapters for WeaveTrace fields, built on first access to each field
+    _adapters: Dict[str, TypeAdapter] = {}
+
+    def __init__(self, data: Dict[str, Any]):
+        """Initialize the TraceView.
+
+        Args:
+            data: Raw trace dictionary, as decoded from the Weave API. It is not copied.
+        """
+        self._data = data
+        self._parsed: Dict[str, Any] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        field = WeaveTrace.model_fields.get(name)
+        if field is None:
+            raise AttributeError(f"'TraceView' object has no attribute '{name}'")
+
+        if name in self._parsed:
+            return self._parsed[name]
+
+        raw = self._data.get(name)
+        if raw is None and name == "trace_id":
+            raw = self._data.get("id")
+
+        if raw is None:
+            value = field.get_default(call_default_factory=True)
+        else:
+            adapter = self._adapters.get(name)
+            if adapter is None:
+                adapter = self._adapters[name] = TypeAdapter(field.annotation)
+            value = adapter.validate_python(raw)
+
+        self._parsed[name] = value
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"TraceView(id={self._data.get('id')!r})"
+
+    def model_dump(self, **kwargs: Any) -> Dict[str, Any]:
+        """Return a shallow copy of the raw trace dictionary.
+
+        Keyword arguments are accepted for compatibility with `WeaveTrace.model_dump`.
+        """
+        return dict(self._data)
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source_type: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        # Accept instances as they are and serialize the raw dictionary
+        return core_schema.is_instance_schema(
+            cls,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda view: view._data
+            ),
+        )
+
+
 class QueryResult(BaseModel):
     """Result of a Weave trace query."""
 
     metadata: TraceMetadata
-    traces: Optional[List[Union[WeaveTrace, Dict[str, Any]]]] = None
+    traces: Optional[List[Union[TraceView, WeaveTrace, Dict[str, Any]]]] = None
 
     class Config:
         """Pydantic model configuration."""
@@ -0,0 +1,191 @@
+"""
+In-process memoization of Weave query results.
+
+Agents often repeat the same trace or count query within a conversation.
+`ResultCache` keeps recent results in a size-bounded LRU with a time-to-live,
+keyed by the canonicalized request body sent to the Weave API, so identical
+requests are served without another round trip.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from wandb_mcp_server.utils import get_rich_logger
+
+logger = get_rich_logger(__name__)
+
+T = TypeVar("T")
+
+# CallsFilter lists whose order doesn't change the result
+_UNORDERED_FILTER_KEYS = {
+    "op_names",
+    "trace_ids",
+    "parent_ids",
+    "call_ids",
+    "input_refs",
+    "output_refs",
+    "wb_user_ids",
+    "wb_run_ids",
+}
+
+
+def canonical_request_key(request_body: Dict[str, Any], **options: Any) -> str:
+    """Build a cache key from a prepared request body and result options.
+
+    Keys are serialized with sorted keys and the unordered `filter` lists
+    sorted, so equivalent requests map to the same key.
+
+    Args:
+        request_body: Request body, e.g. from `QueryBuilder.prepare_query_params`.
+        **options: Options that change the result without being sent to the
+            server, such as truncation settings.
+
+    Returns:
+        Hex digest identifying the request.
+    """
+    body = dict(request_body)
+    calls_filter = body.get("filter")
+    if isinstance(calls_filter, dict):
+        body["filter"] = {
+            key: sorted(value, key=str)
+            if key in _UNORDERED_FILTER_KEYS and isinstance(value, list)
+            else value
+            for key, value in calls_filter.items()
+        }
+    canonical = json.dumps(
+        {"request": body, "options": options},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a time-to-live and hit/miss counters.
+
+    Cached values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl_seconds: float = 60.0):
+        """Initialize the ResultCache.
+
+        Args:
+            maxsize: Maximum number of results kept; the least recently used
+                result is evicted first.
+            ttl_seconds: Seconds after which a result expires.
+
+        Raises:
+            ValueError: If maxsize is less than 1 or ttl_seconds is negative.
+        """
+        if maxsize < 1 or ttl_seconds < 0:
+            raise ValueError("maxsize must be at least 1 and ttl_seconds non-negative")
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Look up a key, counting a hit or a miss.
+
+        Returns:
+            Tuple of (found, value).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if full.
+
+        Args:
+            key: Cache key.
+            value: Value to store.
+            ttl_seconds: Seconds after which this value expires, instead of the
+                cache's `ttl_seconds`.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached result, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit, miss and eviction counters and the current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+    def get_or_compute(
+        self, key: str, compute: Callable[[], T], bypass: bool = False
+    ) -> T:
+        """Return the cached result for a key, computing and storing it on a miss.
+
+        Args:
+            key: Key from `canonical_request_key`.
+            compute: Function producing the result.
+            bypass: Skip the lookup and recompute, still storing the fresh result.
+
+        Returns:
+            The cached or freshly computed result.
+        """
+        if not bypass:
+            found, value = self.get(key)
+            if found:
+                logger.debug(f"Result cache hit for {key[:12]}")
+                return value
+        value = compute()
+        self.put(key, value)
+        return value
+
+    async def aget_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[T]], bypass: bool = False
+    ) -> T:
+        """Async variant of `get_or_compute` for coroutine functions."""
+        if not bypass:
+            found, value = self.get(key)
+            if found:
+                logger.debug(f"Result cache hit for {key[:12]}")
+                return value
+        value = await compute()
+        self.put(key, value)
+        return value
+
+
+# Shared by the MCP tools
+_default_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide result cache, creating it on first use."""
+    global _default_result_cache
+    if _default_result_cache is None:
+        _default_result_cache = ResultCache()
+    return _default_result_cache
@@ -7,13 +7,23 @@ It orchestrates the client, query builder, and processor components.
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Set
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
 
 from wandb_mcp_server.utils import get_rich_logger, get_server_args
-from wandb_mcp_server.weave_api.client import WeaveApiClient
+from wandb_mcp_server.weave_api.cache import (
+    TraceCache,
+    UnsupportedQueryError,
+    compile_request,
+    time_range_bounds,
+)
+from wandb_mcp_server.weave_api.client import AsyncWeaveApiClient, WeaveApiClient
+from wandb_mcp_server.weave_api.frame import FRAME_SOURCE_COLUMNS, TraceFrame
+from wandb_mcp_server.weave_api.metadata import TraceMetadataEngine
 from wandb_mcp_server.weave_api.models import QueryResult
-from wandb_mcp_server.weave_api.processors import TraceProcessor
-from wandb_mcp_server.weave_api.query_builder import QueryBuilder
+from wandb_mcp_server.weave_api.processors import MetadataAccumulator, TraceProcessor
+from wandb_mcp_server.weave_api.query_builder import QueryBuilder, QueryPlan
 
 # Import CallSchema to validate column names
 try:
@@ -60,11 +70,20 @@ class TraceService:
     # Define latency field mapping
     LATENCY_FIELD_MAPPING = {"latency_ms": "summary.weave.latency_ms"}
 
+    # Default for the most rows the server returns from one
+    # `/calls/stream_query` request. A stream ending at exactly this many rows
+    # may have been cut short.
+    STREAM_PAGE_CAP = 10_000
+
     def __init__(
         self,
         server_url: Optional[str] = None,
         retries: int = 3,
         timeout: int = 10,
+        call_ids_batch_size: int = 100,
+        max_workers: int = 4,
+        cache: Optional[TraceCache] = None,
+        stream_page_cap: int = STREAM_PAGE_CAP,
     ):
         """Initialize the TraceService.
 
@@ -72,7 +91,24 @@ class TraceService:
             server_url: Weave API server URL. Defaults to 'https://trace.wandb.ai'.
             retries: Number of retries for failed requests.
             timeout: Request timeout in seconds.
+            call_ids_batch_size: Maximum number of call IDs sent in a single
+                `call_ids` filter when fetching traces by ID.
+            max_workers: Maximum number of concurrent requests used when fetching
+                traces by ID in batches.
+            cache: Local trace cache. When set, streamed queries whose filters can
+                be evaluated locally are answered from the cache after syncing it.
+            stream_page_cap: Most rows the server returns from a single streaming
+                request. Streams ending at exactly this many rows are resumed with
+                a follow-up request, so it must match the server's limit.
+
+        Raises:
+            ValueError: If call_ids_batch_size, max_workers or stream_page_cap is
+                less than 1.
         """
+        if call_ids_batch_size < 1 or max_workers < 1 or stream_page_cap < 1:
+            raise ValueError(
+                "call_ids_batch_size, max_workers and stream_page_cap must be at least 1"
+            )
         # Call get_server_args() to ensure API key is loaded from .netrc or env var
         # and a warning is logged by get_server_args if no key is found.
         server_config = get_server_args()
@@ -84,11 +120,28 @@ class TraceService:
             server_url=server_url,
             retries=retries,
             timeout=timeout,
+            pool_maxsize=max(10, max_workers),
+        )
+        self.async_client = AsyncWeaveApiClient(
+            api_key=server_config.wandb_api_key,
+            server_url=server_url,
+            retries=retries,
+            timeout=timeout,
+            max_connections=max(20, max_workers),
         )
+        self.call_ids_batch_size = call_ids_batch_size
+        self.max_workers = max_workers
+        self.stream_page_cap = stream_page_cap
+        self.metadata_engine = TraceMetadataEngine(self.client)
+        self.cache = cache
 
         # Initialize collection for invalid columns (for warning messages)
         self.invalid_columns = set()
 
+    async def aclose(self) -> None:
+        """Close the pooled async connections of the running event loop."""
+        await self.async_client.aclose()
+
     def _validate_and_filter_columns(
         self, columns: Optional[List[str]]
     ) -> tuple[Optional[List[str]], List[str], Set[str]]:
@@ -254,67 +307,79 @@ class TraceService:
         if not requested_synthetic_columns and not invalid_columns:
             return traces
 
-        updated_traces = []
+        return [
+            self._add_synthetic_columns_to_trace(
+                trace, requested_synthetic_columns, invalid_columns
+            )
+            for trace in traces
+        ]
 
-        for trace in traces:
-            updated_trace = trace.copy()
+    def _add_synthetic_columns_to_trace(
+        self,
+        trace: Dict[str, Any],
+        requested_synthetic_columns: List[str],
+        invalid_columns: Set[str],
+    ) -> Dict[str, Any]:
+        """Add synthetic columns and invalid column warnings to a single trace.
+
+        Args:
+            trace: Trace dictionary.
+            requested_synthetic_columns: List of requested synthetic columns.
+            invalid_columns: Set of invalid column names that were requested.
 
-            # Add costs data if requested
-            if "costs" in requested_synthetic_columns:
-                costs_data = trace.get("summary", {}).get("weave", {}).get("costs", {})
-                if costs_data:
+        Returns:
+            Copy of the trace with synthetic columns and invalid column warnings added.
+        """
+        updated_trace = trace.copy()
+
+        # Add costs data if requested
+        if "costs" in requested_synthetic_columns:
+            costs_data = trace.get("summary", {}).get("weave", {}).get("costs", {})
+            if costs_data:
+                logger.debug(
+                    f"Adding synthetic 'costs' column with {len(costs_data)} providers"
+                )
+                updated_trace["costs"] = costs_data
+            else:
+                logger.warning(f"No costs data found in trace {trace.get('id')}")
+                updated_trace["costs"] = {}
+
+        # Add status from summary if requested
+        if "status" in requested_synthetic_columns:
+            status = trace.get("status")  # Check if it's already in the trace
+            if not status:
+                # Extract from summary.weave.status
+                status = trace.get("summary", {}).get("weave", {}).get("status")
+                if status:
+                    logger.debug(f"Adding synthetic 'status' from summary: {status}")
+                    updated_trace["status"] = status
+                else:
+                    logger.warning(f"No status data found in trace {trace.get('id')}")
+                    updated_trace["status"] = None
+
+        # Add latency_ms from summary if requested
+        if "latency_ms" in requested_synthetic_columns:
+            latency = trace.get("latency_ms")  # Check if it's already in the trace
+            if latency is None:
+                # Extract from summary.weave.latency_ms
+                latency = trace.get("summary", {}).get("weave", {}).get("latency_ms")
+                if latency is not None:
                     logger.debug(
-                        f"Adding synthetic 'costs' column with {len(costs_data)} providers"
+                        f"Adding synthetic 'latency_ms' from summary: {latency}"
                     )
-                    updated_trace["costs"] = costs_data
+                    updated_trace["latency_ms"] = latency
                 else:
-                    logger.warning(f"No costs data found in trace {trace.get('id')}")
-                    updated_trace["costs"] = {}
-
-            # Add status from summary if requested
-            if "status" in requested_synthetic_columns:
-                status = trace.get("status")  # Check if it's already in the trace
-                if not status:
-                    # Extract from summary.weave.status
-                    status = trace.get("summary", {}).get("weave", {}).get("status")
-                    if status:
-                        logger.debug(
-                            f"Adding synthetic 'status' from summary: {status}"
-                        )
-                        updated_trace["status"] = status
-                    else:
-                        logger.warning(
-                            f"No status data found in trace {trace.get('id')}"
-                        )
-                        updated_trace["status"] = None
-
-            # Add latency_ms from summary if requested
-            if "latency_ms" in requested_synthetic_columns:
-                latency = trace.get("latency_ms")  # Check if it's already in the trace
-                if latency is None:
-                    # Extract from summary.weave.latency_ms
-                    latency = (
-                        trace.get("summary", {}).get("weave", {}).get("latency_ms")
+                    logger.warning(
+                        f"No latency_ms data found in trace {trace.get('id')}"
                     )
-                    if latency is not None:
-                        logger.debug(
-                            f"Adding synthetic 'latency_ms' from summary: {latency}"
-                        )
-                        updated_trace["latency_ms"] = latency
-                    else:
-                        logger.warning(
-                            f"No latency_ms data found in trace {trace.get('id')}"
-                        )
-                        updated_trace["latency_ms"] = None
-
-            # Add warnings for invalid columns
-            for col in invalid_columns:
-                warning_message = f"{col} is not a valid column name, no data returned"
-                updated_trace[col] = warning_message
-
-            updated_traces.append(updated_trace)
-
-        return updated_traces
+                    updated_trace["latency_ms"] = None
+
+        # Add warnings for invalid columns
+        for col in invalid_columns:
+            warning_message = f"{col} is not a valid column name, no data returned"
+            updated_trace[col] = warning_message
+
+        return updated_trace
 
     def query_traces(
         self,
@@ -418,32 +483,26 @@ class TraceService:
         # Ensure required columns for synthetic fields are included - This is also largely handled by _validate_and_filter_columns logic
         # filtered_api_columns = self._ensure_required_columns_for_synthetic(filtered_api_columns, rs_columns)
 
-        # Prepare query parameters
-        query_params = {
-            "entity_name": entity_name,
-            "project_name": project_name,
-            "filters": filters or {},
-            "sort_by": server_sort_by,
-            "sort_direction": server_sort_direction,
-            "limit": None
-            if client_side_cost_sort
-            else limit,  # No limit if we're sorting by cost
-            "offset": offset,
-            "include_costs": include_costs,
-            "include_feedback": include_feedback,
-            "columns": filtered_api_columns,  # Use the columns intended for the API
-            "expand_columns": expand_columns,
-        }
-
-        # Build request body
-        request_body = QueryBuilder.prepare_query_params(query_params)
+        # Compile the query plan, reused across the pages of a paginated query
+        plan = QueryBuilder.compile_plan(
+            {
+                "entity_name": entity_name,
+                "project_name": project_name,
+                "filters": filters or {},
+                "sort_by": server_sort_by,
+                "sort_direction": server_sort_direction,
+                "include_costs": include_costs,
+                "include_feedback": include_feedback,
+                "columns": filtered_api_columns,  # Use the columns intended for the API
+                "expand_columns": expand_columns,
+            }
+        )
 
-        # Extract synthetic fields if any were specified
-        synthetic_fields = (
-            request_body.pop("_synthetic_fields", [])
-            if "_synthetic_fields" in request_body
-            else []
+        # Build request body, without a limit if we're sorting by cost
+        request_body = plan.request(
+            offset=offset, limit=None if client_side_cost_sort else limit
         )
+        synthetic_fields = plan.synthetic_fields
 
         # Make sure all requested synthetic columns are included in synthetic_fields
         for col in rs_columns:  # Use rs_columns
@@ -489,6 +548,525 @@ class TraceService:
 
         return result
 
+    def _resolve_paginated_sort_by(self, sort_by: str) -> str:
+        """Map a user-facing sort field to the field the server should sort by.
+
+        Cost fields are sorted client-side, so the server falls back to 'started_at'.
+
+        Args:
+            sort_by: Requested sort field.
+
+        Returns:
+            Sort field to send to the Weave API.
+        """
+        effective_sort_by = "started_at"  # Default
+        if sort_by == "latency_ms":
+            effective_sort_by = self.LATENCY_FIELD_MAPPING["latency_ms"]
+            logger.info(
+                f"Paginated sort by 'latency_ms', server will use '{effective_sort_by}'."
+            )
+        elif "." in sort_by:
+            base_field = sort_by.split(".")[0]
+            if base_field in VALID_COLUMNS:
+                effective_sort_by = sort_by
+                logger.info(
+                    f"Paginated sort by nested field '{sort_by}', server will use it directly."
+                )
+            else:
+                logger.warning(
+                    f"Paginated sort by invalid nested field '{sort_by}', defaulting to 'started_at'."
+                )
+        elif (
+            sort_by in VALID_COLUMNS and sort_by not in self.COST_FIELDS
+        ):  # Exclude COST_FIELDS as they are client-sorted
+            effective_sort_by = sort_by
+        elif (
+            sort_by not in self.COST_FIELDS
+        ):  # If not valid and not cost, warn and default
+            logger.warning(
+                f"Paginated sort by invalid field '{sort_by}', defaulting to 'started_at'."
+            )
+        return effective_sort_by
+
+    def iter_traces(
+        self,
+        entity_name: str,
+        project_name: str,
+        filters: Optional[Dict[str, Any]] = None,
+        sort_by: str = "started_at",
+        sort_direction: str = "desc",
+        target_limit: Optional[int] = None,
+        include_costs: bool = True,
+        include_feedback: bool = True,
+        columns: Optional[List[str]] = None,
+        expand_columns: Optional[List[str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream traces from a single `/calls/stream_query` request.
+
+        Traces are yielded one at a time as they are decoded from the JSONL
+        response, with synthetic columns already added. A follow-up request
+        starting at the number of rows received is only issued when the stream
+        ended at the server-side row cap, `stream_page_cap`, short of the limit.
+
+        Args:
+            entity_name: Weights & Biases entity name.
+            project_name: Weights & Biands project name.
+            filters: Dictionary of filter conditions.
+            sort_by: Field to sort by. Cost fields are not supported here.
+            sort_direction: Sort direction ('asc' or 'desc').
+            target_limit: Maximum total number of results to yield.
+            include_costs: Include tracked API cost information in the results.
+            include_feedback: Include Weave annotations in the results.
+            columns: List of specific columns to include in the results.
+            expand_columns: List of columns to expand in the results.
+
+        Yields:
+            Trace dictionaries.
+        """
+        plan, rs_columns, inv_columns = self._prepare_stream_query(
+            entity_name=entity_name,
+            project_name=project_name,
+            filters=filters,
+            sort_by=sort_by,
+            sort_direction=sort_direction,
+            include_costs=include_costs,
+            include_feedback=include_feedback,
+            columns=columns,
+            expand_columns=expand_columns,
+        )
+
+        yielded = 0
+        while True:
+            request_body = self._build_stream_request(plan, yielded, target_limit)
+
+            received = 0
+            for trace in self.client.query_traces(request_body):
+                received += 1
+                yield self._finish_stream_trace(
+                    trace, rs_columns, inv_columns, plan.synthetic_fields
+                )
+
+            yielded += received
+            if not self._should_resume_stream(received, yielded, target_limit):
+                break
+
+    async def aiter_traces(
+        self,
+        entity_name: str,
+        project_name: str,
+        filters: Optional[Dict[str, Any]] = None,
+        sort_by: str = "started_at",
+        sort_direction: str = "desc",
+        target_limit: Optional[int] = None,
+        include_costs: bool = True,
+        include_feedback: bool = True,
+        columns: Optional[List[str]] = None,
+        expand_columns: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Asynchronously stream traces, as `iter_traces` does, over `AsyncWeaveApiClient`.
+
+        Args:
+            entity_name: Weights & Biases entity name.
+            project_name: Weights & Biases project name.
+            filters: Dictionary of filter conditions.
+            sort_by: Field to sort by. Cost fields are not supported here.
+            sort_direction: Sort direction ('asc' or 'desc').
+            target_limit: Maximum total number of results to yield.
+            include_costs: Include tracked API cost information in the results.
+            include_feedback: Include Weave annotations in the results.
+            columns: List of specific columns to include in the results.
+            expand_columns: List of columns to expand in the results.
+
+        Yields:
+            Trace dictionaries.
+        """
+        plan, rs_columns, inv_columns = self._prepare_stream_query(
+            entity_name=entity_name,
+            project_name=project_name,
+            filters=filters,
+            sort_by=sort_by,
+            sort_direction=sort_direction,
+            include_costs=include_costs,
+            include_feedback=include_feedback,
+            columns=columns,
+            expand_columns=expand_columns,
+        )
+
+        yielded = 0
+        while True:
+            request_body = self._build_stream_request(plan, yielded, target_limit)
+
+            received = 0
+            async for trace in self.async_client.query_traces(request_body):
+                received += 1
+                yield self._finish_stream_trace(
+                    trace, rs_columns, inv_columns, plan.synthetic_fields
+                )
+
+            yielded += received
+            if not self._should_resume_stream(received, yielded, target_limit):
+                break
+
+    def iter_cached_traces(
+        self,
+        entity_name: str,
+        project_name: str,
+        filters: Optional[Dict[str, Any]] = None,
+        sort_by: str = "started_at",
+        sort_direction: str = "desc",
+        target_limit: Optional[int] = None,
+        include_costs: bool = True,
+        include_feedback: bool = True,
+        columns: Optional[List[str]] = None,
+        expand_columns: Optional[List[str]] = None,
+    ) -> Optional[Iterator[Dict[str, Any]]]:
+        """Sync the local cache and stream matching traces from it.
+
+        The request that `iter_traces` would send is built first and compiled
+        into a local predicate. The project is then synced for the filter's
+        time range, and traces are read back from the cache with the same
+        filtering, sorting, limit and column projection as the server applies.
+
+        The cache only holds a bounded window of recent calls, so a query
+        without a time range start is answered from it only when it asks for
+        the `target_limit` latest calls and the window holds that many.
+
+        Args:
+            entity_name: Weights & Biases entity name.
+            project_name: Weights & Biases project name.
+            filters: Dictionary of filter conditions.
+            sort_by: Field to sort by. Cost fields are not supported here.
+            sort_direction: Sort direction ('asc' or 'desc').
+            target_limit: Maximum total number of results to yield.
+            include_costs: Include tracked API cost information in the results.
+            include_feedback: Include Weave annotations in the results.
+            columns: List of specific columns to include in the results.
+            expand_columns: List of columns to expand in the results.
+
+        Returns:
+            Iterator of trace dictionaries, or None if there is no cache or the
+            query can't be answered locally.
+        """
+        if self.cache is None or expand_columns or sort_by in self.COST_FIELDS:
+            return None
+
+        plan, rs_columns, inv_columns = self._prepare_stream_query(
+            entity_name=entity_name,
+            project_name=project_name,
+            filters=filters,
+            sort_by=sort_by,
+            sort_direction=sort_direction,
+            include_costs=include_costs,
+            include_feedback=include_feedback,
+            columns=columns,
+            expand_columns=expand_columns,
+        )
+        request_body = self._build_stream_request(plan, 0, target_limit)
+        try:
+            predicate = compile_request(request_body)
+        except UnsupportedQueryError as e:
+            logger.info(f"Querying the Weave API directly, not the trace cache: {e}")
+            return None
+
+        since, until = time_range_bounds(filters)
+        latest_first = sort_by == "started_at" and sort_direction == "desc"
+        if since is None and not (latest_first and target_limit):
+            logger.info(
+                "Querying the Weave API directly, not the trace cache: "
+                "no time range start"
+            )
+            return None
+        self.cache.sync(self.client, entity_name, project_name, since=since)
+
+        api_columns = request_body.get("columns")
+        include_costs = request_body["include_costs"]
+        include_feedback = request_body["include_feedback"]
+
+        def finish(trace: Dict[str, Any]) -> Dict[str, Any]:
+            # Cached calls have every column, costs and feedback
+            weave_summary = (trace.get("summary") or {}).get("weave")
+            if isinstance(weave_summary, dict):
+                if not include_costs:
+                    weave_summary.pop("costs", None)
+                if not include_feedback:
+                    weave_summary.pop("feedback", None)
+            if api_columns:
+                trace = {
+                    column: trace[column]
+                    for column in {c.split(".")[0] for c in api_columns}
+                    if column in trace
+                }
+            return self._finish_stream_trace(
+                trace, rs_columns, inv_columns, plan.synthetic_fields
+            )
+
+        project_id = request_body["project_id"]
+        window_start = since
+        if window_start is None:
+            window_start = self.cache.get_state(project_id)["synced_from"]
+        traces = self.cache.iter_traces(
+            project_id,
+            predicate,
+            since=window_start,
+            until=until,
+            sort_by=plan.body["sort_by"][0]["field"],
+            sort_direction=sort_direction,
+            limit=target_limit,
+        )
+        if since is None:
+            # Older calls outside the cached window may be needed otherwise
+            traces = list(traces)
+            if len(traces) < target_limit:
+                logger.info(
+                    "Querying the Weave API directly, not the trace cache: fewer "
+                    f"than {target_limit} matching calls in the cached window"
+                )
+                return None
+        return (finish(trace) for trace in traces)
+
+    def iter_traces_keyset(
+        self,
+        entity_name: str,
+        project_name: str,
+        chunk_size: int = 20,
+        filters: Optional[Dict[str, Any]] = None,
+        sort_direction: str = "desc",
+        target_limit: Optional[int] = None,
+        include_costs: bool = True,
+        include_feedback: bool = True,
+        columns: Optional[List[str]] = None,
+        expand_columns: Optional[List[str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream traces page by page using keyset pagination on `(started_at, id)`.
+
+        Each page is sorted by `started_at` then `id`, and the next page is
+        requested with a `cursor` filter on the last row seen instead of an
+        offset. Every page costs the same as the first one, and traces logged
+        during the scan can't shift rows between pages.
+
+        Args:
+            entity_name: Weights & Biases entity name.
+            project_name: Weights & Biases project name.
+            chunk_size: Number of traces to request per page.
+            filters: Dictionary of filter conditions.
+            sort_direction: Sort direction of `started_at` ('asc' or 'desc').
+            target_limit: Maximum total number of results to yield.
+            include_costs: Include tracked API cost information in the results.
+            include_feedback: Include Weave annotations in the results.
+            columns: List of specific columns to include in the results.
+            expand_columns: List of columns to expand in the results.
+
+        Yields:
+            Trace dictionaries.
+        """
+        plan, rs_columns, inv_columns = self._prepare_stream_query(
+            entity_name=entity_name,
+            project_name=project_name,
+            filters=filters,
+            sort_by="started_at",
+            sort_direction=sort_direction,
+            include_costs=include_costs,
+            include_feedback=include_feedback,
+            columns=columns,
+            expand_columns=expand_columns,
+            # The cursor is built from these, so they must always be returned
+            key_columns=("id", "started_at"),
+        )
+        # Break started_at ties by id so the cursor is a total order
+        plan.body["sort_by"] = [
+            *plan.body.get("sort_by", []),
+            {"field": "id", "direction": sort_direction},
+        ]
+
+        cursor = None
+        # IDs already seen at the cursor timestamp, in case the server treats it inclusively
+        boundary_ids: Set[str] = set()
+        yielded = 0
+
+        while True:
+            page_limit = (
+                min(chunk_size, target_limit - yielded) if target_limit else chunk_size
+            )
+            request_body = plan.request(limit=page_limit, cursor=cursor)
+
+            received = 0
+            page_yielded = 0
+            for trace in self.client.query_traces(request_body):
+                received += 1
+                trace_id = trace.get("id")
+                if trace_id in boundary_ids:
+                    continue
+
+                started_at = trace.get("started_at")
+                if cursor is None or started_at != cursor["started_at"]:
+                    boundary_ids = set()
+                boundary_ids.add(trace_id)
+                cursor = {
+                    "started_at": started_at,
+                    "id": trace_id,
+                    "direction": sort_direction,
+                }
+
+                yield self._finish_stream_trace(
+                    trace, rs_columns, inv_columns, plan.synthetic_fields
+                )
+                yielded += 1
+                page_yielded += 1
+
+            if received < page_limit or not page_yielded:
+                break
+            if target_limit and yielded >= target_limit:
+                break
+
+            logger.info(
+                f"Keyset page of {received} traces done, continuing after "
+                f"({cursor['started_at']}, {cursor['id']})"
+            )
+
+    def query_frame(
+        self,
+        entity_name: str,
+        project_name: str,
+        filters: Optional[Dict[str, Any]] = None,
+        sort_by: str = "started_at",
+        sort_direction: str = "desc",
+        target_limit: Optional[int] = None,
+        keyset: bool = False,
+        chunk_size: int = 1000,
+    ) -> TraceFrame:
+        """Stream the traces matching a query into a columnar TraceFrame.
+
+        Only `FRAME_SOURCE_COLUMNS` are requested, without inputs, outputs or
+        feedback, and traces are flattened as they arrive.
+
+        Args:
+            entity_name: Weights & Biases entity name.
+            project_name: Weights & Biases project name.
+            filters: Dictionary of filter conditions.
+            sort_by: Field to sort by, ignored with keyset pagination.
+            sort_direction: Sort direction ('asc' or 'desc').
+            target_limit: Maximum number of traces to include.
+            keyset: Page with a (started_at, id) cursor instead of a single stream.
+            chunk_size: Page size for keyset pagination.
+
+        Returns:
+            TraceFrame over the matching traces.
+        """
+        stream_kwargs = dict(
+            entity_name=entity_name,
+            project_name=project_name,
+            filters=filters,
+            sort_direction=sort_direction,
+            target_limit=target_limit,
+            include_costs=True,
+            include_feedback=False,
+            columns=list(FRAME_SOURCE_COLUMNS),
+        )
+        if keyset:
+            traces = self.iter_traces_keyset(chunk_size=chunk_size, **stream_kwargs)
+        else:
+            traces = self.iter_traces(sort_by=sort_by, **stream_kwargs)
+        return TraceFrame.from_traces(traces)
+
+    def _prepare_stream_query(
+        self,
+        entity_name: str,
+        project_name: str,
+        filters: Optional[Dict[str, Any]],
+        sort_by: str,
+        sort_direction: str,
+        include_costs: bool,
+        include_feedback: bool,
+        columns: Optional[List[str]],
+        expand_columns: Optional[List[str]],
+        key_columns: Tuple[str, ...] = (),
+    ) -> tuple[QueryPlan, List[str], Set[str]]:
+        """Validate columns and compile the query plan shared by a trace stream.
+
+        Args:
+            key_columns: Columns that must be returned whenever the request
+                is restricted to specific columns.
+
+        Returns:
+            Tuple of (query plan, requested synthetic columns, invalid columns).
+            The plan's synthetic fields include the requested synthetic columns.
+        """
+        filtered_api_columns, rs_columns, inv_columns = (
+            self._validate_and_filter_columns(columns)
+        )
+        self.invalid_columns = inv_columns
+
+        if "costs" in rs_columns:
+            include_costs = True
+
+        if filtered_api_columns:
+            for key_column in key_columns:
+                if key_column not in filtered_api_columns:
+                    filtered_api_columns.append(key_column)
+
+        plan = QueryBuilder.compile_plan(
+            {
+                "entity_name": entity_name,
+                "project_name": project_name,
+                "filters": filters or {},
+                "sort_by": self._resolve_paginated_sort_by(sort_by),
+                "sort_direction": sort_direction,
+                "include_costs": include_costs,
+                "include_feedback": include_feedback,
+                "columns": filtered_api_columns,
+                "expand_columns": expand_columns,
+            }
+        )
+        for col in rs_columns:
+            if col not in plan.synthetic_fields:
+                plan.synthetic_fields.append(col)
+        return plan, rs_columns, inv_columns
+
+    @staticmethod
+    def _build_stream_request(
+        plan: QueryPlan, yielded: int, target_limit: Optional[int]
+    ) -> Dict[str, Any]:
+        """Build the request body for a stream starting after `yielded` rows."""
+        return plan.request(
+            offset=yielded,
+            limit=target_limit - yielded if target_limit else None,
+        )
+
+    def _finish_stream_trace(
+        self,
+        trace: Dict[str, Any],
+        rs_columns: List[str],
+        inv_columns: Set[str],
+        synthetic_fields: List[str],
+    ) -> Dict[str, Any]:
+        """Add synthetic columns and fields to a streamed trace."""
+        if rs_columns or inv_columns:
+            trace = self._add_synthetic_columns_to_trace(trace, rs_columns, inv_columns)
+        if synthetic_fields:
+            trace = TraceProcessor.synthesize_fields(trace, synthetic_fields)
+        return trace
+
+    def _should_resume_stream(
+        self, received: int, yielded: int, target_limit: Optional[int]
+    ) -> bool:
+        """Decide whether a stream that ended was truncated by the server.
+
+        A complete stream ends before the server's row cap, so only streams of
+        exactly `stream_page_cap` rows get a follow-up request.
+
+        Returns:
+            True if a follow-up request should resume the stream.
+        """
+        if target_limit and yielded >= target_limit:
+            return False
+        if received < self.stream_page_cap:
+            return False
+
+        logger.info(
+            f"Stream ended after {received} rows, resuming from offset {yielded}"
+        )
+        return True
+
     def query_paginated_traces(
         self,
         entity_name: str,
@@ -505,6 +1083,11 @@ class TraceService:
         truncate_length: Optional[int] = 200,
         return_full_data: bool = False,
         metadata_only: bool = False,
+        stream: bool = True,
+        token_counting: str = "exact",
+        keyset: bool = False,
+        max_response_bytes: Optional[int] = None,
+        max_response_tokens: Optional[int] = None,
     ) -> QueryResult:
         """Query traces with pagination.
 
@@ -523,6 +1106,15 @@ class TraceService:
             truncate_length: Maximum length for string values.
             return_full_data: Whether to include full untruncated trace data.
             metadata_only: Whether to only include metadata without traces.
+            stream: Fetch traces with a single streaming request (see `iter_traces`)
+                instead of issuing one offset-based request per chunk.
+            token_counting: Token counting mode for the metadata ('exact', 'estimate'
+                or 'none'). Metadata-only queries that don't need exact counts are
+                served by `TraceMetadataEngine` without downloading trace payloads.
+            keyset: Page with a `(started_at, id)` cursor instead of offsets (see
+                `iter_traces_keyset`). Only applies when sorting by 'started_at'.
+            max_response_bytes: Total size budget for the truncated result.
+            max_response_tokens: Total token budget for the truncated result.
 
         Returns:
             QueryResult object with metadata and optionally traces.
@@ -530,34 +1122,18 @@ class TraceService:
         # Special handling for cost-based sorting
         client_side_cost_sort = sort_by in self.COST_FIELDS
 
-        # Determine effective_sort_by for the server
-        effective_sort_by = "started_at"  # Default
-        if sort_by == "latency_ms":
-            effective_sort_by = self.LATENCY_FIELD_MAPPING["latency_ms"]
-            logger.info(
-                f"Paginated sort by 'latency_ms', server will use '{effective_sort_by}'."
-            )
-        elif "." in sort_by:
-            base_field = sort_by.split(".")[0]
-            if base_field in VALID_COLUMNS:
-                effective_sort_by = sort_by
-                logger.info(
-                    f"Paginated sort by nested field '{sort_by}', server will use it directly."
-                )
-            else:
-                logger.warning(
-                    f"Paginated sort by invalid nested field '{sort_by}', defaulting to 'started_at'."
-                )
-        elif (
-            sort_by in VALID_COLUMNS and sort_by not in self.COST_FIELDS
-        ):  # Exclude COST_FIELDS as they are client-sorted
-            effective_sort_by = sort_by
-        elif (
-            sort_by not in self.COST_FIELDS
-        ):  # If not valid and not cost, warn and default
-            logger.warning(
-                f"Paginated sort by invalid field '{sort_by}', defaulting to 'started_at'."
+        # Metadata without exact token counts doesn't need the trace payloads
+        if metadata_only and not client_side_cost_sort and token_counting != "exact":
+            metadata = self.metadata_engine.query_metadata(
+                entity_name=entity_name,
+                project_name=project_name,
+                filters=filters,
+                sort_by=self._resolve_paginated_sort_by(sort_by),
+                sort_direction=sort_direction,
+                target_limit=target_limit,
+                token_counting=token_counting,
             )
+            return QueryResult(metadata=metadata)
 
         # Validate and filter columns using CallSchema
         # Pass the original 'columns'
@@ -591,8 +1167,62 @@ class TraceService:
                 requested_synthetic_columns=rs_columns,  # Pass synthetic columns request
                 invalid_columns=inv_columns,  # Pass invalid columns
             )
+        elif stream or keyset:
+            if keyset and sort_by != "started_at":
+                logger.warning(
+                    f"Keyset pagination requires sorting by 'started_at', not '{sort_by}'. "
+                    "Falling back to a streaming query."
+                )
+                keyset = False
+
+            if keyset:
+                trace_stream = self.iter_traces_keyset(
+                    entity_name=entity_name,
+                    project_name=project_name,
+                    chunk_size=chunk_size,
+                    filters=filters,
+                    sort_direction=sort_direction,
+                    target_limit=target_limit,
+                    include_costs=include_costs,
+                    include_feedback=include_feedback,
+                    columns=columns,
+                    expand_columns=expand_columns,
+                )
+            else:
+                trace_stream = self.iter_cached_traces(
+                    entity_name=entity_name,
+                    project_name=project_name,
+                    filters=filters,
+                    sort_by=sort_by,
+                    sort_direction=sort_direction,
+                    target_limit=target_limit,
+                    include_costs=include_costs,
+                    include_feedback=include_feedback,
+                    columns=columns,
+                    expand_columns=expand_columns,
+                )
+            if trace_stream is None:
+                trace_stream = self.iter_traces(
+                    entity_name=entity_name,
+                    project_name=project_name,
+                    filters=filters,
+                    sort_by=sort_by,
+                    sort_direction=sort_direction,
+                    target_limit=target_limit,
+                    include_costs=include_costs,
+                    include_feedback=include_feedback,
+                    columns=columns,
+                    expand_columns=expand_columns,
+                )
+            if metadata_only:
+                # Accumulate metadata as traces arrive instead of holding them all
+                accumulator = MetadataAccumulator(token_counting=token_counting)
+                metadata = accumulator.update(trace_stream).to_metadata()
+                return QueryResult(metadata=metadata)
+            all_traces = list(trace_stream)
         else:
-            # Normal paginated query logic
+            # Offset-based paginated query logic
+            effective_sort_by = self._resolve_paginated_sort_by(sort_by)
             all_traces = []
             current_offset = 0
 
@@ -650,6 +1280,9 @@ class TraceService:
             truncate_length=truncate_length or 0,
             return_full_data=return_full_data,
             metadata_only=metadata_only,
+            token_counting=token_counting,
+            max_response_bytes=max_response_bytes,
+            max_response_tokens=max_response_tokens,
         )
         logger.debug(
             f"Final result from query_paginated_traces:\n\n{len(result.model_dump_json(indent=2))}\n"
@@ -659,6 +1292,151 @@ class TraceService:
         )
         return result
 
+    async def aquery_paginated_traces(
+        self,
+        entity_name: str,
+        project_name: str,
+        chunk_size: int = 20,
+        filters: Optional[Dict[str, Any]] = None,
+        sort_by: str = "started_at",
+        sort_direction: str = "desc",
+        target_limit: Optional[int] = None,
+        include_costs: bool = True,
+        include_feedback: bool = True,
+        columns: Optional[List[str]] = None,
+        expand_columns: Optional[List[str]] = None,
+        truncate_length: Optional[int] = 200,
+        return_full_data: bool = False,
+        metadata_only: bool = False,
+        stream: bool = True,
+        token_counting: str = "exact",
+        keyset: bool = False,
+        max_response_bytes: Optional[int] = None,
+        max_response_tokens: Optional[int] = None,
+    ) -> QueryResult:
+        """Asynchronous variant of `query_paginated_traces`.
+
+        Streamed queries are read with `aiter_traces` on the event loop.
+        Cost-sorted, metadata engine, keyset and offset-paginated queries issue
+        several dependent requests and run `query_paginated_traces` in a worker
+        thread, so none of them block the event loop.
+
+        Args:
+            Same as `query_paginated_traces`.
+
+        Returns:
+            QueryResult object with metadata and optionally traces.
+        """
+        kwargs = dict(
+            entity_name=entity_name,
+            project_name=project_name,
+            chunk_size=chunk_size,
+            filters=filters,
+            sort_by=sort_by,
+            sort_direction=sort_direction,
+            target_limit=target_limit,
+            include_costs=include_costs,
+            include_feedback=include_feedback,
+            columns=columns,
+            expand_columns=expand_columns,
+            truncate_length=truncate_length,
+            return_full_data=return_full_data,
+            metadata_only=metadata_only,
+            stream=stream,
+            token_counting=token_counting,
+            keyset=keyset,
+            max_response_bytes=max_response_bytes,
+            max_response_tokens=max_response_tokens,
+        )
+
+        if (
+            not stream
+            or keyset
+            or self.cache is not None
+            or sort_by in self.COST_FIELDS
+            or (metadata_only and token_counting != "exact")
+        ):
+            return await asyncio.to_thread(self.query_paginated_traces, **kwargs)
+
+        trace_stream = self.aiter_traces(
+            entity_name=entity_name,
+            project_name=project_name,
+            filters=filters,
+            sort_by=sort_by,
+            sort_direction=sort_direction,
+            target_limit=target_limit,
+            include_costs=include_costs,
+            include_feedback=include_feedback,
+            columns=columns,
+            expand_columns=expand_columns,
+        )
+
+        if metadata_only:
+            accumulator = MetadataAccumulator(token_counting=token_counting)
+            async for trace in trace_stream:
+                accumulator.add(trace)
+            metadata = await asyncio.to_thread(accumulator.to_metadata)
+            return QueryResult(metadata=metadata)
+
+        all_traces = [trace async for trace in trace_stream]
+        if target_limit and all_traces:
+            all_traces = all_traces[:target_limit]
+
+        # Token counting and truncation are CPU-bound, keep them off the event loop
+        return await asyncio.to_thread(
+            TraceProcessor.process_traces,
+            traces=all_traces,
+            truncate_length=truncate_length or 0,
+            return_full_data=return_full_data,
+            metadata_only=metadata_only,
+            token_counting=token_counting,
+            max_response_bytes=max_response_bytes,
+            max_response_tokens=max_response_tokens,
+        )
+
+    def _fetch_traces_by_ids(
+        self, query: Dict[str, Any], call_ids: List[str]
+    ) -> List[Dict[str, Any]]:
+        """Fetch traces by ID in bounded `call_ids` batches, concurrently.
+
+        Each batch of at most `call_ids_batch_size` IDs is sent as its own
+        request over the client's pooled session, with at most `max_workers`
+        requests in flight at once.
+
+        Args:
+            query: Query parameters for `QueryBuilder.prepare_query_params`,
+                without the `call_ids` filter.
+            call_ids: IDs of the traces to fetch.
+
+        Returns:
+            List of trace dictionaries, batch by batch in the order of `call_ids`.
+        """
+        batches = [
+            call_ids[i : i + self.call_ids_batch_size]
+            for i in range(0, len(call_ids), self.call_ids_batch_size)
+        ]
+
+        def fetch(batch: List[str]) -> List[Dict[str, Any]]:
+            request = QueryBuilder.prepare_query_params(
+                {**query, "filters": {"call_ids": batch}}
+            )
+            request.pop("_synthetic_fields", None)
+            return list(self.client.query_traces(request))
+
+        if len(batches) <= 1:
+            return [trace for batch in batches for trace in fetch(batch)]
+
+        logger.info(
+            f"Fetching {len(call_ids)} traces in {len(batches)} batches "
+            f"with up to {self.max_workers} workers"
+        )
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(batches))
+        ) as executor:
+            results = list(executor.map(fetch, batches))
+
+        return [trace for batch_result in results for trace in batch_result]
+
     def _query_for_cost_sorting(
         self,
         entity_name: str,
@@ -696,7 +1474,7 @@ class TraceService:
         if invalid_columns is None:
             invalid_columns = set()
 
-        # First pass: Fetch all trace IDs and costs
+        # First pass: Stream all trace IDs and costs
         first_pass_query = {
             "entity_name": entity_name,
             "project_name": project_name,
@@ -710,30 +1488,15 @@ class TraceService:
         }
 
         first_pass_request = QueryBuilder.prepare_query_params(first_pass_query)
-        first_pass_results = list(self.client.query_traces(first_pass_request))
-
-        logger.info(
-            f"First pass of cost sorting request retrieved {len(first_pass_results)} traces"
-        )
-
-        # Filter and sort by cost
-        filtered_results = [
-            t
-            for t in first_pass_results
-            if TraceProcessor.get_cost(t, sort_by) is not None
-        ]
-
-        filtered_results.sort(
-            key=lambda t: TraceProcessor.get_cost(t, sort_by),
-            reverse=(sort_direction == "desc"),
-        )
 
-        # Get the IDs of the top N traces
-        top_ids = (
-            [t["id"] for t in filtered_results[:target_limit] if "id" in t]
-            if target_limit
-            else [t["id"] for t in filtered_results if "id" in t]
+        # Stream the first pass through a bounded heap instead of sorting it all
+        ranked = TraceProcessor.select_top_cost_ids(
+            self.client.query_traces(first_pass_request),
+            sort_by,
+            k=target_limit or None,
+            descending=(sort_direction == "desc"),
         )
+        top_ids = [trace_id for _, trace_id in ranked]
 
         logger.info(f"After sorting by {sort_by}, selected {len(top_ids)} trace IDs")
 
@@ -744,7 +1507,6 @@ class TraceService:
         second_pass_query = {
             "entity_name": entity_name,
             "project_name": project_name,
-            "filters": {"call_ids": top_ids},
             "include_costs": include_costs,
             "include_feedback": include_feedback,
             "columns": columns,
@@ -760,8 +1522,7 @@ class TraceService:
                     second_pass_query["columns"].append("summary")
                 logger.info("Added 'summary' to columns for cost data retrieval")
 
-        second_pass_request = QueryBuilder.prepare_query_params(second_pass_query)
-        second_pass_results = list(self.client.query_traces(second_pass_request))
+        second_pass_results = self._fetch_traces_by_ids(second_pass_query, top_ids)
 
         logger.info(f"Second pass retrieved {len(second_pass_results)} traces")
 
@@ -0,0 +1,244 @@
+"""
+Truncation engine for Weave trace data.
+
+This module truncates nested trace payloads iteratively and copy-on-write:
+containers are only copied along the paths where something was truncated, so
+values that already fit are returned as the original objects. It can also fit
+a whole list of traces into a total response budget by choosing the largest
+per-string length for their payload fields that keeps the serialized response
+under the budget.
+"""
+
+import bisect
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from wandb_mcp_server.utils import get_rich_logger
+
+logger = get_rich_logger(__name__)
+
+# Marker appended to truncated strings
+ELLIPSIS = "..."
+
+# Complex object references are collapsed to their type below this max_length
+MIN_COMPLEX_OBJECT_LENGTH = 50
+
+# Scalars that are never truncated or converted
+_PASSTHROUGH_TYPES = (bool, int, float)
+
+# Trace fields shortened by `fit_to_budget`. Identifiers, op names and
+# timestamps are kept whole, so fitted traces can still be joined and paged.
+BUDGET_PAYLOAD_FIELDS = ("inputs", "output", "attributes", "summary")
+
+
+def _empty_value(value: Any) -> Any:
+    """Return the empty value of the same kind, used when max_length is 0."""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return {}
+    if isinstance(value, list):
+        return []
+    if isinstance(value, (int, float)):
+        return 0
+    return ""
+
+
+def _truncate_scalar(value: Any, max_length: int) -> Any:
+    """Truncate a non-container value, returning it unchanged if it fits."""
+    if value is None or isinstance(value, _PASSTHROUGH_TYPES):
+        return value
+    if not isinstance(value, str):
+        # Datetimes and other non-JSON types are converted to strings once
+        try:
+            value = str(value)
+        except Exception as e:
+            logger.warning(f"Error converting value to string: {e}, returning None")
+            return None
+    if len(value) > max_length:
+        return value[:max_length] + ELLIPSIS
+    return value
+
+
+def _complex_object_placeholder(value: Dict[str, Any], max_length: int) -> Any:
+    """Collapse serialized object references to their type, or None if not one."""
+    if "__type__" not in value and "_type" not in value:
+        return None
+    if max_length < MIN_COMPLEX_OBJECT_LENGTH:
+        return {}
+    return {"type": value.get("__type__") or value.get("_type")}
+
+
+def _copy(container: Any) -> Any:
+    """Shallow copy of a dict or list, made on the first change to it."""
+    return dict(container) if isinstance(container, dict) else list(container)
+
+
+def _items(container: Any) -> Iterator[Tuple[Any, Any]]:
+    """Iterate over (key, child) pairs of a dict or list."""
+    if isinstance(container, dict):
+        return iter(container.items())
+    return enumerate(container)
+
+
+def truncate_value(value: Any, max_length: int = 200) -> Any:
+    """Truncate string values in nested structures without recursion.
+
+    Strings longer than `max_length` are cut and suffixed with '...', other
+    non-JSON values are converted to strings, and serialized object references
+    (dicts with `__type__` or `_type`) are collapsed to their type. Containers
+    are only copied if something inside them changed; otherwise the original
+    object is returned.
+
+    Args:
+        value: The value to truncate.
+        max_length: Maximum length for string values. 0 empties every value.
+
+    Returns:
+        Truncated value, or `value` itself if nothing needed truncating.
+    """
+    if max_length == 0:
+        return _empty_value(value)
+    if isinstance(value, dict):
+        placeholder = _complex_object_placeholder(value, max_length)
+        if placeholder is not None:
+            return placeholder
+    elif not isinstance(value, list):
+        return _truncate_scalar(value, max_length)
+
+    # Each frame is [container, items iterator, copy or None, parent frame, key]
+    frame: List[Any] = [value, _items(value), None, None, None]
+    while True:
+        items, copy = frame[1], frame[2]
+        for key, child in items:
+            child_type = type(child)
+            if child_type is str:
+                if len(child) > max_length:
+                    if copy is None:
+                        copy = frame[2] = _copy(frame[0])
+                    copy[key] = child[:max_length] + ELLIPSIS
+            elif child_type is dict or child_type is list or isinstance(
+                child, (dict, list)
+            ):
+                if isinstance(child, dict):
+                    placeholder = _complex_object_placeholder(child, max_length)
+                    if placeholder is not None:
+                        if copy is None:
+                            copy = frame[2] = _copy(frame[0])
+                        copy[key] = placeholder
+                        continue
+                # Descend, and resume this frame's iterator once the child is done
+                frame = [child, _items(child), None, frame, key]
+                break
+            elif child is not None and child_type not in _PASSTHROUGH_TYPES:
+                truncated = _truncate_scalar(child, max_length)
+                if truncated is not child:
+                    if copy is None:
+                        copy = frame[2] = _copy(frame[0])
+                    copy[key] = truncated
+        else:
+            parent = frame[3]
+            if parent is None:
+                return frame[0] if copy is None else copy
+            if copy is not None:
+                if parent[2] is None:
+                    parent[2] = _copy(parent[0])
+                parent[2][frame[4]] = copy
+            frame = parent
+
+
+def _string_lengths(value: Any) -> List[int]:
+    """Collect the lengths of all string leaves in a nested structure."""
+    lengths = []
+    stack = [value]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, str):
+            lengths.append(len(current))
+        elif isinstance(current, dict):
+            stack.extend(current.values())
+        elif isinstance(current, list):
+            stack.extend(current)
+    return lengths
+
+
+def _payloads(traces: List[Dict[str, Any]]) -> List[Any]:
+    """Values of the BUDGET_PAYLOAD_FIELDS of every trace."""
+    return [
+        trace[field]
+        for trace in traces
+        if isinstance(trace, dict)
+        for field in BUDGET_PAYLOAD_FIELDS
+        if field in trace
+    ]
+
+
+def _truncate_payloads(trace: Any, max_length: int) -> Any:
+    """Truncate the payload fields of a trace, copying it only if one changed."""
+    if not isinstance(trace, dict):
+        return trace
+    truncated = trace
+    for field in BUDGET_PAYLOAD_FIELDS:
+        if field not in trace:
+            continue
+        value = truncate_value(trace[field], max_length)
+        if value is not trace[field]:
+            if truncated is trace:
+                truncated = dict(trace)
+            truncated[field] = value
+    return truncated
+
+
+def fit_to_budget(
+    traces: List[Dict[str, Any]], max_bytes: int
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Truncate traces so that their serialized size fits a total byte budget.
+
+    Only the strings of BUDGET_PAYLOAD_FIELDS are shortened, longest first:
+    the per-string limit is the largest length L such that the traces with
+    every payload string capped at L characters (plus '...') fit in
+    `max_bytes`. String lengths in characters are used as an approximation
+    of their encoded size.
+
+    Args:
+        traces: List of trace dictionaries.
+        max_bytes: Total budget for the serialized traces, in bytes.
+
+    Returns:
+        Tuple of (traces, applied per-string limit). The traces are returned
+        untouched, with a limit of None, if they already fit the budget.
+    """
+    lengths = sorted(_string_lengths(_payloads(traces)))
+    total_string_length = sum(lengths)
+    serialized = json.dumps(traces, default=str, ensure_ascii=False)
+    overhead = len(serialized) - total_string_length
+
+    if overhead + total_string_length <= max_bytes or not lengths:
+        return traces, None
+
+    prefix_sums = [0]
+    for length in lengths:
+        prefix_sums.append(prefix_sums[-1] + length)
+
+    def size_with_limit(limit: int) -> int:
+        # Strings up to `limit` are kept, longer ones become limit + '...'
+        kept = bisect.bisect_right(lengths, limit)
+        truncated = len(lengths) - kept
+        return overhead + prefix_sums[kept] + truncated * (limit + len(ELLIPSIS))
+
+    low, high = 1, lengths[-1]
+    if size_with_limit(low) > max_bytes:
+        logger.warning(
+            f"Response budget of {max_bytes} bytes can't be met by truncating payloads, "
+            f"using the minimum string length of {low}"
+        )
+        high = low
+    while low < high:
+        middle = (low + high + 1) // 2
+        if size_with_limit(middle) <= max_bytes:
+            low = middle
+        else:
+            high = middle - 1
+
+    logger.info(f"Fitting {len(traces)} traces into {max_bytes} bytes, limit {low}")
+    return [_truncate_payloads(trace, low) for trace in traces], low
@@ -0,0 +1,270 @@
+"""
+Tests for the GraphQL response cache of query_paginated_wandb_gql.
+
+Queries go through a real `wandb.Api` client to a local fake GraphQL endpoint
+that counts the requests it receives, so the tests show which calls are
+answered without a network round trip.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+from wandb_mcp_server.mcp_tools import query_wandb_gql as gql_module
+from wandb_mcp_server.mcp_tools.gql_cache import GqlResponseCache
+from wandb_mcp_server.mcp_tools.query_wandb_gql import (
+    clear_query_cache,
+    query_paginated_wandb_gql,
+)
+from wandb_mcp_server.mcp_tools.tools_utils import clear_wandb_api_pool
+
+PROJECT_QUERY = """
+query ProjectInfo($entity: String!, $project: String!) {
+  project(name: $project, entityName: $entity) { id name description }
+}
+"""
+
+RUNS_QUERY = """
+query ProjectRuns($entity: String!, $project: String!, $limit: Int) {
+  project(name: $project, entityName: $entity) {
+    runs(first: $limit) {
+      edges { node { id name state } }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+MUTATION = """
+mutation UpsertProject($entity: String!, $project: String!) {
+  upsertModel(input: {entityName: $entity, name: $project}) { project { id } }
+}
+"""
+
+
+class FakeGraphQLEndpoint:
+    """Local HTTP endpoint answering the test queries by operation name."""
+
+    def __init__(self):
+        self.requests: List[Dict[str, Any]] = []
+        self.run_state = "finished"
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                endpoint.requests.append(body)
+                payload = json.dumps(endpoint.respond(body)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def respond(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        query = body.get("query", "")
+        variables = body.get("variables") or {}
+        if "ProjectRuns" in query:
+            runs = [
+                {"id": f"run-{i}", "name": f"run-{i}", "state": self.run_state}
+                for i in range(3)
+            ]
+            return {
+                "data": {
+                    "project": {
+                        "runs": {
+                            "edges": [{"node": run} for run in runs],
+                            "pageInfo": {"hasNextPage": False, "endCursor": "3"},
+                        }
+                    }
+                }
+            }
+        if "UpsertProject" in query:
+            return {"data": {"upsertModel": {"project": {"id": "p1"}}}}
+        return {
+            "data": {
+                "project": {
+                    "id": "p1",
+                    "name": variables.get("project"),
+                    "description": f"request {len(self.requests)}",
+                }
+            }
+        }
+
+    def close(self) -> None:
+        self.server.shutdown()
+
+
+class TestGqlResponseCache(unittest.TestCase):
+    """Tests for GqlResponseCache through query_paginated_wandb_gql."""
+
+    def setUp(self):
+        self.endpoint = FakeGraphQLEndpoint()
+        self.env = patch.dict(
+            os.environ, {"WANDB_API_KEY": "a" * 40, "WANDB_BASE_URL": self.endpoint.url}
+        )
+        self.env.start()
+        clear_wandb_api_pool()
+        clear_query_cache()
+        self.use_cache(GqlResponseCache())
+
+    def tearDown(self):
+        patch.stopall()
+        self.env.stop()
+        self.endpoint.close()
+        clear_wandb_api_pool()
+
+    def use_cache(self, cache: GqlResponseCache) -> GqlResponseCache:
+        patcher = patch.object(gql_module, "get_gql_response_cache", return_value=cache)
+        patcher.start()
+        self.cache = cache
+        return cache
+
+    def query(self, query: str = PROJECT_QUERY, project: str = "p", **kwargs):
+        return query_paginated_wandb_gql(
+            query, {"entity": "e", "project": project}, **kwargs
+        )
+
+    def test_hits_avoid_network_calls(self):
+        """Test that repeated and reformatted queries are served from the cache."""
+        first = self.query()
+        assert len(self.endpoint.requests) == 1
+
+        assert self.query() == first
+        reformatted = "# Same query\n" + PROJECT_QUERY.replace("  ", "    ")
+        assert self.query(reformatted) == first
+        assert len(self.endpoint.requests) == 1
+        assert self.cache.stats()["hits"] == 2
+
+        # Different variables are a different query
+        self.query(project="other")
+        assert len(self.endpoint.requests) == 2
+
+    def test_hits_are_copies(self):
+        """Test that modifying a returned response doesn't change the cache."""
+        self.query()["project"]["name"] = "changed"
+        assert self.query()["project"]["name"] == "p"
+
+    def test_bypass_cache_refreshes(self):
+        """Test that bypass_cache queries the server and stores the fresh response."""
+        self.query()
+        fresh = self.query(bypass_cache=True)
+        assert len(self.endpoint.requests) == 2
+        assert fresh["project"]["description"] == "request 2"
+        assert self.query() == fresh
+        assert len(self.endpoint.requests) == 2
+
+    def test_running_runs_expire_quickly(self):
+        """Test that responses with running runs get the short TTL."""
+        self.use_cache(GqlResponseCache(running_ttl=0.05))
+        self.endpoint.run_state = "running"
+        self.query(RUNS_QUERY)
+        self.query(RUNS_QUERY)
+        assert len(self.endpoint.requests) == 1
+        time.sleep(0.1)
+        self.query(RUNS_QUERY)
+        assert len(self.endpoint.requests) == 2
+
+        # Finished runs stay cached for the collection TTL
+        self.endpoint.run_state = "finished"
+        self.query(RUNS_QUERY, bypass_cache=True)
+        time.sleep(0.1)
+        self.query(RUNS_QUERY)
+        assert len(self.endpoint.requests) == 3
+
+    def test_lru_eviction(self):
+        """Test that the least recently used response is evicted first."""
+        self.use_cache(GqlResponseCache(maxsize=2))
+        for project in ("a", "b", "a", "c", "a"):
+            self.query(project=project)
+        # "b" was evicted by "c", "a" stayed
+        assert len(self.endpoint.requests) == 3
+        self.query(project="b")
+        assert len(self.endpoint.requests) == 4
+
+    def test_disk_store_shared_across_caches(self):
+        """Test that responses stored on disk are served to a new cache."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "gql.sqlite")
+            self.use_cache(GqlResponseCache(path=path))
+            first = self.query()
+
+            cache = self.use_cache(GqlResponseCache(path=path))
+            assert self.query() == first
+            assert len(self.endpoint.requests) == 1
+            assert cache.stats()["disk_hits"] == 1
+
+    def test_mutations_and_errors_not_cached(self):
+        """Test that mutations and failed queries always reach the server."""
+        self.query(MUTATION)
+        self.query(MUTATION)
+        assert len(self.endpoint.requests) == 2
+
+        with patch.object(
+            self.endpoint, "respond", return_value={"errors": [{"message": "boom"}]}
+        ):
+            assert "errors" in self.query()
+        self.query()
+        assert len(self.endpoint.requests) == 4
+
+    def test_ttl_for(self):
+        """Test TTL selection by root field, collections and running state."""
+        cache = GqlResponseCache(
+            default_ttl=30, root_field_ttls={"project": 600, "viewer": 900}
+        )
+        metadata = {"project": {"id": "p1"}}
+        runs = {
+            "project": {
+                "runs": {
+                    "edges": [{"node": {"state": "finished"}}],
+                    "pageInfo": {"hasNextPage": False, "endCursor": "1"},
+                }
+            }
+        }
+        running = {"project": {"run": {"state": "Running"}}}
+        # Without `state`, runs may be running
+        unknown_state = {
+            "project": {
+                "runs": {
+                    "edges": [{"node": {"name": "abc"}}],
+                    "pageInfo": {"hasNextPage": False, "endCursor": "1"},
+                }
+            }
+        }
+
+        assert cache.ttl_for(["project"], metadata) == 600
+        assert cache.ttl_for(["project", "viewer"], metadata) == 600
+        assert cache.ttl_for(["unknownField"], metadata) == 30
+        assert cache.ttl_for(["project"], runs) == cache.collection_ttl
+        assert cache.ttl_for(["project"], running) == cache.running_ttl
+        assert cache.ttl_for(["project"], unknown_state) == cache.running_ttl
+        assert cache.ttl_for(["project"], {"project": {"run": {"name": "abc"}}}) == (
+            cache.running_ttl
+        )
+        # Null edges of a partial response carry no run
+        null_edges = {
+            "project": {
+                "runs": {
+                    "edges": [None],
+                    "pageInfo": {"hasNextPage": False, "endCursor": None},
+                }
+            }
+        }
+        assert cache.ttl_for(["project"], null_edges) == cache.collection_ttl
+
+
+if __name__ == "__main__":
+    unittest.main()
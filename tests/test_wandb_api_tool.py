@@ -0,0 +1,218 @@
+"""
+Tests for the bulk run listing of the W&B experiment tracking tools.
+
+The W&B API is replaced by a fake GraphQL client, so no network access or
+W&B account is needed.
+"""
+
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import types
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import wandb  # Imported before the pandas stub below, which it would otherwise probe
+
+MODULE_PATH = (
+    Path(__file__).resolve().parents[1] / "src" / "experiment_tracking" / "wandb_api_tool.py"
+)
+
+
+def load_wandb_api_tool():
+    """Load the module from its file, without the SwanLab tools of its package."""
+    if importlib.util.find_spec("pandas") is None:
+        sys.modules["pandas"] = types.SimpleNamespace(DataFrame=object)
+    spec = importlib.util.spec_from_file_location("wandb_api_tool", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    # The module sets proxy variables on import
+    with patch.dict(os.environ):
+        spec.loader.exec_module(module)
+    return module
+
+
+wandb_api_tool = load_wandb_api_tool()
+
+
+def literal(value):
+    """Python value of a literal argument of a parsed query."""
+    if hasattr(value, "values"):
+        return [literal(item) for item in value.values]
+    return value.value
+
+
+class FakeWandbClient:
+    """Answers the BulkRuns and RunsBatch queries from in-memory runs."""
+
+    app_url = "https://wandb.ai"
+
+    def __init__(self, runs):
+        self.runs = runs
+        self.requests = []
+
+    def artifacts_page(self, run, after, first):
+        total = run["artifacts"]
+        return {
+            "edges": [
+                {
+                    "node": {
+                        "id": f"{run['id']}-a{i}",
+                        "versionIndex": i,
+                        "description": None,
+                        "createdAt": "2025-01-01T00:00:00",
+                        "artifactType": {"name": "model"},
+                        "artifactSequence": {
+                            "name": f"{run['id']}-model",
+                            "project": {"entityName": "e", "name": "p"},
+                        },
+                        "aliases": [{"alias": "latest"}] if i == total - 1 else [],
+                    }
+                }
+                for i in range(after, min(after + first, total))
+            ],
+            "pageInfo": {"endCursor": str(after + first), "hasNextPage": after + first < total},
+        }
+
+    def execute(self, query, variable_values):
+        operation = query.definitions[0]
+        self.requests.append((operation.name.value, variable_values))
+        if operation.name.value == "BulkRuns":
+            return self.bulk_runs(variable_values)
+        return self.runs_batch(operation)
+
+    def bulk_runs(self, variables):
+        start = int(variables["cursor"] or 0)
+        end = start + variables["perPage"]
+        nodes = []
+        for run in self.runs[start:end]:
+            node = {
+                "name": run["id"],
+                "displayName": f"run {run['id']}",
+                "state": "finished",
+                "config": json.dumps(run["config"]),
+                "summaryMetrics": json.dumps({"loss": 0.5}),
+            }
+            if variables["withArtifacts"]:
+                node["outputArtifacts"] = self.artifacts_page(
+                    run, 0, variables["artifactsPerRun"]
+                )
+            nodes.append({"node": node})
+        return {
+            "project": {
+                "runs": {
+                    "edges": nodes,
+                    "pageInfo": {"endCursor": str(end), "hasNextPage": end < len(self.runs)},
+                }
+            }
+        }
+
+    def runs_batch(self, operation):
+        runs = {run["id"]: run for run in self.runs}
+        project = {}
+        for selection in operation.selection_set.selections[0].selection_set.selections:
+            run = runs[selection.arguments[0].value.value]
+            field = selection.selection_set.selections[0]
+            arguments = {argument.name.value: literal(argument.value) for argument in field.arguments}
+            if field.name.value == "outputArtifacts":
+                node = {
+                    "outputArtifacts": self.artifacts_page(
+                        run, int(arguments["after"]), int(arguments["first"])
+                    )
+                }
+            else:
+                url = f"https://files.example/{run['id']}/{arguments['names'][0]}"
+                node = {"files": {"edges": [{"node": {"url": url}}]}}
+            project[selection.alias.value] = node
+        return {"project": project}
+
+
+class TestListRunsBulk(unittest.TestCase):
+    """Tests for list_runs in bulk mode."""
+
+    def setUp(self):
+        self.client = FakeWandbClient(
+            [
+                {"id": "r0", "config": {"lr": {"value": 0.1, "desc": None}}, "artifacts": 1},
+                {"id": "r1", "config": {"lr": {"value": 0.2, "desc": None}}, "artifacts": 5},
+                {"id": "r2", "config": {"lr": {"value": 0.3, "desc": None}}, "artifacts": 0},
+                {"id": "r3", "config": {"lr": {"value": 0.1, "desc": None}, "bs": 16}, "artifacts": 3},
+                {"id": "r4", "config": {"lr": {"value": 0.4, "desc": None}}, "artifacts": 2},
+            ]
+        )
+        self.api = Mock(client=self.client, default_entity="e")
+        self.client._client = Mock()
+        self.session = self.client._client.transport.session
+        self.session.get.side_effect = lambda url, timeout: Mock(
+            content=json.dumps({"host": url.split("/")[3]}).encode()
+        )
+        patcher = patch.object(wandb_api_tool.wandb, "Api", return_value=self.api)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_run_config(self):
+        """Test that configs are decoded like wandb's Run.config."""
+        config = json.dumps(
+            {"lr": {"value": 0.1, "desc": None}, "_wandb": {"value": {}}, "raw": 3}
+        )
+        assert wandb_api_tool._run_config(config) == {"lr": 0.1, "raw": 3}
+        assert wandb_api_tool._run_config(None) == {}
+
+    def test_pagination(self):
+        """Test that every page of runs is fetched with the previous page's cursor."""
+        runs = wandb_api_tool.list_runs_bulk("e/p", {"state": "finished"}, per_page=2)
+
+        assert [run["id"] for run in runs] == ["r0", "r1", "r2", "r3", "r4"]
+        assert [variables["cursor"] for _, variables in self.client.requests] == [None, "2", "4"]
+        assert json.loads(self.client.requests[0][1]["filters"]) == {"state": "finished"}
+        assert runs[3]["config"] == {"lr": 0.1, "bs": 16}
+        assert runs[3]["path"] == ["e", "p", "r3"]
+        assert runs[3]["url"] == "https://wandb.ai/e/p/runs/r3"
+        assert runs[3]["metadata"] is None and runs[3]["artifacts"] == []
+
+    def test_artifact_overflow_is_batched(self):
+        """Test that artifacts beyond the first page are listed for several runs per request."""
+        runs = asyncio.run(
+            wandb_api_tool.list_runs("e/p", bulk=True, include_artifacts=True)
+        )
+        assert [len(run["artifacts"]) for run in runs] == [1, 5, 0, 3, 2]
+
+        self.client.requests.clear()
+        runs = wandb_api_tool.list_runs_bulk(
+            "e/p", include_artifacts=True, per_page=10, artifacts_per_run=2
+        )
+
+        assert [len(run["artifacts"]) for run in runs] == [1, 5, 0, 3, 2]
+        assert [artifact["id"] for artifact in runs[1]["artifacts"]] == [
+            f"r1-a{i}" for i in range(5)
+        ]
+        artifact = runs[1]["artifacts"][4]
+        assert artifact["name"] == "r1-model:v4"
+        assert artifact["url"] == "https://wandb.ai/e/p/artifacts/model/r1-model/v4"
+        assert artifact["aliases"] == ["latest"]
+        # One page of runs, then r1 and r3 together, then r1 alone
+        assert [name for name, _ in self.client.requests] == ["BulkRuns", "RunsBatch", "RunsBatch"]
+        self.api.run.assert_not_called()
+
+    def test_filter_runs_fetches_metadata_of_returned_runs(self):
+        """Test that run metadata is only downloaded for the runs that are returned."""
+        runs = asyncio.run(
+            wandb_api_tool.filter_runs_by_single_param_difference("e/p", "lr")
+        )
+
+        assert [run["id"] for run in runs] == ["r0", "r1", "r2", "r4"]
+        assert [run["config"]["lr"] for run in runs] == [0.1, 0.2, 0.3, 0.4]
+        assert runs[0]["metadata"] == {"host": "r0"}
+        downloaded = sorted(call.args[0] for call in self.session.get.call_args_list)
+        assert downloaded == [
+            f"https://files.example/{run_id}/wandb-metadata.json"
+            for run_id in ("r0", "r1", "r2", "r4")
+        ]
+        # The file URLs of the returned runs are queried together
+        assert [name for name, _ in self.client.requests] == ["BulkRuns", "RunsBatch"]
+
+
+if __name__ == "__main__":
+    unittest.main()
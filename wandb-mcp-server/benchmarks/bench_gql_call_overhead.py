@@ -0,0 +1,74 @@
+"""
+Benchmark the per-call overhead of query_paginated_wandb_gql for repeated queries.
+
+Each call fetches a single small page from the local fake GraphQL server of
+`bench_gql_pagination.py`, without latency and with logging disabled, so the
+timings are dominated by client construction, connection setup and query
+parsing and rewriting. Calls with the shared API client and prepared query
+caches cleared before every call are compared to calls reusing them.
+
+Usage:
+    WANDB_API_KEY=... python benchmarks/bench_gql_call_overhead.py [--calls 200]
+
+Importing `wandb_mcp_server` needs WANDB_API_KEY to be set, though no requests
+leave the machine: `wandb.Api` is pointed at the fake server with WANDB_BASE_URL.
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from bench_gql_pagination import QUERY, make_runs, start_fake_server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=5)
+    args = parser.parse_args()
+
+    server = start_fake_server(make_runs(args.page_size, payload_keys=5), latency=0)
+    os.environ["WANDB_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # Rendering the per-call log records would otherwise dominate the timings
+    logging.disable(logging.CRITICAL)
+
+    # Imported after WANDB_BASE_URL is set
+    from wandb_mcp_server.mcp_tools.query_wandb_gql import (
+        clear_query_cache,
+        query_paginated_wandb_gql,
+    )
+    from wandb_mcp_server.mcp_tools.tools_utils import clear_wandb_api_pool
+
+    def call() -> None:
+        result = query_paginated_wandb_gql(
+            QUERY,
+            {"entity": "entity", "project": "project"},
+            max_items=args.page_size,
+            items_per_page=args.page_size,
+        )
+        assert len(result["project"]["runs"]["edges"]) == args.page_size
+
+    timings = {}
+    for label, clear in (("cold", True), ("cached", False)):
+        call()  # Warm up the connection to the fake server
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            if clear:
+                clear_wandb_api_pool()
+                clear_query_cache()
+            call()
+        timings[label] = (time.perf_counter() - start) / args.calls * 1000
+
+    print(f"Milliseconds per call over {args.calls} calls\n")
+    print(f"{'cold':>8}: {timings['cold']:7.2f}")
+    print(
+        f"{'cached':>8}: {timings['cached']:7.2f}  "
+        f"{timings['cold'] / timings['cached']:5.2f}x"
+    )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
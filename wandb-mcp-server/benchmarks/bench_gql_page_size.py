@@ -0,0 +1,85 @@
+"""
+Benchmark automatic page sizing in query_paginated_wandb_gql.
+
+The local fake GraphQL server of `bench_gql_pagination.py` answers after a
+fixed latency plus a delay proportional to the response size, like a server
+serializing JSON blobs. A light query, selecting only run IDs and names, and a
+heavy one, with `config` and `summaryMetrics`, are paginated with the tool's
+former fixed page size and with pages sized automatically from the selection
+set and the observed responses.
+
+Usage:
+    WANDB_API_KEY=... python benchmarks/bench_gql_page_size.py [--num-runs 2000]
+
+Importing `wandb_mcp_server` needs WANDB_API_KEY to be set, though no requests
+leave the machine: `wandb.Api` is pointed at the fake server with WANDB_BASE_URL.
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from bench_gql_pagination import QUERY, make_runs, start_fake_server
+
+LIGHT_QUERY = QUERY.replace("state config summaryMetrics", "")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-runs", type=int, default=2000)
+    parser.add_argument("--fixed-page-size", type=int, default=20)
+    parser.add_argument("--payload-keys", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-per-kb", type=float, default=0.0005)
+    parser.add_argument("--target-page-latency", type=float, default=1.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(
+        f"{args.num_runs} runs, {args.latency * 1000:.0f} ms + "
+        f"{args.latency_per_kb * 1000:.2f} ms/KiB server latency\n"
+    )
+    print(f"{'query':>6} {'pages':>12}: {'requests':>8} {'seconds':>8}")
+    for label, query, payload_keys in (
+        ("light", LIGHT_QUERY, 0),
+        ("heavy", QUERY, args.payload_keys),
+    ):
+        server = start_fake_server(
+            make_runs(args.num_runs, payload_keys), args.latency, args.latency_per_kb
+        )
+        os.environ["WANDB_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+
+        # Imported after WANDB_BASE_URL is set
+        from wandb_mcp_server.mcp_tools.query_wandb_gql import (
+            query_paginated_wandb_gql,
+        )
+        from wandb_mcp_server.mcp_tools.tools_utils import clear_wandb_api_pool
+
+        clear_wandb_api_pool()
+        timings = {}
+        for mode, page_size in (("fixed", args.fixed_page_size), ("automatic", None)):
+            requests_before = server.requests
+            start = time.perf_counter()
+            result = query_paginated_wandb_gql(
+                query,
+                {"entity": "entity", "project": "project"},
+                max_items=args.num_runs,
+                items_per_page=page_size,
+                target_page_latency=args.target_page_latency,
+                bypass_cache=True,
+            )
+            timings[mode] = time.perf_counter() - start
+            edges = result["project"]["runs"]["edges"]
+            assert len(edges) == args.num_runs, len(edges)
+            print(
+                f"{label:>6} {mode:>12}: {server.requests - requests_before:8d} "
+                f"{timings[mode]:8.3f}"
+            )
+        speedup = timings["fixed"] / timings["automatic"]
+        print(f"{'':>6} {'speedup':>12}: {speedup:17.2f}x")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
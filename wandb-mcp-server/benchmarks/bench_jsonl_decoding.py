@@ -0,0 +1,108 @@
+"""
+Benchmark JSON decoders on Weave `/calls/stream_query` JSONL payloads.
+
+Compares the decoders available to `WeaveApiClient` against the previous
+`line.decode("utf-8")` + `json.loads` path.
+
+Usage:
+    WANDB_API_KEY=... python benchmarks/bench_jsonl_decoding.py [recorded.jsonl] [--repeat 5]
+
+Importing `wandb_mcp_server` needs WANDB_API_KEY to be set, though no requests are made.
+
+A recorded payload can be captured with e.g.
+`curl -u :$WANDB_API_KEY -d @query.json https://trace.wandb.ai/calls/stream_query > recorded.jsonl`.
+Without one, a synthetic payload of LLM-style calls is generated.
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+from wandb_mcp_server.weave_api.decoders import DECODERS
+
+
+def synthetic_lines(num_traces: int, seed: int = 0) -> List[bytes]:
+    """Generate JSONL lines shaped like Weave calls with chat inputs and outputs."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    words = ["weave", "trace", "model", "token", "latency", "eval", "prompt", "score"]
+    lines = []
+    for i in range(num_traces):
+        started_at = start + timedelta(seconds=i)
+        content = " ".join(rng.choice(words) for _ in range(rng.randint(20, 400)))
+        call = {
+            "id": f"0195{i:012x}",
+            "project_id": "entity/project",
+            "op_name": "weave:///entity/project/op/openai.chat.completions.create:abc",
+            "trace_id": f"trace{i // 5}",
+            "parent_id": None if i % 5 == 0 else f"0195{i - 1:012x}",
+            "started_at": started_at.isoformat(),
+            "ended_at": (started_at + timedelta(milliseconds=850)).isoformat(),
+            "inputs": {
+                "model": "gpt-4o",
+                "messages": [
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": content},
+                ],
+                "temperature": 0.2,
+            },
+            "output": {
+                "choices": [{"message": {"role": "assistant", "content": content}}]
+            },
+            "summary": {
+                "usage": {"gpt-4o": {"prompt_tokens": 120, "completion_tokens": 80}},
+                "weave": {"status": "success", "latency_ms": 850},
+            },
+            "attributes": {"weave": {"client_version": "0.51.59"}},
+        }
+        lines.append(json.dumps(call).encode("utf-8"))
+    return lines
+
+
+def time_decoder(decode: Callable, lines: List[bytes], repeat: int) -> float:
+    """Return the best wall time in seconds to decode all lines."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            decode(line)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("payload", nargs="?", help="Recorded JSONL payload")
+    parser.add_argument("--num-traces", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload, "rb") as f:
+            lines = [line.rstrip(b"\r\n") for line in f if line.strip()]
+    else:
+        lines = synthetic_lines(args.num_traces)
+
+    total_mb = sum(len(line) for line in lines) / 1e6
+    print(f"{len(lines)} lines, {total_mb:.1f} MB, best of {args.repeat}\n")
+
+    candidates = {
+        "json (decode + loads)": lambda line: json.loads(line.decode("utf-8"))
+    }
+    candidates.update(DECODERS)
+
+    baseline = None
+    for name, decode in candidates.items():
+        elapsed = time_decoder(decode, lines, args.repeat)
+        baseline = baseline or elapsed
+        print(
+            f"{name:>22}: {elapsed * 1000:8.1f} ms  {total_mb / elapsed:7.1f} MB/s  "
+            f"{baseline / elapsed:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark trace truncation on deep LLM input payloads.
+
+Compares the iterative copy-on-write `truncate_value` against the previous
+recursive implementation, which rebuilt every container, and times fitting
+the traces into a total response budget with `fit_to_budget`.
+
+Usage:
+    WANDB_API_KEY=... python benchmarks/bench_truncation.py [--num-traces 500] [--repeat 5]
+
+Importing `wandb_mcp_server` needs WANDB_API_KEY to be set, though no requests are made.
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from wandb_mcp_server.weave_api.truncation import fit_to_budget, truncate_value
+
+
+def recursive_truncate_value(value: Any, max_length: int = 200) -> Any:
+    """The previous recursive implementation, copying every container."""
+    if value is None:
+        return None
+    if max_length == 0:
+        if isinstance(value, dict):
+            return {}
+        if isinstance(value, list):
+            return []
+        if isinstance(value, (int, float)):
+            return 0
+        return ""
+    if isinstance(value, str):
+        return value[:max_length] + "..." if len(value) > max_length else value
+    if isinstance(value, dict):
+        if "__type__" in value or "_type" in value:
+            if max_length < 50:
+                return {}
+            return {"type": value.get("__type__") or value.get("_type")}
+        return {k: recursive_truncate_value(v, max_length) for k, v in value.items()}
+    if isinstance(value, list):
+        return [recursive_truncate_value(v, max_length) for v in value]
+    if isinstance(value, (int, float, bool)):
+        return value
+    return str(value)[:max_length]
+
+
+def synthetic_traces(num_traces: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Generate calls with long chat histories and nested tool-call arguments."""
+    rng = random.Random(seed)
+    words = ["weave", "trace", "model", "token", "latency", "eval", "prompt", "score"]
+
+    def text(low: int, high: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(rng.randint(low, high)))
+
+    def nested_arguments(depth: int) -> Dict[str, Any]:
+        node: Dict[str, Any] = {"query": text(5, 50)}
+        root = node
+        for _ in range(depth):
+            node["context"] = {"documents": [text(20, 200)], "filters": {"k": 5}}
+            node = node["context"]
+        return root
+
+    traces = []
+    for i in range(num_traces):
+        messages = [{"role": "system", "content": text(50, 150)}]
+        for _ in range(rng.randint(5, 30)):
+            messages.append({"role": "user", "content": text(10, 300)})
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": text(10, 300),
+                    "tool_calls": [
+                        {
+                            "type": "function",
+                            "function": {
+                                "name": "search",
+                                "arguments": nested_arguments(rng.randint(2, 20)),
+                            },
+                        }
+                    ],
+                }
+            )
+        traces.append(
+            {
+                "id": f"0195{i:012x}",
+                "op_name": "weave:///entity/project/op/openai.chat.completions.create:abc",
+                "inputs": {"model": "gpt-4o", "messages": messages, "temperature": 0.2},
+                "output": {
+                    "choices": [
+                        {"message": {"role": "assistant", "content": text(20, 400)}}
+                    ]
+                },
+                "attributes": {"weave": {"client_version": "0.51.59"}},
+            }
+        )
+    return traces
+
+
+def best_time(fn: Callable[[], Any], repeat: int) -> float:
+    """Return the best wall time in seconds of `repeat` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-traces", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--budget-fraction",
+        type=float,
+        default=0.5,
+        help="Response budget as a fraction of the untruncated size",
+    )
+    args = parser.parse_args()
+
+    traces = synthetic_traces(args.num_traces)
+    total_bytes = len(json.dumps(traces, ensure_ascii=False))
+    budget = int(total_bytes * args.budget_fraction)
+    print(f"{len(traces)} traces, {total_bytes / 1e6:.1f} MB, best of {args.repeat}\n")
+
+    for max_length in (10_000, 200, 20):
+        results = {}
+        for name, truncate in (
+            ("recursive", recursive_truncate_value),
+            ("iterative", truncate_value),
+        ):
+            results[name] = best_time(
+                lambda: [truncate(trace, max_length) for trace in traces], args.repeat
+            )
+        print(
+            f"max_length={max_length:>6}: recursive {results['recursive'] * 1000:8.1f} ms  "
+            f"iterative {results['iterative'] * 1000:8.1f} ms  "
+            f"{results['recursive'] / results['iterative']:5.2f}x"
+        )
+
+    elapsed = best_time(lambda: fit_to_budget(traces, budget), args.repeat)
+    fitted, limit = fit_to_budget(traces, budget)
+    print(
+        f"\nfit_to_budget({budget} bytes): {elapsed * 1000:8.1f} ms, "
+        f"string limit {limit}, {len(json.dumps(fitted, ensure_ascii=False))} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,33 @@
 import base64
 import json
 import os
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import requests
 
+from wandb_mcp_server.weave_api.decoders import get_decoder
+from wandb_mcp_server.weave_api.processors import MetadataAccumulator
 from wandb_mcp_server.weave_api.query_builder import QueryBuilder
+from wandb_mcp_server.weave_api.result_cache import (
+    canonical_request_key,
+    get_result_cache,
+)
 from wandb_mcp_server.mcp_tools.tools_utils import get_retry_session
 from wandb_mcp_server.utils import get_rich_logger
 
 logger = get_rich_logger(__name__)
 
+# Values of summary.weave.status counted by `count_traces_multi`
+STATUS_VALUES = ("success", "error", "running", "descendant_error")
+
+# Fields `count_traces_multi` can group counts by
+GROUP_BY_FIELDS = ("status", "op_name")
+
+# Most recent matching traces scanned for op name counts
+OP_NAME_SCAN_LIMIT = 10_000
+
 COUNT_WEAVE_TRACES_TOOL_DESCRIPTION = """count Weave traces and return the total storage \
 size in bytes for the given filters.
 
@@ -62,7 +79,8 @@ If user question contains:
 </tool_choice_guidance>
 
 Returns the total number of traces in a project and the number of root
-(i.e. "parent" or top-level) traces.
+(i.e. "parent" or top-level) traces, and optionally counts grouped by status
+or op name, all computed concurrently in a single tool call.
 
 This is more efficient than query_trace_tool when you only need the count.
 This can be useful to understand how many traces are in a project before
@@ -91,14 +109,30 @@ filters : Dict[str, Any], optional
             (e.g., {"token_count": {"$gt": 100}}).
         - has_exception: Boolean to filter traces with/without exceptions
         - trace_roots_only: Boolean to filter for only top-level (aka parent) traces
+group_by : List[str], optional
+    Also count the traces matching `filters` per group. Supported fields:
+        - "status": counts per status ('success', 'error', 'running', 'descendant_error')
+        - "op_name": counts per op name, e.g. {"Evaluation.evaluate": 3, "predict": 150}.
+            Only the 10,000 most recent matching traces are scanned; when more match,
+            `group_sample_sizes` reports the number of traces the counts cover.
+bypass_cache : bool, optional
+    Identical counts made within the last minute are answered from an in-memory cache.
+    Set to True to fetch fresh counts, e.g. when new traces are expected. Defaults to False.
 
 Returns
 -------
-int
-    The number of traces matching the query parameters.
+str
+    JSON with `total_count` and `root_traces_count`, plus `group_counts` keyed by
+    field when `group_by` is given, and `group_sample_sizes` for sampled groups.
 
 Examples
 --------
+>>> # Count traces per status and per op in one call
+>>> count_weave_traces_tool(
+...     entity_name="my-team",
+...     project_name="my-project",
+...     group_by=["status", "op_name"]
+... )
 >>> # Count failed traces
 >>> count = count_traces(
 ...     entity_name="my-team",
@@ -119,6 +153,7 @@ def count_traces(
     project_name: str,
     filters: dict = None,
     request_timeout: int = 30,
+    bypass_cache: bool = False,
 ) -> int:
     """Count the number of traces matching the given filters.
 
@@ -150,6 +185,9 @@ def count_traces(
             - trace_roots_only: Boolean to filter for only top-level (aka parent) traces
     request_timeout : int, optional
         Timeout for the HTTP request in seconds. Defaults to 30.
+    bypass_cache : bool, optional
+        Skip the in-process result cache and query the server, refreshing the
+        cached count. Defaults to False.
 
     Returns
     -------
@@ -174,114 +212,285 @@ def count_traces(
     ...     }
     ... )
     """
-    project_id = f"{entity_name}/{project_name}"
+    server_url, headers = _weave_request_context()
+    request_body = _count_request_body(entity_name, project_name, filters)
+    return _cached_count(
+        f"{server_url}/calls/query_stats",
+        headers,
+        request_body,
+        request_timeout,
+        bypass_cache=bypass_cache,
+    )
 
-    api_key = os.environ.get("WANDB_API_KEY")
-    if not api_key:
-        logger.error("WANDB_API_KEY not found in environment variables.")
-        raise ValueError("WANDB_API_KEY is required to query Weave traces count.")
 
-    request_body: Dict[str, Any] = {"project_id": project_id}
-    filter_payload: Dict[
-        str, Any
-    ] = {}  # For fields that go into the top-level 'filter' object
-    complex_filters_for_query_expr: Dict[
-        str, Any
-    ] = {}  # For fields that go into query.$expr
-
-    if filters:
-        # Keys that belong inside the 'filter' object in the request body
-        # as per https://weave-docs.wandb.ai/reference/service-api/calls-query-stats-calls-query_stats-post
-        direct_filter_keys = {
-            "op_names",
-            "op_name",  # op_name will be converted to op_names list
-            "input_refs",
-            "output_refs",
-            "parent_ids",
-            "trace_ids",
-            "trace_id",  # trace_id will be converted to trace_ids list
-            "call_ids",
-            "trace_roots_only",
-            "wb_user_ids",
-            "wb_run_ids",
+def count_traces_multi(
+    entity_name: str,
+    project_name: str,
+    filters: Optional[Dict[str, Any]] = None,
+    variants: Optional[Dict[str, Optional[Dict[str, Any]]]] = None,
+    group_by: Optional[List[str]] = None,
+    request_timeout: int = 30,
+    bypass_cache: bool = False,
+    max_workers: int = 8,
+    op_name_scan_limit: int = OP_NAME_SCAN_LIMIT,
+) -> Dict[str, Any]:
+    """Compute several trace counts concurrently over one pooled session.
+
+    Each variant's filters are merged over the base `filters` and counted
+    with its own `/calls/query_stats` request; group-by counts are computed
+    for the base filters. All requests run concurrently and share a single
+    retry session, and each count goes through the result cache like
+    `count_traces`.
+
+    Parameters
+    ----------
+    entity_name : str
+        The Weights & Biases entity name (team or username).
+    project_name : str
+        The Weights & Biases project name.
+    filters : Dict[str, Any], optional
+        Base filter conditions, as for `count_traces`.
+    variants : Dict[str, Dict[str, Any]], optional
+        Named extra filter conditions, e.g. `{"roots": {"trace_roots_only": True}}`.
+        Defaults to a single `"total"` variant without extra filters.
+    group_by : List[str], optional
+        Fields to count by, out of `GROUP_BY_FIELDS`. Status counts use one
+        count request per status in `STATUS_VALUES`, within the `status`
+        filter (a status or a list of statuses) if there is one. Op name
+        counts stream only the `op_name` column of the most recent matching
+        traces, up to `op_name_scan_limit` of them.
+    request_timeout : int, optional
+        Timeout for each HTTP request in seconds. Defaults to 30.
+    bypass_cache : bool, optional
+        Skip the in-process result cache, refreshing the cached counts.
+    max_workers : int, optional
+        Maximum number of requests in flight at once. Defaults to 8.
+    op_name_scan_limit : int, optional
+        Maximum number of traces scanned for op name counts. Defaults to
+        `OP_NAME_SCAN_LIMIT`.
+
+    Returns
+    -------
+    Dict[str, Any]
+        `{"counts": {variant: count}, "group_counts": {field: {value: count}},
+        "group_sample_sizes": {field: scanned}}`, with `group_counts` empty
+        unless `group_by` is given. `group_sample_sizes` lists the groups
+        whose scan stopped at its limit, so more traces may match.
+
+    Raises
+    ------
+    ValueError
+        If a `group_by` field is not supported, or `max_workers` or
+        `op_name_scan_limit` is less than 1.
+    """
+    unsupported = set(group_by or []) - set(GROUP_BY_FIELDS)
+    if unsupported:
+        raise ValueError(
+            f"Unsupported group_by fields: {sorted(unsupported)}. "
+            f"Supported fields are {list(GROUP_BY_FIELDS)}."
+        )
+    if max_workers < 1 or op_name_scan_limit < 1:
+        raise ValueError("max_workers and op_name_scan_limit must be at least 1")
+
+    server_url, headers = _weave_request_context()
+    stats_url = f"{server_url}/calls/query_stats"
+    base_filters = dict(filters or {})
+    session = get_retry_session()
+
+    def count(extra_filters: Optional[Dict[str, Any]]) -> int:
+        request_body = _count_request_body(
+            entity_name, project_name, {**base_filters, **(extra_filters or {})}
+        )
+        return _cached_count(
+            stats_url,
+            headers,
+            request_body,
+            request_timeout,
+            bypass_cache=bypass_cache,
+            session=session,
+        )
+
+    def count_by_op_name() -> Tuple[Dict[str, int], int]:
+        request_body = {
+            **_count_request_body(entity_name, project_name, base_filters),
+            "sort_by": [{"field": "started_at", "direction": "desc"}],
+            "limit": op_name_scan_limit,
         }
+        stream_url = f"{server_url}/calls/stream_query"
+        cache_key = canonical_request_key(
+            request_body, endpoint=stream_url, group_by="op_name"
+        )
+        return get_result_cache().get_or_compute(
+            cache_key,
+            lambda: _stream_op_name_counts(
+                session, stream_url, headers, request_body, request_timeout
+            ),
+            bypass=bypass_cache,
+        )
 
-        temp_op_names = []
-        if "op_name" in filters:
-            temp_op_names.append(filters["op_name"])
-        if "op_names" in filters:
-            val = filters["op_names"]
-            if isinstance(val, list):
-                temp_op_names.extend(val)
-            else:
-                temp_op_names.append(val)
-        if temp_op_names:
-            filter_payload["op_names"] = list(set(temp_op_names))
-
-        temp_trace_ids = []
-        if "trace_id" in filters:
-            temp_trace_ids.append(filters["trace_id"])
-        if "trace_ids" in filters:
-            val = filters["trace_ids"]
-            if isinstance(val, list):
-                temp_trace_ids.extend(val)
+    variants = variants if variants is not None else {"total": {}}
+    tasks: Dict[Tuple[str, str], Callable[[], Any]] = {
+        ("counts", name): partial(count, extra) for name, extra in variants.items()
+    }
+    if "status" in (group_by or []):
+        allowed_statuses = _filtered_statuses(base_filters.get("status"))
+        for status in STATUS_VALUES:
+            if allowed_statuses is not None and status not in allowed_statuses:
+                # Excluded by the status filter itself, no request needed
+                tasks[("status", status)] = lambda: 0
             else:
-                temp_trace_ids.append(val)
-        if temp_trace_ids:
-            filter_payload["trace_ids"] = list(set(temp_trace_ids))
-
-        # Handle other direct filter keys
-        for key in [
-            "input_refs",
-            "output_refs",
-            "parent_ids",
-            "call_ids",
-            "wb_user_ids",
-            "wb_run_ids",
-        ]:
-            if key in filters:
-                value = filters[key]
-                filter_payload[key] = [value] if not isinstance(value, list) else value
-
-        if "trace_roots_only" in filters:
-            filter_payload["trace_roots_only"] = filters["trace_roots_only"]
-        # Per docs, trace_roots_only is a boolean, not a list.
-        # If not in filters, it's omitted, API default (false) should apply.
-
-        # Populate complex_filters_for_query_expr for remaining keys
-        for key, value in filters.items():
-            # Skip keys already handled in direct_filter_keys or their singular versions
-            if key not in direct_filter_keys and key not in ["op_name", "trace_id"]:
-                complex_filters_for_query_expr[key] = value
-
-    # Add the constructed filter_payload to the main request_body if it's not empty
-    if filter_payload:
-        request_body["filter"] = filter_payload
-
-    # Build the query expression from remaining complex filters
-    if complex_filters_for_query_expr:
-        query_expr_obj = QueryBuilder.build_query_expression(
-            complex_filters_for_query_expr
-        )
-        if query_expr_obj:
-            dumped_query = query_expr_obj.model_dump(by_alias=True, exclude_none=True)
-            if dumped_query and dumped_query.get("$expr"):
-                request_body["query"] = dumped_query
+                tasks[("status", status)] = partial(count, {"status": status})
+    if "op_name" in (group_by or []):
+        tasks[("op_name", "")] = count_by_op_name
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+            futures = {key: executor.submit(task) for key, task in tasks.items()}
+            results = {key: future.result() for key, future in futures.items()}
+    finally:
+        session.close()
+
+    group_counts: Dict[str, Dict[str, int]] = {}
+    group_sample_sizes: Dict[str, int] = {}
+    for (kind, value), result in results.items():
+        if kind == "status":
+            group_counts.setdefault("status", {})[value] = result
+        elif kind == "op_name":
+            group_counts["op_name"], scanned = result
+            if scanned >= op_name_scan_limit:
+                group_sample_sizes["op_name"] = scanned
+    return {
+        "counts": {
+            name: result
+            for (kind, name), result in results.items()
+            if kind == "counts"
+        },
+        "group_counts": group_counts,
+        "group_sample_sizes": group_sample_sizes,
+    }
+
+
+def _filtered_statuses(status_filter: Any) -> Optional[Set[str]]:
+    """Statuses allowed by a `status` filter, or None if it allows any status."""
+    if isinstance(status_filter, str):
+        return {status_filter.lower()}
+    if isinstance(status_filter, (list, tuple, set)):
+        return {str(status).lower() for status in status_filter}
+    return None
+
+
+def _weave_request_context() -> Tuple[str, Dict[str, str]]:
+    """Return the Weave server URL and the authenticated JSON request headers.
+
+    Raises:
+        ValueError: If WANDB_API_KEY is not set.
+    """
+    api_key = os.environ.get("WANDB_API_KEY")
+    if not api_key:
+        logger.error("WANDB_API_KEY not found in environment variables.")
+        raise ValueError("WANDB_API_KEY is required to query Weave traces count.")
 
-    # Execute the HTTP query
     weave_server_url = os.environ.get(
         "WEAVE_TRACE_SERVER_URL", "https://trace.wandb.ai"
     )
-    url = f"{weave_server_url}/calls/query_stats"
-
     auth_token = base64.b64encode(f":{api_key}".encode()).decode()
     headers = {
         "Content-Type": "application/json",
         "Accept": "application/json",  # /calls/query_stats returns application/json
         "Authorization": f"Basic {auth_token}",
     }
+    return weave_server_url, headers
+
+
+def _count_request_body(
+    entity_name: str, project_name: str, filters: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Build a `/calls/query_stats` request body for the given filters."""
+    # Compile filters exactly as trace queries do, pushing what we can into the
+    # cheap CallsFilter fields before falling back to a query expression
+    request_body: Dict[str, Any] = {"project_id": f"{entity_name}/{project_name}"}
+    calls_filter, query = QueryBuilder.compile_filters(filters)
+    if calls_filter:
+        request_body["filter"] = calls_filter
+    if query:
+        request_body["query"] = query
+    return request_body
+
+
+def _cached_count(
+    url: str,
+    headers: Dict[str, str],
+    request_body: Dict[str, Any],
+    request_timeout: int,
+    bypass_cache: bool = False,
+    session: Optional[requests.Session] = None,
+) -> int:
+    """Return a count, unless the same count was fetched recently."""
+    cache_key = canonical_request_key(request_body, endpoint=url)
+    return get_result_cache().get_or_compute(
+        cache_key,
+        lambda: _post_query_stats(url, headers, request_body, request_timeout, session),
+        bypass=bypass_cache,
+    )
 
-    session = get_retry_session()
+
+def _stream_op_name_counts(
+    session: requests.Session,
+    url: str,
+    headers: Dict[str, str],
+    request_body: Dict[str, Any],
+    request_timeout: int,
+) -> Tuple[Dict[str, int], int]:
+    """Stream only the op names of the matching traces and count them by op.
+
+    Returns:
+        The counts per op, most frequent first, and the number of traces scanned.
+    """
+    stream_body = {
+        **request_body,
+        "columns": ["op_name"],
+        "include_costs": False,
+        "include_feedback": False,
+    }
+    response = session.post(
+        url,
+        headers={**headers, "Accept": "application/jsonl"},
+        data=json.dumps(stream_body),
+        timeout=request_timeout,
+        stream=True,
+    )
+    if response.status_code != 200:
+        error_msg = (
+            f"Error querying Weave op name counts: {response.status_code} - "
+            f"{response.text}"
+        )
+        logger.error(error_msg)
+        raise Exception(error_msg)
+
+    decode_json = get_decoder()
+    op_counts: Dict[str, int] = {}
+    scanned = 0
+    for line in response.iter_lines():
+        if not line:
+            continue
+        scanned += 1
+        op = MetadataAccumulator.base_op_name(decode_json(line).get("op_name"))
+        if op is not None:
+            op_counts[op] = op_counts.get(op, 0) + 1
+    counts = dict(sorted(op_counts.items(), key=lambda item: item[1], reverse=True))
+    return counts, scanned
+
+
+def _post_query_stats(
+    url: str,
+    headers: Dict[str, str],
+    request_body: Dict[str, Any],
+    request_timeout: int,
+    session: Optional[requests.Session] = None,
+) -> int:
+    """POST a count request to /calls/query_stats and return the count."""
+    project_id = request_body["project_id"]
+    session = session or get_retry_session()
 
     logger.debug(f"Posting to {url} with body: {json.dumps(request_body)}")
 
@@ -0,0 +1,144 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from wandb_mcp_server.utils import get_rich_logger
+from wandb_mcp_server.weave_api.export import TraceExporter
+from wandb_mcp_server.weave_api.models import ExportResult
+from wandb_mcp_server.weave_api.service import TraceService
+
+logger = get_rich_logger(__name__)
+
+_trace_exporter: Optional[TraceExporter] = None
+
+EXPORT_WEAVE_TRACES_TOOL_DESCRIPTION = """
+Export Weave traces to a local file (NDJSON, Parquet or Arrow IPC) instead of returning them.
+
+Use this tool when a user wants to download, save, or analyse a large number of Weave traces
+(thousands or more) outside of the conversation, e.g. in pandas, DuckDB or a notebook. Traces are
+streamed from the Weave API straight to disk in batches, so exports of any size are cheap for the
+LLM context window: only the file path and summary metadata (trace count, time range, status
+counts, op distribution and estimated token counts) are returned.
+
+For inspecting a handful of traces in the conversation use `query_weave_traces_tool` instead.
+For runs, metrics, experiments or artifacts use `query_wandb_tool`.
+
+Parameters
+----------
+entity_name : str
+    The Weights & Biases entity name (team or username)
+project_name : str
+    The Weights & Biases project name
+path : str, optional
+    Output file path. Defaults to a new file in the system temp directory.
+format : str, optional
+    One of "ndjson" (one JSON trace per line), "parquet" or "arrow" (Arrow IPC file).
+    Parquet and Arrow store nested values such as `inputs` and `output` as JSON strings.
+    Defaults to "ndjson".
+filters : dict, optional
+    Same filter conditions as `query_weave_traces_tool`, e.g. `{"trace_roots_only": True}`,
+    `{"op_name_contains": "Evaluation.evaluate"}` or `{"status": "error"}`.
+sort_by : str, optional
+    Field to sort by. Defaults to "started_at".
+sort_direction : str, optional
+    Sort direction ("asc" or "desc"). Defaults to "desc".
+limit : int, optional
+    Maximum number of traces to export. Defaults to all matching traces.
+include_costs : bool, optional
+    Include tracked api cost information. Defaults to True.
+include_feedback : bool, optional
+    Include weave annotations (human labels/feedback). Defaults to True.
+columns : list of str, optional
+    Columns to export, e.g. `["id", "op_name", "started_at", "inputs", "output"]`. Only these columns
+    are requested from the server and written. Defaults to all columns.
+
+Returns
+-------
+str
+    JSON string with the file `path`, `format`, `rows_written`, `bytes_written`, `columns`
+    and trace `metadata`.
+
+<examples>
+    ```python
+    # Export all root traces of the last week to Parquet
+    export_weave_traces_tool(
+        entity_name="my-team",
+        project_name="my-project",
+        format="parquet",
+        filters={
+            "trace_roots_only": True,
+            "time_range": {"start": "2025-01-01T00:00:00Z"},
+        },
+    )
+
+    # Export the inputs and outputs of failed calls as NDJSON
+    export_weave_traces_tool(
+        entity_name="my-team",
+        project_name="my-project",
+        filters={"status": "error"},
+        columns=["id", "op_name", "started_at", "inputs", "output", "exception"],
+    )
+    ```
+</examples>
+"""
+
+
+def _get_trace_exporter() -> TraceExporter:
+    """Return the shared exporter, creating it on first use."""
+    global _trace_exporter
+    if _trace_exporter is None:
+        _trace_exporter = TraceExporter(TraceService())
+    return _trace_exporter
+
+
+async def export_weave_traces(
+    entity_name: str,
+    project_name: str,
+    path: Optional[str] = None,
+    format: str = "ndjson",
+    filters: Optional[Dict[str, Any]] = None,
+    sort_by: str = "started_at",
+    sort_direction: str = "desc",
+    limit: Optional[int] = None,
+    include_costs: bool = True,
+    include_feedback: bool = True,
+    columns: Optional[List[str]] = None,
+    keyset: bool = False,
+) -> ExportResult:
+    """
+    Stream the traces matching a query to a local file.
+
+    The export runs in a worker thread, so the event loop is not blocked
+    while traces are downloaded and written.
+
+    Args:
+        entity_name: Weights & Biases entity name.
+        project_name: Weights & Biases project name.
+        path: Output file path. Defaults to a new file in the temp directory.
+        format: One of 'ndjson', 'parquet' or 'arrow'.
+        filters: Dictionary of filter conditions.
+        sort_by: Field to sort by.
+        sort_direction: Sort direction ('asc' or 'desc').
+        limit: Maximum number of traces to export.
+        include_costs: Include tracked API cost information in the results.
+        include_feedback: Include Weave annotations in the results.
+        columns: Columns to request and write. Defaults to all columns.
+        keyset: Page with a (started_at, id) cursor instead of a single stream.
+
+    Returns:
+        ExportResult with the output path, row count and trace metadata.
+    """
+    return await asyncio.to_thread(
+        _get_trace_exporter().export,
+        entity_name=entity_name,
+        project_name=project_name,
+        path=path,
+        format=format,
+        filters=filters,
+        sort_by=sort_by,
+        sort_direction=sort_direction,
+        limit=limit,
+        include_costs=include_costs,
+        include_feedback=include_feedback,
+        columns=columns,
+        keyset=keyset,
+    )
@@ -0,0 +1,287 @@
+"""
+Response cache for W&B Models GraphQL queries.
+
+Agents ask for the same project metadata, run lists and summaries many times
+per session. `GqlResponseCache` keeps aggregated `query_wandb_tool` responses
+in a size-bounded LRU, keyed by the normalized query and its variables, with a
+time-to-live chosen per root field: project metadata changes rarely, while
+runs that are still running change all the time. Responses can also be kept
+in a SQLite file, so they survive server restarts.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+from wandb_mcp_server.utils import get_rich_logger
+from wandb_mcp_server.weave_api.result_cache import ResultCache, canonical_request_key
+
+logger = get_rich_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class _DiskResponseStore:
+    """SQLite table of serialized responses with wall-clock expiry."""
+
+    def __init__(self, path: Union[str, Path], max_entries: int):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection to the database."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return (seconds left, serialized response) for an unexpired key."""
+        connection = self._connection()
+        now = time.time()
+        row = connection.execute(
+            "SELECT expires_at, data FROM responses WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+        if row is None:
+            return None
+        with connection:
+            connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return row[0] - now, row[1]
+
+    def put(self, key: str, data: str, ttl_seconds: float) -> None:
+        """Store a serialized response, dropping expired and stale entries."""
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, expires_at, accessed_at, data) "
+                "VALUES (?, ?, ?, ?)",
+                (key, now + ttl_seconds, now, data),
+            )
+            connection.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        """Delete every stored response."""
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM responses")
+
+
+class GqlResponseCache:
+    """LRU cache of GraphQL responses with TTLs chosen per root field.
+
+    Responses are stored serialized, so every hit returns a fresh copy that
+    callers are free to modify.
+    """
+
+    # Seconds a response stays cached, by root field of the query
+    DEFAULT_ROOT_FIELD_TTLS = {
+        "project": 600.0,
+        "entity": 600.0,
+        "viewer": 600.0,
+        "models": 600.0,
+    }
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        default_ttl: float = 120.0,
+        root_field_ttls: Optional[Dict[str, float]] = None,
+        collection_ttl: float = 120.0,
+        running_ttl: float = 10.0,
+        path: Optional[Union[str, Path]] = None,
+        max_disk_entries: int = 10000,
+    ):
+        """Initialize the GqlResponseCache.
+
+        Args:
+            maxsize: Maximum number of responses kept in memory; the least
+                recently used response is evicted first.
+            default_ttl: Seconds a response stays cached when none of its root
+                fields has a TTL in `root_field_ttls`.
+            root_field_ttls: TTLs by root field name, merged over
+                DEFAULT_ROOT_FIELD_TTLS. The shortest TTL of the query's root
+                fields applies.
+            collection_ttl: Upper bound on the TTL of responses containing
+                paginated collections, such as a project's runs.
+            running_ttl: Upper bound on the TTL of responses containing a node
+                whose `state` is running, or runs selected without their `state`,
+                which may be running.
+            path: Optional SQLite file also storing the responses, shared across
+                processes and restarts.
+            max_disk_entries: Maximum number of responses kept in `path`.
+        """
+        self.default_ttl = default_ttl
+        self.root_field_ttls = {
+            **self.DEFAULT_ROOT_FIELD_TTLS,
+            **(root_field_ttls or {}),
+        }
+        self.collection_ttl = collection_ttl
+        self.running_ttl = running_ttl
+        self._memory = ResultCache(maxsize=maxsize, ttl_seconds=default_ttl)
+        self._disk = _DiskResponseStore(path, max_disk_entries) if path else None
+        self.disk_hits = 0
+
+    @staticmethod
+    def key(
+        normalized_query: str, variables: Optional[Dict[str, Any]], **options: Any
+    ) -> str:
+        """Build the cache key of a query.
+
+        Args:
+            normalized_query: The query printed from its parsed AST, so that
+                formatting and comments don't change the key.
+            variables: Variables of the query.
+            **options: Anything else that changes the response, such as
+                pagination settings and the credentials used.
+
+        Returns:
+            Hex digest identifying the query.
+        """
+        return canonical_request_key(
+            {"query": normalized_query, "variables": variables or {}}, **options
+        )
+
+    def ttl_for(self, root_fields: Iterable[str], response: Dict[str, Any]) -> float:
+        """Choose how long a response stays cached.
+
+        Args:
+            root_fields: Names of the root fields of the query.
+            response: The response to store.
+
+        Returns:
+            The TTL in seconds.
+        """
+        ttls = [
+            self.root_field_ttls.get(name, self.default_ttl) for name in root_fields
+        ]
+        ttl = min(ttls) if ttls else self.default_ttl
+        if _contains_collection(response):
+            ttl = min(ttl, self.collection_ttl)
+        if _contains_running_node(response) or _contains_run_without_state(response):
+            ttl = min(ttl, self.running_ttl)
+        return ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached response for a key, or None."""
+        found, data = self._memory.get(key)
+        if not found and self._disk is not None:
+            stored = self._disk.get(key)
+            if stored is not None:
+                ttl_left, data = stored
+                found = True
+                self.disk_hits += 1
+                self._memory.put(key, data, ttl_seconds=ttl_left)
+        return json.loads(data) if found else None
+
+    def put(self, key: str, response: Dict[str, Any], ttl_seconds: float) -> None:
+        """Store a response for `ttl_seconds`."""
+        if ttl_seconds <= 0:
+            return
+        data = json.dumps(response, separators=(",", ":"), default=str)
+        self._memory.put(key, data, ttl_seconds=ttl_seconds)
+        if self._disk is not None:
+            try:
+                self._disk.put(key, data, ttl_seconds)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to store GraphQL response on disk: {e}")
+
+    def clear(self) -> None:
+        """Drop every cached response, in memory and on disk."""
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the in-memory counters and the number of disk hits."""
+        return {**self._memory.stats(), "disk_hits": self.disk_hits}
+
+
+def _contains_collection(obj: Any) -> bool:
+    """Whether a response contains a collection following the connection pattern."""
+    if isinstance(obj, dict):
+        if isinstance(obj.get("edges"), list) and isinstance(obj.get("pageInfo"), dict):
+            return True
+        return any(_contains_collection(value) for value in obj.values())
+    if isinstance(obj, list):
+        return any(_contains_collection(item) for item in obj)
+    return False
+
+
+def _contains_running_node(obj: Any) -> bool:
+    """Whether a response contains an object whose `state` is running."""
+    if isinstance(obj, dict):
+        state = obj.get("state")
+        if isinstance(state, str) and state.lower() == "running":
+            return True
+        return any(_contains_running_node(value) for value in obj.values())
+    if isinstance(obj, list):
+        return any(_contains_running_node(item) for item in obj)
+    return False
+
+
+def _contains_run_without_state(obj: Any) -> bool:
+    """Whether a response contains a `run` or `runs` node without its `state`."""
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if not isinstance(value, dict):
+                continue
+            if key == "run":
+                nodes = [value]
+            elif key == "runs" and isinstance(value.get("edges"), list):
+                nodes = [
+                    edge.get("node") for edge in value["edges"] if isinstance(edge, dict)
+                ]
+            else:
+                nodes = []
+            if any(isinstance(node, dict) and "state" not in node for node in nodes):
+                return True
+        return any(_contains_run_without_state(value) for value in obj.values())
+    if isinstance(obj, list):
+        return any(_contains_run_without_state(item) for item in obj)
+    return False
+
+
+# Shared by the MCP tools
+_default_gql_cache: Optional[GqlResponseCache] = None
+_default_gql_cache_lock = threading.Lock()
+
+
+def get_gql_response_cache() -> GqlResponseCache:
+    """Return the process-wide GraphQL response cache, creating it on first use.
+
+    Set WANDB_MCP_GQL_CACHE to a SQLite file path to also keep responses on disk.
+    """
+    global _default_gql_cache
+    with _default_gql_cache_lock:
+        if _default_gql_cache is None:
+            _default_gql_cache = GqlResponseCache(
+                path=os.environ.get("WANDB_MCP_GQL_CACHE") or None
+            )
+        return _default_gql_cache
@@ -0,0 +1,176 @@
+"""
+Page size tuning for paginated W&B GraphQL queries.
+
+How many nodes fit in a page depends on what is selected for each node: a page
+of run IDs is tiny, while `config` and `summaryMetrics` JSON blobs can make a
+page of the same size time out. `estimate_node_bytes` guesses the payload of a
+node from the selection set to pick the first page size, and `PageSizeTuner`
+then adapts the size between requests from the observed response sizes and
+latencies, towards a target latency per request.
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+from graphql.language import ast as gql_ast
+
+# Typical serialized size of fields holding JSON blobs or long text
+HEAVY_FIELD_BYTES = {
+    "config": 4096,
+    "summaryMetrics": 4096,
+    "systemMetrics": 2048,
+    "history": 32768,
+    "sampledHistory": 16384,
+    "historyKeys": 2048,
+    "events": 8192,
+    "metadata": 2048,
+    "manifest": 8192,
+    "description": 512,
+    "notes": 512,
+}
+# Size of any other scalar field, key included
+SCALAR_FIELD_BYTES = 32
+# Assumed number of nodes of a nested collection without a literal `first`
+NESTED_COLLECTION_ITEMS = 10
+# Size assumed for an object whose selected fields are unknown
+UNKNOWN_OBJECT_BYTES = 20_000
+
+
+def estimate_node_bytes(
+    selection_set: Optional[gql_ast.SelectionSetNode],
+    fragments: Optional[Dict[str, gql_ast.FragmentDefinitionNode]] = None,
+) -> int:
+    """Estimate the serialized size of an object from the fields selected for it.
+
+    Args:
+        selection_set: Fields selected for the object, e.g. a collection's node.
+        fragments: Fragment definitions of the document, to follow spreads.
+
+    Returns:
+        Estimated size in bytes, UNKNOWN_OBJECT_BYTES without a selection set.
+    """
+    if selection_set is None:
+        return UNKNOWN_OBJECT_BYTES
+    fragments = fragments or {}
+    total = 2
+    for selection in selection_set.selections:
+        if isinstance(selection, gql_ast.FragmentSpreadNode):
+            fragment = fragments.get(selection.name.value)
+            total += estimate_node_bytes(
+                fragment.selection_set if fragment else None, fragments
+            )
+        elif isinstance(selection, gql_ast.InlineFragmentNode):
+            total += estimate_node_bytes(selection.selection_set, fragments)
+        elif selection.selection_set is None:
+            total += HEAVY_FIELD_BYTES.get(selection.name.value, SCALAR_FIELD_BYTES)
+        else:
+            size = estimate_node_bytes(selection.selection_set, fragments)
+            if any(
+                isinstance(child, gql_ast.FieldNode) and child.name.value == "edges"
+                for child in selection.selection_set.selections
+            ):
+                size *= _collection_items(selection)
+            total += SCALAR_FIELD_BYTES + size
+    return total
+
+
+def _collection_items(field: gql_ast.FieldNode) -> int:
+    """Number of nodes expected from a nested collection field."""
+    for argument in field.arguments or ():
+        if argument.name.value == "first" and isinstance(
+            argument.value, gql_ast.IntValueNode
+        ):
+            return int(argument.value.value)
+    return NESTED_COLLECTION_ITEMS
+
+
+def payload_bytes(value: Any) -> int:
+    """Serialized size of a decoded response fragment."""
+    return len(json.dumps(value, separators=(",", ":"), default=str))
+
+
+class PageSizeTuner:
+    """Adapts the number of nodes requested per page to a target latency.
+
+    The page size starts from the estimated node size and the byte budget.
+    After each page, the observed bytes and seconds per node, smoothed over
+    recent pages, give the size that would take `target_latency` and stay
+    within `target_page_bytes`. The page size moves towards the smaller of
+    the two, changing at most by a factor of two per page.
+    """
+
+    def __init__(
+        self,
+        estimated_node_bytes: int,
+        target_latency: float = 2.0,
+        target_page_bytes: int = 1_000_000,
+        min_page_size: int = 5,
+        max_page_size: int = 500,
+        smoothing: float = 0.5,
+    ):
+        """Initialize the PageSizeTuner.
+
+        Args:
+            estimated_node_bytes: Estimated serialized size of one node, e.g.
+                from `estimate_node_bytes`.
+            target_latency: Seconds a page request should take.
+            target_page_bytes: Maximum serialized size of a page.
+            min_page_size: Smallest page size used.
+            max_page_size: Largest page size used.
+            smoothing: Weight of the latest page in the per-node averages.
+        """
+        self.target_latency = target_latency
+        self.target_page_bytes = target_page_bytes
+        self.min_page_size = min_page_size
+        self.max_page_size = max_page_size
+        self.smoothing = smoothing
+        self.node_bytes: Optional[float] = None
+        self.node_seconds: Optional[float] = None
+        self.page_size = self._clamp(
+            target_page_bytes // max(estimated_node_bytes, 1)
+        )
+
+    def _clamp(self, size: float) -> int:
+        return int(max(self.min_page_size, min(self.max_page_size, size)))
+
+    def _average(self, previous: Optional[float], value: float) -> float:
+        if previous is None:
+            return value
+        return self.smoothing * value + (1 - self.smoothing) * previous
+
+    def observe(self, nodes: int, response_bytes: int, seconds: float) -> int:
+        """Update the page size from a fetched page.
+
+        Args:
+            nodes: Number of nodes the page returned.
+            response_bytes: Serialized size of the page.
+            seconds: Time the request took.
+
+        Returns:
+            The new page size.
+        """
+        if nodes <= 0:
+            return self.page_size
+        self.node_bytes = self._average(self.node_bytes, response_bytes / nodes)
+        self.node_seconds = self._average(self.node_seconds, seconds / nodes)
+        target = self.target_page_bytes / max(self.node_bytes, 1.0)
+        if self.node_seconds > 0:
+            target = min(target, self.target_latency / self.node_seconds)
+        target = max(self.page_size / 2, min(self.page_size * 2, target))
+        self.page_size = self._clamp(target)
+        return self.page_size
+
+    def shrink(self) -> bool:
+        """Halve the page size after a failed request.
+
+        Pages never grow back to the failed size: the halved size also becomes
+        the maximum page size.
+
+        Returns:
+            Whether the page size changed, i.e. a retry with a smaller page is
+            worthwhile.
+        """
+        smaller = self._clamp(self.page_size // 2)
+        changed = smaller < self.page_size
+        self.page_size = self.max_page_size = smaller
+        return changed
@@ -1,9 +1,13 @@
 """Module for querying the W&B GraphQL API."""
 
-import copy
 import logging
+import threading
+import time
 import traceback
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import wandb
 from graphql import parse
@@ -11,6 +15,16 @@ from graphql.language import ast as gql_ast
 from graphql.language import printer as gql_printer
 from graphql.language import visitor as gql_visitor
 from wandb_gql import gql  # This must be imported after wandb
+from wandb_mcp_server.mcp_tools.gql_cache import (
+    GqlResponseCache,
+    get_gql_response_cache,
+)
+from wandb_mcp_server.mcp_tools.gql_page_size import (
+    PageSizeTuner,
+    estimate_node_bytes,
+    payload_bytes,
+)
+from wandb_mcp_server.mcp_tools.tools_utils import get_wandb_api, wandb_credentials_key
 from wandb_mcp_server.utils import get_rich_logger
 
 logger = get_rich_logger(__name__)
@@ -85,6 +99,8 @@ use the `runs` collection field with a `filters` argument like: `runs(filters: "
 the value provided in the `variables` dictionary MUST be a JSON formatted *string*. Use `json.dumps()` in Python to create it.
 *   **Collections Require Pagination Structure:** Queries fetching lists/collections (like `project.runs`, \
 `artifact.files`) MUST include the `edges { node { ... } } pageInfo { endCursor hasNextPage }` pattern.
+Every such collection is paginated up to `max_items`, including collections nested inside the nodes \
+of another one (e.g. the `files` of each run), so there is no need to re-query them page by page.
 *   **Summary Metrics:** Use the `summaryMetrics` field (returns a JSON string) to access a run's summary \
 dictionary, not the deprecated `summary` field.
 </key_concepts>
@@ -108,7 +124,15 @@ variables : dict[str, Any] | None, optional
 max_items : int, optional
     Maximum number of items to fetch across all pages. Default is 100.
 items_per_page : int, optional
-    Number of items to request per page. Default is 50.
+    Number of items to request per page. By default, page sizes are chosen automatically: \
+large pages for light nodes (e.g. only IDs and names), smaller ones for nodes with `config` \
+or `summaryMetrics`, adjusted to how fast the server responds. Only set it to force a page size.
+bypass_cache : bool, optional
+    Identical queries are answered from a cache for a few seconds to ten minutes, depending on \
+how fast the data changes (shortest for running runs). Select `state` on runs: runs queried \
+without it are assumed to be running. Cached summaries and metrics of running runs can be \
+up to 10 seconds old, and other cached results up to 10 minutes old. Set to True when fresh \
+data is needed, e.g. right after a run changed. Defaults to False.
 
 Returns
 -------
@@ -566,23 +590,82 @@ def get_nested_value(obj: Dict, path: list[str]) -> Optional[Any]:
     return current
 
 
+def _dedupe_edges(
+    edges: List[Any], seen_ids: Set[Any], remaining: int
+) -> Tuple[List[Any], int, bool]:
+    """Select the edges of a page whose node IDs were not seen yet.
+
+    Args:
+        edges: Edges of the page.
+        seen_ids: Node IDs already aggregated, updated in place.
+        remaining: Maximum number of edges to select.
+
+    Returns:
+        Tuple of (new edges, duplicates skipped, whether `remaining` cut the page
+        short).
+    """
+    new_edges = []
+    duplicates_skipped = 0
+    for edge in edges:
+        if len(new_edges) >= remaining:
+            return new_edges, duplicates_skipped, True
+        try:
+            node_id = edge["node"]["id"]
+            if node_id in seen_ids:
+                duplicates_skipped += 1
+                continue
+            seen_ids.add(node_id)
+        except (KeyError, TypeError):
+            pass
+        new_edges.append(edge)
+    return new_edges, duplicates_skipped, False
+
+
 def query_paginated_wandb_gql(
     query: str,
     variables: Optional[Dict[str, Any]] = None,
     max_items: int = 100,
-    items_per_page: int = 50,
+    items_per_page: Optional[int] = 50,
+    prefetch: bool = True,
+    paginate_nested: bool = True,
+    nested_batch_size: int = 20,
+    bypass_cache: bool = False,
+    target_page_latency: float = 2.0,
 ) -> Dict[str, Any]:
     """
     Execute a GraphQL query against the W&B API with pagination support using AST modification.
-    Handles a single paginated field detected via the connection pattern.
-    Modifies the result dictionary in-place.
+    The first collection detected via the connection pattern is paginated page by page.
+    Every other collection, including those nested inside nodes (e.g. each run's
+    `files`), is then paginated with batched requests of aliased sub-queries.
+    Nodes are always deduplicated by ID across pages. Modifies the result
+    dictionary in-place.
 
     Args:
         query: The GraphQL query string. MUST include pageInfo{hasNextPage, endCursor} for paginated fields.
         variables: Variables to pass to the GraphQL query.
-        max_items: Maximum number of items to fetch across all pages (default: 100).
-        items_per_page: Number of items to request per page (default: 20).
-        deduplicate: Whether to deduplicate nodes by ID across pages (default: True).
+        max_items: Maximum number of items to fetch across all pages of each
+            collection (default: 100).
+        items_per_page: Number of items to request per page (default: 50). None
+            sizes pages automatically: the first page size is estimated from the
+            fields selected for each node, and later pages are resized from the
+            observed response sizes and latencies.
+        prefetch: Request the next page of the first collection in a background
+            thread while the current page is merged, so the two overlap. A
+            prefetched page that is not needed is discarded (default: True).
+        paginate_nested: Also paginate every collection other than the first one,
+            including collections nested in nodes. When False, only the first
+            collection is paginated and the others keep the items returned with
+            it (default: True).
+        nested_batch_size: Maximum number of collections whose next pages are
+            fetched by one request, each as an aliased sub-query, when
+            `paginate_nested` is set (default: 20).
+        bypass_cache: Don't answer from the GraphQL response cache. The query is
+            sent to the server and its response replaces the cached one. Only
+            queries are cached, never mutations (default: False).
+        target_page_latency: Seconds each request should take when
+            `items_per_page` is None. Pages of the first collection and of the
+            other collections are resized towards it. Ignored when
+            `items_per_page` is set (default: 2.0).
 
     Returns:
         The aggregated GraphQL response dictionary.
@@ -591,11 +674,47 @@ def query_paginated_wandb_gql(
     api = None
     limit_key = None
     try:
-        api = wandb.Api()
+        # Parse for execution, reusing the documents of an identical query
+        try:
+            prepared = _prepare_query(query, paginate_nested)
+        except Exception as e:
+            logger.error(f"Failed to parse initial query with wandb_gql: {e}")
+            return {"errors": [{"message": f"Failed to parse initial query: {e}"}]}
+
+        # Identical queries are answered from the response cache
+        cache = get_gql_response_cache() if prepared.cacheable else None
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.key(
+                prepared.normalized_query,
+                variables,
+                max_items=max_items,
+                items_per_page=items_per_page,
+                paginate_nested=paginate_nested,
+                credentials=wandb_credentials_key(),
+            )
+            if not bypass_cache:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    logger.info("Returning cached GraphQL response.")
+                    return cached
+
+        api = get_wandb_api()
         logger.info(
             "--- Inside query_paginated_wandb_gql: Step 0: Execute Initial Query ---"
         )
 
+        # Pages are sized automatically without an explicit items_per_page
+        tuner = None
+        if items_per_page is None:
+            tuner = _page_size_tuner(
+                prepared.query_ast,
+                prepared.connections[0].path if prepared.connections else None,
+                target_page_latency,
+            )
+            items_per_page = max(1, min(tuner.page_size, max_items))
+            logger.info(f"Estimated initial page size: {items_per_page}")
+
         # Determine limit key and set initial page vars
         page1_vars_func = variables.copy() if variables is not None else {}
         limit_key = None
@@ -615,19 +734,15 @@ def query_paginated_wandb_gql(
                 f"No limit variable found in input, adding '{limit_key}={items_per_page}'"
             )
 
-        # Parse for execution
-        try:
-            parsed_initial_query = gql(query.strip())
-        except Exception as e:
-            logger.error(f"Failed to parse initial query with wandb_gql: {e}")
-            return {"errors": [{"message": f"Failed to parse initial query: {e}"}]}
-
         # Execute initial query
         try:
+            start = time.perf_counter()
             result1 = api.client.execute(
-                parsed_initial_query, variable_values=page1_vars_func
+                prepared.document, variable_values=page1_vars_func
             )
-            result_dict = copy.deepcopy(result1)  # Work on a copy
+            first_page_seconds = time.perf_counter() - start
+            # The response is freshly decoded, so it is aggregated in place
+            result_dict = result1
             if "errors" in result_dict:
                 logger.error(
                     f"GraphQL errors in initial response: {result_dict['errors']}"
@@ -641,105 +756,216 @@ def query_paginated_wandb_gql(
         detected_paths = find_paginated_collections(result_dict)
         if not detected_paths:
             logger.info("No paginated paths detected. Returning initial result.")
+            _cache_response(cache, cache_key, prepared, result_dict)
             return result_dict
 
-        # --- Use the first detected path ---
-        # TODO: Enhance to handle multiple paths if necessary
+        # The first detected path is paginated page by page
         path_to_paginate = detected_paths[0]
         logger.info(f"Using path for pagination: {'/'.join(path_to_paginate)}")
+        if tuner is not None:
+            first_edges = get_nested_value(result_dict, path_to_paginate + ["edges"])
+            if isinstance(first_edges, list):
+                tuner.observe(
+                    len(first_edges), payload_bytes(first_edges), first_page_seconds
+                )
+        _paginate_first_collection(
+            api,
+            result_dict,
+            path_to_paginate,
+            prepared,
+            variables,
+            limit_key,
+            max_items,
+            items_per_page,
+            prefetch,
+            tuner,
+        )
 
-        # Extract page 1 data
-        runs_data1 = get_nested_value(result_dict, path_to_paginate)
-        if runs_data1 is None:
-            logger.warning(
-                f"Could not extract data for pagination path {'/'.join(path_to_paginate)}. Returning initial result."
+        if paginate_nested and prepared.connections:
+            _paginate_other_collections(
+                api,
+                result_dict,
+                tuple(path_to_paginate),
+                prepared.query_ast,
+                prepared.connections,
+                variables,
+                max_items,
+                items_per_page,
+                nested_batch_size,
+                target_page_latency if tuner is not None else None,
             )
-            return result_dict
-        page_info1 = get_nested_value(runs_data1, ["pageInfo"])
-        if page_info1 is None:
-            logger.warning(
-                f"Could not extract pageInfo for pagination path {'/'.join(path_to_paginate)}. Returning initial result."
-            )
-            return result_dict
+        for path in prepared.injected_cursor_paths:
+            for edges in _values_at_path(result_dict, path):
+                for edge in edges if isinstance(edges, list) else []:
+                    if isinstance(edge, dict):
+                        edge.pop("cursor", None)
 
-        cursor = page_info1.get("endCursor")
-        has_next = page_info1.get("hasNextPage")
-        initial_edges = runs_data1.get("edges", [])
-        logging.info(f"Page 1 Results: {len(initial_edges)} runs.")
-        logging.info(f"Page 1 PageInfo: {page_info1}")
-
-        # Deduplicate initial edges and update result_dict
-        seen_ids = set()
-        current_edge_count = 0
-        temp_initial_edges = []
-        if initial_edges:
-            for edge in initial_edges:
-                try:
-                    # Check max items even on page 1 relative to the limit
-                    if current_edge_count >= max_items:
-                        break
-                    node_id = edge["node"]["id"]
-                    if node_id not in seen_ids:
-                        seen_ids.add(node_id)
-                        temp_initial_edges.append(edge)
-                        current_edge_count += 1
-                except (KeyError, TypeError):
-                    if current_edge_count < max_items:
-                        temp_initial_edges.append(edge)
-                        current_edge_count += 1
-            # Update the edges in the result_dict
-            target_collection_dict = get_nested_value(result_dict, path_to_paginate)
-            if target_collection_dict:
-                target_collection_dict["edges"] = temp_initial_edges[
-                    :max_items
-                ]  # Ensure initial list respects max_items
-                current_edge_count = len(target_collection_dict["edges"])
-            logging.info(
-                f"Stored {current_edge_count} unique edges after page 1 (max: {max_items})."
-            )
+        _cache_response(cache, cache_key, prepared, result_dict)
+        return result_dict  # Return the modified dictionary
 
-        if not has_next or not cursor or current_edge_count >= max_items:
-            logger.info(
-                "No further pages needed based on page 1 info or max_items reached."
-            )
-            # Ensure final pageInfo reflects reality
-            target_pi_dict = get_nested_value(
-                result_dict, path_to_paginate + ["pageInfo"]
+    except Exception as e:
+        error_message = f"Critical error in paginated GraphQL query function: {str(e)}\n{traceback.format_exc()}"
+        logger.error(error_message)
+        # Return original dict if possible, else error structure
+        if result_dict:
+            if "errors" not in result_dict:
+                result_dict["errors"] = []
+            result_dict["errors"].append(
+                {"message": "Pagination failed", "details": str(e)}
             )
-            if target_pi_dict:
-                target_pi_dict["hasNextPage"] = False
             return result_dict
+        else:
+            return {
+                "errors": [
+                    {"message": "Pagination failed catastrophically", "details": str(e)}
+                ]
+            }
 
-        # Generate Paginated Query String
-        logging.info("\n--- Generating Paginated Query String --- ")
-        generated_paginated_query_string = None
-        after_variable_name = "after"  # Standard name
-        try:
-            initial_ast = parse(query.strip())
-            visitor = AddPaginationArgsVisitor(
-                field_paths=detected_paths,
-                first_variable_name=limit_key,
-                after_variable_name=after_variable_name,
-            )
-            modified_ast = gql_visitor.visit(copy.deepcopy(initial_ast), visitor)
-            generated_paginated_query_string = gql_printer.print_ast(modified_ast)
-            logger.info("AST modification and printing successful.")
-        except Exception as e:
-            logger.error(f"Failed to generate query string via AST: {e}", exc_info=True)
-            return result_dict  # Return what we have if generation fails
 
-        if generated_paginated_query_string is None:
-            return result_dict
+def _cache_response(
+    cache: Optional[GqlResponseCache],
+    key: Optional[str],
+    prepared: "_PreparedQuery",
+    response: Dict[str, Any],
+) -> None:
+    """Store a response without errors in the response cache."""
+    if cache is None or key is None or "errors" in response:
+        return
+    cache.put(key, response, cache.ttl_for(prepared.root_fields, response))
+
+
+def _paginate_first_collection(
+    api: Any,
+    result_dict: Dict[str, Any],
+    path_to_paginate: List[str],
+    prepared: "_PreparedQuery",
+    variables: Optional[Dict[str, Any]],
+    limit_key: str,
+    max_items: int,
+    items_per_page: int,
+    prefetch: bool,
+    tuner: Optional[PageSizeTuner] = None,
+) -> None:
+    """Fetch the remaining pages of one collection and merge them into the result.
 
+    Args:
+        api: The W&B API client.
+        result_dict: The first page response, modified in place.
+        path_to_paginate: Response path of the collection.
+        prepared: The prepared query the first page was fetched with.
+        variables: Variables of the query.
+        limit_key: Name of the page size variable.
+        max_items: Maximum number of items to aggregate.
+        items_per_page: Number of items to request per page.
+        prefetch: Request the next page while the current one is merged.
+        tuner: Resizes the pages from the observed ones instead of using
+            `items_per_page`.
+    """
+    # Extract page 1 data
+    runs_data1 = get_nested_value(result_dict, path_to_paginate)
+    if runs_data1 is None:
+        logger.warning(
+            f"Could not extract data for pagination path {'/'.join(path_to_paginate)}. Returning initial result."
+        )
+        return
+    page_info1 = get_nested_value(runs_data1, ["pageInfo"])
+    if page_info1 is None:
+        logger.warning(
+            f"Could not extract pageInfo for pagination path {'/'.join(path_to_paginate)}. Returning initial result."
+        )
+        return
+
+    cursor = page_info1.get("endCursor")
+    has_next = page_info1.get("hasNextPage")
+    initial_edges = runs_data1.get("edges", [])
+    logging.info(f"Page 1 Results: {len(initial_edges)} runs.")
+    logging.info(f"Page 1 PageInfo: {page_info1}")
+
+    # Deduplicate initial edges and update result_dict
+    seen_ids = set()
+    current_edge_count = 0
+    temp_initial_edges = []
+    if initial_edges:
+        for edge in initial_edges:
+            try:
+                # Check max items even on page 1 relative to the limit
+                if current_edge_count >= max_items:
+                    break
+                node_id = edge["node"]["id"]
+                if node_id not in seen_ids:
+                    seen_ids.add(node_id)
+                    temp_initial_edges.append(edge)
+                    current_edge_count += 1
+            except (KeyError, TypeError):
+                if current_edge_count < max_items:
+                    temp_initial_edges.append(edge)
+                    current_edge_count += 1
+        # Update the edges in the result_dict
+        target_collection_dict = get_nested_value(result_dict, path_to_paginate)
+        if target_collection_dict:
+            target_collection_dict["edges"] = temp_initial_edges[
+                :max_items
+            ]  # Ensure initial list respects max_items
+            current_edge_count = len(target_collection_dict["edges"])
         logging.info(
-            "\n--- Loop: Execute, Deduplicate, Aggregate In-Place, Check Limit ---"
+            f"Stored {current_edge_count} unique edges after page 1 (max: {max_items})."
+        )
+
+    if not has_next or not cursor or current_edge_count >= max_items:
+        logger.info(
+            "No further pages needed based on page 1 info or max_items reached."
         )
-        page_num = 1
-        current_cursor = cursor
-        current_has_next = has_next
-        final_page_info = page_info1
+        # Ensure final pageInfo reflects reality
+        target_pi_dict = get_nested_value(result_dict, path_to_paginate + ["pageInfo"])
+        if target_pi_dict:
+            target_pi_dict["hasNextPage"] = False
+        return
+
+    # Generate Paginated Query String
+    logging.info("\n--- Generating Paginated Query String --- ")
+    after_variable_name = "after"  # Standard name
+    try:
+        # Generated once per query, every page only changes its variables
+        parsed_generated = prepared.paginated_document(
+            path_to_paginate, limit_key, after_variable_name
+        )
+        logger.info("AST modification and printing successful.")
+    except Exception as e:
+        logger.error(f"Failed to generate paginated query via AST: {e}", exc_info=True)
+        return  # Keep what we have if generation fails
+
+    def fetch_page(page_cursor: str, page_size: int) -> Tuple[Dict[str, Any], float]:
+        page_vars = variables.copy() if variables is not None else {}
+        page_vars[limit_key] = page_size  # Set correct page size
+        page_vars[after_variable_name] = page_cursor  # Set cursor
+        logging.info(f"Executing generated query with vars: {page_vars}")
+        start = time.perf_counter()
+        result = api.client.execute(parsed_generated, variable_values=page_vars)
+        return result, time.perf_counter() - start
+
+    def page_size() -> int:
+        return max(1, min(tuner.page_size, max_items)) if tuner else items_per_page
+
+    target_edges = get_nested_value(result_dict, path_to_paginate + ["edges"])
+    if not isinstance(target_edges, list):
+        logging.error("Could not find target edges list in result_dict.")
+        return
+
+    logging.info(
+        "\n--- Loop: Prefetch, Deduplicate, Aggregate In-Place, Check Limit ---"
+    )
+    page_num = 1
+    final_page_info = page_info1
+    # Cursors are sequential, but page N+1 can be requested by a background
+    # fetcher as soon as page N arrives, overlapping its merge with the request
+    fetcher = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    pending = fetcher.submit(fetch_page, cursor, page_size()) if fetcher else None
+    # Large pages are the likeliest to time out, so a failed page is retried
+    # with smaller pages when they are sized automatically
+    max_retries = retries_left = 2
 
-        while current_has_next:
+    try:
+        while True:
             if current_edge_count >= max_items:
                 logging.info(f"Reached max_items ({max_items}). Stopping loop.")
                 final_page_info = {**final_page_info, "hasNextPage": False}
@@ -747,167 +973,760 @@ def query_paginated_wandb_gql(
 
             page_num += 1
             logging.info(f"\nFetching Page {page_num}...")
-            page_vars = (
-                variables.copy() if variables is not None else {}
-            )  # Start with original vars
-            page_vars[limit_key] = items_per_page  # Set correct page size
-            page_vars[after_variable_name] = current_cursor  # Set cursor
-
             try:
-                # Parse and execute for the current page
-                parsed_generated = gql(generated_paginated_query_string)
-                logging.info(
-                    f"Executing generated query for page {page_num} with vars: {page_vars}"
-                )
-                result_page = api.client.execute(
-                    parsed_generated, variable_values=page_vars
+                result_page, seconds = (
+                    pending.result() if pending else fetch_page(cursor, page_size())
                 )
-
-                if "errors" in result_page:
-                    logger.error(
-                        f"GraphQL errors on page {page_num}: {result_page['errors']}. Stopping pagination."
-                    )
-                    current_has_next = False
-                    final_page_info = {
-                        **final_page_info,
-                        "hasNextPage": False,
-                    }  # Update page info on error
-                    continue  # Go to end of loop
-
-                runs_data = get_nested_value(result_page, path_to_paginate)
-                if runs_data is None:
+            except Exception as e:
+                pending = None
+                if tuner and retries_left and tuner.shrink():
+                    retries_left -= 1
                     logging.warning(
-                        f"Could not get data for path {'/'.join(path_to_paginate)} on page {page_num}. Stopping."
+                        f"Execution failed for page {page_num}: {e}. "
+                        f"Retrying with {tuner.page_size} items per page."
                     )
-                    current_has_next = False
+                    page_num -= 1
                     continue
-                else:
-                    edges_this_page = get_nested_value(runs_data, ["edges"]) or []
-                    page_info = get_nested_value(runs_data, ["pageInfo"]) or {}
-                    final_page_info = page_info  # Store latest page info
+                logging.error(
+                    f"Execution failed for page {page_num}: {e}", exc_info=True
+                )
+                break
+            pending = None
+            retries_left = max_retries
+
+            if "errors" in result_page:
+                logger.error(
+                    f"GraphQL errors on page {page_num}: {result_page['errors']}. Stopping pagination."
+                )
+                final_page_info = {**final_page_info, "hasNextPage": False}
+                break
+
+            runs_data = get_nested_value(result_page, path_to_paginate)
+            if runs_data is None:
+                logging.warning(
+                    f"Could not get data for path {'/'.join(path_to_paginate)} on page {page_num}. Stopping."
+                )
+                break
+            edges_this_page = get_nested_value(runs_data, ["edges"]) or []
+            final_page_info = get_nested_value(runs_data, ["pageInfo"]) or {}
+            cursor = final_page_info.get("endCursor")
+            has_next = final_page_info.get("hasNextPage", False)
+            logging.info(
+                f"Result (Page {page_num}): {len(edges_this_page)} runs returned."
+            )
+            logging.info(f"Page Info (Page {page_num}): {final_page_info}")
+            if tuner:
+                tuner.observe(
+                    len(edges_this_page), payload_bytes(edges_this_page), seconds
+                )
 
+            # Speculatively request the next page before merging this one
+            if (
+                fetcher
+                and has_next
+                and cursor
+                and edges_this_page
+                and current_edge_count + len(edges_this_page) < max_items
+            ):
+                pending = fetcher.submit(fetch_page, cursor, page_size())
+
+            # Deduplicate and append new edges in place
+            new_edges, duplicates_skipped, limit_reached = _dedupe_edges(
+                edges_this_page, seen_ids, max_items - current_edge_count
+            )
+            if duplicates_skipped > 0:
                 logging.info(
-                    f"Result (Page {page_num}): {len(edges_this_page)} runs returned."
+                    f"Skipped {duplicates_skipped} duplicate edges on page {page_num}."
                 )
-                logging.info(f"Page Info (Page {page_num}): {page_info}")
-
-                # Deduplicate & Find edges to append
-                new_edges_for_aggregation = []
-                duplicates_skipped = 0
-                if edges_this_page:
-                    for edge in edges_this_page:
-                        if (
-                            current_edge_count + len(new_edges_for_aggregation)
-                            >= max_items
-                        ):
-                            logging.info(
-                                f"Max items ({max_items}) reached mid-page {page_num}."
-                            )
-                            final_page_info = {**final_page_info, "hasNextPage": False}
-                            current_has_next = False
-                            break
-
-                        try:
-                            node_id = edge["node"]["id"]
-                            if node_id not in seen_ids:
-                                seen_ids.add(node_id)
-                                new_edges_for_aggregation.append(edge)
-                            else:
-                                duplicates_skipped += 1
-                        except (KeyError, TypeError):
-                            new_edges_for_aggregation.append(edge)
-
-                    if duplicates_skipped > 0:
-                        logging.info(
-                            f"Skipped {duplicates_skipped} duplicate edges on page {page_num}."
-                        )
-
-                    # Append new unique edges IN-PLACE
-                    if new_edges_for_aggregation:
-                        target_collection_dict_inplace = get_nested_value(
-                            result_dict, path_to_paginate
-                        )
-                        if target_collection_dict_inplace and isinstance(
-                            target_collection_dict_inplace.get("edges"), list
-                        ):
-                            target_collection_dict_inplace["edges"].extend(
-                                new_edges_for_aggregation
-                            )
-                            current_edge_count = len(
-                                target_collection_dict_inplace["edges"]
-                            )
-                            logging.info(
-                                f"Appended {len(new_edges_for_aggregation)} new edges. Total unique edges: {current_edge_count}"
-                            )
-                        else:
-                            logging.error(
-                                "Could not find target edges list in result_dict to append in-place."
-                            )
-                            current_has_next = False
-                    else:
-                        if len(edges_this_page) > 0:
-                            logging.info(
-                                "No new unique edges found on page {page_num} after deduplication."
-                            )
-                        else:
-                            logging.info(
-                                "No edges returned on page {page_num} to aggregate."
-                            )
-                else:
-                    logging.info("No edges returned on page {page_num} to aggregate.")
+            target_edges.extend(new_edges)
+            current_edge_count = len(target_edges)
+            logging.info(
+                f"Appended {len(new_edges)} new edges. Total unique edges: {current_edge_count}"
+            )
+
+            if limit_reached:
+                logging.info(f"Max items ({max_items}) reached mid-page {page_num}.")
+                final_page_info = {**final_page_info, "hasNextPage": False}
+                break
+            if not has_next:
+                break
+            # Safety checks
+            if not cursor:
+                logging.warning(
+                    "hasNextPage is true but no endCursor received. Stopping loop."
+                )
+                break
+            if not edges_this_page:
+                logging.warning(
+                    f"No edges received for page {page_num}. Stopping loop."
+                )
+                break
+    finally:
+        if fetcher:
+            # A prefetched page that is no longer needed is discarded
+            fetcher.shutdown(wait=False, cancel_futures=True)
 
-                # Update cursor and has_next for next loop iteration (or final state)
-                current_cursor = final_page_info.get("endCursor")
-                # Respect hasNextPage from API unless loop was broken early by max_items or errors
-                if current_has_next:  # Only update if loop didn't break mid-page
-                    current_has_next = final_page_info.get("hasNextPage", False)
+    logging.info(f"\n--- Pagination Loop Finished after page {page_num} ---")
+    logging.info(f"Final aggregated edge count: {current_edge_count}")
 
-                # Safety checks
-                if current_has_next and not current_cursor:
-                    logging.warning(
-                        "hasNextPage is true but no endCursor received. Stopping loop."
-                    )
-                    current_has_next = False
-                if not edges_this_page:
-                    logging.warning(
-                        f"No edges received for page {page_num}. Stopping loop."
-                    )
-                    current_has_next = False
+    # Update the final pageInfo in the result dictionary
+    target_collection_dict_final = get_nested_value(result_dict, path_to_paginate)
+    if target_collection_dict_final:
+        target_collection_dict_final["pageInfo"] = final_page_info
+        logging.info(f"Updated final pageInfo: {final_page_info}")
 
-            except Exception as e:
-                logging.error(
-                    f"Execution failed for page {page_num}: {e}", exc_info=True
+
+@dataclass
+class _Connection:
+    """A collection field of the query that follows the connection pattern.
+
+    Attributes:
+        path: Response keys from the operation root to the field.
+        children: Collections selected inside the nodes of this one.
+    """
+
+    path: Tuple[str, ...]
+    children: List["_Connection"] = field(default_factory=list)
+
+
+@dataclass
+class _ConnectionState:
+    """One collection of the response whose remaining pages are fetched.
+
+    Attributes:
+        connection: The query field the collection was returned for.
+        data: The collection in the response, aggregated in place.
+        ancestors: For each enclosing collection, its connection, the cursor of
+            the edge preceding the enclosing node (None for the first edge) and
+            the node ID.
+        seen_ids: Node IDs already aggregated.
+        done: Whether no more pages are fetched.
+    """
+
+    connection: _Connection
+    data: Dict[str, Any]
+    ancestors: Tuple[Tuple[_Connection, Optional[str], Any], ...]
+    seen_ids: Set[Any]
+    done: bool
+
+
+def _first_operation(
+    document: gql_ast.DocumentNode,
+) -> Optional[gql_ast.OperationDefinitionNode]:
+    """Return the first operation of a parsed document."""
+    for definition in document.definitions:
+        if isinstance(definition, gql_ast.OperationDefinitionNode):
+            return definition
+    return None
+
+
+def _response_key(node: gql_ast.FieldNode) -> str:
+    """Key of a field in the response, its alias if it has one."""
+    return node.alias.value if node.alias else node.name.value
+
+
+def _find_field(
+    selection_set: Optional[gql_ast.SelectionSetNode], key: str
+) -> Optional[gql_ast.FieldNode]:
+    """Find a field selected directly in a selection set by its response key."""
+    if selection_set is None:
+        return None
+    for selection in selection_set.selections:
+        if isinstance(selection, gql_ast.FieldNode) and _response_key(selection) == key:
+            return selection
+    return None
+
+
+def _find_query_connections(
+    selection_set: Optional[gql_ast.SelectionSetNode], path: Tuple[str, ...] = ()
+) -> List[_Connection]:
+    """Find the fields of a selection set that select both `edges` and `pageInfo`.
+
+    Collections inside the nodes of another collection are returned as its
+    children. Fields selected through fragments are not followed.
+    """
+    found = []
+    for selection in selection_set.selections if selection_set else ():
+        if not isinstance(selection, gql_ast.FieldNode):
+            continue
+        field_path = path + (_response_key(selection),)
+        edges = _find_field(selection.selection_set, "edges")
+        if edges is not None and _find_field(selection.selection_set, "pageInfo"):
+            node = _find_field(edges.selection_set, "node")
+            children = (
+                _find_query_connections(
+                    node.selection_set, field_path + ("edges", "node")
                 )
-                current_has_next = False  # Stop loop on error
+                if node is not None
+                else []
+            )
+            found.append(_Connection(field_path, children))
+        else:
+            found.extend(_find_query_connections(selection.selection_set, field_path))
+    return found
+
+
+def _connections_with_children(
+    connections: List[_Connection],
+) -> List[_Connection]:
+    """All connections, at any depth, that contain nested connections."""
+    parents = []
+    for connection in connections:
+        if connection.children:
+            parents.append(connection)
+            parents.extend(_connections_with_children(connection.children))
+    return parents
+
+
+@dataclass
+class _PreparedQuery:
+    """A query parsed and rewritten for pagination, reused across tool calls.
+
+    Attributes:
+        document: The query parsed for execution.
+        query_ast: The query parsed by graphql-core, with edge cursors added, or
+            None if it could not be parsed.
+        connections: Top-level collections of the query.
+        injected_cursor_paths: Response paths of the edges that select `cursor`
+            only for nested pagination.
+        paginated_documents: Paginated queries for each collection path and page
+            size variable.
+        normalized_query: The query printed from its AST, independent of its
+            formatting, or None if it could not be parsed.
+        root_fields: Names of the root fields of the operation.
+        cacheable: Whether responses may be cached, i.e. the operation is a query.
+    """
+
+    document: Any
+    query_ast: Optional[gql_ast.DocumentNode]
+    connections: List[_Connection]
+    injected_cursor_paths: List[Tuple[str, ...]]
+    paginated_documents: Dict[Tuple[Tuple[str, ...], str, str], Any] = field(
+        default_factory=dict
+    )
+    normalized_query: Optional[str] = None
+    root_fields: Tuple[str, ...] = ()
+    cacheable: bool = False
+
+    def paginated_document(
+        self, path: List[str], limit_key: str, after_variable_name: str
+    ) -> Any:
+        """Return the query with `first`/`after` page arguments on one collection.
+
+        Only this collection gets the page variables, the others are paginated
+        separately with their own cursors.
+        """
+        key = (tuple(path), limit_key, after_variable_name)
+        document = self.paginated_documents.get(key)
+        if document is None:
+            if self.query_ast is None:
+                raise ValueError("The query could not be parsed for pagination")
+            visitor = AddPaginationArgsVisitor(
+                field_paths=[path],
+                first_variable_name=limit_key,
+                after_variable_name=after_variable_name,
+            )
+            modified_ast = gql_visitor.visit(self.query_ast, visitor)
+            document = gql(gql_printer.print_ast(modified_ast))
+            self.paginated_documents[key] = document
+        return document
 
-        logging.info(f"\n--- Pagination Loop Finished after page {page_num} ---")
-        logging.info(f"Final aggregated edge count: {current_edge_count}")
 
-        # Update the final pageInfo in the result dictionary
-        target_collection_dict_final = get_nested_value(result_dict, path_to_paginate)
-        if target_collection_dict_final:
-            target_collection_dict_final["pageInfo"] = final_page_info
-            logging.info(f"Updated final pageInfo: {final_page_info}")
+# Number of prepared queries kept by `_prepare_query`
+QUERY_CACHE_SIZE = 128
+_query_cache: "OrderedDict[Tuple[str, bool], _PreparedQuery]" = OrderedDict()
+_query_cache_lock = threading.Lock()
 
-        return result_dict  # Return the modified dictionary
 
+def _prepare_query(query: str, paginate_nested: bool) -> _PreparedQuery:
+    """Parse and rewrite a query, or reuse the result for the same query text.
+
+    Raises:
+        Exception: If the query cannot be parsed for execution.
+    """
+    key = (query.strip(), paginate_nested)
+    with _query_cache_lock:
+        prepared = _query_cache.get(key)
+        if prepared is not None:
+            _query_cache.move_to_end(key)
+            return prepared
+
+    # Collections nested in the nodes of another collection are addressed by
+    # the cursor of the preceding edge, so those edges also select `cursor`
+    query_ast = None
+    connections: List[_Connection] = []
+    injected_cursor_paths: List[Tuple[str, ...]] = []
+    normalized_query = None
+    root_fields: Tuple[str, ...] = ()
+    cacheable = False
+    query_to_execute = key[0]
+    try:
+        query_ast = parse(query_to_execute)
+        normalized_query = gql_printer.print_ast(query_ast)
+        operation = _first_operation(query_ast)
+        if operation is not None:
+            connections = _find_query_connections(operation.selection_set)
+            root_fields = tuple(
+                selection.name.value
+                for selection in operation.selection_set.selections
+                if isinstance(selection, gql_ast.FieldNode)
+            )
+            cacheable = operation.operation == gql_ast.OperationType.QUERY
+        parents = _connections_with_children(connections)
+        if paginate_nested and parents:
+            cursor_visitor = AddEdgeCursorVisitor(parents)
+            query_ast = gql_visitor.visit(query_ast, cursor_visitor)
+            query_to_execute = gql_printer.print_ast(query_ast)
+            injected_cursor_paths = cursor_visitor.injected_paths
     except Exception as e:
-        error_message = f"Critical error in paginated GraphQL query function: {str(e)}\n{traceback.format_exc()}"
-        logger.error(error_message)
-        # Return original dict if possible, else error structure
-        if result_dict:
-            if "errors" not in result_dict:
-                result_dict["errors"] = []
-            result_dict["errors"].append(
-                {"message": "Pagination failed", "details": str(e)}
+        logger.warning(f"Failed to analyze query collections: {e}")
+
+    prepared = _PreparedQuery(
+        document=gql(query_to_execute),
+        query_ast=query_ast,
+        connections=connections,
+        injected_cursor_paths=injected_cursor_paths,
+        normalized_query=normalized_query,
+        root_fields=root_fields,
+        cacheable=cacheable,
+    )
+    with _query_cache_lock:
+        _query_cache[key] = prepared
+        _query_cache.move_to_end(key)
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+    return prepared
+
+
+def clear_query_cache() -> None:
+    """Drop all prepared queries."""
+    with _query_cache_lock:
+        _query_cache.clear()
+
+
+def _values_at_path(obj: Any, path: Tuple[str, ...]) -> List[Any]:
+    """Collect the values at a response path, stepping through lists."""
+    if not path:
+        return [obj]
+    if isinstance(obj, list):
+        return [value for item in obj for value in _values_at_path(item, path)]
+    if isinstance(obj, dict) and path[0] in obj:
+        return _values_at_path(obj[path[0]], path[1:])
+    return []
+
+
+def _connection_state(
+    connection: _Connection,
+    data: Any,
+    ancestors: Tuple[Tuple[_Connection, Optional[str], Any], ...],
+    max_items: int,
+) -> Optional[_ConnectionState]:
+    """Track a collection of the response, or return None if it is missing."""
+    if not isinstance(data, dict) or not isinstance(data.get("edges"), list):
+        return None
+    page_info = data.get("pageInfo")
+    if not isinstance(page_info, dict):
+        return None
+    seen_ids = set()
+    for edge in data["edges"]:
+        try:
+            seen_ids.add(edge["node"]["id"])
+        except (KeyError, TypeError):
+            pass
+    has_next = bool(page_info.get("hasNextPage") and page_info.get("endCursor"))
+    if has_next and len(data["edges"]) >= max_items:
+        page_info["hasNextPage"] = False
+        has_next = False
+    return _ConnectionState(connection, data, ancestors, seen_ids, not has_next)
+
+
+def _nested_connection_states(
+    state: _ConnectionState, max_items: int
+) -> List[_ConnectionState]:
+    """Track the collections nested in the nodes of an aggregated collection."""
+    if not state.connection.children:
+        return []
+    nested = []
+    edges = state.data["edges"]
+    depth = len(state.connection.path) + 2
+    for index, edge in enumerate(edges):
+        node = edge.get("node") if isinstance(edge, dict) else None
+        if not isinstance(node, dict):
+            continue
+        previous_cursor = None
+        if index > 0:
+            previous_cursor = (edges[index - 1] or {}).get("cursor")
+            if previous_cursor is None:
+                # The node cannot be addressed without the preceding cursor
+                continue
+        ancestors = state.ancestors + (
+            (state.connection, previous_cursor, node.get("id")),
+        )
+        for child in state.connection.children:
+            child_state = _connection_state(
+                child,
+                get_nested_value(node, list(child.path[depth:])),
+                ancestors,
+                max_items,
             )
-            return result_dict
+            if child_state is not None:
+                nested.append(child_state)
+    return nested
+
+
+def _page_arguments(
+    arguments: Tuple[gql_ast.ArgumentNode, ...], first: int, after: Optional[str]
+) -> Tuple[gql_ast.ArgumentNode, ...]:
+    """Replace the `first` and, if given, the `after` argument of a field."""
+    replaced = {"first", "after"} if after is not None else {"first"}
+    new_arguments = [arg for arg in arguments or () if arg.name.value not in replaced]
+    new_arguments.append(
+        gql_ast.ArgumentNode(
+            name=gql_ast.NameNode(value="first"),
+            value=gql_ast.IntValueNode(value=str(first)),
+        )
+    )
+    if after is not None:
+        new_arguments.append(
+            gql_ast.ArgumentNode(
+                name=gql_ast.NameNode(value="after"),
+                value=gql_ast.StringValueNode(value=after),
+            )
+        )
+    return tuple(new_arguments)
+
+
+def _next_page_field(
+    operation: gql_ast.OperationDefinitionNode,
+    state: _ConnectionState,
+    alias: str,
+    page_size: int,
+) -> Optional[gql_ast.FieldNode]:
+    """Build an aliased root field that fetches the next page of one collection.
+
+    Only the fields on the path to the collection are kept. Each enclosing
+    collection is narrowed to the single node containing it with
+    `first: 1, after: <preceding cursor>`.
+    """
+    target = state.connection.path
+    enclosing = {connection.path: cursor for connection, cursor, _ in state.ancestors}
+
+    def build(
+        selection_set: Optional[gql_ast.SelectionSetNode], depth: int
+    ) -> Optional[gql_ast.FieldNode]:
+        node = _find_field(selection_set, target[depth])
+        if node is None:
+            return None
+        path = target[: depth + 1]
+        arguments = node.arguments
+        if path == target:
+            arguments = _page_arguments(
+                arguments, page_size, state.data["pageInfo"]["endCursor"]
+            )
+            sub_selection = node.selection_set
         else:
-            return {
-                "errors": [
-                    {"message": "Pagination failed catastrophically", "details": str(e)}
-                ]
-            }
+            if path in enclosing:
+                arguments = _page_arguments(arguments, 1, enclosing[path])
+            child = build(node.selection_set, depth + 1)
+            if child is None:
+                return None
+            selections = [child]
+            # Node IDs are kept to check the right node was addressed
+            id_field = _find_field(node.selection_set, "id")
+            if id_field is not None and target[depth + 1] != "id":
+                selections.append(id_field)
+            sub_selection = gql_ast.SelectionSetNode(selections=tuple(selections))
+        return _replace_node(
+            node,
+            alias=gql_ast.NameNode(value=alias) if depth == 0 else node.alias,
+            arguments=tuple(arguments or ()),
+            selection_set=sub_selection,
+        )
+
+    return build(operation.selection_set, 0)
+
+
+def _extract_next_page(
+    response: Dict[str, Any], state: _ConnectionState, alias: str
+) -> Optional[Dict[str, Any]]:
+    """Find the page of a collection in the response of an aliased sub-query."""
+    value = response.get(alias)
+    depth = 1
+    for connection, _, node_id in state.ancestors:
+        enclosing = get_nested_value(value, list(connection.path[depth:]))
+        edges = enclosing.get("edges") if isinstance(enclosing, dict) else None
+        if not edges or not isinstance(edges[0], dict):
+            return None
+        value = edges[0].get("node")
+        if not isinstance(value, dict):
+            return None
+        if node_id is not None and value.get("id", node_id) != node_id:
+            logger.warning(
+                f"Expected node {node_id} at {'/'.join(connection.path)} but got "
+                f"{value.get('id')}. Skipping its nested collection."
+            )
+            return None
+        depth = len(connection.path) + 2
+    page = get_nested_value(value, list(state.connection.path[depth:]))
+    return page if isinstance(page, dict) else None
+
+
+def _merge_next_page(
+    state: _ConnectionState, page: Optional[Dict[str, Any]], max_items: int
+) -> None:
+    """Append the new edges of a fetched page and update the page info."""
+    if page is None:
+        state.done = True
+        return
+    edges_this_page = page.get("edges") or []
+    page_info = page.get("pageInfo") or {}
+    new_edges, _, limit_reached = _dedupe_edges(
+        edges_this_page, state.seen_ids, max_items - len(state.data["edges"])
+    )
+    state.data["edges"].extend(new_edges)
+    limit_reached = limit_reached or len(state.data["edges"]) >= max_items
+    state.data["pageInfo"] = {
+        **page_info,
+        "hasNextPage": bool(page_info.get("hasNextPage")) and not limit_reached,
+    }
+    state.done = (
+        limit_reached
+        or not page_info.get("hasNextPage")
+        or not page_info.get("endCursor")
+        or not edges_this_page
+    )
+
+
+def _next_pages_document(
+    document: gql_ast.DocumentNode,
+    operation: gql_ast.OperationDefinitionNode,
+    fields: List[gql_ast.FieldNode],
+) -> Tuple[gql_ast.DocumentNode, Set[str]]:
+    """Wrap aliased root fields in an operation of their own.
+
+    Only the variables and fragments the fields use are kept, as GraphQL rejects
+    unused ones.
+
+    Returns:
+        Tuple of (document, names of the variables used).
+    """
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if isinstance(definition, gql_ast.FragmentDefinitionNode)
+    }
+    references = _ReferenceCollector()
+    for root_field in fields:
+        gql_visitor.visit(root_field, references)
+    used_fragments: Dict[str, gql_ast.FragmentDefinitionNode] = {}
+    while references.fragments - used_fragments.keys():
+        name = (references.fragments - used_fragments.keys()).pop()
+        used_fragments[name] = fragments.get(name)
+        if used_fragments[name] is not None:
+            gql_visitor.visit(used_fragments[name], references)
+    operation_node = _replace_node(
+        operation,
+        variable_definitions=tuple(
+            definition
+            for definition in operation.variable_definitions or ()
+            if definition.variable.name.value in references.variables
+        ),
+        selection_set=gql_ast.SelectionSetNode(selections=tuple(fields)),
+    )
+    return (
+        gql_ast.DocumentNode(
+            definitions=(
+                operation_node,
+                *(fragment for fragment in used_fragments.values() if fragment),
+            )
+        ),
+        references.variables,
+    )
+
+
+def _paginate_other_collections(
+    api: Any,
+    result_dict: Dict[str, Any],
+    first_path: Tuple[str, ...],
+    query_ast: gql_ast.DocumentNode,
+    connections: List[_Connection],
+    variables: Optional[Dict[str, Any]],
+    max_items: int,
+    items_per_page: int,
+    batch_size: int,
+    target_page_latency: Optional[float] = None,
+) -> None:
+    """Fetch the remaining pages of every collection but the first one.
+
+    Collections are paginated level by level: top-level collections first, then
+    the collections nested in their aggregated nodes, and so on. The next pages
+    of up to `batch_size` collections are fetched by one request, each as an
+    aliased copy of the path to the collection, so many nested collections
+    take a few round trips rather than one each.
+
+    Args:
+        api: The W&B API client.
+        result_dict: The aggregated response, modified in place.
+        first_path: Response path of the collection paginated separately.
+        query_ast: The parsed query the response was fetched with.
+        connections: Top-level collections of the query.
+        variables: Variables of the query.
+        max_items: Maximum number of items to aggregate for each collection.
+        items_per_page: Number of items to request per page.
+        batch_size: Maximum number of collections fetched by one request.
+        target_page_latency: Seconds each request should take, sizing the pages
+            of each collection field automatically instead of using
+            `items_per_page`.
+    """
+    operation = _first_operation(query_ast)
+    tuners: Dict[Tuple[str, ...], PageSizeTuner] = {}
+
+    def batch_page_size(state: _ConnectionState, batch: List[_ConnectionState]) -> int:
+        if target_page_latency is None:
+            return items_per_page
+        path = state.connection.path
+        if path not in tuners:
+            tuners[path] = _page_size_tuner(query_ast, path, target_page_latency)
+        # The tuned size is shared by the collections of a field in one request
+        same_field = sum(1 for other in batch if other.connection.path == path)
+        return max(1, tuners[path].page_size // same_field)
+
+    states = []
+    for connection in connections:
+        state = _connection_state(
+            connection,
+            get_nested_value(result_dict, list(connection.path)),
+            (),
+            max_items,
+        )
+        if state is not None:
+            # The first collection already went through its own pagination
+            state.done = state.done or connection.path == first_path
+            states.append(state)
+
+    requests = 0
+    while states:
+        pending = [state for state in states if not state.done]
+        while pending:
+            batch = pending[:batch_size]
+            aliases, fields = [], []
+            for index, state in enumerate(batch):
+                alias = f"page{index}"
+                page_size = min(
+                    batch_page_size(state, batch),
+                    max_items - len(state.data["edges"]),
+                )
+                root_field = _next_page_field(operation, state, alias, page_size)
+                if root_field is None:
+                    state.done = True
+                    continue
+                aliases.append((alias, state))
+                fields.append(root_field)
+            if fields:
+                document, used_variables = _next_pages_document(
+                    query_ast, operation, fields
+                )
+                page_vars = {
+                    key: value
+                    for key, value in (variables or {}).items()
+                    if key in used_variables
+                }
+                requests += 1
+                start = time.perf_counter()
+                try:
+                    response = api.client.execute(
+                        gql(gql_printer.print_ast(document)), variable_values=page_vars
+                    )
+                except Exception as e:
+                    logger.warning(
+                        f"Failed to fetch the next pages of {len(fields)} "
+                        f"collections: {e}"
+                    )
+                    response = {"errors": [{"message": str(e)}]}
+                if "errors" in response:
+                    for _, state in aliases:
+                        state.done = True
+                else:
+                    pages = [
+                        (state, _extract_next_page(response, state, alias))
+                        for alias, state in aliases
+                    ]
+                    if tuners:
+                        _observe_batch(tuners, pages, time.perf_counter() - start)
+                    for state, page in pages:
+                        _merge_next_page(state, page, max_items)
+            pending = [state for state in states if not state.done]
+        states = [
+            nested
+            for state in states
+            for nested in _nested_connection_states(state, max_items)
+        ]
+    logger.info(f"Paginated the other collections with {requests} batched requests.")
+
+
+def _page_size_tuner(
+    query_ast: Optional[gql_ast.DocumentNode],
+    path: Optional[Tuple[str, ...]],
+    target_latency: float,
+) -> PageSizeTuner:
+    """Create a page size tuner seeded with the estimated size of a collection's nodes.
+
+    Args:
+        query_ast: The parsed query.
+        path: Response path of the collection.
+        target_latency: Seconds each request should take.
+    """
+    selection_set = None
+    fragments = {}
+    operation = _first_operation(query_ast) if query_ast is not None else None
+    if operation is not None and path is not None:
+        fragments = {
+            definition.name.value: definition
+            for definition in query_ast.definitions
+            if isinstance(definition, gql_ast.FragmentDefinitionNode)
+        }
+        selection_set = operation.selection_set
+        for key in tuple(path) + ("edges", "node"):
+            node = _find_field(selection_set, key)
+            selection_set = node.selection_set if node is not None else None
+    return PageSizeTuner(
+        estimate_node_bytes(selection_set, fragments), target_latency=target_latency
+    )
+
+
+def _observe_batch(
+    tuners: Dict[Tuple[str, ...], PageSizeTuner],
+    pages: List[Tuple[_ConnectionState, Optional[Dict[str, Any]]]],
+    seconds: float,
+) -> None:
+    """Update the tuners of the collection fields fetched by one request.
+
+    The request's latency is split between the fields by their share of the
+    response size.
+    """
+    observed: Dict[Tuple[str, ...], List[int]] = {}
+    for state, page in pages:
+        edges = page.get("edges") if isinstance(page, dict) else None
+        if not isinstance(edges, list):
+            continue
+        nodes_and_bytes = observed.setdefault(state.connection.path, [0, 0])
+        nodes_and_bytes[0] += len(edges)
+        nodes_and_bytes[1] += payload_bytes(edges)
+    total_bytes = sum(size for _, size in observed.values()) or 1
+    for path, (nodes, size) in observed.items():
+        if path in tuners:
+            tuners[path].observe(nodes, size, seconds * size / total_bytes)
+
+
+def _replace_node(node: gql_ast.Node, **changes: Any) -> gql_ast.Node:
+    """Return a copy of an AST node with some fields replaced.
+
+    Nodes are frozen in recent graphql-core versions, so visitors return
+    modified copies instead of assigning to them.
+    """
+    fields = {key: getattr(node, key) for key in node.keys}
+    fields.update(changes)
+    return type(node)(**fields)
 
 
 class AddPaginationArgsVisitor(gql_visitor.Visitor):
@@ -954,7 +1773,7 @@ class AddPaginationArgsVisitor(gql_visitor.Visitor):
                 )
                 args_changed = True
             if args_changed:
-                node.arguments = tuple(existing_args)
+                return _replace_node(node, arguments=tuple(existing_args))
 
     def leave_field(self, node, key, parent, path, ancestors):
         if self.current_path:
@@ -993,6 +1812,52 @@ class AddPaginationArgsVisitor(gql_visitor.Visitor):
                 )
             )
             defs_changed = True
-        if defs_changed:
-            node.variable_definitions = tuple(new_defs_list)
         self.modified_operation = True
+        if defs_changed:
+            return _replace_node(node, variable_definitions=tuple(new_defs_list))
+
+
+class AddEdgeCursorVisitor(gql_visitor.Visitor):
+    """Adds the `cursor` field to the edges of the given connections"""
+
+    def __init__(self, connections):
+        super().__init__()
+        self.edge_paths = set(
+            connection.path + ("edges",) for connection in connections
+        )
+        self.injected_paths = []
+        self.current_path = []
+
+    def enter_field(self, node, key, parent, path, ancestors):
+        self.current_path.append(_response_key(node))
+        current_path_tuple = tuple(self.current_path)
+        if current_path_tuple in self.edge_paths and node.selection_set is not None:
+            if _find_field(node.selection_set, "cursor") is None:
+                self.injected_paths.append(current_path_tuple)
+                cursor_field = gql_ast.FieldNode(name=gql_ast.NameNode(value="cursor"))
+                return _replace_node(
+                    node,
+                    selection_set=_replace_node(
+                        node.selection_set,
+                        selections=(*node.selection_set.selections, cursor_field),
+                    ),
+                )
+
+    def leave_field(self, node, key, parent, path, ancestors):
+        if self.current_path:
+            self.current_path.pop()
+
+
+class _ReferenceCollector(gql_visitor.Visitor):
+    """Collects the variables and fragments referenced by the visited nodes"""
+
+    def __init__(self):
+        super().__init__()
+        self.variables = set()
+        self.fragments = set()
+
+    def enter_variable(self, node, key, parent, path, ancestors):
+        self.variables.add(node.name.value)
+
+    def enter_fragment_spread(self, node, key, parent, path, ancestors):
+        self.fragments.add(node.name.value)
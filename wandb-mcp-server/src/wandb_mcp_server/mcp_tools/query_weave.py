@@ -1,12 +1,28 @@
+import os
 from typing import Any, Dict, List, Optional
 
 from wandb_mcp_server.utils import get_rich_logger
+from wandb_mcp_server.weave_api.cache import TraceCache
+from wandb_mcp_server.weave_api.query_builder import QueryBuilder
+from wandb_mcp_server.weave_api.result_cache import (
+    canonical_request_key,
+    get_result_cache,
+)
 from wandb_mcp_server.weave_api.service import TraceService
 from wandb_mcp_server.weave_api.models import QueryResult
 
 logger = get_rich_logger(__name__)
 
-_trace_service = TraceService()
+# Set WANDB_MCP_TRACE_CACHE to a SQLite file path to cache traces locally
+_trace_cache_path = os.environ.get("WANDB_MCP_TRACE_CACHE")
+_trace_service = TraceService(
+    cache=TraceCache(_trace_cache_path) if _trace_cache_path else None
+)
+
+
+async def close_trace_service() -> None:
+    """Close the async connections of the shared trace service on this loop."""
+    await _trace_service.aclose()
 
 QUERY_WEAVE_TRACES_TOOL_DESCRIPTION = """
 Query Weave traces, trace metadata, and trace costs with filtering and sorting options.
@@ -87,9 +103,8 @@ inform more targeted weave trace queries from the user. in the extreme you can s
 only return keys but not the values of the trace data.
 
 - return only the metadata for all the traces (set `metadata_only = True`) if the query doesn't need to know anything
-about the structure or content of the individual weave traces. Note that this still requires
-requesting all the raw traces data from the weave API so can still result in a lot of data and/or a
-lot of calls being made to the weave API.
+about the structure or content of the individual weave traces. Metadata is computed from a few lightweight
+columns per trace, so this is much cheaper than returning the trace data itself.
 
 - return only the columns needed using the `columns` parameter. In weave, the `inputs` and `output` columns of a
 trace can contain a lot of data, so avoiding returning these columns can help. Note you have to explicitly specify
@@ -99,7 +114,8 @@ specficy the columns needed.
 <returning_metadata_only>
 
 If `metadata_only = True` this returns only metadata of the traces such as trace counts, token counts,
-trace types, time range, status counts and distribution of op names. if `metadata_only = False` the
+trace types, time range, status counts and distribution of op names. In this mode token counts are
+estimated from the stored size of the traces rather than counted exactly. if `metadata_only = False` the
 trace data is returned either in full or truncated to `truncate_length` characters depending if
 `return_full_data = True` or `False` respectively.
 </returning_metadata_only>
@@ -240,6 +256,12 @@ return_full_data : bool, optional
 `False` returns truncation_length = 0, no values for the column keys are returned. Defaults to True.
 metadata_only : bool, optional
     Return only metadata without traces. Defaults to False
+max_response_tokens : int, optional
+    Total token budget for the returned traces when `return_full_data` is False. If the truncated traces \
+are still larger, the longest strings across all traces are shortened further until they fit. Defaults to None.
+bypass_cache : bool, optional
+    Identical queries made within the last minute are answered from an in-memory cache. Set to True to \
+fetch fresh traces, e.g. when new traces are expected. Defaults to False.
 
 Returns
 -------
@@ -328,7 +350,7 @@ def query_traces(
 
     # Match the return type of the original function (List[Dict])
     if result.traces:
-        # Convert WeaveTrace objects to dictionaries if needed
+        # Convert TraceViews and WeaveTrace objects to dictionaries if needed
         traces_as_dicts = []
         for trace in result.traces:
             if hasattr(trace, "model_dump"):
@@ -369,6 +391,10 @@ async def query_paginated_weave_traces(
     api_key: Optional[str] = None,
     retries: int = 3,
     debug_raw_traces: bool = False,
+    token_counting: str = "exact",
+    keyset: bool = False,
+    max_response_tokens: Optional[int] = None,
+    bypass_cache: bool = False,
 ) -> QueryResult:
     """
     Query Weave traces with pagination and return results as a Pydantic model.
@@ -405,6 +431,11 @@ async def query_paginated_weave_traces(
         api_key: Optional API key to use for authentication.
         retries: Number of retry attempts for API calls.
         debug_raw_traces: Include raw traces in the response for debugging.
+        token_counting: Token counting mode for the metadata ('exact', 'estimate' or 'none').
+        keyset: Page with a (started_at, id) cursor instead of offsets, when sorting by started_at.
+        max_response_tokens: Total token budget for the truncated traces.
+        bypass_cache: Skip the in-process result cache and query the server,
+            refreshing the cached result.
 
     Returns:
         QueryResult: A Pydantic model containing the query results
@@ -417,22 +448,57 @@ async def query_paginated_weave_traces(
             retries=retries,
         )
 
-    # Query traces with pagination
-    result = service.query_paginated_traces(
-        entity_name=entity_name,
-        project_name=project_name,
-        chunk_size=chunk_size,
-        filters=filters,
+    # Identical requests within the cache TTL are served from memory
+    request_body = QueryBuilder.prepare_query_params(
+        {
+            "entity_name": entity_name,
+            "project_name": project_name,
+            "filters": filters,
+            "sort_by": sort_by,
+            "sort_direction": sort_direction,
+            "limit": target_limit,
+            "include_costs": include_costs,
+            "include_feedback": include_feedback,
+            "columns": columns,
+            "expand_columns": expand_columns,
+        }
+    )
+    cache_key = canonical_request_key(
+        request_body,
+        # Cost sorts are applied locally, so they are not in the request body
         sort_by=sort_by,
         sort_direction=sort_direction,
-        target_limit=target_limit,
-        include_costs=include_costs,
-        include_feedback=include_feedback,
-        columns=columns,
-        expand_columns=expand_columns,
         truncate_length=truncate_length,
         return_full_data=return_full_data,
         metadata_only=metadata_only,
+        token_counting=token_counting,
+        max_response_tokens=max_response_tokens,
+        api_key=api_key,
+    )
+
+    # Query traces with pagination without blocking the event loop
+    result = await get_result_cache().aget_or_compute(
+        cache_key,
+        lambda: service.aquery_paginated_traces(
+            entity_name=entity_name,
+            project_name=project_name,
+            chunk_size=chunk_size,
+            filters=filters,
+            sort_by=sort_by,
+            sort_direction=sort_direction,
+            target_limit=target_limit,
+            include_costs=include_costs,
+            include_feedback=include_feedback,
+            columns=columns,
+            expand_columns=expand_columns,
+            truncate_length=truncate_length,
+            return_full_data=return_full_data,
+            metadata_only=metadata_only,
+            token_counting=token_counting,
+            keyset=keyset,
+            max_response_tokens=max_response_tokens,
+        ),
+        bypass=bypass_cache,
     )
 
     # Add raw traces for debugging if requested
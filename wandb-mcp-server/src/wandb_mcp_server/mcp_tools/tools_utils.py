@@ -1,7 +1,10 @@
 import inspect
+import os
 import re
+import threading
 from typing import Any, Callable, Dict, Type, Union, Tuple, Optional
 import requests
+import wandb
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -321,4 +324,35 @@ def get_retry_session(
     adapter = HTTPAdapter(max_retries=retry_strategy)
     session.mount("https://", adapter)
     session.mount("http://", adapter)
-    return session
\ No newline at end of file
+    return session
+
+
+_api_pool: Dict[Tuple[Optional[str], Optional[str]], "wandb.Api"] = {}
+_api_pool_lock = threading.Lock()
+
+
+def wandb_credentials_key() -> Tuple[Optional[str], Optional[str]]:
+    """Return the API key and base URL that W&B API clients are created with."""
+    return os.environ.get("WANDB_API_KEY"), os.environ.get("WANDB_BASE_URL")
+
+
+def get_wandb_api() -> "wandb.Api":
+    """Return a shared W&B API client for the current credentials.
+
+    Clients are kept per API key and base URL, so tool calls reuse the client's
+    session and cached lookups such as `viewer` instead of constructing a new
+    one every time.
+    """
+    key = wandb_credentials_key()
+    with _api_pool_lock:
+        api = _api_pool.get(key)
+        if api is None:
+            api = wandb.Api()
+            _api_pool[key] = api
+        return api
+
+
+def clear_wandb_api_pool() -> None:
+    """Drop all shared W&B API clients."""
+    with _api_pool_lock:
+        _api_pool.clear()
@@ -8,8 +8,9 @@ import json
 import logging
 import os
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 import asyncio
 import signal
 import atexit
@@ -28,9 +29,13 @@ from wandb_mcp_server.mcp_tools.create_report import (
     CREATE_WANDB_REPORT_TOOL_DESCRIPTION,
     create_report,
 )
+from wandb_mcp_server.mcp_tools.export_weave import (
+    EXPORT_WEAVE_TRACES_TOOL_DESCRIPTION,
+    export_weave_traces,
+)
 from wandb_mcp_server.mcp_tools.count_traces import (
     COUNT_WEAVE_TRACES_TOOL_DESCRIPTION,
-    count_traces,
+    count_traces_multi,
 )
 from wandb_mcp_server.mcp_tools.query_wandb_gql import (
     QUERY_WANDB_GQL_TOOL_DESCRIPTION,
@@ -42,6 +47,7 @@ from wandb_mcp_server.mcp_tools.query_wandbot import (
 )
 from wandb_mcp_server.mcp_tools.query_weave import (
     QUERY_WEAVE_TRACES_TOOL_DESCRIPTION,
+    close_trace_service,
     query_paginated_weave_traces,
 )
 from wandb_mcp_server.utils import get_rich_logger, get_server_args
@@ -66,8 +72,18 @@ logger = get_rich_logger(
     "weave-mcp-server", default_level_str="WARNING", env_var_name="MCP_SERVER_LOG_LEVEL"
 )
 
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Close the pooled Weave connections when the server shuts down."""
+    try:
+        yield
+    finally:
+        await close_trace_service()
+
+
 # Create an MCP server using FastMCP
-mcp = FastMCP("weave-mcp-server")
+mcp = FastMCP("weave-mcp-server", lifespan=lifespan)
 
 # --------------- MCP TOOLS ---------------
 
@@ -87,6 +103,8 @@ async def query_weave_traces_tool(
     truncate_length: int = 200,
     return_full_data: bool = False,
     metadata_only: bool = False,
+    max_response_tokens: Optional[int] = None,
+    bypass_cache: bool = False,
 ) -> str:
     try:
         # Use paginated query with chunks of 20
@@ -105,6 +123,10 @@ async def query_weave_traces_tool(
             truncate_length=truncate_length,
             return_full_data=return_full_data,
             metadata_only=metadata_only,
+            # Exact token counts are not worth tokenizing every payload for an overview
+            token_counting="estimate" if metadata_only else "exact",
+            max_response_tokens=max_response_tokens,
+            bypass_cache=bypass_cache,
         )
         json_output_string = result_model.model_dump_json()
 
@@ -115,28 +137,70 @@ async def query_weave_traces_tool(
         raise e
 
 
-@mcp.tool(description=COUNT_WEAVE_TRACES_TOOL_DESCRIPTION)
-async def count_weave_traces_tool(
-    entity_name: str, project_name: str, filters: Optional[Dict[str, Any]] = None
+@mcp.tool(description=EXPORT_WEAVE_TRACES_TOOL_DESCRIPTION)
+async def export_weave_traces_tool(
+    entity_name: str,
+    project_name: str,
+    path: Optional[str] = None,
+    format: str = "ndjson",
+    filters: Optional[Dict[str, Any]] = None,
+    sort_by: str = "started_at",
+    sort_direction: str = "desc",
+    limit: Optional[int] = None,
+    include_costs: bool = True,
+    include_feedback: bool = True,
+    columns: Optional[List[str]] = None,
 ) -> str:
     try:
-        # Call the synchronous count_traces function
-        total_count = count_traces(
-            entity_name=entity_name, project_name=project_name, filters=filters or {}
+        export_result = await export_weave_traces(
+            entity_name=entity_name,
+            project_name=project_name,
+            path=path,
+            format=format,
+            filters=filters,
+            sort_by=sort_by,
+            sort_direction=sort_direction,
+            limit=limit,
+            include_costs=include_costs,
+            include_feedback=include_feedback,
+            columns=columns,
         )
+        return export_result.model_dump_json()
 
-        # Create a copy of filters and ensure trace_roots_only is True
-        root_filters = filters.copy() if filters else {}
-        root_filters["trace_roots_only"] = True
-        root_traces_count = count_traces(
+    except Exception as e:
+        logger.error(f"Error in export_weave_traces_tool: {e}", exc_info=True)
+        raise e
+
+
+@mcp.tool(description=COUNT_WEAVE_TRACES_TOOL_DESCRIPTION)
+async def count_weave_traces_tool(
+    entity_name: str,
+    project_name: str,
+    filters: Optional[Dict[str, Any]] = None,
+    group_by: Optional[List[str]] = None,
+    bypass_cache: bool = False,
+) -> str:
+    try:
+        # Count total and root traces (and any groups) concurrently in a worker thread
+        result = await asyncio.to_thread(
+            count_traces_multi,
             entity_name=entity_name,
             project_name=project_name,
-            filters=root_filters,
+            filters=filters,
+            variants={
+                "total_count": {},
+                "root_traces_count": {"trace_roots_only": True},
+            },
+            group_by=group_by,
+            bypass_cache=bypass_cache,
         )
 
-        return json.dumps(
-            {"total_count": total_count, "root_traces_count": root_traces_count}
-        )
+        output: Dict[str, Any] = dict(result["counts"])
+        if group_by:
+            output["group_counts"] = result["group_counts"]
+        if result["group_sample_sizes"]:
+            output["group_sample_sizes"] = result["group_sample_sizes"]
+        return json.dumps(output)
 
     except Exception as e:
         logger.error(f"Error calling tool: {e}")
@@ -148,9 +212,12 @@ async def query_wandb_tool(
     query: str,
     variables: Optional[Dict[str, Any]] = None,
     max_items: int = 100,
-    items_per_page: int = 20,
+    items_per_page: Optional[int] = None,
+    bypass_cache: bool = False,
 ) -> Dict[str, Any]:
-    gql_result = query_paginated_wandb_gql(query, variables, max_items, items_per_page)
+    gql_result = query_paginated_wandb_gql(
+        query, variables, max_items, items_per_page, bypass_cache=bypass_cache
+    )
 
     return gql_result
 
@@ -216,65 +216,21 @@ def get_server_args():
 
 
 def merge_metadata(metadata_list: List[Dict]) -> Dict:
-    """Merge metadata from multiple query results."""
+    """Merge metadata from multiple query results.
+
+    Delegates to `MetadataAccumulator`, which should be preferred when the
+    partial results are still available as accumulators.
+    """
+    # Imported here as the weave_api modules import their logger from this module
+    from wandb_mcp_server.weave_api.processors import MetadataAccumulator
+
     if not metadata_list:
         return {}
 
-    merged = {
-        "total_traces": 0,
-        "token_counts": {
-            "total_tokens": 0,
-            "input_tokens": 0,
-            "output_tokens": 0,
-            "average_tokens_per_trace": 0,
-        },
-        "time_range": {"earliest": None, "latest": None},
-        "status_summary": {"success": 0, "error": 0, "other": 0},
-        "op_distribution": {},
-    }
-
+    merged = MetadataAccumulator()
     for metadata in metadata_list:
-        # Sum up trace counts
-        merged["total_traces"] += metadata.get("total_traces", 0)
-
-        # Sum up token counts
-        token_counts = metadata.get("token_counts", {})
-        merged["token_counts"]["total_tokens"] += token_counts.get("total_tokens", 0)
-        merged["token_counts"]["input_tokens"] += token_counts.get("input_tokens", 0)
-        merged["token_counts"]["output_tokens"] += token_counts.get("output_tokens", 0)
-
-        # Update time range
-        time_range = metadata.get("time_range", {})
-        if time_range.get("earliest"):
-            if (
-                not merged["time_range"]["earliest"]
-                or time_range["earliest"] < merged["time_range"]["earliest"]
-            ):
-                merged["time_range"]["earliest"] = time_range["earliest"]
-        if time_range.get("latest"):
-            if (
-                not merged["time_range"]["latest"]
-                or time_range["latest"] > merged["time_range"]["latest"]
-            ):
-                merged["time_range"]["latest"] = time_range["latest"]
-
-        # Sum up status counts
-        status_summary = metadata.get("status_summary", {})
-        merged["status_summary"]["success"] += status_summary.get("success", 0)
-        merged["status_summary"]["error"] += status_summary.get("error", 0)
-        merged["status_summary"]["other"] += status_summary.get("other", 0)
-
-        # Merge op distributions
-        for op, count in metadata.get("op_distribution", {}).items():
-            merged["op_distribution"][op] = merged["op_distribution"].get(op, 0) + count
-
-    # Calculate average tokens per trace
-    if merged["total_traces"] > 0:
-        merged["token_counts"]["average_tokens_per_trace"] = (
-            merged["token_counts"]["total_tokens"] / merged["total_traces"]
-        )
-
-    return merged
+        merged.merge(MetadataAccumulator.from_metadata(metadata))
+    return merged.to_metadata().model_dump()
 
 
 def get_git_commit():
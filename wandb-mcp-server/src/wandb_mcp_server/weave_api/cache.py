@@ -0,0 +1,654 @@
+"""
+Local persistent cache for Weave traces.
+
+Finished calls are immutable, so `TraceCache` keeps them in a SQLite database
+keyed by `(project_id, id)` and only fetches what changed since the last
+sync: calls started after a per-project high-water mark on `started_at`, and
+calls that were still running when they were cached. Each project caches a
+single window of `started_at`, from the earliest time queried (a bounded
+default when a query has none) up to now. Queries whose filters can be
+evaluated locally are then answered from the database, by evaluating the
+request body built by `QueryBuilder` against the cached rows.
+"""
+
+import json
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from wandb_mcp_server.utils import get_rich_logger
+from wandb_mcp_server.weave_api.client import WeaveApiClient
+from wandb_mcp_server.weave_api.decoders import get_decoder
+from wandb_mcp_server.weave_api.query_builder import QueryBuilder
+
+logger = get_rich_logger(__name__)
+
+# Fields compared as epoch seconds, as the query expressions built by QueryBuilder do
+TIMESTAMP_FIELDS = {"started_at", "ended_at", "deleted_at"}
+
+# CallsFilter keys that can be evaluated locally
+LOCAL_FILTER_KEYS = {
+    "trace_roots_only",
+    "op_names",
+    "trace_ids",
+    "parent_ids",
+    "call_ids",
+    "wb_user_ids",
+    "wb_run_ids",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    project_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    started_at REAL,
+    ended_at TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (project_id, id)
+);
+CREATE INDEX IF NOT EXISTS calls_started_at ON calls (project_id, started_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    project_id TEXT PRIMARY KEY,
+    synced_from REAL NOT NULL,
+    high_water_mark REAL,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+class UnsupportedQueryError(ValueError):
+    """Raised when a request can't be evaluated against the local cache."""
+
+
+def _epoch_seconds(value: Any) -> Optional[float]:
+    if isinstance(value, str):
+        return QueryBuilder.datetime_to_epoch_seconds(value)
+    if isinstance(value, datetime):
+        return QueryBuilder.datetime_to_epoch_seconds(value.isoformat())
+    return value
+
+
+def _isoformat(epoch_seconds: float) -> str:
+    return datetime.fromtimestamp(epoch_seconds, tz=timezone.utc).isoformat()
+
+
+def _get_field(trace: Dict[str, Any], path: str) -> Any:
+    """Resolve a dotted field path, comparing timestamps as epoch seconds."""
+    if path in TIMESTAMP_FIELDS:
+        return _epoch_seconds(trace.get(path))
+    value: Any = trace
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _compare(left: Any, right: Any, compare: Callable[[Any, Any], bool]) -> bool:
+    if left is None or right is None:
+        return False
+    try:
+        return compare(left, right)
+    except TypeError:
+        return False
+
+
+def _compile_operand(operand: Dict[str, Any]) -> Callable[[Dict[str, Any]], Any]:
+    """Compile a value-producing expression ($getField, $literal, $convert)."""
+    if not isinstance(operand, dict) or len(operand) != 1:
+        raise UnsupportedQueryError(f"Unsupported operand: {operand}")
+    op, arg = next(iter(operand.items()))
+
+    if op == "$getField":
+        return lambda trace: _get_field(trace, arg)
+    if op == "$literal":
+        return lambda trace: arg
+    if op == "$convert" and arg.get("to") in ("double", "int"):
+        input_value = _compile_operand(arg["input"])
+
+        def convert(trace: Dict[str, Any]) -> Optional[float]:
+            try:
+                return float(input_value(trace))
+            except (TypeError, ValueError):
+                return None
+
+        return convert
+    raise UnsupportedQueryError(f"Unsupported operand: {op}")
+
+
+def _compile_expression(expr: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
+    """Compile a boolean Weave query expression into a predicate."""
+    if not isinstance(expr, dict) or len(expr) != 1:
+        raise UnsupportedQueryError(f"Unsupported expression: {expr}")
+    op, arg = next(iter(expr.items()))
+
+    if op in ("$and", "$or", "$not"):
+        predicates = [_compile_expression(e) for e in arg]
+        if op == "$and":
+            return lambda trace: all(p(trace) for p in predicates)
+        if op == "$or":
+            return lambda trace: any(p(trace) for p in predicates)
+        return lambda trace: not predicates[0](trace)
+
+    if op in ("$eq", "$gt", "$gte"):
+        left, right = (_compile_operand(operand) for operand in arg)
+        if op == "$eq":
+            return lambda trace: left(trace) == right(trace)
+        if op == "$gt":
+            return lambda trace: _compare(left(trace), right(trace), lambda a, b: a > b)
+        return lambda trace: _compare(left(trace), right(trace), lambda a, b: a >= b)
+
+    if op == "$contains":
+        input_value = _compile_operand(arg["input"])
+        substr = _compile_operand(arg["substr"])
+        case_insensitive = arg.get("case_insensitive", False)
+
+        def contains(trace: Dict[str, Any]) -> bool:
+            value, needle = input_value(trace), substr(trace)
+            if not isinstance(value, str) or not isinstance(needle, str):
+                return False
+            if case_insensitive:
+                return needle.lower() in value.lower()
+            return needle in value
+
+        return contains
+
+    raise UnsupportedQueryError(f"Unsupported operator: {op}")
+
+
+def _op_name_matcher(op_names: List[str]) -> Callable[[Optional[str]], bool]:
+    # Op refs ending in ':*' match every version of the op
+    exact = {name for name in op_names if not name.endswith(":*")}
+    prefixes = tuple(name[:-1] for name in op_names if name.endswith(":*"))
+    return lambda op_name: op_name is not None and (
+        op_name in exact or (bool(prefixes) and op_name.startswith(prefixes))
+    )
+
+
+def compile_request(request_body: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
+    """Compile the `filter` and `query` of a prepared request into a predicate.
+
+    Args:
+        request_body: Request body from `QueryBuilder.prepare_query_params`.
+
+    Returns:
+        Function returning True for the traces the server would return.
+
+    Raises:
+        UnsupportedQueryError: If the request uses filters or operators that
+            can't be evaluated locally.
+    """
+    predicates: List[Callable[[Dict[str, Any]], bool]] = []
+    calls_filter = request_body.get("filter") or {}
+
+    unsupported = set(calls_filter) - LOCAL_FILTER_KEYS
+    if unsupported:
+        raise UnsupportedQueryError(f"Unsupported filter keys: {sorted(unsupported)}")
+
+    if calls_filter.get("trace_roots_only"):
+        predicates.append(lambda trace: trace.get("parent_id") is None)
+    if "op_names" in calls_filter:
+        matches_op = _op_name_matcher(calls_filter["op_names"])
+        predicates.append(lambda trace: matches_op(trace.get("op_name")))
+    for key, field in (
+        ("trace_ids", "trace_id"),
+        ("parent_ids", "parent_id"),
+        ("call_ids", "id"),
+        ("wb_user_ids", "wb_user_id"),
+        ("wb_run_ids", "wb_run_id"),
+    ):
+        if key in calls_filter:
+            values = set(calls_filter[key])
+            predicates.append(
+                lambda trace, values=values, field=field: trace.get(field) in values
+            )
+
+    query = request_body.get("query")
+    if query:
+        predicates.append(_compile_expression(query["$expr"]))
+
+    return lambda trace: all(p(trace) for p in predicates)
+
+
+def time_range_bounds(
+    filters: Optional[Dict[str, Any]],
+) -> tuple[Optional[float], Optional[float]]:
+    """Return the `started_at` bounds of a filter's time range as epoch seconds."""
+    time_range = (filters or {}).get("time_range") or {}
+    start = time_range.get("start")
+    end = time_range.get("end")
+    return (
+        QueryBuilder.datetime_to_epoch_seconds(start) if start else None,
+        QueryBuilder.datetime_to_epoch_seconds(end) if end else None,
+    )
+
+
+class TraceCache:
+    """SQLite-backed cache of Weave calls with incremental, per-project sync."""
+
+    DEFAULT_PATH = Path.home() / ".cache" / "wandb_mcp_server" / "traces.sqlite"
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        lookback_seconds: float = 300.0,
+        sync_interval: float = 60.0,
+        default_window_seconds: float = 7 * 24 * 3600.0,
+        page_size: int = 10_000,
+        batch_size: int = 500,
+        call_ids_batch_size: int = 100,
+        json_decoder: Optional[str] = None,
+    ):
+        """Initialize the TraceCache.
+
+        Args:
+            path: SQLite database file. Defaults to DEFAULT_PATH.
+            lookback_seconds: Calls started up to this long before the high-water
+                mark are fetched again on each sync, to pick up calls that were
+                ingested late.
+            sync_interval: Minimum number of seconds between two syncs of a project.
+            default_window_seconds: How far back a sync without `since` reaches.
+            page_size: Number of calls requested per stream. Streams that return
+                a full page are continued from their offset, so this should not
+                exceed the server's row cap per stream.
+            batch_size: Number of calls written per transaction.
+            call_ids_batch_size: Maximum number of still-running call IDs
+                refreshed per request.
+            json_decoder: Decoder used for cached rows, see `get_decoder`.
+        """
+        self.path = Path(path).expanduser() if path else self.DEFAULT_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lookback_seconds = lookback_seconds
+        self.sync_interval = sync_interval
+        self.default_window_seconds = default_window_seconds
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.call_ids_batch_size = call_ids_batch_size
+        self.decode_json = get_decoder(json_decoder)
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection to the database."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get_state(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Return the sync state of a project, or None if it was never synced."""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT synced_from, high_water_mark, synced_at FROM sync_state "
+                "WHERE project_id = ?",
+                (project_id,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return {"synced_from": row[0], "high_water_mark": row[1], "synced_at": row[2]}
+
+    def covers(self, project_id: str, since: Optional[float]) -> bool:
+        """Whether every call started at or after `since` has been synced."""
+        state = self.get_state(project_id)
+        return state is not None and state["synced_from"] <= (since or 0.0)
+
+    def default_since(self, now: Optional[float] = None) -> float:
+        """Start of the window synced when no `since` is given, as epoch seconds."""
+        return (time.time() if now is None else now) - self.default_window_seconds
+
+    def upsert(
+        self, project_id: str, traces: Iterable[Dict[str, Any]]
+    ) -> Optional[float]:
+        """Insert or replace calls, committing every `batch_size` rows.
+
+        Returns:
+            The latest `started_at` written, as epoch seconds.
+        """
+        connection = self._connection()
+        latest = None
+        rows = []
+
+        def flush() -> None:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO calls (project_id, id, started_at, ended_at, data) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (project_id, id) DO UPDATE SET "
+                    "started_at = excluded.started_at, ended_at = excluded.ended_at, "
+                    "data = excluded.data",
+                    rows,
+                )
+            rows.clear()
+
+        for trace in traces:
+            started_at = _epoch_seconds(trace.get("started_at"))
+            if started_at is not None and (latest is None or started_at > latest):
+                latest = started_at
+            ended_at = trace.get("ended_at")
+            rows.append(
+                (
+                    project_id,
+                    trace["id"],
+                    started_at,
+                    None if ended_at is None else str(ended_at),
+                    json.dumps(trace, default=str),
+                )
+            )
+            if len(rows) >= self.batch_size:
+                flush()
+        if rows:
+            flush()
+        return latest
+
+    def running_call_ids(self, project_id: str, before: float) -> List[str]:
+        """IDs of cached calls started before `before` that had not ended."""
+        rows = self._connection().execute(
+            "SELECT id FROM calls WHERE project_id = ? AND ended_at IS NULL "
+            "AND started_at < ?",
+            (project_id, before),
+        )
+        return [row[0] for row in rows]
+
+    def purge(
+        self,
+        project_id: str,
+        keep_ids: Set[str],
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        call_ids: Optional[Iterable[str]] = None,
+    ) -> int:
+        """Delete cached calls of a synced range that the server no longer returns.
+
+        Args:
+            project_id: Project ID ('entity/project').
+            keep_ids: IDs the server returned for the range.
+            start: Inclusive lower bound on `started_at` of the range.
+            end: Exclusive upper bound on `started_at` of the range.
+            call_ids: Restrict the range to these IDs instead of a time window.
+
+        Returns:
+            Number of calls deleted.
+        """
+        connection = self._connection()
+        if call_ids is not None:
+            candidates: Iterable[str] = call_ids
+        else:
+            sql = "SELECT id FROM calls WHERE project_id = ? AND started_at >= ?"
+            args: List[Any] = [project_id, start or 0.0]
+            if end is not None:
+                sql += " AND started_at < ?"
+                args.append(end)
+            candidates = [row[0] for row in connection.execute(sql, args)]
+        deleted = [(project_id, id_) for id_ in candidates if id_ not in keep_ids]
+        if deleted:
+            with connection:
+                connection.executemany(
+                    "DELETE FROM calls WHERE project_id = ? AND id = ?", deleted
+                )
+        return len(deleted)
+
+    def _sync_window(
+        self,
+        client: WeaveApiClient,
+        entity_name: str,
+        project_name: str,
+        start: float,
+        end: Optional[float] = None,
+    ) -> Tuple[int, Optional[float]]:
+        """Fetch the calls started in a window, then purge the ones deleted since.
+
+        The window is requested in pages of `page_size` calls, so a stream
+        truncated at the server's row cap is continued from its offset. Nothing
+        is purged unless every page was read.
+
+        Args:
+            client: Client used to query the Weave API.
+            entity_name: Weights & Biases entity name.
+            project_name: Weights & Biases project name.
+            start: Inclusive lower bound on `started_at`, as epoch seconds.
+            end: Exclusive upper bound on `started_at`, or None for now.
+
+        Returns:
+            Number of calls fetched, and the latest `started_at` among them.
+        """
+        project_id = f"{entity_name}/{project_name}"
+        # The API compares time ranges in whole seconds
+        start = math.floor(start)
+        time_range = {"start": _isoformat(start)}
+        if end is not None:
+            end = math.ceil(end)
+            time_range["end"] = _isoformat(end)
+
+        seen_ids: Set[str] = set()
+        latest = None
+        offset = 0
+        while True:
+            received = 0
+
+            def counted(traces: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+                nonlocal received
+                for trace in traces:
+                    received += 1
+                    seen_ids.add(trace["id"])
+                    yield trace
+
+            request_body = QueryBuilder.prepare_query_params(
+                {
+                    "entity_name": entity_name,
+                    "project_name": project_name,
+                    "filters": {"time_range": time_range},
+                    "sort_by": "started_at",
+                    "sort_direction": "asc",
+                    "include_costs": True,
+                    "include_feedback": True,
+                    "limit": self.page_size,
+                    "offset": offset,
+                }
+            )
+            page_latest = self.upsert(
+                project_id, counted(client.query_traces(request_body))
+            )
+            if page_latest is not None:
+                latest = max(page_latest, latest or page_latest)
+            offset += received
+            if received < self.page_size:
+                break
+
+        purged = self.purge(project_id, seen_ids, start=start, end=end)
+        if purged:
+            logger.info(f"Purged {purged} calls deleted from {project_id}")
+        return offset, latest
+
+    def sync(
+        self,
+        client: WeaveApiClient,
+        entity_name: str,
+        project_name: str,
+        since: Optional[float] = None,
+    ) -> int:
+        """Bring the cached calls of a project up to date.
+
+        The first sync fetches every call started at or after `since`, or
+        `default_window_seconds` ago without it. A later `since` before the
+        synced range only fetches the missing calls before it. Other syncs only
+        fetch calls started after the high-water mark minus `lookback_seconds`,
+        plus the calls that were still running when they were cached. Cached
+        calls of the fetched windows that the server no longer returns were
+        deleted, and are removed.
+
+        The sync state only advances once every request finished, so a sync
+        that fails is started over the next time.
+
+        Args:
+            client: Client used to query the Weave API.
+            entity_name: Weights & Biases entity name.
+            project_name: Weights & Biases project name.
+            since: Earliest `started_at` the cache must cover, as epoch seconds.
+
+        Returns:
+            Number of calls fetched.
+        """
+        project_id = f"{entity_name}/{project_name}"
+
+        with self._sync_lock:
+            state = self.get_state(project_id)
+            now = time.time()
+            lower = self.default_since(now) if since is None else since
+            if state is not None and since is None:
+                # Without a range to cover, keep to the one already synced
+                lower = max(lower, state["synced_from"])
+
+            fetched = 0
+            latest = None
+            running_ids: List[str] = []
+            start = lower
+            if state is None:
+                synced_from = lower
+                fetched, latest = self._sync_window(
+                    client, entity_name, project_name, lower
+                )
+            else:
+                synced_from = min(lower, state["synced_from"])
+                if lower < state["synced_from"]:
+                    fetched, _ = self._sync_window(
+                        client, entity_name, project_name, lower, state["synced_from"]
+                    )
+                elif now - state["synced_at"] < self.sync_interval:
+                    return 0
+
+                start = state["synced_from"]
+                if state["high_water_mark"] is not None:
+                    start = max(start, state["high_water_mark"] - self.lookback_seconds)
+                running_ids = self.running_call_ids(project_id, before=start)
+                count, latest = self._sync_window(
+                    client, entity_name, project_name, start
+                )
+                fetched += count
+
+            for i in range(0, len(running_ids), self.call_ids_batch_size):
+                batch = running_ids[i : i + self.call_ids_batch_size]
+                returned: Set[str] = set()
+
+                def counted(
+                    traces: Iterable[Dict[str, Any]],
+                ) -> Iterator[Dict[str, Any]]:
+                    for trace in traces:
+                        returned.add(trace["id"])
+                        yield trace
+
+                request_body = QueryBuilder.prepare_query_params(
+                    {
+                        "entity_name": entity_name,
+                        "project_name": project_name,
+                        "filters": {"call_ids": batch},
+                        "include_costs": True,
+                        "include_feedback": True,
+                    }
+                )
+                self.upsert(project_id, counted(client.query_traces(request_body)))
+                fetched += len(returned)
+                self.purge(project_id, returned, call_ids=batch)
+
+            high_water_mark = state["high_water_mark"] if state else None
+            if latest is not None:
+                high_water_mark = max(latest, high_water_mark or latest)
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO sync_state "
+                    "(project_id, synced_from, high_water_mark, synced_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (project_id, synced_from, high_water_mark, now),
+                )
+
+        logger.info(
+            f"Synced {fetched} calls for {project_id} from {start}, "
+            f"{len(running_ids)} still running"
+        )
+        return fetched
+
+    def iter_traces(
+        self,
+        project_id: str,
+        predicate: Callable[[Dict[str, Any]], bool],
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        sort_by: str = "started_at",
+        sort_direction: str = "desc",
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield the cached calls of a project matching a predicate, sorted.
+
+        The `started_at` bounds and sort are applied in SQLite. Other sort
+        fields are sorted in memory after filtering.
+
+        Args:
+            project_id: Project ID ('entity/project').
+            predicate: Filter from `compile_request`.
+            since: Inclusive lower bound on `started_at`, as epoch seconds.
+            until: Exclusive upper bound on `started_at`, as epoch seconds.
+            sort_by: Field to sort by, dotted paths are supported.
+            sort_direction: Sort direction ('asc' or 'desc').
+            limit: Maximum number of calls to yield.
+
+        Yields:
+            Decoded trace dictionaries.
+        """
+        descending = sort_direction == "desc"
+        sql = "SELECT data FROM calls WHERE project_id = ?"
+        args: List[Any] = [project_id]
+        if since is not None:
+            sql += " AND started_at >= ?"
+            args.append(since)
+        if until is not None:
+            sql += " AND started_at < ?"
+            args.append(until)
+        if sort_by == "started_at":
+            order = "DESC" if descending else "ASC"
+            sql += f" ORDER BY started_at {order}, id {order}"
+
+        rows = self._connection().execute(sql, args)
+        matching = (
+            trace
+            for trace in (self.decode_json(row[0]) for row in rows)
+            if predicate(trace)
+        )
+
+        if sort_by != "started_at":
+            traces = list(matching)
+            with_value = [t for t in traces if _get_field(t, sort_by) is not None]
+            without_value = [t for t in traces if _get_field(t, sort_by) is None]
+            try:
+                with_value.sort(
+                    key=lambda t: _get_field(t, sort_by), reverse=descending
+                )
+            except TypeError:
+                with_value.sort(
+                    key=lambda t: str(_get_field(t, sort_by)), reverse=descending
+                )
+            matching = iter(with_value + without_value)
+
+        for count, trace in enumerate(matching):
+            if limit is not None and count >= limit:
+                break
+            yield trace
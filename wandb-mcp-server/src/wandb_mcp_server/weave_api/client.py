@@ -5,18 +5,131 @@ This module provides a client for interacting with the Weights & Biases Weave AP
 It handles authentication, request construction, and response parsing.
 """
 
+import asyncio
 import base64
 import json
+import logging
 import os
-from typing import Any, Dict, Iterator, Optional
+import random
+import time
+import weakref
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 
+import httpx
 import requests
-from requests.exceptions import RetryError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ChunkedEncodingError, RetryError
+from urllib3.util.retry import Retry
 
 from wandb_mcp_server.utils import get_rich_logger
+from wandb_mcp_server.weave_api.decoders import get_decoder
 
 logger = get_rich_logger(__name__)
 
+# HTTP/2 support in httpx requires the optional `h2` package
+try:
+    import h2  # noqa: F401
+
+    HAVE_HTTP2 = True
+except ImportError:
+    HAVE_HTTP2 = False
+
+
+# HTTP status codes that are retried with backoff
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Upper bound in seconds for a single backoff delay
+BACKOFF_MAX = 30.0
+
+# Number of most recently yielded trace IDs checked for duplicates after a
+# stream resumes, covering rows shifted by calls inserted in the meantime
+RESUME_DEDUPE_WINDOW = 1000
+
+
+class _StreamInterrupted(Exception):
+    """Raised when a trace stream breaks after the response has started."""
+
+
+class _RetryableStatus(Exception):
+    """Raised when the server answers with a status code that is retried."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _RecentIds:
+    """The last `maxlen` IDs added, with constant-time membership checks."""
+
+    def __init__(self, maxlen: int = RESUME_DEDUPE_WINDOW):
+        self._order: deque = deque()
+        self._ids: set = set()
+        self.maxlen = maxlen
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self._ids
+
+    def add(self, item: Any) -> None:
+        if len(self._order) >= self.maxlen:
+            self._ids.discard(self._order.popleft())
+        self._order.append(item)
+        self._ids.add(item)
+
+
+def _backoff_delay(backoff_factor: float, attempt: int) -> float:
+    """Compute the exponential backoff delay, with jitter, before a retry.
+
+    Args:
+        backoff_factor: Base delay in seconds.
+        attempt: Retry attempt number, starting at 1.
+
+    Returns:
+        Delay in seconds.
+    """
+    delay = backoff_factor * (2 ** (attempt - 1))
+    return min(delay + random.uniform(0, backoff_factor), BACKOFF_MAX)
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds, capped at BACKOFF_MAX."""
+    try:
+        return min(max(float(value), 0.0), BACKOFF_MAX) if value else None
+    except ValueError:
+        return None
+
+
+def _log_request(description: str, query_params: Dict[str, Any]) -> None:
+    """Log an outgoing request, serializing the parameters only if the level is enabled.
+
+    Args:
+        description: Short description of the request.
+        query_params: Request parameters.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            f"{description}, full query parameters:\n{json.dumps(query_params, indent=2)}\n"
+        )
+    elif logger.isEnabledFor(logging.INFO):
+        logger.info(f"{description}:\n{json.dumps(query_params, indent=2)[:1000]}...\n")
+
+
+def _basic_auth_headers(api_key: str) -> Dict[str, str]:
+    """Build the headers used to authenticate against the Weave API.
+
+    Args:
+        api_key: Weights & Biases API key.
+
+    Returns:
+        Dictionary of authentication headers.
+    """
+    auth_token = base64.b64encode(f":{api_key}".encode()).decode()
+    return {
+        "Content-Type": "application/json",
+        "Accept": "application/jsonl",
+        "Authorization": f"Basic {auth_token}",
+    }
+
 
 class WeaveApiClient:
     """Client for interacting with the Weights & Biases Weave API."""
@@ -27,20 +140,43 @@ class WeaveApiClient:
         server_url: Optional[str] = None,
         retries: int = 3,
         timeout: int = 10,
+        pool_maxsize: int = 10,
+        backoff_factor: float = 1.0,
+        json_decoder: Optional[str] = None,
     ):
         """Initialize the WeaveApiClient.
 
         Args:
             api_key: API key for authentication. If None, try to get from environment.
             server_url: Weave API server URL. Defaults to 'https://trace.wandb.ai'.
-            retries: Number of retries for failed requests.
+            retries: Number of retries for failed requests, and for resuming a
+                trace stream that breaks mid-response.
             timeout: Request timeout in seconds.
+            pool_maxsize: Maximum number of pooled connections kept per host, which
+                bounds how many requests can share the session concurrently.
+            backoff_factor: Base delay in seconds for exponential backoff between retries.
+            json_decoder: JSON decoder for streamed lines ('orjson', 'msgspec' or
+                'json'). Defaults to the fastest one installed.
 
         Raises:
-            ValueError: If no API key is provided or found in environment.
+            ValueError: If no API key is provided or found in environment, or the
+                JSON decoder is unavailable.
         """
-        # Set up a session for connection pooling and better request handling
+        # Set up a session for connection pooling and better request handling.
+        # Connection errors and 429/5xx responses are retried with jittered backoff.
         self.session = requests.Session()
+        retry_strategy = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_factor,
+            backoff_max=BACKOFF_MAX,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=["POST", "GET"],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
         # Try to get API key from environment if not provided
         if api_key is None:
@@ -56,6 +192,8 @@ class WeaveApiClient:
         self.server_url = server_url or "https://trace.wandb.ai"
         self.retries = retries
         self.timeout = timeout
+        self.backoff_factor = backoff_factor
+        self.decode_json = get_decoder(json_decoder)
 
     def _get_auth_headers(self) -> Dict[str, str]:
         """Get authentication headers for the Weave API.
@@ -63,16 +201,77 @@ class WeaveApiClient:
         Returns:
             Dictionary of authentication headers.
         """
-        auth_token = base64.b64encode(f":{self.api_key}".encode()).decode()
-        return {
-            "Content-Type": "application/json",
-            "Accept": "application/jsonl",
-            "Authorization": f"Basic {auth_token}",
-        }
+        return _basic_auth_headers(self.api_key)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Compute the exponential backoff delay, with jitter, before a retry.
+
+        Args:
+            attempt: Retry attempt number, starting at 1.
+
+        Returns:
+            Delay in seconds.
+        """
+        return _backoff_delay(self.backoff_factor, attempt)
+
+    def _stream_query(
+        self, url: str, headers: Dict[str, str], query_params: Dict[str, Any]
+    ) -> Iterator[Dict[str, Any]]:
+        """Issue a single `/calls/stream_query` request and decode its JSONL lines.
+
+        Args:
+            url: Stream query URL.
+            headers: Request headers.
+            query_params: Dictionary of query parameters.
+
+        Yields:
+            Trace dictionaries.
+
+        Raises:
+            _StreamInterrupted: If the connection breaks while reading the response.
+        """
+        response = self.session.post(
+            url,
+            headers=headers,
+            data=json.dumps(query_params),
+            timeout=self.timeout,
+            stream=True,
+        )
+
+        # Check for errors
+        if response.status_code != 200:
+            error_msg = f"Error {response.status_code}: {response.text}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
+        logger.info(f"Response status: {response.status_code}")
+
+        # Process the streaming response, decoding each line straight from bytes
+        decode_json = self.decode_json
+        log_ids = logger.isEnabledFor(logging.DEBUG)
+        lines = iter(response.iter_lines())
+        while True:
+            try:
+                line = next(lines)
+            except StopIteration:
+                return
+            except (ChunkedEncodingError, requests.ConnectionError) as e:
+                raise _StreamInterrupted(str(e)) from e
+
+            if line:
+                trace_data = decode_json(line)
+                if log_ids:
+                    logger.debug(f"Received trace data with ID: {trace_data.get('id')}")
+                yield trace_data
 
     def query_traces(self, query_params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
         """Query traces from the Weave API.
 
+        If the connection breaks mid-stream, the query is re-issued from the
+        offset of the last parsed trace, up to `retries` times with backoff.
+        The last RESUME_DEDUPE_WINDOW traces yielded are skipped by `id`, so
+        rows that shift position between requests are not returned twice.
+
         Args:
             query_params: Dictionary of query parameters.
 
@@ -85,10 +284,83 @@ class WeaveApiClient:
         url = f"{self.server_url}/calls/stream_query"
         headers = self._get_auth_headers()
 
-        logger.info(
-            f"Sending request to Weave server:\n{json.dumps(query_params, indent=2)[:1000]}...\n"
-        )
-        logger.debug(f"Full query parameters:\n{json.dumps(query_params, indent=2)}\n")
+        _log_request("Sending request to Weave server", query_params)
+
+        base_offset = query_params.get("offset") or 0
+        limit = query_params.get("limit")
+        received = 0
+        recent_ids = _RecentIds()
+        attempt = 0
+
+        try:
+            while True:
+                request_params = query_params
+                if received:
+                    request_params = {**query_params, "offset": base_offset + received}
+                    if limit is not None:
+                        request_params["limit"] = limit - received
+
+                try:
+                    for trace_data in self._stream_query(url, headers, request_params):
+                        received += 1
+                        trace_id = trace_data.get("id")
+                        if trace_id is not None:
+                            if attempt and trace_id in recent_ids:
+                                continue
+                            recent_ids.add(trace_id)
+                        yield trace_data
+                    return
+                except _StreamInterrupted as e:
+                    attempt += 1
+                    if attempt > self.retries:
+                        raise requests.ConnectionError(
+                            f"Stream interrupted after {received} traces and "
+                            f"{self.retries} resume attempts: {e}"
+                        ) from e
+                    delay = self._backoff_delay(attempt)
+                    logger.warning(
+                        f"Stream interrupted after {received} traces ({e}), resuming "
+                        f"in {delay:.1f}s (attempt {attempt}/{self.retries})"
+                    )
+                    time.sleep(delay)
+
+        except requests.RequestException as e:
+            logger.error(
+                f"Error executing HTTP request to Weave server: {e}. "
+                f"Request body snippet: {str(query_params)[:1000]}"
+            )
+            if isinstance(e, RetryError):
+                cause = e.__cause__
+                if cause and hasattr(cause, "reason"):
+                    logger.error(
+                        f"Specific reason for retry exhaustion: {cause.reason}"
+                    )
+            raise Exception(f"Failed to query Weave traces due to network error: {e}")
+        except json.JSONDecodeError as e:
+            logger.error(f"Error decoding JSON from Weave server: {e}")
+            raise Exception(f"Failed to parse Weave API response: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error during HTTP request to Weave server: {e}")
+            raise
+
+    def query_stats(self, query_params: Dict[str, Any]) -> Dict[str, Any]:
+        """Query aggregate call statistics from the Weave API.
+
+        Args:
+            query_params: Dictionary of query parameters for `/calls/query_stats`.
+
+        Returns:
+            Dictionary with the stats response, e.g. `count` and `total_storage_size_bytes`.
+
+        Raises:
+            Exception: If the request fails.
+        """
+        url = f"{self.server_url}/calls/query_stats"
+        headers = self._get_auth_headers()
+        headers["Accept"] = "application/json"
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Sending stats request to Weave server:\n{json.dumps(query_params)}")
 
         try:
             response = self.session.post(
@@ -96,40 +368,311 @@ class WeaveApiClient:
                 headers=headers,
                 data=json.dumps(query_params),
                 timeout=self.timeout,
-                stream=True,
             )
 
-            # Check for errors
             if response.status_code != 200:
                 error_msg = f"Error {response.status_code}: {response.text}"
                 logger.error(error_msg)
                 raise Exception(error_msg)
 
-            logger.info(f"Response status: {response.status_code}")
-
-            # Process the streaming response
-            for line in response.iter_lines():
-                if line:
-                    # Parse the JSON line
-                    trace_data = json.loads(line.decode("utf-8"))
-                    logger.debug(f"Received trace data with ID: {trace_data.get('id')}")
-                    yield trace_data
+            return response.json()
 
+        except json.JSONDecodeError as e:
+            logger.error(f"Error decoding JSON from Weave server: {e}")
+            raise Exception(f"Failed to parse Weave API response: {e}")
         except requests.RequestException as e:
+            logger.error(f"Error executing HTTP stats request to Weave server: {e}")
+            raise Exception(f"Failed to query Weave call stats due to network error: {e}")
+
+
+class AsyncWeaveApiClient:
+    """Asynchronous client for the Weights & Biases Weave API, built on httpx.
+
+    Requests share a pooled `httpx.AsyncClient` that keeps connections alive
+    and negotiates HTTP/2 when the `h2` package is installed, so concurrent
+    queries are multiplexed instead of blocking the event loop.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        server_url: Optional[str] = None,
+        retries: int = 3,
+        timeout: int = 10,
+        http2: bool = True,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        json_decoder: Optional[str] = None,
+        backoff_factor: float = 1.0,
+    ):
+        """Initialize the AsyncWeaveApiClient.
+
+        Args:
+            api_key: API key for authentication. If None, try to get from environment.
+            server_url: Weave API server URL. Defaults to 'https://trace.wandb.ai'.
+            retries: Number of retries for failed connection attempts, 429/5xx
+                responses, and for resuming a trace stream that breaks
+                mid-response.
+            timeout: Request timeout in seconds.
+            http2: Use HTTP/2 if the `h2` package is available.
+            max_connections: Maximum number of concurrent connections.
+            max_keepalive_connections: Maximum number of idle connections kept alive.
+            keepalive_expiry: Seconds an idle connection is kept alive.
+            transport: Custom transport to use instead of the pooled HTTP transport.
+            json_decoder: JSON decoder for streamed lines ('orjson', 'msgspec' or
+                'json'). Defaults to the fastest one installed.
+            backoff_factor: Base delay in seconds for exponential backoff between retries.
+
+        Raises:
+            ValueError: If no API key is provided or found in environment, or the
+                JSON decoder is unavailable.
+        """
+        if api_key is None:
+            api_key = os.environ.get("WANDB_API_KEY")
+
+        if not api_key:
+            raise ValueError(
+                "API key not found. Provide api_key or set WANDB_API_KEY environment variable."
+            )
+
+        if http2 and not HAVE_HTTP2:
+            logger.warning("HTTP/2 requested but 'h2' is not installed, using HTTP/1.1")
+
+        self.api_key = api_key
+        self.server_url = server_url or "https://trace.wandb.ai"
+        self.retries = retries
+        self.timeout = timeout
+        self.http2 = http2 and HAVE_HTTP2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.transport = transport
+        self.decode_json = get_decoder(json_decoder)
+        self.backoff_factor = backoff_factor
+
+        # Pooled clients by event loop
+        self._clients: "weakref.WeakKeyDictionary[Any, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the pooled httpx client for the running event loop.
+
+        Connections can't be shared across event loops, so each loop gets its
+        own client, which `aclose` closes on that loop.
+
+        Returns:
+            The shared `httpx.AsyncClient`.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            transport = self.transport or httpx.AsyncHTTPTransport(
+                http2=self.http2, limits=self.limits, retries=self.retries
+            )
+            client = httpx.AsyncClient(
+                transport=transport,
+                headers=_basic_auth_headers(self.api_key),
+                timeout=self.timeout,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close the pooled connections of the running event loop.
+
+        Call it before the loop shuts down, e.g. when the server stops. A later
+        request on the same loop opens a new client.
+        """
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def __aenter__(self) -> "AsyncWeaveApiClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def _stream_query(
+        self, url: str, query_params: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Issue a single `/calls/stream_query` request and decode its JSONL lines.
+
+        Args:
+            url: Stream query URL.
+            query_params: Dictionary of query parameters.
+
+        Yields:
+            Trace dictionaries.
+
+        Raises:
+            _RetryableStatus: If the server answers with a 429 or 5xx status.
+            _StreamInterrupted: If the connection breaks while reading the response.
+        """
+        async with self._get_client().stream(
+            "POST", url, content=json.dumps(query_params)
+        ) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", errors="replace")
+                error_msg = f"Error {response.status_code}: {body}"
+                if response.status_code in RETRY_STATUS_CODES:
+                    raise _RetryableStatus(
+                        error_msg, _retry_after(response.headers.get("Retry-After"))
+                    )
+                logger.error(error_msg)
+                raise Exception(error_msg)
+
+            logger.info(
+                f"Response status: {response.status_code} ({response.http_version})"
+            )
+
+            decode_json = self.decode_json
+            log_ids = logger.isEnabledFor(logging.DEBUG)
+            pending = b""
+            chunks = response.aiter_bytes().__aiter__()
+            while True:
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+                except httpx.TransportError as e:
+                    raise _StreamInterrupted(str(e)) from e
+
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        trace_data = decode_json(line)
+                        if log_ids:
+                            logger.debug(
+                                f"Received trace data with ID: {trace_data.get('id')}"
+                            )
+                        yield trace_data
+            if pending.strip():
+                yield decode_json(pending)
+
+    async def query_traces(
+        self, query_params: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Query traces from the Weave API, decoding the JSONL stream as it arrives.
+
+        429/5xx responses are retried with backoff, honouring Retry-After. If the
+        connection breaks mid-stream, the query is re-issued from the offset of
+        the last parsed trace. Both share a budget of `retries` attempts. The
+        last RESUME_DEDUPE_WINDOW traces yielded are skipped by `id` after a
+        resume, so rows that shift position between requests are not returned
+        twice.
+
+        Args:
+            query_params: Dictionary of query parameters.
+
+        Yields:
+            Trace dictionaries.
+
+        Raises:
+            Exception: If the request fails.
+        """
+        url = f"{self.server_url}/calls/stream_query"
+
+        _log_request("Sending async request to Weave server", query_params)
+
+        base_offset = query_params.get("offset") or 0
+        limit = query_params.get("limit")
+        received = 0
+        recent_ids = _RecentIds()
+        attempt = 0
+
+        try:
+            while True:
+                request_params = query_params
+                if received:
+                    request_params = {**query_params, "offset": base_offset + received}
+                    if limit is not None:
+                        request_params["limit"] = limit - received
+
+                try:
+                    async for trace_data in self._stream_query(url, request_params):
+                        received += 1
+                        trace_id = trace_data.get("id")
+                        if trace_id is not None:
+                            if attempt and trace_id in recent_ids:
+                                continue
+                            recent_ids.add(trace_id)
+                        yield trace_data
+                    return
+                except _RetryableStatus as e:
+                    attempt += 1
+                    if attempt > self.retries:
+                        logger.error(str(e))
+                        raise Exception(str(e)) from e
+                    delay = e.retry_after
+                    if delay is None:
+                        delay = _backoff_delay(self.backoff_factor, attempt)
+                    logger.warning(
+                        f"{e}, retrying in {delay:.1f}s "
+                        f"(attempt {attempt}/{self.retries})"
+                    )
+                    await asyncio.sleep(delay)
+                except _StreamInterrupted as e:
+                    attempt += 1
+                    if attempt > self.retries:
+                        raise httpx.ReadError(
+                            f"Stream interrupted after {received} traces and "
+                            f"{self.retries} resume attempts: {e}"
+                        ) from e
+                    delay = _backoff_delay(self.backoff_factor, attempt)
+                    logger.warning(
+                        f"Stream interrupted after {received} traces ({e}), resuming "
+                        f"in {delay:.1f}s (attempt {attempt}/{self.retries})"
+                    )
+                    await asyncio.sleep(delay)
+
+        except httpx.HTTPError as e:
             logger.error(
                 f"Error executing HTTP request to Weave server: {e}. "
                 f"Request body snippet: {str(query_params)[:1000]}"
             )
-            if isinstance(e, RetryError):
-                cause = e.__cause__
-                if cause and hasattr(cause, "reason"):
-                    logger.error(
-                        f"Specific reason for retry exhaustion: {cause.reason}"
-                    )
             raise Exception(f"Failed to query Weave traces due to network error: {e}")
         except json.JSONDecodeError as e:
             logger.error(f"Error decoding JSON from Weave server: {e}")
             raise Exception(f"Failed to parse Weave API response: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error during HTTP request to Weave server: {e}")
-            raise
+
+    async def query_stats(self, query_params: Dict[str, Any]) -> Dict[str, Any]:
+        """Query aggregate call statistics from the Weave API.
+
+        Args:
+            query_params: Dictionary of query parameters for `/calls/query_stats`.
+
+        Returns:
+            Dictionary with the stats response, e.g. `count` and `total_storage_size_bytes`.
+
+        Raises:
+            Exception: If the request fails.
+        """
+        url = f"{self.server_url}/calls/query_stats"
+
+        try:
+            response = await self._get_client().post(
+                url,
+                content=json.dumps(query_params),
+                headers={"Accept": "application/json"},
+            )
+
+            if response.status_code != 200:
+                error_msg = f"Error {response.status_code}: {response.text}"
+                logger.error(error_msg)
+                raise Exception(error_msg)
+
+            return response.json()
+
+        except json.JSONDecodeError as e:
+            logger.error(f"Error decoding JSON from Weave server: {e}")
+            raise Exception(f"Failed to parse Weave API response: {e}")
+        except httpx.HTTPError as e:
+            logger.error(f"Error executing HTTP stats request to Weave server: {e}")
+            raise Exception(f"Failed to query Weave call stats due to network error: {e}")
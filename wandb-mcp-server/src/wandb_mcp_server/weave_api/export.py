@@ -0,0 +1,269 @@
+"""
+Streaming export of Weave traces to local files.
+
+This module writes traces from `TraceService` to NDJSON, Parquet or Arrow IPC
+files in fixed-size batches, so memory use stays flat regardless of how many
+traces a query matches. Parquet and Arrow output require `pyarrow`.
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from wandb_mcp_server.utils import get_rich_logger
+from wandb_mcp_server.weave_api.models import ExportResult, WeaveTrace
+from wandb_mcp_server.weave_api.processors import MetadataAccumulator
+from wandb_mcp_server.weave_api.service import TraceService
+
+logger = get_rich_logger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+# Supported formats and their file extensions
+EXPORT_FORMATS = {"ndjson": ".ndjson", "parquet": ".parquet", "arrow": ".arrow"}
+
+# Directory used when no output path is given
+DEFAULT_EXPORT_DIR = Path(tempfile.gettempdir()) / "wandb_mcp_exports"
+
+# Columns stored as timestamps in Parquet/Arrow, every other column is a string
+TIMESTAMP_COLUMNS = {"started_at", "ended_at", "deleted_at"}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=_json_default, ensure_ascii=False)
+
+
+def _project(trace: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
+    """Keep only the requested top-level columns of a trace."""
+    return {column: trace.get(column) for column in columns}
+
+
+class NdjsonTraceWriter:
+    """Writes traces as newline-delimited JSON, one batch per write."""
+
+    def __init__(self, path: Path, columns: Optional[List[str]]):
+        self.columns = columns
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write_batch(self, traces: List[Dict[str, Any]]) -> None:
+        if self.columns:
+            traces = [_project(trace, self.columns) for trace in traces]
+        self._file.write("".join(_dumps(trace) + "\n" for trace in traces))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ArrowTraceWriter:
+    """Writes traces as Parquet row groups or Arrow IPC record batches.
+
+    The schema is fixed up front from the projected columns: timestamp columns
+    are parsed into UTC timestamps, string columns are kept as-is and nested
+    values (inputs, output, summary, ...) are stored as JSON strings.
+    """
+
+    def __init__(self, path: Path, columns: Optional[List[str]], format: str):
+        if not HAVE_PYARROW:
+            raise ValueError(f"Exporting to '{format}' requires the 'pyarrow' package")
+        self.columns = columns or list(WeaveTrace.model_fields)
+        self.schema = pa.schema(
+            [
+                (
+                    column,
+                    pa.timestamp("us", tz="UTC")
+                    if column in TIMESTAMP_COLUMNS
+                    else pa.string(),
+                )
+                for column in self.columns
+            ]
+        )
+        if format == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(str(path), self.schema)
+        else:
+            self._writer = pyarrow.ipc.new_file(str(path), self.schema)
+
+    @staticmethod
+    def _to_timestamp(value: Any) -> Optional[datetime]:
+        if isinstance(value, str):
+            return datetime.fromisoformat(value) if value else None
+        return value
+
+    def _column_values(self, traces: List[Dict[str, Any]], column: str) -> List[Any]:
+        values = [trace.get(column) for trace in traces]
+        if column in TIMESTAMP_COLUMNS:
+            return [self._to_timestamp(value) for value in values]
+        return [
+            value if value is None or isinstance(value, str) else _dumps(value)
+            for value in values
+        ]
+
+    def write_batch(self, traces: List[Dict[str, Any]]) -> None:
+        batch = pa.record_batch(
+            [
+                pa.array(self._column_values(traces, field.name), type=field.type)
+                for field in self.schema
+            ],
+            schema=self.schema,
+        )
+        if isinstance(self._writer, pyarrow.parquet.ParquetWriter):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write(batch)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class TraceExporter:
+    """Streams the traces matching a query to a local file."""
+
+    def __init__(
+        self, service: Optional[TraceService] = None, batch_size: int = 1000
+    ):
+        """Initialize the TraceExporter.
+
+        Args:
+            service: Service used to stream traces. A new one is created if None.
+            batch_size: Number of traces buffered before each write.
+
+        Raises:
+            ValueError: If batch_size is less than 1.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        self.service = service or TraceService()
+        self.batch_size = batch_size
+
+    @staticmethod
+    def default_path(entity_name: str, project_name: str, format: str) -> Path:
+        """Build a unique output path in DEFAULT_EXPORT_DIR."""
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        filename = f"{entity_name}_{project_name}_{timestamp}_{os.getpid()}"
+        return DEFAULT_EXPORT_DIR / (filename + EXPORT_FORMATS[format])
+
+    def _open_writer(self, path: Path, format: str, columns: Optional[List[str]]):
+        if format == "ndjson":
+            return NdjsonTraceWriter(path, columns)
+        return ArrowTraceWriter(path, columns, format)
+
+    def export(
+        self,
+        entity_name: str,
+        project_name: str,
+        path: Optional[str] = None,
+        format: str = "ndjson",
+        filters: Optional[Dict[str, Any]] = None,
+        sort_by: str = "started_at",
+        sort_direction: str = "desc",
+        limit: Optional[int] = None,
+        include_costs: bool = True,
+        include_feedback: bool = True,
+        columns: Optional[List[str]] = None,
+        expand_columns: Optional[List[str]] = None,
+        keyset: bool = False,
+    ) -> ExportResult:
+        """Export the traces matching a query to a file.
+
+        Traces are streamed from the server and written every `batch_size`
+        rows, while summary metadata is accumulated on the fly. The file is
+        written under a temporary name and only moved to `path` once complete.
+
+        Args:
+            entity_name: Weights & Biases entity name.
+            project_name: Weights & Biases project name.
+            path: Output file path. Defaults to a new file in DEFAULT_EXPORT_DIR.
+            format: One of 'ndjson', 'parquet' or 'arrow' (Arrow IPC file).
+            filters: Dictionary of filter conditions.
+            sort_by: Field to sort by.
+            sort_direction: Sort direction ('asc' or 'desc').
+            limit: Maximum number of traces to export.
+            include_costs: Include tracked API cost information in the results.
+            include_feedback: Include Weave annotations in the results.
+            columns: Columns to request and write. Defaults to all columns.
+            expand_columns: List of columns to expand in the results.
+            keyset: Page with a (started_at, id) cursor instead of a single stream.
+
+        Returns:
+            ExportResult with the output path, row count and trace metadata.
+
+        Raises:
+            ValueError: If the format is unknown or its dependencies are missing.
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(
+                f"Unknown export format '{format}'. Choose from: {', '.join(EXPORT_FORMATS)}"
+            )
+
+        output_path = (
+            Path(path).expanduser()
+            if path
+            else self.default_path(entity_name, project_name, format)
+        )
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = output_path.with_name(output_path.name + ".partial")
+
+        stream_kwargs = dict(
+            entity_name=entity_name,
+            project_name=project_name,
+            filters=filters,
+            sort_direction=sort_direction,
+            target_limit=limit,
+            include_costs=include_costs,
+            include_feedback=include_feedback,
+            columns=columns,
+            expand_columns=expand_columns,
+        )
+        if keyset:
+            traces = self.service.iter_traces_keyset(
+                chunk_size=self.batch_size, **stream_kwargs
+            )
+        else:
+            traces = self.service.iter_traces(sort_by=sort_by, **stream_kwargs)
+
+        accumulator = MetadataAccumulator(token_counting="estimate")
+        writer = self._open_writer(partial_path, format, columns)
+        try:
+            batch: List[Dict[str, Any]] = []
+            for trace in traces:
+                accumulator.add(trace)
+                batch.append(trace)
+                if len(batch) >= self.batch_size:
+                    writer.write_batch(batch)
+                    batch = []
+            if batch:
+                writer.write_batch(batch)
+        except BaseException:
+            writer.close()
+            partial_path.unlink(missing_ok=True)
+            raise
+        writer.close()
+        os.replace(partial_path, output_path)
+
+        logger.info(
+            f"Exported {accumulator.total_traces} traces to {output_path} ({format})"
+        )
+        return ExportResult(
+            path=str(output_path),
+            format=format,
+            rows_written=accumulator.total_traces,
+            bytes_written=output_path.stat().st_size,
+            columns=list(getattr(writer, "columns", None) or []),
+            metadata=accumulator.to_metadata(),
+        )
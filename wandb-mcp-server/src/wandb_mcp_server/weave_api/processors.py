@@ -5,18 +5,38 @@ This module provides utilities for processing and transforming Weave trace data.
 It provides consistent handling of truncation, token counting, and metadata extraction.
 """
 
+import functools
+import heapq
 import json
 import re
+from collections.abc import Mapping
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 import tiktoken
 
-from wandb_mcp_server.weave_api.models import TraceMetadata, QueryResult
+from wandb_mcp_server.weave_api.models import TraceMetadata, TraceView, QueryResult
+from wandb_mcp_server.weave_api.truncation import fit_to_budget, truncate_value
 from wandb_mcp_server.utils import get_rich_logger
 
 logger = get_rich_logger(__name__)
 
+# Approximate number of UTF-8 bytes per cl100k_base token, used for estimates
+BYTES_PER_TOKEN_ESTIMATE = 4
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_encoding(name: str = "cl100k_base") -> tiktoken.Encoding:
+    """Return a process-wide cached tiktoken encoding.
+
+    Args:
+        name: Name of the tiktoken encoding. Defaults to OpenAI's cl100k_base.
+
+    Returns:
+        The tiktoken Encoding object.
+    """
+    return tiktoken.get_encoding(name)
+
 
 class DateTimeEncoder(json.JSONEncoder):
     """JSON encoder that can handle datetime objects."""
@@ -28,12 +48,270 @@ class DateTimeEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+class MetadataAccumulator:
+    """Single-pass, mergeable accumulator for trace metadata.
+
+    Token counts, time range, status counts and op distribution are updated
+    as each trace is added, so traces can be consumed straight from a stream
+    without being kept in memory. Accumulators built over separate pages or
+    parallel fetches can be combined with `merge`.
+    """
+
+    OP_NAME_PATTERN = re.compile(r"/op/([^:]+)")
+
+    # "exact" counts with tiktoken, "estimate" uses UTF-8 byte length, "none" skips
+    TOKEN_COUNTING_MODES = ("exact", "estimate", "none")
+
+    # Number of traces whose inputs/outputs are tokenized together in exact mode
+    TOKEN_BATCH_SIZE = 256
+
+    def __init__(self, token_counting: str = "exact"):
+        """Initialize an empty accumulator.
+
+        Args:
+            token_counting: How to count input/output tokens, one of
+                TOKEN_COUNTING_MODES.
+
+        Raises:
+            ValueError: If token_counting is not a supported mode.
+        """
+        if token_counting not in self.TOKEN_COUNTING_MODES:
+            raise ValueError(
+                f"Invalid token_counting '{token_counting}', expected one of {self.TOKEN_COUNTING_MODES}"
+            )
+        self.token_counting = token_counting
+        self.total_traces = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        # Tokens estimated from stored call size, not attributable to inputs or output
+        self.estimated_tokens = 0
+        self._pending_inputs: List[str] = []
+        self._pending_outputs: List[str] = []
+        self.earliest: Optional[Any] = None
+        self.latest: Optional[Any] = None
+        self.status_counts: Dict[str, int] = {"success": 0, "error": 0, "other": 0}
+        self.op_counts: Dict[str, int] = {}
+
+    def add(self, trace: Any) -> None:
+        """Update the accumulated metadata with a single trace.
+
+        Args:
+            trace: Trace dictionary or WeaveTrace object.
+        """
+        fields = trace if isinstance(trace, Mapping) else getattr(trace, "__dict__", {})
+        self.total_traces += 1
+
+        if self.token_counting != "none":
+            inputs = fields.get("inputs")
+            output = fields.get("output")
+            inputs_text = "" if inputs is None else str(inputs)
+            output_text = "" if output is None else str(output)
+            if self.token_counting == "estimate":
+                if (
+                    inputs is None
+                    and output is None
+                    and fields.get("storage_size_bytes") is not None
+                ):
+                    # Projected rows without payloads still carry their stored size
+                    self.add_storage_size(fields["storage_size_bytes"])
+                else:
+                    self.input_tokens += TraceProcessor.estimate_tokens(inputs_text)
+                    self.output_tokens += TraceProcessor.estimate_tokens(output_text)
+            else:
+                self._pending_inputs.append(inputs_text)
+                self._pending_outputs.append(output_text)
+                if len(self._pending_inputs) >= self.TOKEN_BATCH_SIZE:
+                    self._flush_token_counts()
+
+        for timestamp in (fields.get("started_at"), fields.get("ended_at")):
+            if not timestamp:
+                continue
+            if self.earliest is None or timestamp < self.earliest:
+                self.earliest = timestamp
+            if self.latest is None or timestamp > self.latest:
+                self.latest = timestamp
+
+        status = fields.get("status")
+        if not status:
+            summary = fields.get("summary")
+            if isinstance(summary, dict):
+                status = (summary.get("weave") or {}).get("status")
+        status = status.lower() if isinstance(status, str) else "other"
+        if status not in ("success", "error"):
+            status = "other"
+        self.status_counts[status] += 1
+
+        base_op = self.base_op_name(fields.get("op_name"))
+        if base_op is not None:
+            self.op_counts[base_op] = self.op_counts.get(base_op, 0) + 1
+
+    @classmethod
+    def base_op_name(cls, op_name: Optional[str]) -> Optional[str]:
+        """Return the op name of an op ref without its version.
+
+        Args:
+            op_name: Op ref, e.g. 'weave:///entity/project/op/name:digest'.
+
+        Returns:
+            The op name, or None if `op_name` is empty or not an op ref.
+        """
+        if not op_name:
+            return None
+        match = cls.OP_NAME_PATTERN.search(op_name)
+        return match.group(1) if match else None
+
+    def add_storage_size(self, num_bytes: int) -> None:
+        """Add a token estimate for calls known only by their stored size in bytes.
+
+        Args:
+            num_bytes: Storage size of one or more calls, as reported by the Weave API.
+        """
+        self.estimated_tokens += TraceProcessor.estimate_tokens_from_bytes(
+            int(num_bytes or 0)
+        )
+
+    def _flush_token_counts(self) -> None:
+        """Tokenize the buffered inputs/outputs in one batch."""
+        if not self._pending_inputs:
+            return
+        counts = TraceProcessor.count_tokens_batch(
+            self._pending_inputs + self._pending_outputs
+        )
+        num_inputs = len(self._pending_inputs)
+        self.input_tokens += sum(counts[:num_inputs])
+        self.output_tokens += sum(counts[num_inputs:])
+        self._pending_inputs = []
+        self._pending_outputs = []
+
+    def update(self, traces: Iterable[Any]) -> "MetadataAccumulator":
+        """Add every trace from an iterable, consuming it lazily.
+
+        Args:
+            traces: Iterable of trace dictionaries or WeaveTrace objects.
+
+        Returns:
+            This accumulator, for chaining.
+        """
+        for trace in traces:
+            self.add(trace)
+        return self
+
+    def merge(self, other: "MetadataAccumulator") -> "MetadataAccumulator":
+        """Fold the metadata of another accumulator into this one.
+
+        Args:
+            other: Accumulator built over a disjoint set of traces.
+
+        Returns:
+            This accumulator, for chaining.
+        """
+        other._flush_token_counts()
+        self.total_traces += other.total_traces
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.estimated_tokens += other.estimated_tokens
+
+        if other.earliest is not None and (
+            self.earliest is None or other.earliest < self.earliest
+        ):
+            self.earliest = other.earliest
+        if other.latest is not None and (
+            self.latest is None or other.latest > self.latest
+        ):
+            self.latest = other.latest
+
+        for status, count in other.status_counts.items():
+            self.status_counts[status] = self.status_counts.get(status, 0) + count
+        for op, count in other.op_counts.items():
+            self.op_counts[op] = self.op_counts.get(op, 0) + count
+        return self
+
+    @classmethod
+    def from_metadata(
+        cls, metadata: Union[TraceMetadata, Dict[str, Any]]
+    ) -> "MetadataAccumulator":
+        """Rebuild an accumulator from previously computed metadata.
+
+        Args:
+            metadata: TraceMetadata object or its dictionary form.
+
+        Returns:
+            Accumulator holding the same totals, ready to be merged.
+        """
+        if isinstance(metadata, TraceMetadata):
+            metadata = metadata.model_dump()
+
+        accumulator = cls()
+        accumulator.total_traces = metadata.get("total_traces", 0)
+
+        token_counts = metadata.get("token_counts") or {}
+        accumulator.input_tokens = token_counts.get("input_tokens", 0)
+        accumulator.output_tokens = token_counts.get("output_tokens", 0)
+        accumulator.estimated_tokens = max(
+            token_counts.get("total_tokens", 0)
+            - accumulator.input_tokens
+            - accumulator.output_tokens,
+            0,
+        )
+
+        time_range = metadata.get("time_range") or {}
+        accumulator.earliest = time_range.get("earliest")
+        accumulator.latest = time_range.get("latest")
+
+        for status, count in (metadata.get("status_summary") or {}).items():
+            accumulator.status_counts[status] = count
+        accumulator.op_counts = dict(metadata.get("op_distribution") or {})
+        return accumulator
+
+    def token_counts(self) -> Dict[str, Union[int, float]]:
+        """Return the accumulated token count statistics.
+
+        Input/output counts are omitted when the tokens were only estimated from
+        stored call sizes, as those cannot be split between inputs and outputs.
+        """
+        self._flush_token_counts()
+        total_tokens = self.input_tokens + self.output_tokens + self.estimated_tokens
+        token_counts = {
+            "total_tokens": total_tokens,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "average_tokens_per_trace": round(total_tokens / self.total_traces, 2)
+            if self.total_traces
+            else 0,
+        }
+        if self.estimated_tokens and not (self.input_tokens or self.output_tokens):
+            del token_counts["input_tokens"]
+            del token_counts["output_tokens"]
+        return token_counts
+
+    def time_range(self) -> Dict[str, Optional[Any]]:
+        """Return the earliest and latest timestamps seen."""
+        return {"earliest": self.earliest, "latest": self.latest}
+
+    def op_distribution(self) -> Dict[str, int]:
+        """Return op counts sorted by count in descending order."""
+        return dict(sorted(self.op_counts.items(), key=lambda x: x[1], reverse=True))
+
+    def to_metadata(self) -> TraceMetadata:
+        """Build a TraceMetadata object from the accumulated state."""
+        return TraceMetadata(
+            total_traces=self.total_traces,
+            token_counts=self.token_counts(),
+            time_range=self.time_range(),
+            status_summary=dict(self.status_counts),
+            op_distribution=self.op_distribution(),
+        )
+
+
 class TraceProcessor:
     """Processor for Weave trace data."""
 
     @staticmethod
     def truncate_value(value: Any, max_length: int = 200) -> Any:
-        """Recursively truncate string values in nested structures.
+        """Truncate string values in nested structures.
+
+        See `truncation.truncate_value`: the original object is returned if
+        nothing needed truncating.
 
         Args:
             value: The value to truncate.
@@ -42,70 +320,7 @@ class TraceProcessor:
         Returns:
             Truncated value.
         """
-        # Handle None values
-        if value is None:
-            return None
-
-        # If max_length is 0, truncate completely by returning empty values based on type
-        if max_length == 0:
-            if isinstance(value, str):
-                return ""
-            elif isinstance(value, dict):
-                return {}
-            elif isinstance(value, list):
-                return []
-            elif isinstance(value, (int, float)):
-                return 0
-            else:
-                return ""
-
-        # Regular truncation for non-zero max_length
-        if isinstance(value, str):
-            if len(value) > max_length:
-                logger.debug(
-                    f"Truncating string of length {len(value)} to {max_length}"
-                )
-            return value[:max_length] + "..." if len(value) > max_length else value
-        elif isinstance(value, dict):
-            try:
-                # Handle special case for inputs/outputs that might have complex object references
-                if "__type__" in value or "_type" in value:
-                    logger.info(
-                        f"Found potential complex object: {value.get('__type__') or value.get('_type')}"
-                    )
-                    # For very small max_length, return empty dict to ensure proper truncation tests pass
-                    if max_length < 50:
-                        return {}
-                    # Otherwise, convert to a simplified representation
-                    return {"type": value.get("__type__") or value.get("_type")}
-
-                result = {
-                    k: TraceProcessor.truncate_value(v, max_length)
-                    for k, v in value.items()
-                }
-                return result
-            except Exception as e:
-                logger.warning(f"Error truncating dict: {e}, returning empty dict")
-                return {}
-        elif isinstance(value, list):
-            try:
-                result = [TraceProcessor.truncate_value(v, max_length) for v in value]
-                return result
-            except Exception as e:
-                logger.warning(f"Error truncating list: {e}, returning empty list")
-                return []
-        # For datetime objects and other non-JSON serializable types, convert to string
-        elif not isinstance(value, (int, float, bool)):
-            try:
-                return (
-                    str(value)[:max_length] + "..."
-                    if len(str(value)) > max_length
-                    else str(value)
-                )
-            except Exception as e:
-                logger.warning(f"Error converting value to string: {e}, returning None")
-                return None
-        return value
+        return truncate_value(value, max_length)
 
     @staticmethod
     def count_tokens(text: str) -> int:
@@ -118,8 +333,8 @@ class TraceProcessor:
             Number of tokens.
         """
         try:
-            encoding = tiktoken.get_encoding("cl100k_base")  # Using OpenAI's encoding
-            return len(encoding.encode(text))
+            encoding = get_token_encoding()
+            return len(encoding.encode(text, disallowed_special=()))
         except Exception as e:
             logger.warning(
                 f"Error counting tokens with tiktoken: {e}, falling back to approximation"
@@ -128,52 +343,67 @@ class TraceProcessor:
             return len(text.split())
 
     @classmethod
-    def calculate_token_counts(cls, traces: List[Dict]) -> Dict[str, int]:
-        """Calculate token counts for traces.
+    def count_tokens_batch(cls, texts: List[str], num_threads: int = 8) -> List[int]:
+        """Count tokens for many strings at once.
+
+        Uses tiktoken's `encode_batch`, which tokenizes across a thread pool.
 
         Args:
-            traces: List of trace dictionaries.
+            texts: Texts to count tokens in.
+            num_threads: Number of worker threads used by tiktoken.
 
         Returns:
-            Dictionary of token count statistics.
+            Number of tokens for each text, in the same order.
         """
-        total_tokens = 0
-        input_tokens = 0
-        output_tokens = 0
+        if not texts:
+            return []
+        try:
+            encoding = get_token_encoding()
+            encoded = encoding.encode_batch(
+                texts, num_threads=num_threads, disallowed_special=()
+            )
+            return [len(tokens) for tokens in encoded]
+        except Exception as e:
+            logger.warning(
+                f"Error batch counting tokens with tiktoken: {e}, counting individually"
+            )
+            return [cls.count_tokens(text) for text in texts]
 
-        for trace in traces:
-            # Get inputs and outputs handling both dict and Pydantic model cases
-            if hasattr(trace, "inputs") and isinstance(trace.inputs, dict):
-                # Pydantic model case
-                trace_inputs = str(trace.inputs)
-            elif isinstance(trace, dict) and "inputs" in trace:
-                # Dictionary case
-                trace_inputs = str(trace.get("inputs", ""))
-            else:
-                trace_inputs = ""
-
-            if hasattr(trace, "output"):
-                # Pydantic model case
-                trace_output = str(trace.output) if trace.output is not None else ""
-            elif isinstance(trace, dict) and "output" in trace:
-                # Dictionary case
-                trace_output = str(trace.get("output", ""))
-            else:
-                trace_output = ""
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Cheaply estimate the number of tokens in a string from its UTF-8 size.
 
-            input_tokens += cls.count_tokens(trace_inputs)
-            output_tokens += cls.count_tokens(trace_output)
+        Args:
+            text: Text to estimate tokens for.
 
-        total_tokens = input_tokens + output_tokens
+        Returns:
+            Estimated number of tokens.
+        """
+        return TraceProcessor.estimate_tokens_from_bytes(len(text.encode("utf-8")))
 
-        return {
-            "total_tokens": total_tokens,
-            "input_tokens": input_tokens,
-            "output_tokens": output_tokens,
-            "average_tokens_per_trace": round(total_tokens / len(traces), 2)
-            if traces
-            else 0,
-        }
+    @staticmethod
+    def estimate_tokens_from_bytes(num_bytes: int) -> int:
+        """Estimate the number of tokens in a payload of the given UTF-8 size.
+
+        Args:
+            num_bytes: Payload size in bytes.
+
+        Returns:
+            Estimated number of tokens.
+        """
+        return (num_bytes + BYTES_PER_TOKEN_ESTIMATE - 1) // BYTES_PER_TOKEN_ESTIMATE
+
+    @classmethod
+    def calculate_token_counts(cls, traces: List[Dict]) -> Dict[str, int]:
+        """Calculate token counts for traces.
+
+        Args:
+            traces: List of trace dictionaries.
+
+        Returns:
+            Dictionary of token count statistics.
+        """
+        return MetadataAccumulator().update(traces).token_counts()
 
     @staticmethod
     def generate_status_summary(traces: List[Dict]) -> Dict[str, int]:
@@ -185,30 +415,8 @@ class TraceProcessor:
         Returns:
             Dictionary of status counts.
         """
-        summary = {"success": 0, "error": 0, "other": 0}
-
-        for trace in traces:
-            # Handle both dictionary and Pydantic model cases
-            if hasattr(trace, "status"):
-                # Pydantic model case
-                status = trace.status or "other"
-            elif isinstance(trace, dict):
-                # Dictionary case
-                status = trace.get("status", "other")
-            else:
-                # Unknown case
-                status = "other"
-
-            status = status.lower()
-
-            if status == "success":
-                summary["success"] += 1
-            elif status == "error":
-                summary["error"] += 1
-            else:
-                summary["other"] += 1
-
-        return summary
+        accumulator = MetadataAccumulator(token_counting="none")
+        return dict(accumulator.update(traces).status_counts)
 
     @staticmethod
     def get_time_range(traces: List[Dict]) -> Dict[str, Optional[str]]:
@@ -220,36 +428,8 @@ class TraceProcessor:
         Returns:
             Dictionary with earliest and latest timestamps.
         """
-        if not traces:
-            return {"earliest": None, "latest": None}
-
-        dates = []
-        for trace in traces:
-            # Handle both dictionary and Pydantic model cases
-            if hasattr(trace, "started_at"):
-                # Pydantic model case
-                started = trace.started_at
-                if hasattr(trace, "ended_at") and trace.ended_at is not None:
-                    ended = trace.ended_at
-                else:
-                    ended = None
-            elif isinstance(trace, dict):
-                # Dictionary case
-                started = trace.get("started_at")
-                ended = trace.get("ended_at")
-            else:
-                # Unknown case
-                continue
-
-            if started:
-                dates.append(started)
-            if ended:
-                dates.append(ended)
-
-        if not dates:
-            return {"earliest": None, "latest": None}
-
-        return {"earliest": min(dates), "latest": max(dates)}
+        accumulator = MetadataAccumulator(token_counting="none")
+        return accumulator.update(traces).time_range()
 
     @staticmethod
     def extract_op_name_distribution(traces: List[Dict]) -> Dict[str, int]:
@@ -261,32 +441,8 @@ class TraceProcessor:
         Returns:
             Dictionary mapping operation names to counts.
         """
-        op_counts = {}
-
-        for trace in traces:
-            # Handle both dictionary and Pydantic model cases
-            if hasattr(trace, "op_name"):
-                # Pydantic model case
-                op_name = trace.op_name
-            elif isinstance(trace, dict) and "op_name" in trace:
-                # Dictionary case
-                op_name = trace.get("op_name", "")
-            else:
-                # Unknown case or missing op_name
-                continue
-
-            if not op_name:
-                continue
-
-            # Extract the operation name from the URI
-            # Pattern matches everything between /op/ and the colon
-            match = re.search(r"/op/([^:]+)", op_name)
-            if match:
-                base_op = match.group(1)
-                op_counts[base_op] = op_counts.get(base_op, 0) + 1
-
-        # Sort by count in descending order
-        return dict(sorted(op_counts.items(), key=lambda x: x[1], reverse=True))
+        accumulator = MetadataAccumulator(token_counting="none")
+        return accumulator.update(traces).op_distribution()
 
     @classmethod
     def process_traces(
@@ -295,6 +451,9 @@ class TraceProcessor:
         truncate_length: int = 200,
         return_full_data: bool = False,
         metadata_only: bool = False,
+        token_counting: str = "exact",
+        max_response_bytes: Optional[int] = None,
+        max_response_tokens: Optional[int] = None,
     ) -> QueryResult:
         """Process traces and generate metadata.
 
@@ -303,6 +462,10 @@ class TraceProcessor:
             truncate_length: Maximum length for string values.
             return_full_data: Whether to include full untruncated trace data.
             metadata_only: Whether to only include metadata without traces.
+            token_counting: Token counting mode ('exact', 'estimate' or 'none').
+            max_response_bytes: Total size budget for the serialized result. When
+                exceeded, the longest strings across all traces are truncated further.
+            max_response_tokens: Total budget in tokens, estimated from bytes.
 
         Returns:
             QueryResult object with metadata and optionally traces.
@@ -312,22 +475,18 @@ class TraceProcessor:
         )
 
         if traces:
-            # Handle both dict traces and WeaveTrace Pydantic objects
-            trace_ids = []
-            for t in traces:
-                if hasattr(t, "id"):  # Pydantic WeaveTrace object
-                    trace_ids.append(t.id)
-                elif isinstance(t, dict) and "id" in t:  # Dictionary
-                    trace_ids.append(t.get("id"))
-            logger.debug(f"First few trace IDs: {trace_ids[:3]}")
-
-        # Generate metadata
-        metadata = TraceMetadata(
-            total_traces=len(traces),
-            token_counts=cls.calculate_token_counts(traces),
-            time_range=cls.get_time_range(traces),
-            status_summary=cls.generate_status_summary(traces),
-            op_distribution=cls.extract_op_name_distribution(traces),
+            # Handle dict traces, TraceViews and WeaveTrace Pydantic objects
+            trace_ids = [
+                t.get("id") if isinstance(t, Mapping) else getattr(t, "id", None)
+                for t in traces[:3]
+            ]
+            logger.debug(f"First few trace IDs: {trace_ids}")
+
+        # Generate metadata in a single pass over the traces
+        metadata = (
+            MetadataAccumulator(token_counting=token_counting)
+            .update(traces)
+            .to_metadata()
         )
 
         if metadata_only:
@@ -382,86 +541,58 @@ class TraceProcessor:
                         processed_traces.append(empty_trace)
             else:
                 for trace in traces:
-                    if hasattr(trace, "model_dump"):  # Pydantic model
-                        trace_dict = trace.model_dump()
-                        processed_trace = {
-                            k: cls.truncate_value(v, truncate_length)
-                            for k, v in trace_dict.items()
-                        }
-                        processed_traces.append(processed_trace)
-                    elif isinstance(trace, dict):  # Dict
-                        processed_trace = {
-                            k: cls.truncate_value(v, truncate_length)
-                            for k, v in trace.items()
-                        }
-                        processed_traces.append(processed_trace)
+                    if hasattr(trace, "model_dump"):  # Pydantic model or TraceView
+                        trace = trace.model_dump()
+                    if isinstance(trace, dict):
+                        # Traces that fit are kept as-is, without copying
+                        processed_traces.append(truncate_value(trace, truncate_length))
+
+                budget = cls._response_budget(max_response_bytes, max_response_tokens)
+                if budget is not None:
+                    budget -= len(metadata.model_dump_json())
+                    processed_traces, _ = fit_to_budget(processed_traces, max(budget, 0))
 
             # Log after truncation
             logger.info(f"After truncation: {len(processed_traces)} traces")
 
-        # Convert dictionaries to WeaveTrace objects
-        try:
-            from wandb_mcp_server.weave_api.models import WeaveTrace
-
-            # Ensure all required fields are present in each trace
-            for trace in processed_traces:
-                # Check for required fields and provide default values if missing
+        # Wrap dictionaries in lazy views instead of validating every field up front
+        views = []
+        for trace in processed_traces:
+            if isinstance(trace, dict):
                 if "trace_id" not in trace and "id" in trace:
-                    trace["trace_id"] = trace["id"]
-                if "started_at" not in trace:
-                    trace["started_at"] = datetime.now().isoformat()
-
-            # Convert to Pydantic models
-            converted_traces = []
-            for trace in processed_traces:
-                # Handle datetime strings
-                if "started_at" in trace and isinstance(trace["started_at"], str):
-                    try:
-                        # Try to parse ISO format string
-                        trace["started_at"] = datetime.fromisoformat(
-                            trace["started_at"].replace("Z", "+00:00")
-                        )
-                    except (ValueError, TypeError):
-                        # If parsing fails, use current time
-                        trace["started_at"] = datetime.now()
+                    # Root calls are their own trace, copied to leave the input intact
+                    trace = {**trace, "trace_id": trace["id"]}
+                trace = TraceView(trace)
+            views.append(trace)
+        return QueryResult(metadata=metadata, traces=views)
 
-                if (
-                    "ended_at" in trace
-                    and trace["ended_at"]
-                    and isinstance(trace["ended_at"], str)
-                ):
-                    try:
-                        trace["ended_at"] = datetime.fromisoformat(
-                            trace["ended_at"].replace("Z", "+00:00")
-                        )
-                    except (ValueError, TypeError):
-                        trace["ended_at"] = None
-
-                # Create WeaveTrace object
-                try:
-                    converted_trace = WeaveTrace(**trace)
-                    converted_traces.append(converted_trace)
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to convert trace {trace.get('id')} to WeaveTrace: {e}"
-                    )
-                    # Keep the original dictionary if conversion fails
-                    converted_traces.append(trace)
-
-            return QueryResult(metadata=metadata, traces=converted_traces)
-        except ImportError:
-            # If WeaveTrace can't be imported for some reason, return dicts
-            logger.warning("Could not import WeaveTrace model, returning dictionaries")
-            return QueryResult(metadata=metadata, traces=processed_traces)
-        except Exception as e:
-            # If there's any other error in conversion, return dictionaries
-            logger.warning(f"Error converting traces to WeaveTrace: {e}")
-            return QueryResult(metadata=metadata, traces=processed_traces)
+    @staticmethod
+    def _response_budget(
+        max_response_bytes: Optional[int], max_response_tokens: Optional[int]
+    ) -> Optional[int]:
+        """Combine byte and token budgets into a single byte budget.
+
+        Args:
+            max_response_bytes: Budget in bytes, or None.
+            max_response_tokens: Budget in tokens, or None.
+
+        Returns:
+            The tighter of the two budgets in bytes, or None if neither is set.
+        """
+        budgets = []
+        if max_response_bytes is not None:
+            budgets.append(max_response_bytes)
+        if max_response_tokens is not None:
+            budgets.append(max_response_tokens * BYTES_PER_TOKEN_ESTIMATE)
+        return min(budgets) if budgets else None
 
     @staticmethod
     def get_cost(trace: Dict[str, Any], which_cost: str) -> float:
         """Extract cost information from a trace.
 
+        Costs are read from a top-level `costs` key if present, otherwise from
+        `summary.weave.costs`, where the API returns them.
+
         Args:
             trace: Trace dictionary.
             which_cost: Type of cost to extract ('total_cost', 'completion_cost', or 'prompt_cost').
@@ -469,7 +600,13 @@ class TraceProcessor:
         Returns:
             Cost value as a float.
         """
-        costs = trace.get("costs", {})
+        costs = trace.get("costs")
+        if not isinstance(costs, dict):
+            summary = trace.get("summary")
+            weave_summary = summary.get("weave") if isinstance(summary, dict) else None
+            costs = weave_summary.get("costs") if isinstance(weave_summary, dict) else None
+        if not isinstance(costs, dict):
+            costs = {}
         total = 0.0
         found = False
 
@@ -495,6 +632,49 @@ class TraceProcessor:
 
         return total if found else 0.0
 
+    @classmethod
+    def select_top_cost_ids(
+        cls,
+        traces: Iterable[Dict[str, Any]],
+        which_cost: str,
+        k: Optional[int] = None,
+        descending: bool = True,
+    ) -> List[Tuple[float, str]]:
+        """Select the k traces with the highest (or lowest) cost from a stream.
+
+        Only `(cost, id)` pairs are retained, in a heap bounded by k, so the
+        stream is consumed without holding the traces themselves. Ties keep
+        the order in which traces arrived, as a stable sort would.
+
+        Args:
+            traces: Iterable of trace dictionaries, consumed once.
+            which_cost: Type of cost to rank by ('total_cost', 'completion_cost', or 'prompt_cost').
+            k: Number of traces to select, or None to rank every trace.
+            descending: Select the most expensive traces if True, the cheapest otherwise.
+
+        Returns:
+            List of `(cost, id)` pairs in ranked order.
+        """
+        sign = 1 if descending else -1
+        # Min-heap on (signed cost, -arrival): the root is the weakest candidate
+        heap: List[Tuple[float, int, str]] = []
+        count = 0
+
+        for seq, trace in enumerate(traces):
+            count += 1
+            trace_id = trace.get("id")
+            if trace_id is None:
+                continue
+            entry = (sign * cls.get_cost(trace, which_cost), -seq, trace_id)
+            if k is None or len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        logger.info(f"Ranked {count} traces by {which_cost}, kept {len(heap)}")
+
+        return [(sign * cost, trace_id) for cost, _, trace_id in sorted(heap, reverse=True)]
+
     @staticmethod
     def get_latency_ms(trace: Dict[str, Any]) -> float:
         """Extract latency from a trace.
@@ -6,8 +6,12 @@ It separates the complex query construction logic from the API client.
 """
 
 import calendar
-from datetime import datetime
-from typing import Any, Dict, Optional, Tuple, Union
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 # Import the query models for building complex queries
 from weave.trace_server.interface.query import (
@@ -21,6 +25,7 @@ from weave.trace_server.interface.query import (
     GtOperation,
     LiteralOperation,
     NotOperation,
+    OrOperation,
     Query,
 )
 
@@ -33,6 +38,10 @@ from wandb_mcp_server.utils import get_rich_logger
 
 logger = get_rich_logger(__name__)
 
+# Half of the microsecond resolution of `started_at`: keyset cursors treat
+# server timestamps this close to the cursor's as equal to it
+KEYSET_TIMESTAMP_TOLERANCE = 5e-7
+
 
 class QueryBuilder:
     """Builds query expressions for the Weave API."""
@@ -43,6 +52,34 @@ class QueryBuilder:
     # Define synthetic fields that need special handling
     SYNTHETIC_FIELDS = {"status", "latency_ms"}
 
+    # CallsFilter list fields, applied by the server before any `$expr`
+    DIRECT_LIST_FILTER_KEYS = {
+        "op_names",
+        "op_names_prefix",
+        "trace_ids",
+        "trace_parent_ids",
+        "parent_ids",
+        "call_ids",
+        "input_refs",
+        "output_refs",
+        "wb_user_ids",
+        "wb_run_ids",
+    }
+
+    # Singular filters folded into CallsFilter lists when they are exact values
+    DIRECT_FILTER_ALIASES = {
+        "op_name": "op_names",
+        "trace_id": "trace_ids",
+        "wb_run_id": "wb_run_ids",
+    }
+    # Aliases whose IDs may also be given as integers
+    INT_FILTER_ALIASES = {"wb_run_id"}
+
+    # Number of compiled query plans kept by `compile_plan`
+    PLAN_CACHE_SIZE = 128
+    _plan_cache: "OrderedDict[str, QueryPlan]" = OrderedDict()
+    _plan_cache_lock = threading.Lock()
+
     @staticmethod
     def datetime_to_timestamp(dt_str: str) -> int:
         """Convert an ISO format datetime string to Unix timestamp.
@@ -67,6 +104,90 @@ class QueryBuilder:
             logger.warning(f"Failed to parse datetime string: {dt_str}")
             return 0
 
+    @staticmethod
+    def datetime_to_epoch_seconds(dt_str: str) -> Optional[float]:
+        """Convert an ISO format datetime string to fractional Unix seconds.
+
+        Unlike `datetime_to_timestamp`, sub-second precision is kept, which
+        keyset cursors need to compare exactly against `started_at`.
+
+        Args:
+            dt_str: The ISO format datetime string. Handles 'Z' suffix for UTC.
+
+        Returns:
+            Seconds since epoch, rounded to microseconds, or None if parsing fails.
+        """
+        if not dt_str:
+            return None
+
+        try:
+            dt = datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
+        except ValueError:
+            logger.warning(f"Failed to parse datetime string: {dt_str}")
+            return None
+
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return round(dt.timestamp(), 6)
+
+    @classmethod
+    def create_keyset_operation(
+        cls, cursor: Dict[str, Any]
+    ) -> Optional[OrOperation]:
+        """Create the filter selecting rows after a `(started_at, id)` keyset cursor.
+
+        For descending order this is `started_at < ts OR (started_at == ts AND id < last_id)`,
+        and the mirror image for ascending order. The server compares `started_at`
+        as a float, which may differ from the cursor's timestamp in the last bits,
+        so "== ts" is the inclusive range within KEYSET_TIMESTAMP_TOLERANCE of it
+        rather than `$eq`. Rows at the cursor timestamp may then be returned
+        again, and callers de-duplicate them by id.
+
+        Args:
+            cursor: Dictionary with the last seen `started_at` (ISO string) and `id`,
+                and the sort `direction` ('asc' or 'desc', default 'desc').
+
+        Returns:
+            An OR operation, or None if the cursor is invalid.
+        """
+        started_at = cursor.get("started_at") if isinstance(cursor, dict) else None
+        last_id = cursor.get("id") if isinstance(cursor, dict) else None
+        timestamp = cls.datetime_to_epoch_seconds(started_at) if started_at else None
+        if timestamp is None or last_id is None:
+            logger.warning(f"Invalid keyset cursor: {cursor}")
+            return None
+
+        earliest = timestamp - KEYSET_TIMESTAMP_TOLERANCE
+        latest = timestamp + KEYSET_TIMESTAMP_TOLERANCE
+        if cursor.get("direction", "desc") == "asc":
+            operator = FilterOperator.GREATER_THAN
+            past_timestamp = cls.create_comparison_operation(
+                "started_at", operator, latest
+            )
+            same_timestamp = cls.create_comparison_operation(
+                "started_at", FilterOperator.GREATER_THAN_EQUAL, earliest
+            )
+        else:
+            operator = FilterOperator.LESS_THAN
+            past_timestamp = cls.create_comparison_operation(
+                "started_at", operator, earliest
+            )
+            same_timestamp = cls.create_comparison_operation(
+                "started_at", FilterOperator.LESS_THAN_EQUAL, latest
+            )
+        past_id = cls.create_comparison_operation("id", operator, str(last_id))
+        if not (past_timestamp and same_timestamp and past_id):
+            return None
+
+        return OrOperation(
+            **{
+                "$or": [
+                    past_timestamp,
+                    AndOperation(**{"$and": [same_timestamp, past_id]}),
+                ]
+            }
+        )
+
     @classmethod
     def create_comparison_operation(
         cls, field_name: str, operator: FilterOperator, value: Any
@@ -256,6 +377,19 @@ class QueryBuilder:
                     if comp_op:
                         operations.append(comp_op)
 
+        # Handle trace_id left over from separate_filters (conflicts with trace_ids)
+        if "trace_id" in filters:
+            operations.append(
+                EqOperation(
+                    **{
+                        "$eq": (
+                            GetFieldOperator(**{"$getField": "trace_id"}),
+                            LiteralOperation(**{"$literal": str(filters["trace_id"])}),
+                        )
+                    }
+                )
+            )
+
         # Handle wb_run_id filter (top-level)
         if "wb_run_id" in filters:
             run_id = filters["wb_run_id"]
@@ -394,6 +528,12 @@ class QueryBuilder:
                     # For has_exception=False: Use the operation as is
                     operations.append(base_op)
 
+        # Handle keyset pagination cursor on (started_at, id)
+        if "cursor" in filters:
+            cursor_op = cls.create_keyset_operation(filters["cursor"])
+            if cursor_op:
+                operations.append(cursor_op)
+
         # Combine all operations with AND
         if operations:
             if len(operations) == 1:
@@ -406,12 +546,33 @@ class QueryBuilder:
 
         return None  # No complex filters, so no Query object needed
 
+    @classmethod
+    def _is_exact_match(cls, alias: str, value: Any) -> bool:
+        """Whether a singular filter value is a literal ID rather than a pattern.
+
+        Only plain strings qualify, and integers for INT_FILTER_ALIASES. Compiled
+        regexes, booleans and any other values are left to the query expression.
+        """
+        if isinstance(value, str):
+            return "*" not in value and "$contains" not in value
+        if isinstance(value, int) and not isinstance(value, bool):
+            return alias in cls.INT_FILTER_ALIASES
+        return False
+
     @classmethod
     def separate_filters(
         cls, filters: Union[Dict[str, Any], QueryFilter]
     ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """Separate filters into direct and complex filters.
 
+        Direct filters map onto the `CallsFilter` fields, which the server
+        applies cheaply before evaluating any `$expr`, so as much as possible
+        is pushed there: list fields are normalized to de-duplicated string
+        lists, and exact `op_name`, `trace_id` and `wb_run_id` strings are
+        folded into `op_names`, `trace_ids` and `wb_run_ids`. Patterns, other
+        values, and values that conflict with a list given alongside them, are
+        left for the query expression.
+
         Args:
             filters: Dictionary or QueryFilter of filter conditions.
 
@@ -428,93 +589,53 @@ class QueryBuilder:
             filters_dict = filters
 
         # Simple filters for CallsFilter object
-        direct_filters = {}
-        complex_filters = {}
-
-        # Simple filter keys that go directly to the CallsFilter object
-        simple_filter_keys = [
-            "trace_roots_only",
-            "op_names",
-            "op_names_prefix",
-            "trace_ids",
-            "trace_parent_ids",
-            "parent_ids",
-            "call_ids",
-        ]
-
-        for key in simple_filter_keys:
-            if key in filters_dict:
-                # Ensure op_names, trace_ids, etc. are lists as expected by CallsFilter
-                if key in [
-                    "op_names",
-                    "op_names_prefix",
-                    "trace_ids",
-                    "trace_parent_ids",
-                    "parent_ids",
-                    "call_ids",
-                ] and not isinstance(filters_dict[key], list):
-                    direct_filters[key] = [str(filters_dict[key])]
-                else:
-                    direct_filters[key] = filters_dict[key]
-
-                # Ensure call_ids are strings
-                if key == "call_ids" and isinstance(direct_filters[key], list):
-                    direct_filters[key] = [
-                        str(call_id) for call_id in direct_filters[key]
-                    ]
-
-        # Handle individual op_name and trace_id if op_names/trace_ids not already set
-        if "op_name" in filters_dict and "op_names" not in direct_filters:
-            # Only add if it's a simple name, not a pattern (patterns go to complex)
-            if (
-                isinstance(filters_dict["op_name"], str)
-                and "*" not in filters_dict["op_name"]
-                and ".*" not in filters_dict["op_name"]
-            ):
-                direct_filters["op_names"] = [filters_dict["op_name"]]
-            else:
-                # It's a pattern or complex, send to complex_filters
-                complex_filters["op_name"] = filters_dict["op_name"]
-        elif "op_name" in filters_dict and "op_names" in direct_filters:
-            # If op_names is already set, and op_name is a pattern, it needs to go to complex
-            if isinstance(filters_dict["op_name"], str) and (
-                "*" in filters_dict["op_name"] or ".*" in filters_dict["op_name"]
-            ):
-                complex_filters["op_name"] = filters_dict["op_name"]
-
-        if "trace_id" in filters_dict and "trace_ids" not in direct_filters:
-            direct_filters["trace_ids"] = [str(filters_dict["trace_id"])]
-
-        # All other keys from the original `filters` dict go to complex_filters
-        all_handled_direct_keys = set(direct_filters.keys())
-        # Add op_name/trace_id to handled if they were processed into op_names/trace_ids
-        if (
-            "op_names" in direct_filters
-            and "op_name" in filters_dict
-            and filters_dict["op_name"] in direct_filters["op_names"]
-        ):
-            all_handled_direct_keys.add("op_name")
-        if (
-            "trace_ids" in direct_filters
-            and "trace_id" in filters_dict
-            and filters_dict["trace_id"] in direct_filters["trace_ids"]
-        ):
-            all_handled_direct_keys.add("trace_id")
+        direct_filters: Dict[str, Any] = {}
+        complex_filters: Dict[str, Any] = {}
 
         for key, value in filters_dict.items():
-            if key not in all_handled_direct_keys:
-                # Exception: if op_name was simple and handled, but is also in filters, it shouldn't be added again
-                if (
-                    key == "op_name"
-                    and "op_names" in direct_filters
-                    and value in direct_filters["op_names"]
-                    and not (isinstance(value, str) and ("*" in value or ".*" in value))
-                ):
-                    continue
+            if key == "trace_roots_only":
+                direct_filters[key] = value
+            elif key in cls.DIRECT_LIST_FILTER_KEYS:
+                # CallsFilter expects lists of strings
+                values = value if isinstance(value, list) else [value]
+                direct_filters[key] = list(dict.fromkeys(str(v) for v in values))
+            else:
                 complex_filters[key] = value
 
+        for alias, key in cls.DIRECT_FILTER_ALIASES.items():
+            value = complex_filters.get(alias)
+            if not cls._is_exact_match(alias, value):
+                continue
+            value = str(value)
+            if key in direct_filters and value not in direct_filters[key]:
+                # Nothing can match both, leave the conflict to the query expression
+                continue
+            # Matching one value of a list narrows the list to that value
+            direct_filters[key] = [value]
+            del complex_filters[alias]
+
         return direct_filters, complex_filters
 
+    @classmethod
+    def compile_filters(
+        cls, filters: Union[Dict[str, Any], QueryFilter, None]
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Compile filters into the `filter` and `query` fields of a Weave request.
+
+        This is the single filter compiler shared by trace queries and counts,
+        so the same filters always produce the same server query.
+
+        Args:
+            filters: Dictionary or QueryFilter of filter conditions.
+
+        Returns:
+            Tuple of (CallsFilter dictionary, serialized query expression or None).
+        """
+        direct_filters, complex_filters = cls.separate_filters(filters or {})
+        query_expression = cls.build_query_expression(complex_filters)
+        query = query_expression.model_dump(by_alias=True) if query_expression else None
+        return direct_filters, query
+
     @classmethod
     def prepare_query_params(
         cls, params: Union[QueryParams, Dict[str, Any]]
@@ -546,11 +667,8 @@ class QueryBuilder:
         else:
             raw_params = params.copy()
 
-        # Extract filters
-        filters = raw_params.get("filters", {})
-
-        # Separate filters
-        direct_filters, complex_filters = cls.separate_filters(filters)
+        # Compile filters into the CallsFilter and query expression
+        direct_filters, query = cls.compile_filters(raw_params.get("filters", {}))
 
         # Prepare request body
         request_body = {
@@ -564,9 +682,8 @@ class QueryBuilder:
             request_body["filter"] = direct_filters
 
         # Add query expression if present
-        query_expression = cls.build_query_expression(complex_filters)
-        if query_expression:
-            request_body["query"] = query_expression.model_dump(by_alias=True)
+        if query:
+            request_body["query"] = query
 
         # Add sort criteria if present, but never send cost fields to server
         sort_by = raw_params.get("sort_by")
@@ -625,3 +742,108 @@ class QueryBuilder:
             request_body["expand_columns"] = raw_params["expand_columns"]
 
         return request_body
+
+    @classmethod
+    def compile_plan(cls, params: Union[QueryParams, Dict[str, Any]]) -> "QueryPlan":
+        """Compile query parameters into a plan reused for every page of a query.
+
+        Filters are separated and the query expression is built and serialized
+        once, so paging through a query only patches the pagination fields.
+        The last `PLAN_CACHE_SIZE` plans compiled from dictionaries are kept,
+        so repeated calls for the pages of one query don't recompile it.
+
+        Args:
+            params: Query parameters, as for `prepare_query_params`. `limit` and
+                `offset` are ignored and set per page with `QueryPlan.request`.
+
+        Returns:
+            A new QueryPlan for the query, safe to extend by the caller.
+        """
+        key = None
+        if isinstance(params, dict):
+            key = json.dumps(
+                {k: v for k, v in params.items() if k not in ("limit", "offset")},
+                sort_keys=True,
+                default=str,
+            )
+            with cls._plan_cache_lock:
+                plan = cls._plan_cache.get(key)
+                if plan is not None:
+                    cls._plan_cache.move_to_end(key)
+                    return plan.copy()
+
+        body = cls.prepare_query_params(params)
+        body.pop("limit", None)
+        body.pop("offset", None)
+        synthetic_fields = body.pop("_synthetic_fields", [])
+        plan = QueryPlan(body=body, synthetic_fields=synthetic_fields)
+
+        if key is not None:
+            with cls._plan_cache_lock:
+                cls._plan_cache[key] = plan
+                while len(cls._plan_cache) > cls.PLAN_CACHE_SIZE:
+                    cls._plan_cache.popitem(last=False)
+        return plan.copy()
+
+    @classmethod
+    def clear_plan_cache(cls) -> None:
+        """Drop every compiled query plan."""
+        with cls._plan_cache_lock:
+            cls._plan_cache.clear()
+
+
+@dataclass
+class QueryPlan:
+    """A Weave API request body compiled once per logical query.
+
+    Nested values of `body` are shared by every request built from the plan
+    and must not be modified in place.
+    """
+
+    body: Dict[str, Any]
+    synthetic_fields: List[str] = field(default_factory=list)
+
+    def copy(self) -> "QueryPlan":
+        """Return a plan with its own top-level body and synthetic fields."""
+        return QueryPlan(
+            body=dict(self.body), synthetic_fields=list(self.synthetic_fields)
+        )
+
+    def request(
+        self,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Build the request body for one page of the query.
+
+        Args:
+            offset: Number of results to skip, omitted if None.
+            limit: Maximum number of results, omitted if None.
+            cursor: Keyset cursor (see `QueryBuilder.create_keyset_operation`)
+                added to the compiled query expression.
+
+        Returns:
+            Request body ready for the Weave API.
+        """
+        request_body = dict(self.body)
+        if limit is not None:
+            request_body["limit"] = limit
+        if offset is not None:
+            request_body["offset"] = offset
+        if cursor:
+            cursor_op = QueryBuilder.create_keyset_operation(cursor)
+            if cursor_op:
+                request_body["query"] = {
+                    "$expr": self._and_expression(cursor_op.model_dump(by_alias=True))
+                }
+        return request_body
+
+    def _and_expression(self, operation: Dict[str, Any]) -> Dict[str, Any]:
+        """AND an extra serialized operation with the compiled query expression."""
+        expression = (self.body.get("query") or {}).get("$expr")
+        if not expression:
+            return operation
+        if "$and" in expression:
+            return {"$and": [*expression["$and"], operation]}
+        return {"$and": [expression, operation]}
@@ -0,0 +1,482 @@
+"""
+Tests for cursor pagination in query_paginated_wandb_gql.
+
+These tests run against an in-process fake W&B GraphQL client, so no network
+access or API keys are needed.
+"""
+
+import threading
+import time
+import unittest
+from typing import Any, Dict, List, Optional
+from unittest.mock import patch
+
+import wandb  # noqa: F401  (puts the vendored wandb_graphql on the path)
+from graphql import build_schema, graphql_sync, parse
+from wandb_graphql import print_ast
+from wandb_mcp_server.mcp_tools import query_wandb_gql as gql_module
+from wandb_mcp_server.mcp_tools.gql_cache import get_gql_response_cache
+from wandb_mcp_server.mcp_tools.gql_page_size import (
+    HEAVY_FIELD_BYTES,
+    PageSizeTuner,
+    estimate_node_bytes,
+)
+from wandb_mcp_server.mcp_tools.query_wandb_gql import (
+    clear_query_cache,
+    query_paginated_wandb_gql,
+)
+from wandb_mcp_server.mcp_tools.tools_utils import clear_wandb_api_pool
+
+QUERY = """
+query ProjectRuns($entity: String!, $project: String!, $limit: Int) {
+  project(name: $project, entityName: $entity) {
+    runs(first: $limit) {
+      edges { node { id name } }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+
+class FakeGqlClient:
+    """Serves `project.runs` pages, with cursors as run offsets.
+
+    Pages take `seconds_per_node` per requested run, and later pages larger
+    than `max_page_size` fail like a server timeout.
+    """
+
+    def __init__(
+        self,
+        runs: List[Dict[str, Any]],
+        errors_at: Optional[int] = None,
+        seconds_per_node: float = 0.0,
+        max_page_size: Optional[int] = None,
+    ):
+        self.runs = runs
+        self.errors_at = errors_at
+        self.seconds_per_node = seconds_per_node
+        self.max_page_size = max_page_size
+        self.requests: List[Dict[str, Any]] = []
+        self.threads = set()
+
+    def execute(self, document, variable_values=None):
+        variables = dict(variable_values or {})
+        self.requests.append(
+            {"query": print_ast(document), "variables": variables}
+        )
+        self.threads.add(threading.get_ident())
+        start = int(variables.get("after") or 0)
+        if self.errors_at is not None and start >= self.errors_at:
+            return {"errors": [{"message": "boom"}]}
+        if self.max_page_size and start and variables["limit"] > self.max_page_size:
+            raise TimeoutError("Read timed out")
+        time.sleep(self.seconds_per_node * variables["limit"])
+        end = min(start + variables["limit"], len(self.runs))
+        return {
+            "project": {
+                "runs": {
+                    "edges": [{"node": dict(run)} for run in self.runs[start:end]],
+                    "pageInfo": {
+                        "hasNextPage": end < len(self.runs),
+                        "endCursor": str(end),
+                    },
+                }
+            }
+        }
+
+
+class TestQueryPaginatedWandbGql(unittest.TestCase):
+    """Tests for query_paginated_wandb_gql."""
+
+    def run_query(self, client: FakeGqlClient, **kwargs) -> Dict[str, Any]:
+        clear_wandb_api_pool()
+        get_gql_response_cache().clear()
+        with patch(
+            "wandb_mcp_server.mcp_tools.query_wandb_gql.wandb.Api"
+        ) as mock_api:
+            mock_api.return_value.client = client
+            return query_paginated_wandb_gql(
+                QUERY, {"entity": "e", "project": "p"}, **kwargs
+            )
+
+    def test_aggregates_all_pages(self):
+        """Test that every page is fetched and merged, with or without prefetch."""
+        runs = [{"id": str(i), "name": f"run-{i}"} for i in range(25)]
+        for prefetch in (True, False):
+            client = FakeGqlClient(runs)
+            result = self.run_query(
+                client, max_items=100, items_per_page=10, prefetch=prefetch
+            )
+
+            collection = result["project"]["runs"]
+            assert [e["node"]["id"] for e in collection["edges"]] == [
+                str(i) for i in range(25)
+            ]
+            assert collection["pageInfo"]["hasNextPage"] is False
+            assert len(client.requests) == 3
+            assert "$after: String" in client.requests[1]["query"]
+            assert client.requests[2]["variables"]["after"] == "20"
+
+    def test_prefetch_runs_in_background_thread(self):
+        """Test that later pages are fetched off the calling thread."""
+        client = FakeGqlClient([{"id": str(i)} for i in range(30)])
+        self.run_query(client, max_items=100, items_per_page=10)
+        assert len(client.threads) == 2
+
+    def test_max_items_and_duplicates(self):
+        """Test that duplicates are skipped and max_items stops pagination."""
+        runs = [{"id": str(i % 12)} for i in range(40)]
+        client = FakeGqlClient(runs)
+        result = self.run_query(client, max_items=12, items_per_page=5)
+
+        collection = result["project"]["runs"]
+        assert [e["node"]["id"] for e in collection["edges"]] == [
+            str(i) for i in range(12)
+        ]
+        assert collection["pageInfo"]["hasNextPage"] is False
+        # The speculative prefetch may request at most one page past the limit
+        assert len(client.requests) <= 5
+
+    def test_error_page_stops_pagination(self):
+        """Test that GraphQL errors on a later page keep the pages merged so far."""
+        client = FakeGqlClient([{"id": str(i)} for i in range(30)], errors_at=20)
+        result = self.run_query(client, max_items=100, items_per_page=10)
+
+        collection = result["project"]["runs"]
+        assert len(collection["edges"]) == 20
+        assert collection["pageInfo"]["hasNextPage"] is False
+
+
+SCHEMA = build_schema(
+    """
+    type Query { project(name: String!, entityName: String!): Project }
+    type Project {
+      runs(first: Int, after: String, order: String): RunConnection
+      artifactTypes(first: Int, after: String): ArtifactTypeConnection
+    }
+    type PageInfo { hasNextPage: Boolean, endCursor: String }
+    type RunConnection { edges: [RunEdge], pageInfo: PageInfo }
+    type RunEdge { node: Run, cursor: String }
+    type Run { id: ID!, name: String, files(first: Int, after: String): FileConnection }
+    type FileConnection { edges: [FileEdge], pageInfo: PageInfo }
+    type FileEdge { node: File, cursor: String }
+    type File { id: ID!, name: String }
+    type ArtifactTypeConnection { edges: [ArtifactTypeEdge], pageInfo: PageInfo }
+    type ArtifactTypeEdge { node: ArtifactType, cursor: String }
+    type ArtifactType { id: ID!, name: String }
+    """
+)
+
+NESTED_QUERY = """
+query RunFiles($entity: String!, $project: String!, $limit: Int) {
+  project(name: $project, entityName: $entity) {
+    runs(first: $limit, order: "-createdAt") {
+      edges {
+        node {
+          id
+          name
+          files(first: 2) {
+            edges { node { ...FileFields } }
+            pageInfo { hasNextPage endCursor }
+          }
+        }
+      }
+      pageInfo { hasNextPage endCursor }
+    }
+    artifactTypes(first: 2) {
+      edges { node { id name } }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+
+fragment FileFields on File {
+  id
+  name
+}
+"""
+
+
+def connection(items: List[Dict[str, Any]], first: Optional[int], after: Optional[str]):
+    """Slice a list like a connection field, with cursors as offsets."""
+    start = int(after) if after else 0
+    end = len(items) if first is None else min(start + first, len(items))
+    return {
+        "edges": [
+            {"node": item, "cursor": str(index + 1)}
+            for index, item in enumerate(items[start:end], start)
+        ],
+        "pageInfo": {"hasNextPage": end < len(items), "endCursor": str(end)},
+    }
+
+
+class SchemaGqlClient:
+    """Executes queries against an in-memory project with graphql-core."""
+
+    def __init__(self, num_runs: int, files_per_run: int, num_artifact_types: int):
+        def run(i: int) -> Dict[str, Any]:
+            files = [
+                {"id": f"file-{i}-{j}", "name": f"file-{j}.txt"}
+                for j in range(files_per_run + i)
+            ]
+            return {
+                "id": f"run-{i}",
+                "name": f"run-{i}",
+                "files": lambda info, first=None, after=None: connection(
+                    files, first, after
+                ),
+            }
+
+        runs = [run(i) for i in range(num_runs)]
+        artifact_types = [
+            {"id": f"type-{i}", "name": f"type-{i}"} for i in range(num_artifact_types)
+        ]
+        project = {
+            "runs": lambda info, first=None, after=None, order=None: connection(
+                runs, first, after
+            ),
+            "artifactTypes": lambda info, first=None, after=None: connection(
+                artifact_types, first, after
+            ),
+        }
+        self.root = {"project": lambda info, name, entityName: project}
+        self.requests: List[str] = []
+
+    def execute(self, document, variable_values=None):
+        source = print_ast(document)
+        self.requests.append(source)
+        result = graphql_sync(
+            SCHEMA, source, root_value=self.root, variable_values=variable_values
+        )
+        if result.errors:
+            raise Exception(str(result.errors[0]))
+        return result.data
+
+
+class TestNestedPagination(unittest.TestCase):
+    """Tests for paginating every collection of a query."""
+
+    def run_query(self, client: SchemaGqlClient, **kwargs) -> Dict[str, Any]:
+        clear_wandb_api_pool()
+        get_gql_response_cache().clear()
+        with patch(
+            "wandb_mcp_server.mcp_tools.query_wandb_gql.wandb.Api"
+        ) as mock_api:
+            mock_api.return_value.client = client
+            return query_paginated_wandb_gql(
+                NESTED_QUERY, {"entity": "e", "project": "p"}, **kwargs
+            )
+
+    def test_paginates_nested_and_sibling_collections(self):
+        """Test that nested and sibling collections are fully aggregated."""
+        client = SchemaGqlClient(num_runs=25, files_per_run=3, num_artifact_types=7)
+        result = self.run_query(client, max_items=100, items_per_page=10)
+
+        runs = result["project"]["runs"]
+        assert [e["node"]["id"] for e in runs["edges"]] == [
+            f"run-{i}" for i in range(25)
+        ]
+        for i, edge in enumerate(runs["edges"]):
+            files = edge["node"]["files"]
+            assert [e["node"]["id"] for e in files["edges"]] == [
+                f"file-{i}-{j}" for j in range(3 + i)
+            ]
+            assert files["pageInfo"]["hasNextPage"] is False
+            # Cursors added to address the runs are not returned
+            assert "cursor" not in edge
+
+        artifact_types = result["project"]["artifactTypes"]
+        assert len(artifact_types["edges"]) == 7
+        assert artifact_types["pageInfo"]["hasNextPage"] is False
+
+        # 3 pages of runs, then one request for the artifact types and 4 for
+        # the next pages of 25 file collections, in batches of up to 20
+        assert len(client.requests) == 3 + 1 + 4
+
+    def test_automatic_page_size(self):
+        """Test that automatically sized pages aggregate the same response."""
+        fixed = self.run_query(
+            SchemaGqlClient(num_runs=25, files_per_run=3, num_artifact_types=7),
+            items_per_page=10,
+        )
+        client = SchemaGqlClient(num_runs=25, files_per_run=3, num_artifact_types=7)
+        result = self.run_query(client, items_per_page=None)
+
+        assert result == fixed
+        # One page of runs, one request for the artifact types and 2 for the
+        # remaining files of 25 runs, in batches of up to 20
+        assert len(client.requests) == 1 + 1 + 2
+
+    def test_nested_max_items(self):
+        """Test that max_items caps each nested collection."""
+        client = SchemaGqlClient(num_runs=3, files_per_run=20, num_artifact_types=1)
+        result = self.run_query(client, max_items=5, items_per_page=4)
+
+        for edge in result["project"]["runs"]["edges"]:
+            files = edge["node"]["files"]
+            assert len(files["edges"]) == 5
+            assert files["pageInfo"]["hasNextPage"] is False
+
+    def test_paginate_nested_disabled(self):
+        """Test that only the first collection is paginated when disabled."""
+        client = SchemaGqlClient(num_runs=3, files_per_run=5, num_artifact_types=4)
+        result = self.run_query(client, paginate_nested=False)
+
+        assert len(client.requests) == 1
+        edge = result["project"]["runs"]["edges"][0]
+        assert len(edge["node"]["files"]["edges"]) == 2
+        assert edge["node"]["files"]["pageInfo"]["hasNextPage"] is True
+
+
+def node_selection(query: str):
+    """Selection set of the nodes of the first `runs` collection of a query."""
+    document = parse(query)
+    runs = document.definitions[0].selection_set.selections[0].selection_set
+    edges = runs.selections[0].selection_set.selections[0]
+    return edges.selection_set.selections[0].selection_set, {
+        definition.name.value: definition for definition in document.definitions[1:]
+    }
+
+
+class TestAutomaticPageSize(unittest.TestCase):
+    """Tests for page sizes estimated from the query and tuned from responses."""
+
+    def run_query(self, client: FakeGqlClient, **kwargs) -> Dict[str, Any]:
+        return TestQueryPaginatedWandbGql.run_query(self, client, **kwargs)
+
+    def test_estimate_node_bytes(self):
+        """Test that JSON blobs, fragments and nested collections are weighted."""
+        light, _ = node_selection(QUERY)
+        heavy, fragments = node_selection(
+            """
+            query { project { runs {
+              edges { node { id ...Blobs files(first: 3) { edges { node { id } } } } }
+            } } }
+            fragment Blobs on Run { config summaryMetrics }
+            """
+        )
+
+        light_bytes = estimate_node_bytes(light)
+        heavy_bytes = estimate_node_bytes(heavy, fragments)
+        blob_bytes = HEAVY_FIELD_BYTES["config"] + HEAVY_FIELD_BYTES["summaryMetrics"]
+        assert light_bytes < 100
+        assert blob_bytes < heavy_bytes < blob_bytes + 500
+        # The nested collection counts for three nodes
+        without_files = estimate_node_bytes(
+            node_selection(
+                "query { project { runs { edges { node { id ...Blobs } } } } }"
+                "fragment Blobs on Run { config summaryMetrics }"
+            )[0],
+            fragments,
+        )
+        assert heavy_bytes - without_files > 3 * 32
+
+    def test_tuner_converges_to_target_latency(self):
+        """Test that the page size follows the latency, by at most 2x per page."""
+        tuner = PageSizeTuner(
+            1000, target_latency=1.0, max_page_size=1000, smoothing=1.0
+        )
+        assert tuner.page_size == 1000
+
+        # 10ms per node: 100 nodes per second
+        sizes = [tuner.observe(tuner.page_size, 0, tuner.page_size * 0.01)]
+        while sizes[-1] != 100:
+            sizes.append(tuner.observe(tuner.page_size, 0, tuner.page_size * 0.01))
+        assert sizes == [500, 250, 125, 100]
+
+        # Large nodes are limited by the byte budget, fast ones grow the pages
+        assert tuner.observe(100, 100 * 20_000, 0.001) == 50
+        assert tuner.observe(50, 0, 0.0005) == 100
+
+        # Failed pages halve the size and cap it
+        assert tuner.shrink() and tuner.page_size == tuner.max_page_size == 50
+        assert tuner.observe(50, 0, 0.0005) == 50
+        tuner.page_size = tuner.min_page_size
+        assert not tuner.shrink()
+
+    def test_light_nodes_use_large_pages(self):
+        """Test that ID-only collections are fetched with a few large pages."""
+        client = FakeGqlClient([{"id": str(i)} for i in range(1200)])
+        result = self.run_query(client, max_items=1000, items_per_page=None)
+
+        assert len(result["project"]["runs"]["edges"]) == 1000
+        assert client.requests[0]["variables"]["limit"] == 500
+        assert len(client.requests) == 2
+
+    def test_slow_pages_shrink(self):
+        """Test that pages shrink towards the target latency."""
+        client = FakeGqlClient(
+            [{"id": str(i)} for i in range(2000)], seconds_per_node=0.0002
+        )
+        result = self.run_query(
+            client, max_items=1000, items_per_page=None, target_page_latency=0.01
+        )
+
+        limits = [request["variables"]["limit"] for request in client.requests]
+        assert len(result["project"]["runs"]["edges"]) == 1000
+        assert limits[:3] == [500, 250, 125]
+        assert limits[-1] < 100
+
+    def test_failed_pages_retried_smaller(self):
+        """Test that a timed out page is retried with smaller pages."""
+        client = FakeGqlClient([{"id": str(i)} for i in range(800)], max_page_size=200)
+        result = self.run_query(client, max_items=1000, items_per_page=None)
+
+        limits = [request["variables"]["limit"] for request in client.requests]
+        assert len(result["project"]["runs"]["edges"]) == 800
+        assert limits[:4] == [500, 500, 250, 125]
+        assert max(limits[4:]) == 125
+
+
+class TestQueryCaches(unittest.TestCase):
+    """Tests for the shared API client and the prepared query cache."""
+
+    def setUp(self):
+        clear_wandb_api_pool()
+        clear_query_cache()
+
+    def tearDown(self):
+        clear_wandb_api_pool()
+        clear_query_cache()
+
+    def test_api_client_and_documents_reused(self):
+        """Test that repeated calls skip client construction and query parsing."""
+        runs = [{"id": str(i), "name": f"run-{i}"} for i in range(25)]
+        with patch(
+            "wandb_mcp_server.mcp_tools.query_wandb_gql.wandb.Api"
+        ) as mock_api, patch.object(gql_module, "gql", wraps=gql_module.gql) as parse:
+            results = []
+            for _ in range(3):
+                mock_api.return_value.client = FakeGqlClient(runs)
+                results.append(
+                    query_paginated_wandb_gql(
+                        QUERY,
+                        {"entity": "e", "project": "p"},
+                        items_per_page=10,
+                        bypass_cache=True,
+                    )
+                )
+
+        assert results[0] == results[1] == results[2]
+        assert len(results[0]["project"]["runs"]["edges"]) == 25
+        assert mock_api.call_count == 1
+        # The initial and the paginated query are parsed by the first call only
+        assert parse.call_count == 2
+
+    def test_prepared_query_cache_is_bounded(self):
+        """Test that the least recently used prepared queries are evicted."""
+        with patch.object(gql_module, "QUERY_CACHE_SIZE", 2):
+            first = gql_module._prepare_query("query A { viewer { id } }", True)
+            gql_module._prepare_query("query B { viewer { id } }", True)
+            assert gql_module._prepare_query("query A { viewer { id } }", True) is first
+            gql_module._prepare_query("query C { viewer { id } }", True)
+
+            assert [key[0] for key in gql_module._query_cache] == [
+                "query A { viewer { id } }",
+                "query C { viewer { id } }",
+            ]
+
+
+if __name__ == "__main__":
+    unittest.main()
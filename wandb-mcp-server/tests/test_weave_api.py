@@ -4,26 +4,56 @@ Tests for the Weave API client.
 This module provides tests for the Weave API client implementation.
 """
 
+import asyncio
 import json
 import os
+import re
+import tempfile
 import unittest
-from datetime import datetime, timedelta
-from unittest.mock import Mock, patch
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, Mock, patch
 
+import httpx
 import pytest
 import requests
 
-from wandb_mcp_server.weave_api.client import WeaveApiClient
+from wandb_mcp_server.weave_api import client as client_module
+from wandb_mcp_server.weave_api.client import (
+    AsyncWeaveApiClient,
+    WeaveApiClient,
+    _RecentIds,
+)
+from wandb_mcp_server.weave_api.decoders import DECODERS, get_decoder
+from wandb_mcp_server.weave_api.truncation import fit_to_budget, truncate_value
+from wandb_mcp_server.weave_api.cache import (
+    TraceCache,
+    UnsupportedQueryError,
+    compile_request,
+)
+from wandb_mcp_server.weave_api.export import (
+    HAVE_PYARROW,
+    NdjsonTraceWriter,
+    TraceExporter,
+)
+from wandb_mcp_server.weave_api.frame import HAVE_PYARROW as FRAME_HAVE_PYARROW
+from wandb_mcp_server.weave_api.frame import TraceFrame
+from wandb_mcp_server.weave_api.metadata import TraceMetadataEngine
 from wandb_mcp_server.weave_api.models import (
     FilterOperator,
     QueryFilter,
     QueryParams,
     QueryResult,
     TraceMetadata,
+    TraceView,
     WeaveTrace,
 )
-from wandb_mcp_server.weave_api.processors import TraceProcessor
+from wandb_mcp_server.weave_api.processors import (
+    MetadataAccumulator,
+    TraceProcessor,
+    get_token_encoding,
+)
 from wandb_mcp_server.weave_api.query_builder import QueryBuilder
+from wandb_mcp_server.weave_api.result_cache import ResultCache, canonical_request_key
 from wandb_mcp_server.weave_api.service import TraceService
 
 
@@ -93,12 +123,26 @@ class TestTraceProcessor(unittest.TestCase):
 
     def test_count_tokens_fallback(self):
         """Test token counting fallback when tiktoken fails."""
+        get_token_encoding.cache_clear()
         with patch("tiktoken.get_encoding", side_effect=Exception("Tiktoken error")):
             text = "This is a test of the token counter."
             result = TraceProcessor.count_tokens(text)
             # Fallback method should count words
             assert result == 8
 
+    def test_count_tokens_batch(self):
+        """Test that batch counting matches counting strings one at a time."""
+        texts = ["This is a test.", "", "Another <|endoftext|> string" * 10]
+        result = TraceProcessor.count_tokens_batch(texts)
+        assert result == [TraceProcessor.count_tokens(text) for text in texts]
+        assert TraceProcessor.count_tokens_batch([]) == []
+
+    def test_estimate_tokens(self):
+        """Test estimating tokens from UTF-8 byte length."""
+        assert TraceProcessor.estimate_tokens("") == 0
+        assert TraceProcessor.estimate_tokens("abcd") == 1
+        assert TraceProcessor.estimate_tokens("abcde") == 2
+
     def test_process_traces(self):
         """Test processing traces."""
         now = datetime.now()
@@ -234,6 +278,400 @@ class TestTraceProcessor(unittest.TestCase):
         }
         assert TraceProcessor.get_cost(trace_with_invalid, "total_cost") == 0.0
 
+    def test_select_top_cost_ids(self):
+        """Test bounded top-K selection of trace IDs by cost."""
+        costs = [3.0, 1.0, 2.0, 2.0, 5.0]
+        traces = (
+            {"id": str(i), "costs": {"model": {"total_cost": cost}}}
+            for i, cost in enumerate(costs)
+        )
+
+        top = TraceProcessor.select_top_cost_ids(traces, "total_cost", k=3)
+        assert top == [(5.0, "4"), (3.0, "0"), (2.0, "2")]
+
+        traces = [
+            {"id": str(i), "costs": {"model": {"total_cost": cost}}}
+            for i, cost in enumerate(costs)
+        ]
+        bottom = TraceProcessor.select_top_cost_ids(
+            traces, "total_cost", k=2, descending=False
+        )
+        assert bottom == [(1.0, "1"), (2.0, "2")]
+
+        # Without k every trace with an ID is ranked, matching a stable sort
+        ranked = TraceProcessor.select_top_cost_ids(
+            traces + [{"costs": {}}], "total_cost"
+        )
+        expected = sorted(
+            traces,
+            key=lambda t: TraceProcessor.get_cost(t, "total_cost"),
+            reverse=True,
+        )
+        assert [trace_id for _, trace_id in ranked] == [t["id"] for t in expected]
+
+
+class TestTruncation(unittest.TestCase):
+    """Tests for the iterative truncation engine."""
+
+    def test_untouched_values_are_not_copied(self):
+        """Test that values needing no truncation are returned as-is."""
+        value = {"messages": [{"role": "user", "content": "hi"}], "n": 1}
+        assert truncate_value(value, 100) is value
+
+    def test_copy_on_write(self):
+        """Test that only the containers on a truncated path are copied."""
+        untouched = {"role": "system", "content": "short"}
+        value = {
+            "messages": [untouched, {"role": "user", "content": "a" * 300}],
+            "config": {"temperature": 0.2},
+        }
+
+        result = truncate_value(value, 100)
+
+        assert result is not value
+        assert result["messages"][1]["content"] == "a" * 100 + "..."
+        assert result["messages"][0] is untouched
+        assert result["config"] is value["config"]
+        assert value["messages"][1]["content"] == "a" * 300
+
+    def test_deep_nesting(self):
+        """Test that deeply nested payloads don't hit the recursion limit."""
+        value = leaf = {}
+        for _ in range(5000):
+            leaf["child"] = {}
+            leaf = leaf["child"]
+        leaf["text"] = "b" * 10
+
+        result = truncate_value(value, 5)
+
+        for _ in range(5000):
+            result = result["child"]
+        assert result["text"] == "bbbbb..."
+
+    def test_fit_to_budget(self):
+        """Test fitting traces into a total byte budget."""
+        traces = [
+            {"id": str(i), "inputs": {"text": "x" * (100 * (i + 1))}} for i in range(5)
+        ]
+
+        untouched, limit = fit_to_budget(traces, 10_000)
+        assert untouched is traces and limit is None
+
+        fitted, limit = fit_to_budget(traces, 800)
+        assert len(json.dumps(fitted)) <= 800
+        assert limit is not None
+        # Short strings are kept, the longest ones are cut to the same length
+        assert fitted[0]["id"] == "0"
+        assert fitted[4]["inputs"]["text"] == "x" * limit + "..."
+
+    def test_fit_to_budget_keeps_identifiers(self):
+        """Test that identifiers and timestamps are never shortened to fit a budget."""
+        traces = [
+            {
+                "id": f"0192f7a3-{i:04d}-7c2e-9a51-{'b' * 12}",
+                "trace_id": f"0192f7a3-{i:04d}-7000-8000-{'c' * 12}",
+                "parent_id": None,
+                "op_name": "weave:///entity/project/op/predict:" + "d" * 40,
+                "started_at": "2025-01-01T00:00:00.123456Z",
+                "inputs": {"text": "x" * 2000},
+                "output": "y" * 2000,
+            }
+            for i in range(5)
+        ]
+
+        fitted, limit = fit_to_budget(traces, 1500)
+
+        assert limit is not None and limit < 40
+        for original, trace in zip(traces, fitted):
+            for key in ("id", "trace_id", "op_name", "started_at"):
+                assert trace[key] == original[key]
+            assert trace["output"] == "y" * limit + "..."
+
+    def test_process_traces_with_token_budget(self):
+        """Test that process_traces applies a total token budget."""
+        traces = [
+            {
+                "id": str(i),
+                "project_id": "entity/project",
+                "op_name": "test_op",
+                "trace_id": str(i),
+                "started_at": "2025-01-01T00:00:00Z",
+                "inputs": {"text": "y" * 5000},
+            }
+            for i in range(10)
+        ]
+
+        result = TraceProcessor.process_traces(
+            traces, truncate_length=4000, max_response_tokens=1000
+        )
+
+        assert len(result.model_dump_json()) <= 1000 * 4
+        assert len(result.traces[0].inputs["text"]) < 4000
+        # Identifiers are not part of the truncated payload
+        assert [trace.id for trace in result.traces] == [str(i) for i in range(10)]
+        assert result.traces[3].trace_id == "3"
+        assert result.traces[3].op_name == "test_op"
+
+
+    def test_process_traces_defaults_trace_id(self):
+        """Test that traces without a trace_id are returned with their own id."""
+        raw = {
+            "id": "1",
+            "project_id": "entity/project",
+            "op_name": "test_op",
+            "started_at": "2025-01-01T00:00:00Z",
+        }
+
+        result = TraceProcessor.process_traces([raw], truncate_length=200)
+
+        assert result.traces[0]["trace_id"] == "1"
+        assert json.loads(result.model_dump_json())["traces"][0]["trace_id"] == "1"
+        assert "trace_id" not in raw
+
+
+class TestTraceView(unittest.TestCase):
+    """Tests for the lazy TraceView."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.raw = {
+            "id": "1",
+            "project_id": "entity/project",
+            "op_name": "test_op",
+            "started_at": "2025-01-01T00:00:00Z",
+            "summary": {"weave": {"status": "success"}},
+            "inputs": {"text": "hello"},
+        }
+        self.view = TraceView(self.raw)
+
+    def test_lazy_field_parsing(self):
+        """Test that fields are parsed on access and mirror WeaveTrace."""
+        assert self.view._parsed == {}
+
+        started_at = self.view.started_at
+        assert isinstance(started_at, datetime)
+        assert started_at == WeaveTrace(**self.raw, trace_id="1").started_at
+        assert set(self.view._parsed) == {"started_at"}
+
+        # Defaults and fallbacks match the old conversion
+        assert self.view.trace_id == "1"
+        assert self.view.ended_at is None
+        assert self.view.feedback == {}
+        with pytest.raises(AttributeError):
+            self.view.not_a_field
+
+    def test_mapping_access_is_raw(self):
+        """Test that item access and dumps return the raw values without copying."""
+        assert self.view["started_at"] == "2025-01-01T00:00:00Z"
+        assert self.view.get("missing") is None
+        assert dict(self.view) == self.raw
+        assert self.view.model_dump() == self.raw
+        assert self.view._data is self.raw
+
+    def test_query_result_serialization(self):
+        """Test that QueryResult serializes views without re-validation."""
+        result = QueryResult(metadata=TraceMetadata(total_traces=1), traces=[self.view])
+
+        assert result.traces[0] is self.view
+        assert json.loads(result.model_dump_json())["traces"] == [self.raw]
+        assert self.view._parsed == {}
+
+
+@unittest.skipUnless(FRAME_HAVE_PYARROW, "pyarrow is not installed")
+class TestTraceFrame(unittest.TestCase):
+    """Tests for the columnar TraceFrame."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.traces = [
+            {
+                "id": "1",
+                "trace_id": "t1",
+                "op_name": "weave:///entity/project/op/chat:123",
+                "started_at": "2025-01-01T00:00:00Z",
+                "ended_at": "2025-01-01T00:00:01.500Z",
+                "summary": {
+                    "weave": {
+                        "status": "success",
+                        "costs": {
+                            "gpt-4o": {
+                                "prompt_tokens": 10,
+                                "completion_tokens": 5,
+                                "prompt_tokens_total_cost": 0.25,
+                                "completion_tokens_total_cost": 0.5,
+                            }
+                        },
+                    }
+                },
+            },
+            {
+                "id": "2",
+                "trace_id": "t1",
+                "parent_id": "1",
+                "op_name": "weave:///entity/project/op/tool:123",
+                "started_at": "2025-01-01T00:00:00Z",
+                "summary": {"weave": {"status": "error", "latency_ms": 30}},
+            },
+            {
+                "id": "3",
+                "trace_id": "t2",
+                "op_name": "weave:///entity/project/op/chat:123",
+                "started_at": "2025-01-02T00:00:00Z",
+                "status": "success",
+                "latency_ms": 100,
+                "costs": {"claude": {"total_cost": 1.0}, "gpt-4o": {"total_cost": 0.5}},
+            },
+        ]
+        # Batches of 2 so that per-model cost columns differ between batches
+        self.frame = TraceFrame.from_traces(self.traces, batch_size=2)
+
+    def test_flattening(self):
+        """Test that traces are flattened into typed columns."""
+        rows = self.frame.table.to_pylist()
+
+        assert len(self.frame) == 3
+        assert [row["op"] for row in rows] == ["chat", "tool", "chat"]
+        # Latency from the field, the summary, or the start/end timestamps
+        assert [row["latency_ms"] for row in rows] == [1500.0, 30.0, 100.0]
+        assert [row["status"] for row in rows] == ["success", "error", "success"]
+        assert rows[0]["total_cost"] == 0.75
+        assert rows[2]["total_cost"] == 1.5
+        assert self.frame.model_cost_columns == ["cost.gpt-4o", "cost.claude"]
+        assert rows[0]["cost.claude"] is None
+
+    def test_matches_trace_processor(self):
+        """Test that aggregates agree with the per-dict implementations."""
+        accumulator = MetadataAccumulator(token_counting="none").update(self.traces)
+
+        assert self.frame.status_counts() == accumulator.status_counts
+        assert self.frame.op_distribution() == accumulator.op_distribution()
+        costs = {
+            trace["id"]: TraceProcessor.get_cost(trace, "total_cost")
+            for trace in self.traces
+            if "costs" in trace
+        }
+        assert self.frame.table.column("total_cost")[2].as_py() == costs["3"]
+
+    def test_percentiles(self):
+        """Test overall and grouped percentiles."""
+        overall = self.frame.percentiles("latency_ms", q=[0.5])
+        assert overall == {0.5: 100.0}
+
+        by_op = {row["op"]: row for row in self.frame.percentiles(q=[0.5], by="op")}
+        assert by_op["tool"]["p50"] == 30.0
+        assert set(by_op) == {"chat", "tool"}
+
+    def test_group_by_and_cost_rollup(self):
+        """Test grouped aggregations and cost rollups."""
+        groups = self.frame.group_by("op")
+        assert groups[0]["op"] == "chat"
+        assert groups[0]["id_count"] == 2
+        assert groups[0]["latency_ms_mean"] == 800.0
+
+        totals = self.frame.cost_rollup()
+        assert totals["total_cost"] == 2.25
+        assert totals["cost.claude"] == 1.0
+        assert totals["prompt_tokens"] == 10.0
+
+        by_trace = self.frame.cost_rollup(by="trace_id")
+        assert [row["trace_id"] for row in by_trace] == ["t2", "t1"]
+        assert by_trace[1]["total_cost"] == 0.75
+
+    def test_empty_frame(self):
+        """Test building a frame from no traces."""
+        frame = TraceFrame.from_traces([])
+
+        assert len(frame) == 0
+        assert frame.status_counts() == {"success": 0, "error": 0, "other": 0}
+        assert frame.percentiles(q=[0.5]) == {0.5: None}
+
+
+class TestMetadataAccumulator(unittest.TestCase):
+    """Tests for the MetadataAccumulator class."""
+
+    def setUp(self):
+        """Set up test traces."""
+        now = datetime.now()
+        self.earlier = (now - timedelta(hours=1)).isoformat()
+        self.later = (now + timedelta(hours=1)).isoformat()
+        self.traces = [
+            {
+                "id": "1",
+                "op_name": "weave:///entity/project/op/test:123",
+                "started_at": self.earlier,
+                "ended_at": now.isoformat(),
+                "inputs": {"text": "hello world"},
+                "output": "hi",
+                "status": "success",
+            },
+            {
+                "id": "2",
+                "op_name": "weave:///entity/project/op/other:456",
+                "started_at": now.isoformat(),
+                "ended_at": self.later,
+                "summary": {"weave": {"status": "error"}},
+            },
+            {
+                "id": "3",
+                "op_name": "weave:///entity/project/op/test:789",
+                "started_at": now.isoformat(),
+                "status": None,
+            },
+        ]
+
+    def test_single_pass_matches_helpers(self):
+        """Test that one pass produces the same metadata as the per-field helpers."""
+        metadata = MetadataAccumulator().update(iter(self.traces)).to_metadata()
+
+        assert metadata.total_traces == 3
+        assert (
+            metadata.token_counts
+            == TraceProcessor.calculate_token_counts(self.traces)
+        )
+        assert metadata.op_distribution == {"test": 2, "other": 1}
+        assert metadata.status_summary == {"success": 1, "error": 1, "other": 1}
+        assert metadata.time_range["earliest"].isoformat() == self.earlier
+        assert metadata.time_range["latest"].isoformat() == self.later
+
+    def test_merge(self):
+        """Test that merging partial accumulators equals one accumulator over all traces."""
+        full = MetadataAccumulator().update(self.traces)
+        merged = (
+            MetadataAccumulator()
+            .update(self.traces[:1])
+            .merge(MetadataAccumulator().update(self.traces[1:]))
+        )
+
+        assert merged.to_metadata() == full.to_metadata()
+
+    def test_estimated_token_counts(self):
+        """Test that estimate mode counts tokens from byte length."""
+        exact = MetadataAccumulator().update(self.traces).token_counts()
+        estimated = (
+            MetadataAccumulator(token_counting="estimate")
+            .update(self.traces)
+            .token_counts()
+        )
+
+        assert estimated["input_tokens"] == TraceProcessor.estimate_tokens(
+            str({"text": "hello world"})
+        )
+        assert estimated["total_tokens"] > 0
+        assert estimated != exact
+
+        none = MetadataAccumulator(token_counting="none").update(self.traces)
+        assert none.token_counts()["total_tokens"] == 0
+
+        with pytest.raises(ValueError, match="Invalid token_counting"):
+            MetadataAccumulator(token_counting="fast")
+
+    def test_from_metadata_round_trip(self):
+        """Test rebuilding an accumulator from computed metadata."""
+        metadata = MetadataAccumulator().update(self.traces).to_metadata()
+        rebuilt = MetadataAccumulator.from_metadata(metadata)
+
+        assert rebuilt.to_metadata() == metadata
+
 
 class TestQueryBuilder(unittest.TestCase):
     """Tests for the QueryBuilder class."""
@@ -308,6 +746,80 @@ class TestQueryBuilder(unittest.TestCase):
         assert direct == {}
         assert complex == {}
 
+    def test_separate_filters_pushdown(self):
+        """Test that exact values are pushed into the CallsFilter fields."""
+        direct, complex = QueryBuilder.separate_filters(
+            {
+                "op_names": ["a", "b", "a"],
+                "op_name": "b",
+                "wb_run_id": "run-1",
+                "wb_user_ids": "user-1",
+                "input_refs": ["ref-1"],
+                "status": "error",
+            }
+        )
+        assert direct == {
+            "op_names": ["b"],
+            "wb_run_ids": ["run-1"],
+            "wb_user_ids": ["user-1"],
+            "input_refs": ["ref-1"],
+        }
+        assert complex == {"status": "error"}
+
+        # Patterns and conflicting values stay in the query expression
+        direct, complex = QueryBuilder.separate_filters(
+            {
+                "wb_run_id": {"$contains": "run"},
+                "trace_ids": ["t1"],
+                "trace_id": "t2",
+            }
+        )
+        assert direct == {"trace_ids": ["t1"]}
+        assert complex == {"wb_run_id": {"$contains": "run"}, "trace_id": "t2"}
+        query = QueryBuilder.build_query_expression(complex).model_dump(by_alias=True)
+        assert len(query["$expr"]["$and"]) == 2
+
+    def test_separate_filters_regex_op_name(self):
+        """Test that compiled regexes and non-ID values are not folded into lists."""
+        pattern = re.compile("predict")
+        direct, complex = QueryBuilder.separate_filters({"op_name": pattern})
+        assert direct == {}
+        assert complex == {"op_name": pattern}
+        query = QueryBuilder.build_query_expression(complex).model_dump(by_alias=True)
+        assert query["$expr"]["$contains"]["substr"]["$literal"] == "predict"
+
+        direct, complex = QueryBuilder.separate_filters(
+            {"trace_id": 7, "op_name": True, "wb_run_id": 42}
+        )
+        assert direct == {"wb_run_ids": ["42"]}
+        assert complex == {"trace_id": 7, "op_name": True}
+
+    @patch("wandb_mcp_server.mcp_tools.count_traces.get_retry_session")
+    def test_count_traces_shares_filter_compiler(self, mock_get_session):
+        """Test that counts and trace queries send the same filter and query."""
+        from wandb_mcp_server.mcp_tools.count_traces import count_traces
+
+        response = Mock(status_code=200)
+        response.json.return_value = {"count": 1}
+        mock_get_session.return_value.post.return_value = response
+        filters = {
+            "op_name": "weave:///e/p/op/chat:*",
+            "trace_id": "t1",
+            "wb_run_id": "run-1",
+            "has_exception": True,
+            "latency": {"$lt": 500},
+        }
+
+        count_traces("e", "p", filters=filters, bypass_cache=True)
+
+        sent = json.loads(mock_get_session.return_value.post.call_args[1]["data"])
+        expected = QueryBuilder.prepare_query_params(
+            {"entity_name": "e", "project_name": "p", "filters": filters}
+        )
+        assert sent["filter"] == expected["filter"]
+        assert sent["filter"] == {"trace_ids": ["t1"], "wb_run_ids": ["run-1"]}
+        assert sent["query"] == json.loads(json.dumps(expected["query"]))
+
     def test_prepare_query_params(self):
         """Test preparing query parameters."""
         params = {
@@ -429,6 +941,89 @@ class TestQueryBuilder(unittest.TestCase):
         )
         assert invalid_op is None
 
+    def test_create_keyset_operation(self):
+        """Test building a (started_at, id) keyset cursor filter."""
+        cursor = {"started_at": "2025-01-01T00:00:00.250000Z", "id": "abc"}
+        expr = QueryBuilder.build_query_expression({"cursor": cursor})
+        expr_dict = expr.model_dump(by_alias=True)["$expr"]
+
+        past_timestamp, same_timestamp = expr_dict["$or"]
+        # Descending order: $lt is expressed as $not($gte), $lte as $not($gt)
+        earliest = past_timestamp["$not"][0]["$gte"][1]["$literal"]
+        assert earliest == pytest.approx(1735689600.25 - 5e-7, abs=1e-7)
+        same_op, id_op = same_timestamp["$and"]
+        assert same_op["$not"][0]["$gt"][0]["$getField"] == "started_at"
+        latest = same_op["$not"][0]["$gt"][1]["$literal"]
+        assert latest == pytest.approx(1735689600.25 + 5e-7, abs=1e-7)
+        assert id_op["$not"][0]["$gte"][1]["$literal"] == "abc"
+
+        asc_op = QueryBuilder.create_keyset_operation({**cursor, "direction": "asc"})
+        asc_dict = asc_op.model_dump(by_alias=True)
+        assert asc_dict["$or"][0]["$gt"][1]["$literal"] == latest
+        assert asc_dict["$or"][1]["$and"][0]["$gte"][1]["$literal"] == earliest
+
+        assert QueryBuilder.create_keyset_operation({"id": "abc"}) is None
+
+
+    def test_compile_plan(self):
+        """Test that a plan matches prepare_query_params with pagination patched."""
+        QueryBuilder.clear_plan_cache()
+        params = {
+            "entity_name": "test_entity",
+            "project_name": "test_project",
+            "filters": {
+                "trace_roots_only": True,
+                "status": "success",
+                "latency": {"$gt": 100},
+            },
+            "sort_by": "started_at",
+            "sort_direction": "desc",
+            "columns": ["id", "status"],
+        }
+        plan = QueryBuilder.compile_plan(params)
+        assert plan.synthetic_fields == ["status"]
+
+        expected = QueryBuilder.prepare_query_params(
+            {**params, "limit": 10, "offset": 20}
+        )
+        expected.pop("_synthetic_fields")
+        assert plan.request(offset=20, limit=10) == expected
+        assert "offset" not in plan.request()
+
+        # Pages share the compiled expression instead of rebuilding it
+        with patch.object(
+            QueryBuilder,
+            "build_query_expression",
+            side_effect=AssertionError("recompiled"),
+        ):
+            second = QueryBuilder.compile_plan({**params, "offset": 40})
+        assert second.request(offset=40)["query"] is plan.body["query"]
+
+        # Each caller gets its own top-level body
+        second.body["sort_by"] = []
+        second.synthetic_fields.append("latency_ms")
+        assert QueryBuilder.compile_plan(params).body["sort_by"] == expected["sort_by"]
+        assert plan.synthetic_fields == ["status"]
+
+    def test_compile_plan_cursor(self):
+        """Test that a keyset cursor is ANDed with the compiled expression."""
+        QueryBuilder.clear_plan_cache()
+        cursor = {"started_at": "2025-01-01T00:00:00Z", "id": "a", "direction": "desc"}
+        for filters in (
+            {},
+            {"status": "error"},
+            {"status": "error", "latency": {"$gt": 1}},
+        ):
+            params = {
+                "entity_name": "e",
+                "project_name": "p",
+                "filters": filters,
+            }
+            expected = QueryBuilder.prepare_query_params(
+                {**params, "filters": {**filters, "cursor": cursor}}
+            )
+            assert QueryBuilder.compile_plan(params).request(cursor=cursor) == expected
+
 
 class TestWeaveApiClient(unittest.TestCase):
     """Tests for the WeaveApiClient class."""
@@ -539,45 +1134,1072 @@ class TestWeaveApiClient(unittest.TestCase):
             list(self.client.query_traces({"project_id": "entity/project"}))
 
 
-class TestTraceService(unittest.TestCase):
-    """Tests for the TraceService class."""
+    def test_retry_adapter(self):
+        """Test that 429 and 5xx responses are retried with backoff."""
+        adapter = self.client.session.get_adapter(self.client.server_url)
+        retry = adapter.max_retries
+
+        assert retry.total == self.client.retries
+        assert {429, 500, 502, 503, 504} <= set(retry.status_forcelist)
+        assert "POST" in retry.allowed_methods
+        assert retry.backoff_jitter > 0
+
+    @patch("wandb_mcp_server.weave_api.client.time.sleep")
+    @patch("requests.Session.post")
+    def test_query_traces_resumes_interrupted_stream(self, mock_post, mock_sleep):
+        """Test that a broken stream resumes from the last offset without duplicates."""
+
+        def broken_lines():
+            yield b'{"id": "1"}'
+            yield b'{"id": "2"}'
+            raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+        first = Mock(status_code=200)
+        first.iter_lines.return_value = broken_lines()
+        # A new call shifted the rows, so "2" is returned again after resuming
+        second = Mock(status_code=200)
+        second.iter_lines.return_value = [b'{"id": "2"}', b'{"id": "3"}']
+        mock_post.side_effect = [first, second]
+
+        traces = list(
+            self.client.query_traces(
+                {"project_id": "entity/project", "offset": 5, "limit": 4}
+            )
+        )
+
+        assert [t["id"] for t in traces] == ["1", "2", "3"]
+        resumed_request = json.loads(mock_post.call_args_list[1][1]["data"])
+        assert resumed_request["offset"] == 7
+        assert resumed_request["limit"] == 2
+        mock_sleep.assert_called_once()
+
+    def test_resume_dedupe_window_is_bounded(self):
+        """Test that only the most recent trace IDs are kept for de-duplication."""
+        recent_ids = _RecentIds(maxlen=2)
+        for trace_id in ("1", "2", "3"):
+            recent_ids.add(trace_id)
+
+        assert "1" not in recent_ids
+        assert "2" in recent_ids and "3" in recent_ids
+        assert len(recent_ids._order) == len(recent_ids._ids) == 2
+
+    @patch("wandb_mcp_server.weave_api.client.time.sleep")
+    @patch("requests.Session.post")
+    def test_query_traces_resume_exhausted(self, mock_post, mock_sleep):
+        """Test that a stream which keeps breaking fails after the retry budget."""
+
+        def make_response(*args, **kwargs):
+            def broken_lines():
+                raise requests.exceptions.ChunkedEncodingError("Connection broken")
+                yield
+
+            response = Mock(status_code=200)
+            response.iter_lines.return_value = broken_lines()
+            return response
+
+        mock_post.side_effect = make_response
+
+        with pytest.raises(
+            Exception, match="Failed to query Weave traces due to network error"
+        ):
+            list(self.client.query_traces({"project_id": "entity/project"}))
+
+        assert mock_post.call_count == self.client.retries + 1
+        assert mock_sleep.call_count == self.client.retries
+
+    @patch("requests.Session.post")
+    def test_query_stats(self, mock_post):
+        """Test querying call stats."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"count": 3, "total_storage_size_bytes": 400}
+        mock_post.return_value = mock_response
+
+        stats = self.client.query_stats({"project_id": "entity/project"})
+
+        assert stats == {"count": 3, "total_storage_size_bytes": 400}
+        args, kwargs = mock_post.call_args
+        assert args[0] == f"{self.client.server_url}/calls/query_stats"
+        assert kwargs["headers"]["Accept"] == "application/json"
+
+
+class TestJsonDecoders(unittest.TestCase):
+    """Tests for the pluggable JSON decoders."""
+
+    def test_available_decoders(self):
+        """Test that every available decoder handles bytes and reports errors alike."""
+        assert "json" in DECODERS
+        for name, decode in DECODERS.items():
+            assert decode(b'{"id": "1", "n": [1, 2.5, null]}') == {
+                "id": "1",
+                "n": [1, 2.5, None],
+            }, name
+            with pytest.raises(json.JSONDecodeError):
+                decode(b"{not json")
+
+    def test_get_decoder(self):
+        """Test selecting decoders by name."""
+        assert get_decoder("json") is DECODERS["json"]
+        assert get_decoder() in DECODERS.values()
+        with pytest.raises(ValueError, match="Unknown JSON decoder"):
+            get_decoder("simdjson")
+
+    def test_client_decoder_and_lazy_logging(self):
+        """Test that the client uses the chosen decoder and only logs when enabled."""
+        client = WeaveApiClient(api_key="test_key", json_decoder="json")
+        assert client.decode_json is DECODERS["json"]
+
+        # Unserializable parameters must not be touched when logging is disabled
+        previous_level = client_module.logger.level
+        client_module.logger.setLevel("WARNING")
+        try:
+            client_module._log_request("Sending request", {"value": object()})
+        finally:
+            client_module.logger.setLevel(previous_level)
+
+
+class TestAsyncWeaveApiClient(unittest.TestCase):
+    """Tests for the AsyncWeaveApiClient class."""
+
+    def _client(self, handler):
+        return AsyncWeaveApiClient(
+            api_key="test_key",
+            server_url="https://test.wandb.ai",
+            transport=httpx.MockTransport(handler),
+        )
+
+    def test_query_traces_streams_jsonl(self):
+        """Test that the JSONL stream is decoded into trace dictionaries."""
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(request)
+            body = b'{"id": "1"}\n\n{"id": "2"}\n'
+            return httpx.Response(200, content=body)
+
+        async def run():
+            async with self._client(handler) as client:
+                return [t async for t in client.query_traces({"project_id": "e/p"})]
+
+        traces = asyncio.run(run())
+
+        assert traces == [{"id": "1"}, {"id": "2"}]
+        request = requests_seen[0]
+        assert str(request.url) == "https://test.wandb.ai/calls/stream_query"
+        assert request.headers["Authorization"].startswith("Basic ")
+        assert json.loads(request.content) == {"project_id": "e/p"}
+
+    def test_query_traces_error_response(self):
+        """Test that error responses raise with the status and body."""
+        client = self._client(lambda request: httpx.Response(400, text="Bad Request"))
+
+        async def run():
+            return [t async for t in client.query_traces({})]
+
+        with pytest.raises(Exception, match="Error 400: Bad Request"):
+            asyncio.run(run())
+
+    def test_query_traces_network_error(self):
+        """Test that transport errors are reported as network errors."""
+
+        def handler(request):
+            raise httpx.ConnectError("Connection refused")
+
+        client = self._client(handler)
+
+        async def run():
+            return [t async for t in client.query_traces({})]
+
+        with pytest.raises(Exception, match="network error"):
+            asyncio.run(run())
+
+    @patch("wandb_mcp_server.weave_api.client.asyncio.sleep", new_callable=AsyncMock)
+    def test_query_traces_retries_status(self, mock_sleep):
+        """Test that 429/5xx responses are retried, honouring Retry-After."""
+        responses = [
+            httpx.Response(503, headers={"Retry-After": "3"}, text="Unavailable"),
+            httpx.Response(200, content=b'{"id": "1"}\n'),
+        ]
+        client = self._client(lambda request: responses.pop(0))
+
+        async def run():
+            return [t async for t in client.query_traces({})]
+
+        assert asyncio.run(run()) == [{"id": "1"}]
+        mock_sleep.assert_awaited_once_with(3.0)
+
+    @patch("wandb_mcp_server.weave_api.client.asyncio.sleep", new_callable=AsyncMock)
+    def test_query_traces_resumes_interrupted_stream(self, mock_sleep):
+        """Test that a broken stream resumes from the last offset without duplicates."""
+
+        class BrokenStream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield b'{"id": "1"}\n{"id": "2"}\n{"id"'
+                raise httpx.ReadError("Connection broken")
+
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(json.loads(request.content))
+            if len(requests_seen) == 1:
+                return httpx.Response(200, stream=BrokenStream())
+            # A new call shifted the rows, so "2" is returned again after resuming
+            return httpx.Response(200, content=b'{"id": "2"}\n{"id": "3"}\n')
+
+        client = self._client(handler)
+
+        async def run():
+            return [
+                t async for t in client.query_traces({"offset": 5, "limit": 4})
+            ]
+
+        assert [t["id"] for t in asyncio.run(run())] == ["1", "2", "3"]
+        assert requests_seen[1] == {"offset": 7, "limit": 2}
+        mock_sleep.assert_awaited_once()
+
+    @patch("wandb_mcp_server.weave_api.client.asyncio.sleep", new_callable=AsyncMock)
+    def test_query_traces_retries_exhausted(self, mock_sleep):
+        """Test that a status which keeps failing raises after the retry budget."""
+        client = self._client(lambda request: httpx.Response(502, text="Bad Gateway"))
+
+        async def run():
+            return [t async for t in client.query_traces({})]
+
+        with pytest.raises(Exception, match="Error 502: Bad Gateway"):
+            asyncio.run(run())
+        assert mock_sleep.await_count == client.retries
+
+    def test_query_stats(self):
+        """Test querying call stats asynchronously."""
+        client = self._client(lambda request: httpx.Response(200, json={"count": 4}))
+
+        assert asyncio.run(client.query_stats({"project_id": "e/p"})) == {"count": 4}
+
+    def test_clients_per_loop(self):
+        """Test that each event loop gets its own client, closed by aclose on that loop."""
+        client = self._client(lambda request: httpx.Response(200, json={"count": 4}))
+        pooled = []
+
+        async def run():
+            await client.query_stats({"project_id": "e/p"})
+            pooled.append(client._get_client())
+            await client.aclose()
+
+        asyncio.run(run())
+        asyncio.run(run())
+
+        assert pooled[0] is not pooled[1]
+        assert pooled[0].is_closed and pooled[1].is_closed
+
+    def test_aclose(self):
+        """Test that aclose closes the running loop's client."""
+        client = self._client(lambda request: httpx.Response(200, json={"count": 4}))
+
+        async def run():
+            pooled = client._get_client()
+            await client.aclose()
+            return pooled, client._get_client()
+
+        closed, reopened = asyncio.run(run())
+        assert closed.is_closed
+        assert closed is not reopened
+
+    def test_server_lifespan_closes_trace_service(self):
+        """Test that the shared trace service's connections close on server shutdown."""
+        from wandb_mcp_server.mcp_tools import query_weave
+        from wandb_mcp_server.server import lifespan, mcp
+
+        async def run():
+            async with lifespan(mcp):
+                return query_weave._trace_service.async_client._get_client()
+
+        assert asyncio.run(run()).is_closed
+
+
+class TestTraceMetadataEngine(unittest.TestCase):
+    """Tests for the TraceMetadataEngine class."""
 
     def setUp(self):
         """Set up test environment."""
-        self.service = TraceService()
-
-    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
-    def test_query_traces(self, mock_query_traces):
-        """Test querying traces."""
-        now = datetime.now()
-        # Set up mock response
-        mock_traces = [
+        self.client = Mock()
+        self.engine = TraceMetadataEngine(self.client)
+        self.rows = [
             {
-                "id": "trace1",
-                "project_id": "entity/project",
+                "id": "1",
                 "op_name": "weave:///entity/project/op/test:123",
-                "trace_id": "trace1",
-                "started_at": now.isoformat(),
-                "inputs": {"text": "a" * 300},
-                "output": "b" * 300,
-                "status": "success",
+                "started_at": "2025-01-01T00:00:00+00:00",
+                "ended_at": "2025-01-01T00:00:01+00:00",
+                "summary": {"weave": {"status": "success"}},
+            },
+            {
+                "id": "2",
+                "op_name": "weave:///entity/project/op/test:123",
+                "started_at": "2025-01-02T00:00:00+00:00",
+                "summary": {"weave": {"status": "error"}},
             },
         ]
-        mock_query_traces.return_value = mock_traces
 
-        # Test basic query
-        result = self.service.query_traces(
+    def test_query_metadata_uses_stats_and_projection(self):
+        """Test that metadata is built from stats and projected columns only."""
+        self.client.query_stats.return_value = {
+            "count": 2,
+            "total_storage_size_bytes": 800,
+        }
+        self.client.query_traces.return_value = iter(self.rows)
+
+        metadata = self.engine.query_metadata(
             entity_name="test_entity",
             project_name="test_project",
-            filters={"status": "success"},
-            limit=10,
+            filters={"trace_roots_only": True},
         )
 
-        # Verify result
-        assert isinstance(result, QueryResult)
-        assert result.metadata.total_traces == 1
-        assert len(result.traces) == 1
-
+        assert metadata.total_traces == 2
+        assert metadata.status_summary == {"success": 1, "error": 1, "other": 0}
+        assert metadata.op_distribution == {"test": 2}
+        assert metadata.token_counts["total_tokens"] == 200
+        assert "input_tokens" not in metadata.token_counts
+
+        stats_request = self.client.query_stats.call_args[0][0]
+        assert stats_request["include_total_storage_size"] is True
+        assert stats_request["filter"] == {"trace_roots_only": True}
+
+        request_body = self.client.query_traces.call_args[0][0]
+        assert request_body["columns"] == TraceMetadataEngine.METADATA_COLUMNS
+        assert request_body["include_costs"] is False
+        assert request_body["include_feedback"] is False
+        assert "include_storage_size" not in request_body
+
+    def test_query_metadata_with_limit_uses_row_sizes(self):
+        """Test that per-call storage sizes are used when a limit cuts the stats short."""
+        self.client.query_stats.return_value = {
+            "count": 5,
+            "total_storage_size_bytes": 8000,
+        }
+        self.client.query_traces.return_value = iter(
+            [dict(row, storage_size_bytes=40) for row in self.rows]
+        )
+
+        metadata = self.engine.query_metadata(
+            entity_name="test_entity", project_name="test_project", target_limit=2
+        )
+
+        assert metadata.token_counts["total_tokens"] == 20
+        request_body = self.client.query_traces.call_args[0][0]
+        assert request_body["include_storage_size"] is True
+        assert request_body["limit"] == 2
+
+    def test_query_metadata_with_limit_covering_stats(self):
+        """Test that the stats size is used when the limit covers every matching call."""
+        self.client.query_stats.return_value = {
+            "count": 2,
+            "total_storage_size_bytes": 800,
+        }
+        self.client.query_traces.return_value = iter(self.rows)
+
+        metadata = self.engine.query_metadata(
+            entity_name="test_entity", project_name="test_project", target_limit=2
+        )
+
+        assert metadata.token_counts["total_tokens"] == 200
+        assert "include_storage_size" not in self.client.query_traces.call_args[0][0]
+
+    def test_query_metadata_stats_without_count(self):
+        """Test that stats without a count don't short-circuit to empty metadata."""
+        self.client.query_stats.return_value = {"total_storage_size_bytes": 8000}
+        self.client.query_traces.return_value = iter(
+            [dict(row, storage_size_bytes=40) for row in self.rows]
+        )
+
+        metadata = self.engine.query_metadata(
+            entity_name="test_entity", project_name="test_project", target_limit=2
+        )
+
+        assert metadata.total_traces == 2
+        assert metadata.token_counts["total_tokens"] == 20
+        assert self.client.query_traces.call_args[0][0]["include_storage_size"] is True
+
+    def test_query_metadata_empty_skips_stream(self):
+        """Test that no calls are streamed when the stats report no matches."""
+        self.client.query_stats.return_value = {"count": 0}
+
+        metadata = self.engine.query_metadata(
+            entity_name="test_entity", project_name="test_project"
+        )
+
+        assert metadata.total_traces == 0
+        self.client.query_traces.assert_not_called()
+
+    def test_query_metadata_stats_failure(self):
+        """Test falling back to streamed sizes when the stats endpoint fails."""
+        self.client.query_stats.side_effect = Exception("Error 404: Not Found")
+        self.client.query_traces.return_value = iter(self.rows)
+
+        metadata = self.engine.query_metadata(
+            entity_name="test_entity", project_name="test_project"
+        )
+
+        assert metadata.total_traces == 2
+        assert self.client.query_traces.call_args[0][0]["include_storage_size"] is True
+
+    def test_query_metadata_rejects_exact_counts(self):
+        """Test that exact token counting is rejected."""
+        with pytest.raises(ValueError, match="does not support"):
+            self.engine.query_metadata(
+                entity_name="test_entity",
+                project_name="test_project",
+                token_counting="exact",
+            )
+
+
+class TestTraceExporter(unittest.TestCase):
+    """Tests for the TraceExporter class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.service = TraceService()
+        self.exporter = TraceExporter(self.service, batch_size=2)
+        self.traces = [
+            {
+                "id": str(i),
+                "project_id": "entity/project",
+                "op_name": "weave:///entity/project/op/test:123",
+                "trace_id": "t1",
+                "started_at": f"2025-01-0{i + 1}T00:00:00+00:00",
+                "inputs": {"prompt": f"question {i}"},
+                "output": f"answer {i}",
+                "summary": {"weave": {"status": "success"}},
+            }
+            for i in range(5)
+        ]
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_export_ndjson(self, mock_query_traces):
+        """Test streaming traces to an NDJSON file in batches."""
+        mock_query_traces.return_value = iter(self.traces)
+        path = os.path.join(self.tmpdir.name, "traces.ndjson")
+
+        with patch.object(
+            NdjsonTraceWriter,
+            "write_batch",
+            autospec=True,
+            side_effect=NdjsonTraceWriter.write_batch,
+        ) as mock_write_batch:
+            result = self.exporter.export(
+                entity_name="entity",
+                project_name="project",
+                path=path,
+                limit=5,
+            )
+
+        # 5 traces in batches of 2
+        assert [len(call.args[1]) for call in mock_write_batch.call_args_list] == [
+            2,
+            2,
+            1,
+        ]
+        with open(path) as f:
+            rows = [json.loads(line) for line in f]
+        assert [row["id"] for row in rows] == ["0", "1", "2", "3", "4"]
+        assert result.path == path
+        assert result.rows_written == 5
+        assert result.bytes_written == os.path.getsize(path)
+        assert result.metadata.total_traces == 5
+        assert result.metadata.status_summary["success"] == 5
+        assert not os.path.exists(path + ".partial")
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_export_projects_columns(self, mock_query_traces):
+        """Test that only the requested columns are requested and written."""
+        mock_query_traces.return_value = iter(self.traces)
+        path = os.path.join(self.tmpdir.name, "traces.ndjson")
+
+        result = self.exporter.export(
+            entity_name="entity",
+            project_name="project",
+            path=path,
+            columns=["id", "output"],
+        )
+
+        request = mock_query_traces.call_args[0][0]
+        assert "id" in request["columns"] and "output" in request["columns"]
+        assert "inputs" not in request["columns"]
+        with open(path) as f:
+            rows = [json.loads(line) for line in f]
+        assert rows[0] == {"id": "0", "output": "answer 0"}
+        assert result.columns == ["id", "output"]
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_export_failure_removes_partial_file(self, mock_query_traces):
+        """Test that a failed export leaves no file behind."""
+
+        def failing_stream(request):
+            yield self.traces[0]
+            raise requests.exceptions.ConnectionError("connection lost")
+
+        mock_query_traces.side_effect = failing_stream
+        path = os.path.join(self.tmpdir.name, "traces.ndjson")
+
+        with pytest.raises(requests.exceptions.ConnectionError):
+            self.exporter.export(entity_name="entity", project_name="project", path=path)
+
+        assert os.listdir(self.tmpdir.name) == []
+
+    def test_invalid_format(self):
+        """Test that unknown formats are rejected before querying."""
+        with pytest.raises(ValueError, match="Unknown export format"):
+            self.exporter.export(
+                entity_name="entity", project_name="project", format="csv"
+            )
+
+    @unittest.skipUnless(HAVE_PYARROW, "pyarrow is not installed")
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_export_parquet(self, mock_query_traces):
+        """Test exporting traces to Parquet with a fixed schema."""
+        import pyarrow.parquet
+
+        mock_query_traces.return_value = iter(self.traces)
+        path = os.path.join(self.tmpdir.name, "traces.parquet")
+
+        self.exporter.export(
+            entity_name="entity",
+            project_name="project",
+            path=path,
+            format="parquet",
+            columns=["id", "started_at", "inputs"],
+        )
+
+        table = pyarrow.parquet.read_table(path)
+        assert table.column_names == ["id", "started_at", "inputs"]
+        assert table.num_rows == 5
+        assert json.loads(table.column("inputs")[0].as_py()) == {
+            "prompt": "question 0"
+        }
+
+
+class TestTraceCache(unittest.TestCase):
+    """Tests for the local TraceCache."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.cache = TraceCache(
+            os.path.join(self.tmpdir.name, "traces.sqlite"), sync_interval=0
+        )
+        self.since = QueryBuilder.datetime_to_epoch_seconds("2025-01-01T00:00:00Z")
+        self.client = Mock()
+        self.calls = [
+            {
+                "id": "1",
+                "op_name": "weave:///entity/project/op/chat:abc",
+                "trace_id": "t1",
+                "parent_id": None,
+                "started_at": "2025-01-01T00:00:00Z",
+                "ended_at": "2025-01-01T00:00:01Z",
+                "exception": None,
+                "summary": {"weave": {"status": "success", "latency_ms": 1000}},
+            },
+            {
+                "id": "2",
+                "op_name": "weave:///entity/project/op/tool:abc",
+                "trace_id": "t1",
+                "parent_id": "1",
+                "started_at": "2025-01-01T00:00:00.500Z",
+                "ended_at": None,
+                "exception": None,
+                "summary": {"weave": {"status": "running"}},
+            },
+            {
+                "id": "3",
+                "op_name": "weave:///entity/project/op/chat:abc",
+                "trace_id": "t2",
+                "parent_id": None,
+                "started_at": "2025-01-02T00:00:00Z",
+                "ended_at": "2025-01-02T00:00:02Z",
+                "exception": "boom",
+                "summary": {"weave": {"status": "error", "latency_ms": 2000}},
+            },
+        ]
+
+    def _predicate(self, filters):
+        return compile_request(
+            QueryBuilder.prepare_query_params(
+                {"entity_name": "entity", "project_name": "project", "filters": filters}
+            )
+        )
+
+    def test_compile_request(self):
+        """Test that QueryBuilder requests are evaluated locally."""
+        roots = self._predicate({"trace_roots_only": True})
+        assert [c["id"] for c in self.calls if roots(c)] == ["1", "3"]
+
+        errors = self._predicate({"op_name_contains": "CHAT", "has_exception": True})
+        assert [c["id"] for c in self.calls if errors(c)] == ["3"]
+
+        in_range = self._predicate(
+            {
+                "time_range": {"end": "2025-01-01T12:00:00Z"},
+                "latency": {"$lt": 1500},
+                "status": "success",
+            }
+        )
+        assert [c["id"] for c in self.calls if in_range(c)] == ["1"]
+
+    def test_compile_request_unsupported(self):
+        """Test that requests the cache can't evaluate are rejected."""
+        with pytest.raises(UnsupportedQueryError):
+            compile_request({"filter": {"input_refs": ["ref"]}})
+        with pytest.raises(UnsupportedQueryError):
+            compile_request({"query": {"$expr": {"$in": []}}})
+
+    def _sync_start(self, request):
+        return request["query"]["$expr"]["$gte"][1]["$literal"]
+
+    def test_incremental_sync(self):
+        """Test that later syncs only fetch newer and still-running calls."""
+        self.client.query_traces.return_value = iter(self.calls)
+        assert self.cache.sync(self.client, "entity", "project", since=self.since) == 3
+
+        first_request = self.client.query_traces.call_args[0][0]
+        assert self._sync_start(first_request) == self.since
+        assert first_request["sort_by"] == [{"field": "started_at", "direction": "asc"}]
+        state = self.cache.get_state("entity/project")
+        assert state["synced_from"] == self.since
+        assert state["high_water_mark"] == QueryBuilder.datetime_to_epoch_seconds(
+            "2025-01-02T00:00:00Z"
+        )
+
+        finished = dict(self.calls[1], ended_at="2025-01-01T00:00:03Z")
+        self.client.query_traces.reset_mock()
+        self.client.query_traces.side_effect = [
+            iter(self.calls[2:]),
+            iter([finished]),
+        ]
+        assert self.cache.sync(self.client, "entity", "project", since=self.since) == 2
+
+        new_calls_request, running_request = [
+            call.args[0] for call in self.client.query_traces.call_args_list
+        ]
+        # Only calls after the high-water mark, minus the lookback window
+        start = self._sync_start(new_calls_request)
+        assert start == QueryBuilder.datetime_to_timestamp("2025-01-01T23:55:00Z")
+        assert running_request["filter"] == {"call_ids": ["2"]}
+
+        cached = list(self.cache.iter_traces("entity/project", lambda trace: True))
+        assert [c["id"] for c in cached] == ["3", "2", "1"]
+        assert cached[1]["ended_at"] == "2025-01-01T00:00:03Z"
+
+    def test_sync_interval(self):
+        """Test that a project synced recently is not synced again."""
+        cache = TraceCache(
+            os.path.join(self.tmpdir.name, "interval.sqlite"), sync_interval=3600
+        )
+        self.client.query_traces.return_value = iter(self.calls)
+        cache.sync(self.client, "entity", "project", since=self.since)
+
+        assert cache.sync(self.client, "entity", "project", since=self.since) == 0
+        assert self.client.query_traces.call_count == 1
+        assert TraceCache(self.cache.path).sync_interval > 0
+
+    @patch("wandb_mcp_server.weave_api.cache.time.time")
+    def test_sync_default_window(self, mock_time):
+        """Test that a sync without `since` only covers the default window."""
+        now = QueryBuilder.datetime_to_epoch_seconds("2025-01-08T00:00:00Z")
+        mock_time.return_value = now
+        self.client.query_traces.return_value = iter(self.calls[2:])
+
+        assert self.cache.sync(self.client, "entity", "project") == 1
+
+        request = self.client.query_traces.call_args[0][0]
+        assert self._sync_start(request) == now - self.cache.default_window_seconds
+        assert not self.cache.covers("entity/project", None)
+
+    def test_sync_continues_full_pages(self):
+        """Test that a stream returning a full page is continued from its offset."""
+        self.cache.page_size = 2
+        self.client.query_traces.side_effect = [
+            iter(self.calls[:2]),
+            iter(self.calls[2:]),
+        ]
+
+        assert self.cache.sync(self.client, "entity", "project", since=self.since) == 3
+
+        first, second = [c.args[0] for c in self.client.query_traces.call_args_list]
+        assert (first["limit"], first.get("offset", 0)) == (2, 0)
+        assert (second["limit"], second["offset"]) == (2, 2)
+
+    def test_interrupted_sync_keeps_state(self):
+        """Test that a sync which fails mid-stream does not advance the sync state."""
+        self.client.query_traces.return_value = iter(self.calls[:1])
+        self.cache.sync(self.client, "entity", "project", since=self.since)
+        state = self.cache.get_state("entity/project")
+
+        def broken_stream(request):
+            yield self.calls[2]
+            raise requests.ConnectionError("Stream interrupted")
+
+        self.client.query_traces.side_effect = broken_stream
+        with pytest.raises(requests.ConnectionError):
+            self.cache.sync(self.client, "entity", "project", since=self.since)
+        assert self.cache.get_state("entity/project") == state
+
+        # The next sync fetches the same window again
+        self.client.query_traces.side_effect = None
+        self.client.query_traces.return_value = iter([self.calls[0], self.calls[2]])
+        self.cache.sync(self.client, "entity", "project", since=self.since)
+        first, retried = [
+            c.args[0] for c in self.client.query_traces.call_args_list[1:]
+        ]
+        assert self._sync_start(retried) == self._sync_start(first)
+        cached = self.cache.iter_traces("entity/project", lambda trace: True)
+        assert [c["id"] for c in cached] == ["3", "1"]
+
+    def test_sync_purges_deleted_calls(self):
+        """Test that calls the server no longer returns are removed from the cache."""
+        self.client.query_traces.return_value = iter(self.calls)
+        self.cache.sync(self.client, "entity", "project", since=self.since)
+
+        # "3" was deleted, and the running call "2" too
+        self.client.query_traces.side_effect = [iter([]), iter([])]
+        self.cache.sync(self.client, "entity", "project", since=self.since)
+
+        cached = self.cache.iter_traces("entity/project", lambda trace: True)
+        assert [c["id"] for c in cached] == ["1"]
+
+    def test_sync_backfills_missing_range(self):
+        """Test that an earlier `since` only fetches calls before the synced range."""
+        later = QueryBuilder.datetime_to_epoch_seconds("2025-01-02T00:00:00Z")
+        self.client.query_traces.return_value = iter(self.calls[2:])
+        self.cache.sync(self.client, "entity", "project", since=later)
+
+        self.client.query_traces.reset_mock()
+        self.client.query_traces.side_effect = [
+            iter(self.calls[:1]),
+            iter(self.calls[2:]),
+        ]
+        self.cache.sync(self.client, "entity", "project", since=self.since)
+
+        backfill = self.client.query_traces.call_args_list[0].args[0]
+        start, end = backfill["query"]["$expr"]["$and"]
+        assert start["$gte"][1]["$literal"] == self.since
+        assert end["$not"][0]["$gte"][1]["$literal"] == later
+        assert self.cache.get_state("entity/project")["synced_from"] == self.since
+        cached = self.cache.iter_traces("entity/project", lambda trace: True)
+        assert [c["id"] for c in cached] == ["3", "1"]
+
+    def test_iter_traces_sort_and_limit(self):
+        """Test local sorting, time bounds and limits."""
+        self.cache.upsert("entity/project", self.calls)
+
+        by_latency = self.cache.iter_traces(
+            "entity/project",
+            lambda trace: True,
+            sort_by="summary.weave.latency_ms",
+            sort_direction="desc",
+        )
+        assert [c["id"] for c in by_latency] == ["3", "1", "2"]
+
+        oldest = self.cache.iter_traces(
+            "entity/project", lambda trace: True, sort_direction="asc", limit=2
+        )
+        assert [c["id"] for c in oldest] == ["1", "2"]
+
+        since = QueryBuilder.datetime_to_epoch_seconds("2025-01-01T12:00:00Z")
+        recent = self.cache.iter_traces("entity/project", lambda trace: True, since=since)
+        assert [c["id"] for c in recent] == ["3"]
+
+
+class TestResultCache(unittest.TestCase):
+    """Tests for the in-process ResultCache."""
+
+    def test_canonical_request_key(self):
+        """Test that equivalent requests share a key and options change it."""
+        first = {
+            "project_id": "e/p",
+            "filter": {"op_names": ["b", "a"], "trace_roots_only": True},
+            "sort_by": [{"field": "started_at", "direction": "desc"}],
+        }
+        second = {
+            "sort_by": [{"field": "started_at", "direction": "desc"}],
+            "filter": {"trace_roots_only": True, "op_names": ["a", "b"]},
+            "project_id": "e/p",
+        }
+        assert canonical_request_key(first) == canonical_request_key(second)
+        assert canonical_request_key(
+            first, truncate_length=10
+        ) != canonical_request_key(first, truncate_length=20)
+        assert canonical_request_key(first) != canonical_request_key(
+            {**first, "limit": 5}
+        )
+
+    def test_lru_eviction_and_stats(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = ResultCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == (True, 1)
+        cache.put("c", 3)
+        assert cache.get("b") == (False, None)
+        assert cache.get("a") == (True, 1)
+        assert cache.get("c") == (True, 3)
+        assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2}
+
+    def test_ttl_expiry(self):
+        """Test that expired entries are recomputed."""
+        cache = ResultCache(ttl_seconds=0)
+        compute = Mock(side_effect=[1, 2])
+        assert cache.get_or_compute("key", compute) == 1
+        assert cache.get_or_compute("key", compute) == 2
+        assert cache.misses == 2
+
+    def test_bypass_refreshes_entry(self):
+        """Test that bypassing recomputes and stores the fresh result."""
+        cache = ResultCache()
+        compute = Mock(side_effect=[1, 2])
+        assert cache.get_or_compute("key", compute) == 1
+        assert cache.get_or_compute("key", compute, bypass=True) == 2
+        assert cache.get_or_compute("key", compute) == 2
+        assert compute.call_count == 2
+
+    def test_errors_are_not_cached(self):
+        """Test that a failing computation leaves no entry behind."""
+        cache = ResultCache()
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("key", Mock(side_effect=RuntimeError("boom")))
+        assert len(cache) == 0
+
+    @patch("wandb_mcp_server.mcp_tools.count_traces.get_retry_session")
+    def test_count_traces_memoized(self, mock_get_session):
+        """Test that repeated counts hit the server once unless bypassed."""
+        from wandb_mcp_server.mcp_tools import count_traces as count_module
+
+        response = Mock(status_code=200)
+        response.json.return_value = {"count": 7}
+        mock_get_session.return_value.post.return_value = response
+        cache = ResultCache()
+        with patch.object(count_module, "get_result_cache", return_value=cache):
+            for op_names in (["a", "b"], ["b", "a"]):
+                count = count_module.count_traces(
+                    "entity", "project", filters={"op_names": op_names}
+                )
+                assert count == 7
+            count_module.count_traces(
+                "entity", "project", filters={"op_names": ["a"]}, bypass_cache=True
+            )
+
+        assert mock_get_session.return_value.post.call_count == 2
+        assert cache.hits == 1
+
+    def test_query_paginated_weave_traces_memoized(self):
+        """Test that repeated trace queries reuse the cached QueryResult."""
+        from wandb_mcp_server.mcp_tools import query_weave
+
+        result = QueryResult(
+            metadata=TraceMetadata(total_traces=0),
+            traces=[],
+        )
+
+        async def fake_query(**kwargs):
+            return result
+
+        cache = ResultCache()
+        with patch.object(
+            query_weave, "get_result_cache", return_value=cache
+        ), patch.object(
+            query_weave._trace_service,
+            "aquery_paginated_traces",
+            side_effect=fake_query,
+        ) as mock_query:
+
+            async def run(**kwargs):
+                return await query_weave.query_paginated_weave_traces(
+                    entity_name="entity", project_name="project", **kwargs
+                )
+
+            assert asyncio.run(run()) is result
+            assert asyncio.run(run()) is result
+            asyncio.run(run(truncate_length=10))
+            asyncio.run(run(bypass_cache=True))
+
+        assert mock_query.call_count == 3
+        assert cache.stats()["hits"] == 1
+
+
+class TestCountTracesMulti(unittest.TestCase):
+    """Tests for concurrent multi-counts."""
+
+    def setUp(self):
+        """Set up a fake Weave server behind a patched retry session."""
+        from wandb_mcp_server.mcp_tools import count_traces as count_module
+
+        self.count_module = count_module
+        patcher = patch.object(count_module, "get_retry_session")
+        self.mock_get_session = patcher.start()
+        self.addCleanup(patcher.stop)
+        cache_patcher = patch.object(
+            count_module, "get_result_cache", return_value=ResultCache()
+        )
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+        self.session = self.mock_get_session.return_value
+        self.session.post.side_effect = self.fake_post
+
+    @staticmethod
+    def fake_post(url, headers, data, timeout, stream=False):
+        body = json.loads(data)
+        response = Mock(status_code=200)
+        if url.endswith("/calls/stream_query"):
+            assert body["columns"] == ["op_name"]
+            response.iter_lines.return_value = [
+                b'{"op_name": "weave:///e/p/op/chat:abc"}',
+                b"",
+                b'{"op_name": "weave:///e/p/op/chat:def"}',
+                b'{"op_name": "weave:///e/p/op/score:abc"}',
+                # Not op refs, skipped like MetadataAccumulator does
+                b'{"op_name": ""}',
+                b'{"op_name": "chat"}',
+            ][: body["limit"] + 1]
+            return response
+        count = 10
+        if body.get("filter", {}).get("trace_roots_only"):
+            count = 4
+        if "query" in body:
+            count = 1
+        response.json.return_value = {"count": count}
+        return response
+
+    def test_variants_and_group_by(self):
+        """Test that variants and groups share one session and are combined."""
+        result = self.count_module.count_traces_multi(
+            "e",
+            "p",
+            variants={"total": {}, "roots": {"trace_roots_only": True}},
+            group_by=["status", "op_name"],
+        )
+
+        assert result["counts"] == {"total": 10, "roots": 4}
+        assert result["group_counts"]["status"] == {
+            status: 1 for status in self.count_module.STATUS_VALUES
+        }
+        assert result["group_counts"]["op_name"] == {"chat": 2, "score": 1}
+        assert result["group_sample_sizes"] == {}
+        self.mock_get_session.assert_called_once()
+        assert self.session.post.call_count == 3 + len(
+            self.count_module.STATUS_VALUES
+        )
+
+    def test_status_filter_and_group_by(self):
+        """Test that status groups stay within a status filter."""
+        result = self.count_module.count_traces_multi(
+            "e", "p", filters={"status": "Error"}, group_by=["status"]
+        )
+
+        assert result["group_counts"]["status"] == {
+            "success": 0,
+            "error": 1,
+            "running": 0,
+            "descendant_error": 0,
+        }
+        # The matching status shares the total's request, the others aren't sent
+        assert self.session.post.call_count == 1
+        status_body = json.loads(self.session.post.call_args_list[-1].kwargs["data"])
+        assert "error" in json.dumps(status_body["query"])
+
+    def test_status_list_filter_and_group_by(self):
+        """Test that status groups are intersected with a list of statuses."""
+        result = self.count_module.count_traces_multi(
+            "e", "p", filters={"status": ["Error", "running"]}, group_by=["status"]
+        )
+
+        assert result["group_counts"]["status"] == {
+            "success": 0,
+            "error": 1,
+            "running": 1,
+            "descendant_error": 0,
+        }
+        # The total plus one request per status in the filter
+        assert self.session.post.call_count == 3
+
+    def test_op_name_scan_limit(self):
+        """Test that op name counts scan a bounded number of recent traces."""
+        result = self.count_module.count_traces_multi(
+            "e", "p", group_by=["op_name"], op_name_scan_limit=2
+        )
+
+        assert result["group_counts"]["op_name"] == {"chat": 2}
+        assert result["group_sample_sizes"] == {"op_name": 2}
+        stream_body = json.loads(
+            next(
+                call.kwargs["data"]
+                for call in self.session.post.call_args_list
+                if call.args[0].endswith("/calls/stream_query")
+            )
+        )
+        assert stream_body["limit"] == 2
+        assert stream_body["sort_by"] == [{"field": "started_at", "direction": "desc"}]
+
+    def test_invalid_group_by(self):
+        """Test that unsupported group-by fields are rejected."""
+        with pytest.raises(ValueError):
+            self.count_module.count_traces_multi("e", "p", group_by=["model"])
+
+    def test_count_weave_traces_tool(self):
+        """Test the tool output keeps total and root counts at the top level."""
+        from wandb_mcp_server.server import count_weave_traces_tool
+
+        output = json.loads(
+            asyncio.run(
+                count_weave_traces_tool("e", "p", filters={}, group_by=["op_name"])
+            )
+        )
+        assert output == {
+            "total_count": 10,
+            "root_traces_count": 4,
+            "group_counts": {"op_name": {"chat": 2, "score": 1}},
+        }
+
+
+class TestTraceService(unittest.TestCase):
+    """Tests for the TraceService class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.service = TraceService()
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_query_traces(self, mock_query_traces):
+        """Test querying traces."""
+        now = datetime.now()
+        # Set up mock response
+        mock_traces = [
+            {
+                "id": "trace1",
+                "project_id": "entity/project",
+                "op_name": "weave:///entity/project/op/test:123",
+                "trace_id": "trace1",
+                "started_at": now.isoformat(),
+                "inputs": {"text": "a" * 300},
+                "output": "b" * 300,
+                "status": "success",
+            },
+        ]
+        mock_query_traces.return_value = mock_traces
+
+        # Test basic query
+        result = self.service.query_traces(
+            entity_name="test_entity",
+            project_name="test_project",
+            filters={"status": "success"},
+            limit=10,
+        )
+
+        # Verify result
+        assert isinstance(result, QueryResult)
+        assert result.metadata.total_traces == 1
+        assert len(result.traces) == 1
+
         # Verify request construction
         mock_query_traces.assert_called_once()
         call_args = mock_query_traces.call_args[0][0]
@@ -696,6 +2318,7 @@ class TestTraceService(unittest.TestCase):
             project_name="test_project",
             chunk_size=2,
             target_limit=5,
+            stream=False,
         )
 
         # Verify all traces were collected
@@ -708,6 +2331,241 @@ class TestTraceService(unittest.TestCase):
         # No need for 3rd call as we already have 3 results, which is less than target_limit=5
         assert mock_query_traces.call_count == 2
 
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_query_paginated_traces_streaming(self, mock_query_traces):
+        """Test that paginated queries stream from a single request."""
+        now = datetime.now()
+        mock_query_traces.return_value = iter(
+            [
+                {
+                    "id": str(i),
+                    "project_id": "entity/project",
+                    "op_name": "test_op",
+                    "trace_id": f"trace{i}",
+                    "started_at": now.isoformat(),
+                    "summary": {"weave": {"status": "success"}},
+                }
+                for i in range(3)
+            ]
+        )
+
+        result = self.service.query_paginated_traces(
+            entity_name="test_entity",
+            project_name="test_project",
+            chunk_size=20,
+            target_limit=5,
+            columns=["id", "status"],
+        )
+
+        assert [t.id for t in result.traces] == ["0", "1", "2"]
+        assert result.traces[0].status == "success"
+
+        # A short stream is complete, so only one request is made
+        mock_query_traces.assert_called_once()
+        request_body = mock_query_traces.call_args[0][0]
+        assert request_body["limit"] == 5
+        assert request_body["offset"] == 0
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_query_paginated_traces_metadata_only(self, mock_query_traces):
+        """Test that metadata-only queries are accumulated from the stream."""
+        mock_query_traces.return_value = iter(
+            [
+                {
+                    "id": str(i),
+                    "op_name": "weave:///entity/project/op/test:123",
+                    "started_at": datetime.now().isoformat(),
+                    "summary": {"weave": {"status": "success"}},
+                }
+                for i in range(4)
+            ]
+        )
+
+        result = self.service.query_paginated_traces(
+            entity_name="test_entity",
+            project_name="test_project",
+            metadata_only=True,
+        )
+
+        assert result.traces is None
+        assert result.metadata.total_traces == 4
+        assert result.metadata.status_summary["success"] == 4
+        assert result.metadata.op_distribution == {"test": 4}
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_query_paginated_traces_from_cache(self, mock_query_traces):
+        """Test that cached projects are only synced incrementally."""
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        service = TraceService(
+            cache=TraceCache(
+                os.path.join(tmpdir.name, "traces.sqlite"), sync_interval=0
+            )
+        )
+        time_range = {"start": "2025-01-01T00:00:00Z"}
+        calls = [
+            {
+                "id": str(i),
+                "project_id": "test_entity/test_project",
+                "op_name": f"weave:///test_entity/test_project/op/{op}:abc",
+                "trace_id": str(i),
+                "started_at": f"2025-01-0{i + 1}T00:00:00Z",
+                "ended_at": f"2025-01-0{i + 1}T00:00:01Z",
+                "inputs": {"prompt": f"question {i}"},
+                "summary": {"weave": {"status": "success", "costs": {}}},
+            }
+            for i, op in enumerate(["chat", "tool", "chat"])
+        ]
+        mock_query_traces.side_effect = [iter(calls), iter([])]
+
+        first = service.query_paginated_traces(
+            entity_name="test_entity",
+            project_name="test_project",
+            filters={"op_name_contains": "chat", "time_range": time_range},
+            return_full_data=True,
+        )
+        second = service.query_paginated_traces(
+            entity_name="test_entity",
+            project_name="test_project",
+            filters={"op_name_contains": "tool", "time_range": time_range},
+            columns=["id", "op_name", "status"],
+            include_costs=False,
+            return_full_data=True,
+        )
+
+        assert [t["id"] for t in first.traces] == ["2", "0"]
+        # 'status' is synthesized from 'summary', costs are left out as requested
+        assert [dict(t) for t in second.traces] == [
+            {
+                "id": "1",
+                "trace_id": "1",
+                "op_name": "weave:///test_entity/test_project/op/tool:abc",
+                "summary": {"weave": {"status": "success"}},
+                "status": "success",
+            }
+        ]
+        # Both syncs fetch every column of the project, filters are applied locally
+        assert mock_query_traces.call_count == 2
+        first_sync, second_sync = [
+            call.args[0] for call in mock_query_traces.call_args_list
+        ]
+        assert "filter" not in first_sync and "columns" not in first_sync
+        assert "$gte" in json.dumps(second_sync["query"])
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_query_paginated_traces_cache_without_time_range(self, mock_query_traces):
+        """Test that unbounded queries use the cache only for the latest calls."""
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        service = TraceService(
+            cache=TraceCache(os.path.join(tmpdir.name, "traces.sqlite"))
+        )
+        now = datetime.now(timezone.utc)
+        calls = [
+            {
+                "id": str(i),
+                "project_id": "test_entity/test_project",
+                "op_name": "weave:///test_entity/test_project/op/chat:abc",
+                "trace_id": str(i),
+                "started_at": (now - timedelta(minutes=i)).isoformat(),
+                "ended_at": (now - timedelta(minutes=i)).isoformat(),
+                "summary": {"weave": {"status": "success"}},
+            }
+            for i in range(3)
+        ]
+        mock_query_traces.side_effect = [iter(calls), iter(calls)]
+
+        latest = service.query_paginated_traces(
+            entity_name="test_entity",
+            project_name="test_project",
+            target_limit=2,
+            return_full_data=True,
+        )
+        assert [t["id"] for t in latest.traces] == ["0", "1"]
+        # Only the default window was synced
+        sync_request = mock_query_traces.call_args_list[0].args[0]
+        assert "$gte" in json.dumps(sync_request["query"])
+
+        # All calls may be older than the cached window, so the API is queried
+        service.query_paginated_traces(
+            entity_name="test_entity",
+            project_name="test_project",
+            return_full_data=True,
+        )
+        assert mock_query_traces.call_count == 2
+        assert "$gte" not in json.dumps(mock_query_traces.call_args[0][0])
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_iter_traces_resumes_truncated_stream(self, mock_query_traces):
+        """Test that a stream cut short by the server is resumed from its offset."""
+        mock_query_traces.side_effect = [
+            iter([{"id": "1"}, {"id": "2"}]),
+            iter([{"id": "3"}]),
+        ]
+
+        # The first stream ends at the server's row cap
+        self.service.stream_page_cap = 2
+        traces = list(
+            self.service.iter_traces(
+                entity_name="test_entity",
+                project_name="test_project",
+                target_limit=10,
+            )
+        )
+
+        assert [t["id"] for t in traces] == ["1", "2", "3"]
+        assert mock_query_traces.call_count == 2
+        second_request = mock_query_traces.call_args_list[1][0][0]
+        assert second_request["offset"] == 2
+        assert second_request["limit"] == 8
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_iter_traces_unlimited_stream_single_request(self, mock_query_traces):
+        """Test that a complete unlimited stream isn't followed by an empty request."""
+        mock_query_traces.side_effect = [
+            iter([{"id": str(i)} for i in range(50)]),
+            iter([]),
+        ]
+
+        traces = list(
+            self.service.iter_traces(
+                entity_name="test_entity",
+                project_name="test_project",
+            )
+        )
+
+        assert len(traces) == 50
+        assert mock_query_traces.call_count == 1
+        assert mock_query_traces.call_args[0][0].get("limit") is None
+
+    @unittest.skipUnless(FRAME_HAVE_PYARROW, "pyarrow is not installed")
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_query_frame(self, mock_query_traces):
+        """Test that query_frame streams only the columns the frame needs."""
+        mock_query_traces.return_value = iter(
+            [
+                {
+                    "id": str(i),
+                    "trace_id": "t1",
+                    "op_name": "weave:///entity/project/op/test:123",
+                    "started_at": "2025-01-01T00:00:00Z",
+                    "summary": {"weave": {"status": "success", "latency_ms": 10 * i}},
+                }
+                for i in range(4)
+            ]
+        )
+
+        frame = self.service.query_frame(
+            entity_name="test_entity", project_name="test_project"
+        )
+
+        request = mock_query_traces.call_args[0][0]
+        assert "inputs" not in request["columns"]
+        assert "output" not in request["columns"]
+        assert "summary" in request["columns"]
+        assert len(frame) == 4
+        assert frame.percentiles(q=[1.0]) == {1.0: 30.0}
+
     @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
     def test_query_for_cost_sorting(self, mock_query_traces):
         """Test two-stage cost-based sorting."""
@@ -782,6 +2640,220 @@ class TestTraceService(unittest.TestCase):
         assert "call_ids" in second_call_args["filter"]
         assert set(second_call_args["filter"]["call_ids"]) == {"1", "3"}
 
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_query_for_cost_sorting_summary_costs(self, mock_query_traces):
+        """Test that the first pass ranks by the costs nested in `summary`."""
+        costs = {"1": 1.0, "2": 3.0, "3": 2.0}
+        # The first pass only selects id and summary, as the API returns them
+        first_pass = [
+            {
+                "id": trace_id,
+                "summary": {"weave": {"costs": {"model": {"total_cost": cost}}}},
+            }
+            for trace_id, cost in costs.items()
+        ]
+        second_pass = [
+            {
+                "id": trace_id,
+                "project_id": "entity/project",
+                "op_name": "test_op",
+                "trace_id": trace_id,
+                "started_at": datetime.now().isoformat(),
+            }
+            for trace_id in ("3", "2")
+        ]
+        mock_query_traces.side_effect = [first_pass, second_pass]
+
+        result = self.service._query_for_cost_sorting(
+            entity_name="test_entity",
+            project_name="test_project",
+            sort_by="total_cost",
+            sort_direction="desc",
+            target_limit=2,
+        )
+
+        assert [trace["id"] for trace in result] == ["2", "3"]
+        first_request, second_request = [
+            call.args[0] for call in mock_query_traces.call_args_list
+        ]
+        assert first_request["columns"] == ["id", "summary"]
+        assert second_request["filter"]["call_ids"] == ["2", "3"]
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_query_for_cost_sorting_batched_second_pass(self, mock_query_traces):
+        """Test that the second pass fetches IDs in concurrent batches, in rank order."""
+        costs = {str(i): float(i) for i in range(7)}
+        second_pass_batches = []
+
+        def fake_query_traces(request):
+            call_ids = request.get("filter", {}).get("call_ids")
+            if call_ids is None:
+                return iter(
+                    {"id": id, "costs": {"model": {"total_cost": cost}}}
+                    for id, cost in costs.items()
+                )
+            second_pass_batches.append(call_ids)
+            # Return each batch out of order to check the results are reassembled
+            return iter({"id": id, "data": f"details{id}"} for id in reversed(call_ids))
+
+        mock_query_traces.side_effect = fake_query_traces
+        service = TraceService(call_ids_batch_size=2, max_workers=3)
+
+        result = service._query_for_cost_sorting(
+            entity_name="test_entity",
+            project_name="test_project",
+            sort_by="total_cost",
+            sort_direction="desc",
+            target_limit=5,
+        )
+
+        assert [t["id"] for t in result] == ["6", "5", "4", "3", "2"]
+        assert sorted(len(batch) for batch in second_pass_batches) == [1, 2, 2]
+        assert sorted(id for batch in second_pass_batches for id in batch) == [
+            "2",
+            "3",
+            "4",
+            "5",
+            "6",
+        ]
+
+    def test_aquery_paginated_traces(self):
+        """Test that async paginated queries stream over the async client."""
+        now = datetime.now().isoformat()
+        requests_seen = []
+
+        async def fake_query_traces(client, request):
+            requests_seen.append(request)
+            for i in range(3):
+                yield {
+                    "id": str(i),
+                    "project_id": "entity/project",
+                    "op_name": "weave:///entity/project/op/test:123",
+                    "trace_id": f"trace{i}",
+                    "started_at": now,
+                    "inputs": {"prompt": "hi"},
+                    "output": "hello",
+                }
+
+        with patch.object(AsyncWeaveApiClient, "query_traces", fake_query_traces):
+            result = asyncio.run(
+                self.service.aquery_paginated_traces(
+                    entity_name="test_entity",
+                    project_name="test_project",
+                    target_limit=3,
+                    return_full_data=True,
+                )
+            )
+            metadata = asyncio.run(
+                self.service.aquery_paginated_traces(
+                    entity_name="test_entity",
+                    project_name="test_project",
+                    metadata_only=True,
+                )
+            )
+
+        assert [t.id for t in result.traces] == ["0", "1", "2"]
+        assert result.metadata.total_traces == 3
+        assert requests_seen[0]["limit"] == 3
+        assert metadata.traces is None
+        assert metadata.metadata.total_traces == 3
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_query_paginated_traces_keyset(self, mock_query_traces):
+        """Test keyset pagination sends a cursor filter instead of an offset."""
+        rows = [
+            {"id": "e", "started_at": "2025-01-03T00:00:00Z"},
+            {"id": "d", "started_at": "2025-01-02T00:00:00Z"},
+            {"id": "c", "started_at": "2025-01-02T00:00:00Z"},
+            {"id": "b", "started_at": "2025-01-01T00:00:00Z"},
+            {"id": "a", "started_at": "2025-01-01T00:00:00Z"},
+        ]
+        for row in rows:
+            row.update(project_id="entity/project", op_name="test_op", trace_id="t")
+        mock_query_traces.side_effect = [
+            iter(rows[0:2]),
+            iter(rows[2:4]),
+            iter(rows[4:]),
+        ]
+
+        result = self.service.query_paginated_traces(
+            entity_name="test_entity",
+            project_name="test_project",
+            chunk_size=2,
+            keyset=True,
+            return_full_data=True,
+        )
+
+        assert [t.id for t in result.traces] == ["e", "d", "c", "b", "a"]
+        assert mock_query_traces.call_count == 3
+
+        first_request = mock_query_traces.call_args_list[0][0][0]
+        assert "query" not in first_request
+        assert first_request["sort_by"] == [
+            {"field": "started_at", "direction": "desc"},
+            {"field": "id", "direction": "desc"},
+        ]
+
+        second_request = mock_query_traces.call_args_list[1][0][0]
+        assert "offset" not in second_request
+        assert second_request["limit"] == 2
+        cursor_op = second_request["query"]["$expr"]["$or"][1]["$and"][1]
+        assert cursor_op["$not"][0]["$gte"][1]["$literal"] == "d"
+
+    @patch("wandb_mcp_server.weave_api.client.WeaveApiClient.query_traces")
+    def test_query_paginated_traces_keyset_timestamp_ties(self, mock_query_traces):
+        """Test that rows sharing a started_at across a page boundary are all returned."""
+        tied = "2025-01-02T00:00:00.123456Z"
+        rows = [{"id": "f", "started_at": "2025-01-03T00:00:00Z"}]
+        rows += [{"id": trace_id, "started_at": tied} for trace_id in "edcb"]
+        rows += [{"id": "a", "started_at": "2025-01-01T00:00:00Z"}]
+        for row in rows:
+            row.update(project_id="entity/project", op_name="test_op", trace_id="t")
+
+        def server_value(row, field):
+            if field != "started_at":
+                return row[field]
+            # The server's float differs from the cursor's in the last bits
+            return QueryBuilder.datetime_to_epoch_seconds(row[field]) + 2e-7
+
+        def matches(expr, row):
+            op, args = next(iter(expr.items()))
+            if op == "$or":
+                return any(matches(arg, row) for arg in args)
+            if op == "$and":
+                return all(matches(arg, row) for arg in args)
+            if op == "$not":
+                return not matches(args[0], row)
+            value = server_value(row, args[0]["$getField"])
+            literal = args[1]["$literal"]
+            if op == "$eq":
+                return value == literal
+            return value > literal if op == "$gt" else value >= literal
+
+        def query_traces(request):
+            query = request.get("query")
+            page = [r for r in rows if not query or matches(query["$expr"], r)]
+            return iter([dict(r) for r in page[: request["limit"]]])
+
+        mock_query_traces.side_effect = query_traces
+
+        result = self.service.query_paginated_traces(
+            entity_name="test_entity",
+            project_name="test_project",
+            chunk_size=2,
+            keyset=True,
+            return_full_data=True,
+        )
+
+        assert [t.id for t in result.traces] == ["f", "e", "d", "c", "b", "a"]
+
+    def test_invalid_concurrency_settings(self):
+        """Test that non-positive batch sizes and worker counts are rejected."""
+        with pytest.raises(ValueError):
+            TraceService(call_ids_batch_size=0)
+        with pytest.raises(ValueError):
+            TraceService(max_workers=0)
+
 
 class TestIntegration:
     """Integration tests for the Weave API components."""